@@ -37,11 +37,12 @@ this data to be available in the ``histories`` dictionary. The single and most
 used example of two *modes* are the *train* and *runtime* modes of the
 autoregressive decoder.
 """
-from typing import Dict, Optional, Any, Tuple, Union
+from typing import ContextManager, Dict, Optional, Any, Tuple, Union
 
 import tensorflow as tf
 
 from neuralmonkey.attention.namedtuples import AttentionLoopState
+from neuralmonkey.decorators import replaced_tensors
 from neuralmonkey.model.model_part import ModelPart
 from neuralmonkey.model.parameterized import InitializerSpecs
 from neuralmonkey.model.stateful import TemporalStateful, SpatialStateful
@@ -125,6 +126,16 @@ def get_attention_mask(encoder: Attendable) -> Optional[tf.Tensor]:
 class BaseAttention(ModelPart):
     """The abstract class for the attenion mechanism flavors."""
 
+    # Whether the attention reads the histories in its loop state when
+    # computing the next step. If so, the decoder keeps the whole histories
+    # as tensors in the decoding loop.
+    reads_history = False
+
+    # The names of the batch-major tensors the attention reads when computing
+    # the context vector. The decoder gathers them when it removes the
+    # finished sentences from the batch.
+    batch_tensors = ()  # type: Tuple[str, ...]
+
     def __init__(self,
                  name: str,
                  reuse: ModelPart = None,
@@ -157,6 +168,29 @@ class BaseAttention(ModelPart):
         """Get context vector for a given query."""
         raise NotImplementedError("Abstract method")
 
+    def get_batch_tensors(self) -> Dict[str, Any]:
+        """Get the batch-major tensors read by the ``attention`` method.
+
+        Returns:
+            A dictionary of (possibly nested structures of) tensors, which can
+            be gathered along the first dimension.
+        """
+        return {name: getattr(self, name) for name in self.batch_tensors}
+
+    def replace_batch_tensors(
+            self, tensors: Dict[str, Any]) -> ContextManager[None]:
+        """Use different batch-major tensors in the ``attention`` method.
+
+        Arguments:
+            tensors: A dictionary with the same structure as the one returned
+                by ``get_batch_tensors``.
+
+        Returns:
+            A context manager, in which the ``attention`` method reads the
+            given tensors.
+        """
+        return replaced_tensors(self, tensors)
+
     def initial_loop_state(self) -> Any:
         """Get initial loop state for the attention object.
 
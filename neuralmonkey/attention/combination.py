@@ -13,7 +13,8 @@ decoder not to attend to the, and extract information on its own hidden state
 (see paper `Knowing when to Look: Adaptive Attention via a Visual Sentinel for
 Image Captioning  <https://arxiv.org/pdf/1612.01887.pdf>`_).
 """
-from typing import Any, List, Tuple
+from contextlib import contextmanager, ExitStack
+from typing import Any, Dict, Iterator, List, Tuple
 
 from typeguard import check_argument_types
 import tensorflow as tf
@@ -27,7 +28,8 @@ from neuralmonkey.decorators import tensor
 from neuralmonkey.logging import debug
 from neuralmonkey.model.model_part import ModelPart
 from neuralmonkey.model.parameterized import InitializerSpecs
-from neuralmonkey.tf_utils import get_variable
+from neuralmonkey.tf_utils import (
+    append_tensor, get_variable, group_copies, ungroup_copies)
 
 
 class MultiAttention(BaseAttention):
@@ -116,6 +118,9 @@ class FlatMultiAttention(MultiAttention):
     See equations 8 to 10 in the Attention Combination Strategies paper.
     """
 
+    batch_tensors = ("masks_concat", "encoder_projections_for_logits",
+                     "encoder_projections_for_ctx")
+
     # pylint: disable=too-many-arguments
     def __init__(self,
                  name: str,
@@ -250,13 +255,23 @@ class FlatMultiAttention(MultiAttention):
 
             assert_shape(projected_state, [-1, 1, self.attention_state_size])
 
+            # The encoder projections are not tiled when the decoder decodes
+            # several outputs for each input sentence in a single loop (e.g.
+            # in the beam search). Instead, the queries are grouped by the
+            # encoder batch items, shape (batch, multiple, 1, state_size).
+            batch_size = tf.shape(self.masks_concat)[0]
+            grouped_state = tf.expand_dims(
+                group_copies(projected_state, batch_size), 2)
+
             logits = []
 
             for proj, bias in zip(self.encoder_projections_for_logits,
                                   self.encoder_attn_biases):
 
-                logits.append(tf.reduce_sum(
-                    self.attn_v * tf.tanh(projected_state + proj), [2]) + bias)
+                logits.append(ungroup_copies(tf.reduce_sum(
+                    self.attn_v * tf.tanh(
+                        grouped_state + tf.expand_dims(proj, 1)),
+                    [3])) + bias)
 
             if self._use_sentinels:
                 sentinel_value = _sentinel(query,
@@ -270,24 +285,24 @@ class FlatMultiAttention(MultiAttention):
 
             self.attentions_in_time.append(attentions)
 
-            if self._use_sentinels:
-                tiled_encoder_projections = self._tile_encoders_for_beamsearch(
-                    projected_sentinel)
+            # pylint: disable=not-an-iterable
+            encoders_length = sum(
+                tf.shape(proj)[1]
+                for proj in self.encoder_projections_for_ctx)
+            # pylint: enable=not-an-iterable
 
-                projections_concat = tf.concat(
-                    tiled_encoder_projections + [projected_sentinel], 1)
+            encoders_attentions = group_copies(
+                attentions[:, :encoders_length], batch_size)
+            contexts = ungroup_copies(tf.matmul(
+                encoders_attentions,
+                tf.concat(self.encoder_projections_for_ctx, 1)))
 
-            else:
-                projections_concat = tf.concat(
-                    self.encoder_projections_for_ctx, 1)
-
-            contexts = tf.reduce_sum(
-                tf.expand_dims(attentions, 2) * projections_concat, [1])
+            if self._use_sentinels:
+                contexts += (attentions[:, encoders_length:]
+                             * tf.squeeze(projected_sentinel, 1))
 
-            next_contexts = tf.concat(
-                [loop_state.contexts, tf.expand_dims(contexts, 0)], 0)
-            next_weights = tf.concat(
-                [loop_state.weights, tf.expand_dims(attentions, 0)], 0)
+            next_contexts = append_tensor(loop_state.contexts, contexts)
+            next_weights = append_tensor(loop_state.weights, attentions)
 
             next_loop_state = AttentionLoopState(
                 contexts=next_contexts,
@@ -296,29 +311,15 @@ class FlatMultiAttention(MultiAttention):
             return contexts, next_loop_state
     # pylint: enable=too-many-locals
 
-    # pylint: disable=not-an-iterable,unsubscriptable-object
-    def _tile_encoders_for_beamsearch(self, projected_sentinel):
-        sentinel_batch_size = tf.shape(projected_sentinel)[0]
-        encoders_batch_size = tf.shape(
-            self.encoder_projections_for_ctx[0])[0]
-
-        modulo = tf.mod(sentinel_batch_size, encoders_batch_size)
-
-        with tf.control_dependencies([tf.assert_equal(modulo, 0)]):
-            beam_size = tf.div(sentinel_batch_size,
-                               encoders_batch_size)
-
-        return [tf.tile(proj, [beam_size, 1, 1])
-                for proj in self.encoder_projections_for_ctx]
-    # pylint: enable=not-an-iterable,unsubscriptable-object
-
     def _renorm_softmax(self, logits):
         """Renormalized softmax wrt. attention mask."""
-        softmax_concat = tf.nn.softmax(logits) * self.masks_concat
-        norm = tf.reduce_sum(softmax_concat, 1, keepdims=True) + 1e-8
+        softmax = group_copies(
+            tf.nn.softmax(logits), tf.shape(self.masks_concat)[0])
+        softmax_concat = softmax * tf.expand_dims(self.masks_concat, 1)
+        norm = tf.reduce_sum(softmax_concat, 2, keepdims=True) + 1e-8
         attentions = softmax_concat / norm
 
-        return attentions
+        return ungroup_copies(attentions)
 
     def finalize_loop(self, key: str,
                       last_loop_state: AttentionLoopState) -> None:
@@ -379,6 +380,22 @@ class HierarchicalMultiAttention(MultiAttention):
         self.attentions = attentions
     # pylint: enable=too-many-arguments
 
+    @property
+    def reads_history(self) -> bool:  # type: ignore
+        return any(a.reads_history for a in self.attentions)
+
+    def get_batch_tensors(self) -> Dict[str, Any]:
+        return {a.name: a.get_batch_tensors() for a in self.attentions}
+
+    @contextmanager
+    def replace_batch_tensors(
+            self, tensors: Dict[str, Any]) -> Iterator[None]:
+        with ExitStack() as stack:
+            for att in self.attentions:
+                stack.enter_context(
+                    att.replace_batch_tensors(tensors[att.name]))
+            yield
+
     def initial_loop_state(self) -> HierarchicalLoopState:
         length = len(self.attentions)
         if self._use_sentinels:
@@ -446,11 +463,9 @@ class HierarchicalMultiAttention(MultiAttention):
 
             prev_loop_state = loop_state.loop_state
 
-            next_contexts = tf.concat(
-                [prev_loop_state.contexts, tf.expand_dims(context, 0)], axis=0)
-            next_weights = tf.concat(
-                [prev_loop_state.weights, tf.expand_dims(attention_distr, 0)],
-                axis=0)
+            next_contexts = append_tensor(prev_loop_state.contexts, context)
+            next_weights = append_tensor(
+                prev_loop_state.weights, attention_distr)
 
             next_loop_state = AttentionLoopState(
                 contexts=next_contexts,
@@ -8,15 +8,21 @@ introduced by Bahdanau et al. (2015)
 import tensorflow as tf
 from typeguard import check_argument_types
 
-from neuralmonkey.attention.base_attention import Attendable
+from neuralmonkey.attention.base_attention import (
+    Attendable, AttentionLoopState)
 from neuralmonkey.attention.feed_forward import Attention
 from neuralmonkey.decorators import tensor
+from neuralmonkey.logging import debug, debug_enabled
 from neuralmonkey.model.model_part import ModelPart
 from neuralmonkey.model.parameterized import InitializerSpecs
-from neuralmonkey.tf_utils import get_variable
+from neuralmonkey.tf_utils import get_variable, group_copies
 
 
 class CoverageAttention(Attention):
+
+    reads_history = True
+    batch_tensors = Attention.batch_tensors + ("fertility",)
+
     # pylint: disable=too-many-arguments
     def __init__(self,
                  name: str,
@@ -49,18 +55,29 @@ class CoverageAttention(Attention):
         return 1e-8 + self.max_fertility * tf.sigmoid(
             tf.reduce_sum(self.fertility_weights * self.attention_states, [2]))
 
+    def initial_loop_state(self) -> AttentionLoopState:
+        # The fertility is read in every step, so it is pre-computed outside
+        # the decoding loops together with the hidden features
+        fertility = self.fertility
+
+        if debug_enabled("bless"):
+            debug("Fertility: {}".format(fertility), "bless")
+
+        return Attention.initial_loop_state(self)
+
     def get_energies(self, y: tf.Tensor, weights_in_time: tf.Tensor):
-        weight_sum = tf.cond(
-            tf.greater(weights_in_time.size(), 0),
-            lambda: tf.reduce_sum(weights_in_time, axis=0),
-            lambda: 0.0)
+        weight_sum = group_copies(tf.reduce_sum(weights_in_time, axis=0),
+                                  tf.shape(y)[0])
+
+        fertility = tf.expand_dims(self.fertility, 1)
+        attention_mask = tf.expand_dims(self.attention_mask, 1)
 
-        coverage = weight_sum / self.fertility * self.attention_mask
-        coverage_exp = tf.expand_dims(tf.expand_dims(coverage, -1), -1)
+        coverage = weight_sum / fertility * attention_mask
+        coverage_exp = tf.expand_dims(coverage, -1)
         logits = tf.reduce_sum(
             self.similarity_bias_vector * tf.tanh(
-                self.hidden_features + y
+                self._hidden_features_3d + y
                 + self.coverage_weights * coverage_exp),
-            [2, 3])
+            [3])
 
         return logits
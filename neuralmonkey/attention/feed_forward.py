@@ -13,15 +13,19 @@ from neuralmonkey.attention.base_attention import (
     BaseAttention, AttentionLoopState, empty_attention_loop_state,
     get_attention_states, get_attention_mask, Attendable)
 from neuralmonkey.decorators import tensor
-from neuralmonkey.logging import debug
+from neuralmonkey.logging import debug, debug_enabled
 from neuralmonkey.model.model_part import ModelPart
 from neuralmonkey.model.parameterized import InitializerSpecs
 from neuralmonkey.nn.utils import dropout
-from neuralmonkey.tf_utils import get_variable
+from neuralmonkey.tf_utils import (
+    append_tensor, get_variable, group_copies, ungroup_copies)
 
 
 class Attention(BaseAttention):
 
+    batch_tensors = ("attention_states", "attention_mask",
+                     "_hidden_features_3d")
+
     # pylint: disable=too-many-arguments
     def __init__(self,
                  name: str,
@@ -117,10 +121,25 @@ class Attention(BaseAttention):
         return tf.nn.conv2d(
             self._att_states_reshaped, key_proj_reshaped, [1, 1, 1, 1], "SAME")
 
-    def get_energies(self, y, _):
+    @tensor
+    def _hidden_features_3d(self) -> tf.Tensor:
+        # Shape (batch, 1, time, state_size) for broadcasting over queries
+        return tf.expand_dims(tf.squeeze(self.hidden_features, 2), 1)
+
+    def get_energies(self, y: tf.Tensor, _):
+        """Compute the attention energies.
+
+        The queries of shape ``(batch, multiple, 1, state_size)`` are
+        broadcast over the encoder states, which are not tiled when the
+        decoder decodes several outputs for each input sentence in a single
+        loop (see ``tf_utils.tile_batch``).
+
+        Returns:
+            Energies of shape ``(batch, multiple, time)``.
+        """
         return tf.reduce_sum(
-            self.similarity_bias_vector * tf.tanh(self.hidden_features + y),
-            [2, 3]) + self.bias_term
+            self.similarity_bias_vector * tf.tanh(
+                self._hidden_features_3d + y), [3]) + self.bias_term
 
     def attention(self,
                   query: tf.Tensor,
@@ -132,33 +151,30 @@ class Attention(BaseAttention):
 
         y = tf.matmul(query, self.query_projection_matrix)
         y = y + self.projection_bias_vector
-        y = tf.reshape(y, [-1, 1, 1, self.state_size])
+
+        # Group the queries that attend to the same encoder states, shape
+        # (batch, multiple, 1, state_size)
+        y = tf.expand_dims(
+            group_copies(y, tf.shape(self.attention_states)[0]), 2)
 
         energies = self.get_energies(y, loop_state.weights)
 
         if self.attention_mask is None:
-            weights = tf.nn.softmax(energies)
+            weights_3d = tf.nn.softmax(energies)
         else:
-            weights_all = tf.nn.softmax(energies) * self.attention_mask
-            norm = tf.reduce_sum(weights_all, 1, keepdims=True) + 1e-8
-            weights = weights_all / norm
-
-            # condition = tf.equal(self.attention_mask, 1)
-            # masked_logits = tf.where(
-            #     tf.tile(condition, [tf.shape(energies)[0], 1]),
-            #     energies, -np.inf * tf.ones_like(energies))
-            # weights = tf.nn.softmax(masked_logits)
+            weights_all = (tf.nn.softmax(energies)
+                           * tf.expand_dims(self.attention_mask, 1))
+            norm = tf.reduce_sum(weights_all, 2, keepdims=True) + 1e-8
+            weights_3d = weights_all / norm
 
         # Now calculate the attention-weighted vector d.
-        context = tf.reduce_sum(
-            tf.expand_dims(tf.expand_dims(weights, -1), -1)
-            * self._att_states_reshaped, [1, 2])
+        context = ungroup_copies(
+            tf.matmul(weights_3d, self.attention_states))
         context = tf.reshape(context, [-1, self.context_vector_size])
+        weights = ungroup_copies(weights_3d)
 
-        next_contexts = tf.concat(
-            [loop_state.contexts, tf.expand_dims(context, 0)], 0)
-        next_weights = tf.concat(
-            [loop_state.weights, tf.expand_dims(weights, 0)], 0)
+        next_contexts = append_tensor(loop_state.contexts, context)
+        next_weights = append_tensor(loop_state.weights, weights)
         next_loop_state = AttentionLoopState(
             contexts=next_contexts,
             weights=next_weights)
@@ -175,9 +191,13 @@ class Attention(BaseAttention):
         # Note that we are not breaking lazy loading here because this method
         # is called from a lazy tensor.
 
-        debug("Pre-computing attention tensors", "bless")
-        debug("Hidden features: {}".format(self.hidden_features), "bless")
-        debug("Hidden mask: {}".format(self.attention_mask), "bless")
+        hidden_features = self._hidden_features_3d
+        attention_mask = self.attention_mask
+
+        if debug_enabled("bless"):
+            debug("Pre-computing attention tensors", "bless")
+            debug("Hidden features: {}".format(hidden_features), "bless")
+            debug("Hidden mask: {}".format(attention_mask), "bless")
 
         return empty_attention_loop_state(
             self.batch_size,
@@ -19,6 +19,7 @@ from neuralmonkey.decorators import tensor
 from neuralmonkey.model.model_part import ModelPart
 from neuralmonkey.model.parameterized import InitializerSpecs
 from neuralmonkey.nn.utils import dropout
+from neuralmonkey.tf_utils import append_tensor
 
 
 def split_for_heads(x: tf.Tensor, n_heads: int, head_dim: int) -> tf.Tensor:
@@ -128,20 +129,28 @@ def attention(
 
         Attention(Q, K, V) = softmax(Q * K^T / √(d_k)) * V
 
+    The batch of queries may contain several copies of each batch item of
+    the keys and values, as long as they are placed next to each other (as
+    done by ``tf_utils.tile_batch``, e.g. the hypotheses in the beam search).
+    In that case, the queries of the copies are moved to the time dimension
+    so the keys and values are neither copied nor projected more than once.
+
     Arguments:
-        queries: Input queries of shape ``(batch, time(q), k_channels)``.
+        queries: Input queries of shape ``(batch * multiple, time(q),
+            k_channels)``.
         keys: Input keys of shape ``(batch, time(k), k_channels)``.
         values: Input values of shape ``(batch, time(k), v_channels)``.
         keys_mask: A float Tensor for masking sequences in keys.
         num_heads: Number of attention heads.
         dropout_callback: Callable function implementing dropout.
         masked: Boolean indicating whether we want to mask future energies.
+            Can be used only if there is a single copy of the queries.
         use_bias: If True, enable bias in the attention head projections
             (for all queries, keys and values).
 
     Returns:
-        Contexts of shape ``(batch, time(q), v_channels)`` and
-        weights of shape ``(batch, time(q), time(k))``.
+        Contexts of shape ``(batch * multiple, time(q), v_channels)`` and
+        weights of shape ``(batch * multiple, n_heads, time(q), time(k))``.
     """
     if num_heads <= 0:
         raise ValueError("Number of heads must be greater than zero.")
@@ -169,6 +178,12 @@ def attention(
 
     head_dim = int(queries_dim / num_heads)
 
+    # Move the copies of the queries to the time dimension, shape:
+    # batch, multiple * time(q), k_channels
+    queries_shape = tf.shape(queries)
+    keys_batch = tf.shape(keys)[0]
+    queries = tf.reshape(queries, [keys_batch, -1, queries_dim])
+
     # For multi-head attention, queries, keys and values are linearly projected
     if num_heads > 1:
         queries = tf.layers.dense(
@@ -210,11 +225,18 @@ def attention(
 
     context = tf.matmul(weights, values)
 
-    # transpose and reshape to shape [batch, time(q), v_channels]
-    context_shape = tf.shape(context)
+    # transpose and reshape to shape [batch * multiple, time(q), v_channels]
     context = tf.reshape(
         tf.transpose(context, perm=[0, 2, 1, 3]),
-        [context_shape[0], context_shape[2], queries_dim])
+        [queries_shape[0], queries_shape[1], queries_dim])
+
+    # shape: batch * multiple, head, time(q), time(k)
+    weights = tf.reshape(
+        weights, [keys_batch, num_heads, -1, queries_shape[1],
+                  tf.shape(keys)[1]])
+    weights = tf.reshape(
+        tf.transpose(weights, perm=[0, 2, 1, 3, 4]),
+        [queries_shape[0], num_heads, queries_shape[1], tf.shape(keys)[1]])
 
     if num_heads > 1:
         # pylint: disable=redefined-variable-type
@@ -246,6 +268,8 @@ def empty_multi_head_loop_state(
 
 class MultiHeadAttention(BaseAttention):
 
+    batch_tensors = ("attention_keys", "attention_values", "attention_mask")
+
     # pylint: disable=too-many-arguments
     def __init__(self,
                  name: str,
@@ -335,11 +359,9 @@ class MultiHeadAttention(BaseAttention):
         context = tf.squeeze(context_3d, axis=1)
         head_weights = [tf.squeeze(w, axis=[1, 2]) for w in head_weights_3d]
 
-        next_contexts = tf.concat(
-            [loop_state.contexts, tf.expand_dims(context, 0)], axis=0)
+        next_contexts = append_tensor(loop_state.contexts, context)
         next_head_weights = [
-            tf.concat([loop_state.head_weights[i],
-                       tf.expand_dims(head_weights[i], 0)], axis=0)
+            append_tensor(loop_state.head_weights[i], head_weights[i])
             for i in range(self.n_heads)]
 
         next_loop_state = MultiHeadLoopState(
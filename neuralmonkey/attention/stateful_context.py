@@ -9,6 +9,7 @@ from neuralmonkey.model.stateful import Stateful
 from neuralmonkey.decorators import tensor
 from neuralmonkey.model.model_part import ModelPart
 from neuralmonkey.model.parameterized import InitializerSpecs
+from neuralmonkey.tf_utils import append_tensor, tile_batch
 
 
 class StatefulContext(BaseAttention):
@@ -23,6 +24,8 @@ class StatefulContext(BaseAttention):
     the `attentions` parameter.
     """
 
+    batch_tensors = ("attention_states",)
+
     def __init__(self,
                  name: str,
                  encoder: Stateful,
@@ -63,14 +66,16 @@ class StatefulContext(BaseAttention):
                   decoder_input: tf.Tensor,
                   loop_state: AttentionLoopState) -> Tuple[tf.Tensor,
                                                            AttentionLoopState]:
+        # The queries may come from several copies of each batch item (see
+        # ``tf_utils.tile_batch``), the context is copied for each of them
+        query_batch = tf.shape(query)[0]
         context = tf.reshape(self.attention_states,
                              [-1, self.context_vector_size])
-        weights = tf.ones(shape=[self.batch_size, 1])
+        context = tile_batch(context, query_batch // tf.shape(context)[0])
+        weights = tf.ones(shape=[query_batch, 1])
 
-        next_contexts = tf.concat(
-            [loop_state.contexts, tf.expand_dims(context, 0)], 0)
-        next_weights = tf.concat(
-            [loop_state.weights, tf.expand_dims(weights, 0)], 0)
+        next_contexts = append_tensor(loop_state.contexts, context)
+        next_weights = append_tensor(loop_state.weights, weights)
         next_loop_state = AttentionLoopState(
             contexts=next_contexts,
             weights=next_weights)
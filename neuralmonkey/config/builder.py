@@ -10,7 +10,7 @@ from argparse import Namespace
 from inspect import signature, isclass, isfunction, Parameter
 from typing import Any, Dict, Set, Tuple
 
-from neuralmonkey.logging import debug, warn
+from neuralmonkey.logging import debug, debug_enabled, warn
 from neuralmonkey.config.exceptions import (ConfigInvalidValueException,
                                             ConfigBuildException)
 
@@ -102,7 +102,10 @@ def build_object(value: str,
     if depth > 20:
         raise AssertionError("Config recursion should not be deeper that 20.")
 
-    debug("Building value on depth {}: {}".format(depth, value), "configBuild")
+    # The values may be large, format them only when they are logged
+    if debug_enabled("configBuild"):
+        debug("Building value on depth {}: {}".format(depth, value),
+              "configBuild")
 
     # if isinstance(value, str) and value in ignore_names:
     # TODO zapisovani do argumentu
@@ -141,7 +144,8 @@ def instantiate_class(name: str,
     Arguments: see help(build_object)
     """
     if name not in all_dicts:
-        debug(str(all_dicts), "configBuild")
+        if debug_enabled("configBuild"):
+            debug(str(all_dicts), "configBuild")
         raise ConfigInvalidValueException(name, "Undefined object")
     this_dict = all_dicts[name]
 
@@ -191,16 +195,18 @@ def instantiate_class(name: str,
     except TypeError as exc:
         raise ConfigBuildException(clazz, exc)
 
-    debug("Instantiating class {} with arguments {}".format(clazz, arguments),
-          "configBuild")
+    if debug_enabled("configBuild"):
+        debug("Instantiating class {} with arguments {}".format(
+            clazz, arguments), "configBuild")
 
     # call the function with the arguments
     # NOTE: any exception thrown from the body of the constructor is
     # not worth catching here
     obj = clazz(*bounded_params.args, **bounded_params.kwargs)
 
-    debug("Class {} initialized into object {}".format(clazz, obj),
-          "configBuild")
+    if debug_enabled("configBuild"):
+        debug("Class {} initialized into object {}".format(clazz, obj),
+              "configBuild")
 
     return obj
 
@@ -14,7 +14,7 @@ from typing import (
 
 from typeguard import check_argument_types
 from neuralmonkey.config.parsing import get_first_match
-from neuralmonkey.logging import debug, log, warn
+from neuralmonkey.logging import debug, debug_enabled, log, warn
 from neuralmonkey.readers.plain_text_reader import UtfPlainTextReader
 from neuralmonkey.util.match_type import match_type
 from neuralmonkey.writers.auto import AutoWriter
@@ -170,7 +170,9 @@ def _get_series_paths_and_readers(
             patterns = [patterns]
 
         paths = _expand_patterns_flat(patterns)
-        debug("Series '{}' has the following files: {}".format(name, paths))
+        if debug_enabled():
+            debug("Series '{}' has the following files: {}".format(
+                name, paths))
 
         series_sources[name] = (paths, reader)
 
@@ -602,6 +604,10 @@ class Dataset:
                                               start, start + length)
                   for s_id in self.iterators}
 
+        buffer_size = None
+        if self.lazy:
+            buffer_size = (self.buffer_min_size, self.buffer_size)
+
         # Here, the type: ignore is because of the tied argument to the lambda
         # function above, which made it Callable[[Any], ...] instead of just
         # Callable[[], ...].
@@ -610,5 +616,5 @@ class Dataset:
             iterators=slices,
             batching=self.batching,
             outputs=outputs,
-            buffer_size=self.buffer_size,
+            buffer_size=buffer_size,
             shuffled=self.shuffled)
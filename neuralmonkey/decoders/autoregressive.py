@@ -5,19 +5,24 @@ Either for the recurrent decoder, or for the transformer decoder.
 The autoregressive decoder uses the while loop to get the outputs.
 Descendants should only specify the initial state and the while loop body.
 """
-from typing import NamedTuple, Callable, Tuple, Optional, Any, List, Dict
+from contextlib import contextmanager
+from typing import (
+    NamedTuple, Callable, Tuple, Optional, Any, List, Dict, Iterator, Union)
 
 import tensorflow as tf
 
 from neuralmonkey.dataset import Dataset
 from neuralmonkey.decorators import tensor
+from neuralmonkey.decoders.shortlist import Shortlist
 from neuralmonkey.model.feedable import FeedDict
 from neuralmonkey.model.parameterized import InitializerSpecs
 from neuralmonkey.model.model_part import ModelPart
 from neuralmonkey.logging import warn
 from neuralmonkey.model.sequence import EmbeddedSequence
 from neuralmonkey.nn.utils import dropout
-from neuralmonkey.tf_utils import get_variable, get_state_shape_invariants
+from neuralmonkey.tf_utils import (
+    append_tensor, array_to_history, get_variable,
+    get_state_shape_invariants, history_to_array, tile_batch)
 from neuralmonkey.vocabulary import (
     Vocabulary, pad_batch, sentence_mask, UNK_TOKEN_INDEX, START_TOKEN_INDEX)
 
@@ -51,7 +56,8 @@ class DecoderHistories(NamedTuple(
 
     Attributes:
         logits: A tensor of shape ``(time, batch, vocabulary)`` which contains
-            the unnormalized output scores of words in a vocabulary.
+            the unnormalized output scores of words in a vocabulary. In loops
+            which use the shortlist, the last dimension is the shortlist.
         decoder_outputs: A tensor of shape ``(time, batch, state_size)``. The
             states of the decoder before the final output (logit) projection.
         outputs: An int tensor of shape ``(time, batch)``. Stores the generated
@@ -89,8 +95,9 @@ class DecoderFeedables(NamedTuple(
         input_symbol: A boolean ``batch``-sized tensor with the inputs to the
             decoder. During inference, this contains the previously generated
             tokens. During training, this contains the reference tokens.
-        prev_logits: A tensor of shape ``(batch, vocabulary)``. Contains the
-            logits from the previous decoding step.
+        prev_logits: A tensor of shape ``(batch, vocabulary)``, or
+            ``(batch, shortlist)`` when the loop uses the shortlist. Contains
+            the logits from the previous decoding step.
     """
 
 
@@ -109,6 +116,9 @@ class AutoregressiveDecoder(ModelPart):
                  tie_embeddings: bool = False,
                  label_smoothing: float = None,
                  supress_unk: bool = False,
+                 sampled_softmax_size: int = None,
+                 compaction_interval: int = None,
+                 shortlist: Shortlist = None,
                  reuse: ModelPart = None,
                  save_checkpoint: str = None,
                  load_checkpoint: str = None,
@@ -130,6 +140,22 @@ class AutoregressiveDecoder(ModelPart):
             label_smoothing: Label smoothing parameter.
             supress_unk: If true, decoder will not produce symbols for unknown
                 tokens.
+            sampled_softmax_size: If set, the training cost is computed using
+                the sampled softmax with this number of sampled words instead
+                of the softmax over the whole vocabulary. The full softmax is
+                still used for decoding and for the reported losses.
+            compaction_interval: If set, the finished sentences are removed
+                from the batch every this many steps of the greedy or sampling
+                decoding loop, so the following steps are computed only for
+                the unfinished ones. The logits and the decoder outputs of
+                the removed sentences are set to zero. The beam search always
+                decodes the whole batch.
+            shortlist: If set, the output projection, the argmax, and the
+                beam search top-k selection during greedy and beam search
+                decoding are computed only for the words in the vocabulary
+                shortlist of the batch. The returned logits are expanded to
+                the whole vocabulary after the decoding loop, the other words
+                get a large negative logit.
         """
         ModelPart.__init__(self, name, reuse, save_checkpoint, load_checkpoint,
                            initializers)
@@ -143,6 +169,9 @@ class AutoregressiveDecoder(ModelPart):
         self.label_smoothing = label_smoothing
         self.tie_embeddings = tie_embeddings
         self.supress_unk = supress_unk
+        self.sampled_softmax_size = sampled_softmax_size
+        self.compaction_interval = compaction_interval
+        self.shortlist = shortlist
 
         self.encoder_states = lambda: []  # type: Callable[[], List[tf.Tensor]]
         self.encoder_masks = lambda: []  # type: Callable[[], List[tf.Tensor]]
@@ -158,8 +187,25 @@ class AutoregressiveDecoder(ModelPart):
         if self.dropout_keep_prob < 0.0 or self.dropout_keep_prob > 1.0:
             raise ValueError("Dropout keep probability must be a real number "
                              "in the interval [0,1].")
+
+        if (self.compaction_interval is not None
+                and self.compaction_interval <= 0):
+            raise ValueError("Compaction interval must be a positive integer.")
+
+        if self.sampled_softmax_size is not None:
+            if not 0 < self.sampled_softmax_size < len(self.vocabulary):
+                raise ValueError(
+                    "Sampled softmax size must be a positive integer smaller "
+                    "than the vocabulary size.")
+            if self.label_smoothing:
+                raise ValueError(
+                    "Label smoothing cannot be used with sampled softmax.")
     # pylint: enable=too-many-arguments,too-many-locals
 
+    @property
+    def dependencies(self) -> List[str]:
+        return super().dependencies + ["shortlist"]
+
     @property
     def embedding_size(self) -> int:
         if self.embeddings_source is None:
@@ -247,14 +293,53 @@ class AutoregressiveDecoder(ModelPart):
             name="word_embeddings",
             shape=[len(self.vocabulary), self.embedding_size])
 
+    def dropout_output_states(self, states: tf.Tensor) -> tf.Tensor:
+        """Apply dropout on the states before the projection to logits."""
+        return dropout(states, self.dropout_keep_prob, self.train_mode)
+
     def get_logits(self, state: tf.Tensor) -> tf.Tensor:
         """Project the decoder's output layer to logits over the vocabulary."""
-        state = dropout(state, self.dropout_keep_prob, self.train_mode)
+        state = self.dropout_output_states(state)
         logits = tf.matmul(state, self.decoding_w) + self.decoding_b
+        return self._supress_unk(logits)
+
+    def uses_shortlist(self, train_mode: bool, sample: bool) -> bool:
+        """Tell whether the decoding loop computes the logits on a shortlist.
+
+        Arguments:
+            train_mode: Whether the loop is a training run.
+            sample: Whether the loop samples the output symbols.
+        """
+        return self.shortlist is not None and not train_mode and not sample
+
+    def get_shortlist_logits_fn(self) -> Callable[[tf.Tensor], tf.Tensor]:
+        """Return a function projecting the output layer using the shortlist.
+
+        The output projection matrix and bias are gathered to the shortlist
+        when this method is called. It should therefore be called outside the
+        decoding loop, so the gathering is done only once per batch. The
+        returned function computes the same logits as ``get_logits`` for the
+        shortlisted words, ordered as in the shortlist.
+        """
+        assert self.shortlist is not None
+
+        with tf.name_scope("shortlist_projection"):
+            decoding_w = tf.gather(self.decoding_w, self.shortlist.ids, axis=1)
+            decoding_b = tf.gather(self.decoding_b, self.shortlist.ids)
 
+        def get_logits(state: tf.Tensor) -> tf.Tensor:
+            state = self.dropout_output_states(state)
+            logits = tf.matmul(state, decoding_w) + decoding_b
+            return self._supress_unk(logits)
+
+        return get_logits
+
+    def _supress_unk(self, logits: tf.Tensor) -> tf.Tensor:
+        # The unknown token has the same index in the vocabulary and in the
+        # shortlist
         if self.supress_unk:
             unk_mask = tf.one_hot(
-                UNK_TOKEN_INDEX, depth=len(self.vocabulary), on_value=-1e9)
+                UNK_TOKEN_INDEX, depth=tf.shape(logits)[-1], on_value=-1e9)
             logits += unk_mask
 
         return logits
@@ -299,8 +384,42 @@ class AutoregressiveDecoder(ModelPart):
     def train_loss(self) -> tf.Tensor:
         return tf.reduce_mean(self.train_xents)
 
+    @tensor
+    def sampled_train_loss(self) -> tf.Tensor:
+        """Approximate the training loss using the sampled softmax.
+
+        Instead of the logits over the whole vocabulary, only the logits of
+        the target words and of ``sampled_softmax_size`` words sampled from
+        the log-uniform (Zipfian) distribution are computed in each step (see
+        Jean et al., 2015, arxiv.org/abs/1412.2007). This assumes the
+        vocabulary is sorted by frequency.
+        """
+        assert self.sampled_softmax_size is not None
+
+        # shape (time, batch, output_dimension)
+        states = self.dropout_output_states(self.train_output_states)
+        states_shape = tf.shape(states)
+
+        # shape (time * batch)
+        xents = tf.nn.sampled_softmax_loss(
+            weights=tf.transpose(self.decoding_w),
+            biases=self.decoding_b,
+            labels=tf.reshape(self.train_inputs, [-1, 1]),
+            inputs=tf.reshape(states, [-1, self.output_dimension]),
+            num_sampled=self.sampled_softmax_size,
+            num_classes=len(self.vocabulary))
+
+        # Average over time and batch as in ``train_xents``
+        xents = tf.reshape(xents, states_shape[:2]) * self.train_mask
+        sentence_xents = (tf.reduce_sum(xents, axis=0)
+                          / (tf.reduce_sum(self.train_mask, axis=0) + 1e-12))
+
+        return tf.reduce_mean(sentence_xents)
+
     @property
     def cost(self) -> tf.Tensor:
+        if self.sampled_softmax_size is not None:
+            return self.sampled_train_loss
         return self.train_loss
 
     @tensor
@@ -360,13 +479,19 @@ class AutoregressiveDecoder(ModelPart):
 
     def get_initial_loop_state(self) -> LoopState:
 
+        # With a shortlist, the logits are over the whole vocabulary or over
+        # the shortlist, depending on the kind of the decoding loop
+        logits_size = len(self.vocabulary)  # type: Union[int, tf.Tensor]
+        if self.shortlist is not None:
+            logits_size = tf.size(self.shortlist.ids)
+
         dec_output = tf.zeros(
             shape=[0, self.batch_size, self.embedding_size],
             dtype=tf.float32,
             name="hist_decoder_outputs")
 
         logit = tf.zeros(
-            shape=[0, self.batch_size, len(self.vocabulary)],
+            shape=[0, self.batch_size, logits_size],
             dtype=tf.float32,
             name="hist_logits")
 
@@ -384,7 +509,7 @@ class AutoregressiveDecoder(ModelPart):
             step=tf.constant(0, tf.int32),
             finished=tf.zeros([self.batch_size], dtype=tf.bool),
             input_symbol=self.go_symbols,
-            prev_logits=tf.zeros([self.batch_size, len(self.vocabulary)]))
+            prev_logits=tf.zeros([self.batch_size, logits_size]))
 
         histories = DecoderHistories(
             logits=logit,
@@ -413,6 +538,105 @@ class AutoregressiveDecoder(ModelPart):
                                  self.max_output_len)
         return tf.logical_and(not_all_done, before_max_len)
 
+    # pylint: disable=no-self-use
+    def tile_loop_state(self, loop_state: LoopState,
+                        multiple: int) -> LoopState:
+        """Tile the batch dimension of the initial loop state.
+
+        Feedables have the batch as the first dimension, histories and
+        constants are time-major.
+
+        Arguments:
+            loop_state: The initial loop state of the decoder.
+            multiple: Number of copies of each batch item.
+        """
+        if multiple == 1:
+            return loop_state
+
+        nest = tf.contrib.framework.nest
+        return LoopState(
+            histories=nest.map_structure(
+                lambda x: tile_batch(x, multiple, dim=1),
+                loop_state.histories),
+            constants=nest.map_structure(
+                lambda x: tile_batch(x, multiple, dim=1),
+                loop_state.constants),
+            feedables=nest.map_structure(
+                lambda x: tile_batch(x, multiple), loop_state.feedables))
+    # pylint: enable=no-self-use
+
+    # pylint: disable=no-self-use
+    def output_histories_mask(self, histories: NamedTuple) -> NamedTuple:
+        """Mark the histories which are only appended to in the loop body.
+
+        These histories do not influence the decoding, so they can be
+        accumulated in TensorArrays, or not kept at all by the beam search.
+        Decoders which read some of their histories in the loop body should
+        override this method and mark these with ``False``.
+
+        Arguments:
+            histories: The (possibly nested) histories of the initial loop
+                state.
+
+        Returns:
+            A structure of booleans of the same shape as the histories.
+        """
+        return tf.contrib.framework.nest.map_structure(
+            lambda _: True, histories)
+    # pylint: enable=no-self-use
+
+    def histories_to_arrays(self, histories: NamedTuple) -> NamedTuple:
+        """Convert the output histories to TensorArrays.
+
+        The histories that are only appended to in the loop body (see
+        ``output_histories_mask``) are accumulated in ``TensorArray`` objects
+        instead of being concatenated in every step. They are stacked back to
+        tensors using ``tf_utils.array_to_history`` after the loop.
+
+        Arguments:
+            histories: The (possibly nested) histories of the initial loop
+                state.
+        """
+        return tf.contrib.framework.nest.map_structure(
+            lambda hist, out: history_to_array(hist) if out else hist,
+            histories, self.output_histories_mask(histories))
+
+    def get_batch_tensors(self) -> Dict[str, Any]:
+        """Get the batch-major tensors read by the while loop body.
+
+        These are the tensors computed outside the loop which have the batch
+        as the first dimension, e.g. the encoder states. When the finished
+        sentences are removed from the batch (see ``compaction_interval``),
+        the tensors are gathered for the remaining sentences and passed to
+        ``replace_batch_tensors``.
+
+        Returns:
+            A dictionary of (possibly nested structures of) tensors.
+        """
+        return {"encoder_states": self.encoder_states(),
+                "encoder_masks": self.encoder_masks()}
+
+    @contextmanager
+    def replace_batch_tensors(
+            self, tensors: Dict[str, Any]) -> Iterator[None]:
+        """Make the while loop body read different batch-major tensors.
+
+        Arguments:
+            tensors: A dictionary with the same structure as the one returned
+                by ``get_batch_tensors``.
+        """
+        enc_states = self.encoder_states
+        enc_masks = self.encoder_masks
+
+        self.encoder_states = lambda: tensors["encoder_states"]
+        self.encoder_masks = lambda: tensors["encoder_masks"]
+
+        try:
+            yield
+        finally:
+            self.encoder_states = enc_states
+            self.encoder_masks = enc_masks
+
     def get_body(self, train_mode: bool, sample: bool = False,
                  temperature: float = 1) -> Callable:
         """Return the while loop body function."""
@@ -430,17 +654,24 @@ class AutoregressiveDecoder(ModelPart):
         """
 
     def decoding_loop(self, train_mode: bool, sample: bool = False,
-                      temperature: float = 1) -> Tuple[tf.Tensor, tf.Tensor,
-                                                       tf.Tensor, tf.Tensor]:
+                      temperature: float = 1,
+                      sample_size: int = 1) -> Tuple[tf.Tensor, tf.Tensor,
+                                                     tf.Tensor, tf.Tensor]:
         """Run the decoding while loop.
 
         Calls get_initial_loop_state and constructs tf.while_loop
         with the continuation criterion returned from loop_continue_criterion,
-        and body function returned from get_body.
+        and body function returned from get_body. The histories are
+        accumulated in TensorArrays during the loop (see
+        histories_to_arrays).
+
+        After finishing the tf.while_loop, the histories are stacked back to
+        tensors and finalize_loop is called to further postprocess the final
+        decoder loop state.
 
-        After finishing the tf.while_loop, it calls finalize_loop
-        to further postprocess the final decoder loop state (usually
-        by stacking Tensors containing decoding histories).
+        If ``compaction_interval`` is set, the finished sentences are
+        periodically removed from the batch outside training (see
+        ``compacted_loop``).
 
         Arguments:
             train_mode: Boolean flag, telling whether this is
@@ -449,18 +680,42 @@ class AutoregressiveDecoder(ModelPart):
                 the output symbols from the output distribution instead
                 of using argmax or gold data.
             temperature: float value specifying the softmax temperature
+            sample_size: Number of outputs decoded for each batch item. The
+                initial loop state is tiled so all the outputs are decoded in
+                a single loop. The outputs for a single batch item are next
+                to each other in the batch dimension of the results (see
+                ``tf_utils.tile_batch``).
         """
-        initial_loop_state = self.get_initial_loop_state()
-        final_loop_state = tf.while_loop(
-            self.loop_continue_criterion,
-            self.get_body(train_mode, sample, temperature),
-            initial_loop_state,
-            shape_invariants=tf.contrib.framework.nest.map_structure(
-                get_state_shape_invariants, initial_loop_state))
+        nest = tf.contrib.framework.nest
+
+        initial_loop_state = self.tile_loop_state(
+            self.get_initial_loop_state(), sample_size)
+
+        if self.compaction_interval is not None and not train_mode:
+            final_loop_state = self.compacted_loop(
+                initial_loop_state, sample, temperature, sample_size)
+        else:
+            initial_loop_state = initial_loop_state._replace(
+                histories=self.histories_to_arrays(
+                    initial_loop_state.histories))
+
+            final_loop_state = tf.while_loop(
+                self.loop_continue_criterion,
+                self.get_body(train_mode, sample, temperature),
+                initial_loop_state,
+                shape_invariants=nest.map_structure(
+                    get_state_shape_invariants, initial_loop_state))
+
+            final_loop_state = final_loop_state._replace(
+                histories=nest.map_structure(
+                    array_to_history, final_loop_state.histories))
 
         self.finalize_loop(final_loop_state, train_mode)
 
         logits = final_loop_state.histories.logits
+        if self.uses_shortlist(train_mode, sample):
+            logits = self.shortlist.expand_logits(logits)
+
         decoder_outputs = final_loop_state.histories.decoder_outputs
         decoded = final_loop_state.histories.outputs
 
@@ -469,6 +724,155 @@ class AutoregressiveDecoder(ModelPart):
 
         return logits, decoder_outputs, mask, decoded
 
+    # pylint: disable=too-many-locals
+    def compacted_loop(self, initial_loop_state: LoopState, sample: bool,
+                       temperature: float, sample_size: int) -> LoopState:
+        """Run the decoding loop, removing the finished sentences periodically.
+
+        Every ``compaction_interval`` steps, the loop state is gathered for
+        the unfinished sentences, and so are the batch-major tensors read by
+        the loop body (see ``get_batch_tensors``). The following steps are
+        then computed only for the smaller batch. The positions of the
+        remaining sentences in the original batch are carried through the
+        loop.
+
+        The values written to the histories in each step are accumulated in
+        TensorArrays with elements of different batch sizes, and scattered to
+        the original batch after the loop. The logits and the decoder outputs
+        of the removed sentences are zeros, their outputs are padding and
+        their mask is false. The histories read in the loop body are kept as
+        tensors (of the current batch), their last values are accumulated
+        for the scattering in separate TensorArrays.
+
+        Arguments:
+            initial_loop_state: The (tiled) initial loop state.
+            sample: Whether the output symbols are sampled.
+            temperature: The softmax temperature.
+            sample_size: The number of copies of each batch item in the
+                initial loop state.
+
+        Returns:
+            The final loop state with the histories of the whole batch. The
+            feedables are those of the last remaining batch.
+        """
+        nest = tf.contrib.framework.nest
+
+        batch_size = tf.shape(initial_loop_state.feedables.finished)[0]
+        out_mask = nest.flatten(
+            self.output_histories_mask(initial_loop_state.histories))
+
+        # Create the batch-major tensors outside the loop
+        batch_tensors = self.get_batch_tensors()
+        body = self.get_body(False, sample, temperature)
+
+        initial_loop_state = initial_loop_state._replace(
+            histories=nest.map_structure(
+                lambda hist, out: history_to_array(hist, infer_shape=False)
+                if out else hist,
+                initial_loop_state.histories,
+                self.output_histories_mask(initial_loop_state.histories)))
+
+        def gather(x, indices, axis):
+            if (x is None or isinstance(x, tf.TensorArray)
+                    or x.shape.ndims == 0):
+                return x
+            return tf.gather(x, indices, axis=axis)
+
+        def step_body(loop_state, rows, positions, read_arrays):
+            step = loop_state.feedables.step
+            next_loop_state = body(*loop_state)
+
+            positions = positions.write(
+                positions.size(),
+                tf.stack([tf.fill(tf.shape(rows), step), rows], 1))
+
+            read_histories = [
+                hist for hist, out in zip(
+                    nest.flatten(next_loop_state.histories), out_mask)
+                if not out]
+            read_arrays = [
+                append_tensor(array, hist[-1])
+                for array, hist in zip(read_arrays, read_histories)]
+
+            return next_loop_state, rows, positions, read_arrays
+
+        def compact_body(loop_state, rows, positions, read_arrays):
+            active = tf.to_int32(tf.reshape(
+                tf.where(tf.logical_not(loop_state.feedables.finished)),
+                [-1]))
+
+            # Feedables are batch-major, histories and constants time-major
+            loop_state = LoopState(
+                histories=nest.map_structure(
+                    lambda x: gather(x, active, 1), loop_state.histories),
+                constants=nest.map_structure(
+                    lambda x: gather(x, active, 1), loop_state.constants),
+                feedables=nest.map_structure(
+                    lambda x: gather(x, active, 0), loop_state.feedables))
+            rows = tf.gather(rows, active)
+
+            # The batch tensors are not tiled, see tile_loop_state
+            sentences = rows // sample_size
+            compact_tensors = nest.map_structure(
+                lambda x: gather(x, sentences, 0), batch_tensors)
+
+            end_step = loop_state.feedables.step + self.compaction_interval
+
+            def step_cond(loop_state, *_):
+                return tf.logical_and(
+                    self.loop_continue_criterion(*loop_state),
+                    tf.less(loop_state.feedables.step, end_step))
+
+            loop_vars = (loop_state, rows, positions, read_arrays)
+            with self.replace_batch_tensors(compact_tensors):
+                return tf.while_loop(
+                    step_cond, step_body, loop_vars,
+                    shape_invariants=nest.map_structure(
+                        get_state_shape_invariants, loop_vars))
+
+        loop_vars = (
+            initial_loop_state,
+            # The positions of the remaining sentences in the batch
+            tf.range(batch_size),
+            # The (step, position) coordinates of the values in the arrays
+            tf.TensorArray(
+                dtype=tf.int32, size=0, dynamic_size=True, infer_shape=False,
+                element_shape=tf.TensorShape([None, 2])),
+            [history_to_array(hist, infer_shape=False)
+             for hist, out in zip(
+                 nest.flatten(initial_loop_state.histories), out_mask)
+             if not out])
+
+        final_loop_state, _, final_positions, final_arrays = tf.while_loop(
+            lambda loop_state, *_: self.loop_continue_criterion(*loop_state),
+            compact_body, loop_vars,
+            shape_invariants=nest.map_structure(
+                get_state_shape_invariants, loop_vars))
+
+        indices = final_positions.concat()
+        num_steps = final_positions.size()
+
+        def scatter(values):
+            if values.dtype == tf.bool:
+                return tf.cast(scatter(tf.to_int32(values)), tf.bool)
+
+            history = tf.scatter_nd(indices, values, tf.concat(
+                [[num_steps, batch_size], tf.shape(values)[1:]], 0))
+            history.set_shape(
+                tf.TensorShape([None, None]).concatenate(values.shape[1:]))
+            return history
+
+        read_arrays = iter(final_arrays)
+        histories = [
+            scatter((hist if out else next(read_arrays)).concat())
+            for hist, out in zip(
+                nest.flatten(final_loop_state.histories), out_mask)]
+
+        return final_loop_state._replace(
+            histories=nest.pack_sequence_as(
+                final_loop_state.histories, histories))
+    # pylint: enable=too-many-locals
+
     def feed_dict(self, dataset: Dataset, train: bool = False) -> FeedDict:
         """Populate the feed dictionary for the decoder object.
 
@@ -34,8 +34,8 @@ from neuralmonkey.decoders.autoregressive import (
 from neuralmonkey.decorators import tensor
 from neuralmonkey.model.model_part import ModelPart
 from neuralmonkey.tf_utils import (
-    append_tensor, gather_flat, get_state_shape_invariants, partial_transpose,
-    get_shape_list)
+    append_tensor, array_to_history, gather_flat, get_state_shape_invariants,
+    history_to_array, partial_transpose, tile_batch)
 from neuralmonkey.vocabulary import (
     Vocabulary, END_TOKEN_INDEX, PAD_TOKEN_INDEX)
 
@@ -62,7 +62,8 @@ class SearchState(NamedTuple(
             log-probabilities of each hypothesis.
         prev_logprobs: A ``(batch, beam, vocabulary)``-sized tensor. Stores
             the log-distribution over the vocabulary from the previous decoding
-            step for each hypothesis.
+            step for each hypothesis. When the parent decoder uses a
+            shortlist, the last dimension is the shortlist.
         lengths: A ``(batch, beam)``-shaped tensor with the lengths of the
             hypotheses.
         finished: A boolean tensor with shape ``(batch, beam)``. Marks finished
@@ -73,18 +74,27 @@ class SearchState(NamedTuple(
 class SearchResults(NamedTuple(
         "SearchResults",
         [("scores", tf.Tensor),
-         ("token_ids", tf.Tensor)])):
+         ("token_ids", tf.Tensor),
+         ("parent_ids", tf.Tensor)])):
     """The intermediate results of the beam search decoding.
 
     A cummulative structure that holds the actual decoded tokens and hypotheses
     scores (after applying a length penalty term).
 
+    The hypotheses are not reordered during the search. Instead, the tokens
+    selected in each step are stored together with backpointers to the
+    hypotheses they extend. The hypotheses are reconstructed from the
+    backpointers after the search (see ``backtrack_hypotheses``).
+
     Attributes:
         scores: A ``(time, batch, beam)``-shaped tensor with the scores for
             each hypothesis. The score is computed from the ``logprob_sum`` of
             a hypothesis and accounting for the hypothesis length.
         token_ids: A ``(time, batch, beam)``-shaped tensor with the vocabulary
-            indices of the tokens in each hypothesis.
+            indices of the tokens selected in each step.
+        parent_ids: A ``(time, batch, beam)``-shaped tensor with the indices
+            of the hypotheses from the previous step, which are extended by
+            the selected tokens.
     """
 
 
@@ -166,29 +176,34 @@ class BeamSearchDecoder(ModelPart):
 
     @tensor
     def outputs(self) -> tf.Tensor:
-        # This is an ugly hack for handling the whole graph when expanding to
-        # the beam. We need to access all the inner states of the network in
-        # the graph, replace them with beam-size-times copied originals, create
-        # the beam search graph, and then replace the inner states back.
-
-        enc_states = self.parent_decoder.encoder_states
-        enc_masks = self.parent_decoder.encoder_masks
-
-        setattr(self.parent_decoder, "encoder_states",
-                lambda: [self.expand_to_beam(sts) for sts in enc_states()])
-        setattr(self.parent_decoder, "encoder_masks",
-                lambda: [self.expand_to_beam(mask) for mask in enc_masks()])
+        # The encoder states are not expanded to the beam. The attentions
+        # group the queries of the hypotheses in the beam by the input
+        # sentences and broadcast them over the original encoder states.
 
         # Create the beam search symbolic graph.
         with self.use_scope():
             self._initial_loop_state = self.get_initial_loop_state()
-            outputs = self.decoding_loop()
+            return self.decoding_loop()
 
-        # Reassign the original encoder states and mask back
-        setattr(self.parent_decoder, "encoder_states", enc_states)
-        setattr(self.parent_decoder, "encoder_masks", enc_masks)
+    @tensor
+    def hypotheses(self) -> tf.Tensor:
+        """Get the token ids of the final hypotheses in the beam.
+
+        This is the in-graph counterpart of the backtracking done by the beam
+        search runner. It is used when the graph is exported for inference.
+
+        Returns:
+            A ``(time, batch, beam)``-shaped tensor with the tokens of the
+            final hypotheses, including the initial start symbols.
+        """
+        token_ids = self.outputs.last_search_step_output.token_ids
+        paths = self.backtrack_hypotheses(
+            self.outputs.last_search_step_output.parent_ids)
 
-        return outputs
+        shape = tf.shape(token_ids)
+        hypotheses = self._reorder_history(
+            tf.reshape(token_ids, [shape[0], -1]), paths)
+        return tf.reshape(hypotheses, shape)
 
     @property
     def initial_loop_state(self) -> BeamSearchLoopState:
@@ -238,6 +253,8 @@ class BeamSearchDecoder(ModelPart):
             - ``token_ids`` - A (1, batch, beam)-sized tensor filled with
               indices of decoder-specific initial input symbols (usually start
               symbol IDs).
+            - ``parent_ids`` - A (1, batch, beam)-sized tensor with the beam
+              indices (each hypothesis is its own parent).
 
         - ``decoder_loop_state`` - The loop state of the underlying
             autoregressive decoder, as returned from the initial call to the
@@ -286,7 +303,7 @@ class BeamSearchDecoder(ModelPart):
                 name="bs_logprob_sum"),
             prev_logprobs=tf.reshape(
                 tf.nn.log_softmax(dec_next_ls.feedables.prev_logits),
-                [self.batch_size, self.beam_size, len(self.vocabulary)]),
+                [self.batch_size, self.beam_size, -1]),
             lengths=tf.zeros(
                 [self.batch_size, self.beam_size], dtype=tf.int32,
                 name="bs_lengths"),
@@ -304,7 +321,11 @@ class BeamSearchDecoder(ModelPart):
             token_ids=tf.reshape(
                 feedables.input_symbol,
                 [1, self.batch_size, self.beam_size],
-                name="beam_tokens"))
+                name="beam_tokens"),
+            parent_ids=tf.tile(
+                tf.reshape(tf.range(self.beam_size), [1, 1, -1]),
+                [1, self.batch_size, 1],
+                name="beam_parents"))
 
         # In structures that contain tensors that grow in time, we replace
         # tensors with placeholders with loosened shape constraints in the time
@@ -358,6 +379,8 @@ class BeamSearchDecoder(ModelPart):
         This function mimics the behavior of the ``decoding_loop`` method of
         the ``AutoregressiveDecoder``, except the initial loop state is created
         outside this method because it is accessed and fed during ensembling.
+        The selected tokens and the backpointers are accumulated in
+        TensorArrays during the loop.
 
         TODO: The ``finalize_loop`` method and the handling of attention loop
         states might be implemented in the future.
@@ -365,13 +388,25 @@ class BeamSearchDecoder(ModelPart):
         Returns:
             This method returns a populated ``BeamSearchOutput`` object.
         """
+        nest = tf.contrib.framework.nest
+
+        search_results = self.initial_loop_state.search_results
+        search_results = search_results._replace(
+            token_ids=history_to_array(search_results.token_ids),
+            parent_ids=history_to_array(search_results.parent_ids))
+
+        initial_loop_state = self.initial_loop_state._replace(
+            search_results=search_results)
 
         final_loop_state = tf.while_loop(
             self.loop_continue_criterion,
             self.get_body(),
-            self.initial_loop_state,
-            shape_invariants=tf.contrib.framework.nest.map_structure(
-                get_state_shape_invariants, self.initial_loop_state))
+            initial_loop_state,
+            shape_invariants=nest.map_structure(
+                get_state_shape_invariants, initial_loop_state))
+
+        final_loop_state = nest.map_structure(
+            array_to_history, final_loop_state)
 
         # TODO: return att_loop_states properly
         return BeamSearchOutput(
@@ -412,7 +447,9 @@ class BeamSearchDecoder(ModelPart):
 
             4. Reconstruct the beam by gathering elements from the original
                data structures using the data indices computed in the previous
-               step.
+               step. The decoder histories which are not needed for the next
+               step are not gathered but reset. The decoded tokens are stored
+               together with the backpointers.
 
             5. Call the ``body`` function of the underlying decoder.
 
@@ -437,7 +474,10 @@ class BeamSearchDecoder(ModelPart):
 
             # mask the probabilities
             # shape(logprobs) = [batch, beam, vocabulary]
+            # (the vocabulary is the shortlist if the parent decoder uses it;
+            # the special tokens have the same indices in both)
             logprobs = search_state.prev_logprobs
+            num_words = tf.shape(logprobs)[2]
 
             finished_mask = tf.expand_dims(
                 tf.to_float(search_state.finished), 2)
@@ -445,7 +485,7 @@ class BeamSearchDecoder(ModelPart):
 
             finished_row = tf.one_hot(
                 PAD_TOKEN_INDEX,
-                len(self.vocabulary),
+                num_words,
                 dtype=tf.float32,
                 on_value=0.,
                 off_value=-INF)
@@ -466,8 +506,7 @@ class BeamSearchDecoder(ModelPart):
                 self._length_penalty(hyp_lengths), 2)
 
             # reshape to [batch, beam * vocabulary] for topk
-            scores_flat = tf.reshape(
-                scores, [-1, self.beam_size * len(self.vocabulary)])
+            scores_flat = tf.reshape(scores, [-1, self.beam_size * num_words])
 
             # shape(both) = [batch, beam]
             topk_scores, topk_indices = tf.nn.top_k(
@@ -476,9 +515,11 @@ class BeamSearchDecoder(ModelPart):
             topk_indices.set_shape([None, self.beam_size])
             topk_scores.set_shape([None, self.beam_size])
 
-            next_word_ids = tf.to_int64(
-                tf.mod(topk_indices, len(self.vocabulary)))
-            next_beam_ids = tf.div(topk_indices, len(self.vocabulary))
+            next_word_ids = tf.to_int64(tf.mod(topk_indices, num_words))
+            if self.parent_decoder.shortlist is not None:
+                next_word_ids = self.parent_decoder.shortlist.word_ids(
+                    next_word_ids)
+            next_beam_ids = tf.div(topk_indices, num_words)
 
             # batch offset for tf.gather_nd
             batch_offset = tf.tile(
@@ -489,8 +530,7 @@ class BeamSearchDecoder(ModelPart):
             # gather the topk logprob_sums
             next_beam_lengths = tf.gather_nd(hyp_lengths, batch_beam_ids)
             next_beam_logprob_sum = tf.gather_nd(
-                tf.reshape(
-                    hyp_probs, [-1, self.beam_size * len(self.vocabulary)]),
+                tf.reshape(hyp_probs, [-1, self.beam_size * num_words]),
                 tf.stack([batch_offset, topk_indices], axis=2))
 
             # mark finished beams
@@ -509,7 +549,11 @@ class BeamSearchDecoder(ModelPart):
                 finished=tf.reshape(next_finished, [-1]))
 
             # histories have shape [len, batch, ...]
-            def gather_fn(x):
+            def gather_fn(x, is_output):
+                # The output histories are not needed in the next step
+                if is_output:
+                    return x[:0]
+
                 return partial_transpose(
                     gather_flat(
                         partial_transpose(x, [1, 0]),
@@ -519,7 +563,9 @@ class BeamSearchDecoder(ModelPart):
                     [1, 0])
 
             next_histories = tf.contrib.framework.nest.map_structure(
-                gather_fn, dec_loop_state.histories)
+                gather_fn, dec_loop_state.histories,
+                self.parent_decoder.output_histories_mask(
+                    dec_loop_state.histories))
 
             dec_loop_state = dec_loop_state._replace(
                 feedables=next_feedables,
@@ -532,16 +578,16 @@ class BeamSearchDecoder(ModelPart):
                 logprob_sum=next_beam_logprob_sum,
                 prev_logprobs=tf.reshape(
                     tf.nn.log_softmax(next_loop_state.feedables.prev_logits),
-                    [self.batch_size, self.beam_size, len(self.vocabulary)]),
+                    [self.batch_size, self.beam_size, -1]),
                 lengths=next_beam_lengths,
                 finished=next_finished)
 
-            next_token_ids = tf.transpose(search_results.token_ids, [1, 2, 0])
-            next_token_ids = tf.gather_nd(next_token_ids, batch_beam_ids)
-            next_token_ids = tf.transpose(next_token_ids, [2, 0, 1])
             next_output = SearchResults(
                 scores=topk_scores,
-                token_ids=append_tensor(next_token_ids, next_word_ids))
+                token_ids=append_tensor(
+                    search_results.token_ids, next_word_ids),
+                parent_ids=append_tensor(
+                    search_results.parent_ids, next_beam_ids))
 
             return BeamSearchLoopState(
                 search_state=next_search_state,
@@ -551,6 +597,50 @@ class BeamSearchDecoder(ModelPart):
 
         return body
 
+    def backtrack_hypotheses(self, parent_ids: tf.Tensor) -> tf.Tensor:
+        """Follow the backpointers from the final hypotheses.
+
+        Arguments:
+            parent_ids: A ``(time, batch, beam)``-shaped tensor with the
+                backpointers (see ``SearchResults``).
+
+        Returns:
+            A ``(time, batch, beam)``-shaped tensor with the index of the
+            hypothesis in each step, which is a prefix of the respective final
+            hypothesis.
+        """
+        batch_offset = tf.tile(
+            tf.expand_dims(tf.range(self.batch_size), 1), [1, self.beam_size])
+        last_beam_ids = tf.tile(
+            tf.expand_dims(tf.range(self.beam_size), 0), [self.batch_size, 1])
+
+        def step(beam_ids: tf.Tensor, parents: tf.Tensor) -> tf.Tensor:
+            return tf.gather_nd(
+                parents, tf.stack([batch_offset, beam_ids], axis=2))
+
+        paths = tf.scan(step, parent_ids[1:], initializer=last_beam_ids,
+                        reverse=True)
+        return tf.concat([paths, tf.expand_dims(last_beam_ids, 0)], 0)
+
+    def _reorder_history(self, history: tf.Tensor,
+                         paths: tf.Tensor) -> tf.Tensor:
+        """Reorder a ``(time, batch * beam, ...)`` history along the paths."""
+        shape = tf.shape(history)
+        time = shape[0]
+
+        history = tf.reshape(history, tf.concat(
+            [[time, self.batch_size, self.beam_size], shape[2:]], 0))
+
+        time_ids = tf.tile(tf.reshape(tf.range(time), [-1, 1, 1]),
+                           [1, self.batch_size, self.beam_size])
+        batch_ids = tf.tile(tf.reshape(tf.range(self.batch_size), [1, -1, 1]),
+                            [time, 1, self.beam_size])
+
+        reordered = tf.gather_nd(
+            history, tf.stack([time_ids, batch_ids, paths], axis=3))
+
+        return tf.reshape(reordered, shape)
+
     def _length_penalty(self, lengths: tf.Tensor) -> tf.Tensor:
         """Apply length penalty ("lp") term from Eq. 14.
 
@@ -575,15 +665,4 @@ class BeamSearchDecoder(ModelPart):
         Returns:
             The expanded tensor.
         """
-        orig_shape = get_shape_list(val)
-        if val.shape.ndims == 0:
-            return val
-
-        orig_shape[dim] *= self.beam_size
-        tile_shape = [1] * (len(orig_shape) + 1)
-        tile_shape[dim + 1] = self.beam_size
-
-        val = tf.tile(tf.expand_dims(val, 1), tile_shape)
-        val = tf.reshape(val, orig_shape)
-
-        return val
+        return tile_batch(val, self.beam_size, dim)
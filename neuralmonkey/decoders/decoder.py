@@ -1,4 +1,5 @@
-from typing import List, Callable, Tuple, cast, NamedTuple
+from contextlib import contextmanager, ExitStack
+from typing import Any, Dict, Iterator, List, Callable, Tuple, cast, NamedTuple
 
 import tensorflow as tf
 from typeguard import check_argument_types
@@ -18,6 +19,7 @@ from neuralmonkey.nn.utils import dropout
 from neuralmonkey.decoders.encoder_projection import (
     linear_encoder_projection, concat_encoder_projection, empty_initial_state,
     EncoderProjection)
+from neuralmonkey.decoders.shortlist import Shortlist
 from neuralmonkey.decoders.output_projection import (
     OutputProjectionSpec, OutputProjection, nonlinear_output)
 from neuralmonkey.decorators import tensor
@@ -27,7 +29,7 @@ from neuralmonkey.tf_utils import append_tensor
 RNN_CELL_TYPES = {
     "NematusGRU": NematusGRUCell,
     "GRU": OrthoGRUCell,
-    "LSTM": tf.contrib.rnn.LSTMCell
+    "LSTM": tf.nn.rnn_cell.LSTMCell
 }
 
 
@@ -100,8 +102,12 @@ class Decoder(AutoregressiveDecoder):
                  attentions: List[BaseAttention] = None,
                  attention_on_input: bool = False,
                  rnn_cell: str = "GRU",
+                 fused_rnn_cell: bool = False,
                  conditional_gru: bool = False,
                  supress_unk: bool = False,
+                 sampled_softmax_size: int = None,
+                 compaction_interval: int = None,
+                 shortlist: Shortlist = None,
                  reuse: ModelPart = None,
                  save_checkpoint: str = None,
                  load_checkpoint: str = None,
@@ -127,12 +133,21 @@ class Decoder(AutoregressiveDecoder):
             encoder_projection: How to construct initial state from encoders.
             attention: The attention object to use. Optional.
             rnn_cell: RNN Cell used by the decoder (GRU or LSTM).
+            fused_rnn_cell: Use the fused implementation of the GRU or LSTM
+                cell, which computes the decoder step in a single kernel. It
+                is faster on CPU and it uses the same variables.
             conditional_gru: Flag whether to use the Conditional GRU
                 architecture.
             attention_on_input: Flag whether attention from previous decoding
                 step should be combined with the input in the next step.
             supress_unk: If true, decoder will not produce symbols for unknown
                 tokens.
+            sampled_softmax_size: Use sampled softmax with this number of
+                samples for the training cost.
+            compaction_interval: Remove the finished sentences from the batch
+                every this many steps during decoding.
+            shortlist: Restrict the output projection during greedy and beam
+                search decoding to the vocabulary shortlist.
             reuse: Reuse the model variables from the given model part.
         """
         check_argument_types()
@@ -148,6 +163,9 @@ class Decoder(AutoregressiveDecoder):
             tie_embeddings=tie_embeddings,
             label_smoothing=label_smoothing,
             supress_unk=supress_unk,
+            sampled_softmax_size=sampled_softmax_size,
+            compaction_interval=compaction_interval,
+            shortlist=shortlist,
             reuse=reuse,
             save_checkpoint=save_checkpoint,
             load_checkpoint=load_checkpoint,
@@ -158,6 +176,7 @@ class Decoder(AutoregressiveDecoder):
         self._conditional_gru = conditional_gru
         self._attention_on_input = attention_on_input
         self._rnn_cell_str = rnn_cell
+        self._fused_rnn_cell = fused_rnn_cell
         self._rnn_size = rnn_size
         self._encoder_projection = encoder_projection
 
@@ -173,6 +192,10 @@ class Decoder(AutoregressiveDecoder):
             raise ValueError("RNN cell must be a either 'GRU', 'LSTM', or "
                              "'NematusGRU'. Not {}".format(self._rnn_cell_str))
 
+        if self._fused_rnn_cell and self._rnn_cell_str == "NematusGRU":
+            raise ValueError("There is no fused implementation of the "
+                             "'NematusGRU' cell")
+
         if self._attention_on_input:
             self.input_projection = self.input_plus_attention
         else:
@@ -264,15 +287,37 @@ class Decoder(AutoregressiveDecoder):
 
         return initial_state
 
-    def _get_rnn_cell(self) -> tf.contrib.rnn.RNNCell:
+    @tensor
+    def train_logits(self) -> tf.Tensor:
+        # shape (time, batch, output_dimension)
+        states = self.train_output_states
+        states_shape = tf.shape(states)
+
+        logits = self.get_logits(
+            tf.reshape(states, [-1, self.output_dimension]))
+
+        return tf.reshape(
+            logits,
+            tf.concat([states_shape[:2], [len(self.vocabulary)]], 0))
+
+    def _get_rnn_cell(self) -> tf.nn.rnn_cell.RNNCell:
+        if self._fused_rnn_cell:
+            # The fused cells need TensorFlow contrib, which is slow to import.
+            from neuralmonkey.nn.fused_rnn_cells import (
+                FusedOrthoGRUCell, FusedLSTMCell)
+
+            if self._rnn_cell_str == "LSTM":
+                return FusedLSTMCell(self.rnn_size)
+            return FusedOrthoGRUCell(self.rnn_size)
+
         return RNN_CELL_TYPES[self._rnn_cell_str](self.rnn_size)
 
-    def _get_conditional_gru_cell(self) -> tf.contrib.rnn.GRUCell:
+    def _get_conditional_gru_cell(self) -> tf.nn.rnn_cell.GRUCell:
         if self._rnn_cell_str == "NematusGRU":
             return NematusGRUCell(
                 self.rnn_size, use_state_bias=True, use_input_bias=False)
 
-        return RNN_CELL_TYPES[self._rnn_cell_str](self.rnn_size)
+        return self._get_rnn_cell()
 
     def embed_input_symbol(self, *args) -> tf.Tensor:
         loop_state = LoopState(*args)
@@ -298,6 +343,11 @@ class Decoder(AutoregressiveDecoder):
                  train_mode: bool,
                  sample: bool = False,
                  temperature: float = 1) -> Callable:
+        get_logits = self.get_logits
+        use_shortlist = self.uses_shortlist(train_mode, sample)
+        if use_shortlist:
+            get_logits = self.get_shortlist_logits_fn()
+
         # pylint: disable=too-many-branches
         def body(*args) -> LoopState:
             loop_state = LoopState(*args)
@@ -332,7 +382,7 @@ class Decoder(AutoregressiveDecoder):
                             cond_input, next_state, scope="cond_gru_2_cell")
 
                 elif self._rnn_cell_str == "LSTM":
-                    prev_state = tf.contrib.rnn.LSTMStateTuple(
+                    prev_state = tf.nn.rnn_cell.LSTMStateTuple(
                         loop_state.feedables.prev_rnn_state,
                         loop_state.feedables.prev_rnn_output)
                     cell_output, state = cell(rnn_input, prev_state)
@@ -362,7 +412,13 @@ class Decoder(AutoregressiveDecoder):
                         self.train_mode)
                     # pylint: enable=not-callable
 
-                logits = self.get_logits(output) / temperature
+                # With teacher forcing, the logits are not needed inside the
+                # loop. They are computed for all steps at once in
+                # train_logits (if they are needed at all).
+                if train_mode and not sample:
+                    logits = loop_state.feedables.prev_logits
+                else:
+                    logits = get_logits(output) / temperature
 
             self.step_scope.reuse_variables()
 
@@ -373,6 +429,8 @@ class Decoder(AutoregressiveDecoder):
                 next_symbols = loop_state.constants.train_inputs[step]
             else:
                 next_symbols = tf.argmax(logits, axis=1)
+                if use_shortlist:
+                    next_symbols = self.shortlist.word_ids(next_symbols)
                 int_unfinished_mask = tf.to_int64(
                     tf.logical_not(loop_state.feedables.finished))
 
@@ -396,11 +454,17 @@ class Decoder(AutoregressiveDecoder):
                 prev_rnn_output=cell_output,
                 prev_contexts=list(contexts))
 
+            if train_mode and not sample:
+                logits_history = loop_state.histories.logits
+            else:
+                logits_history = append_tensor(
+                    loop_state.histories.logits, logits)
+
             new_histories = RNNHistories(
                 attention_histories=list(att_loop_states),
-                logits=append_tensor(loop_state.histories.logits, logits),
+                logits=logits_history,
                 decoder_outputs=append_tensor(
-                    loop_state.histories.decoder_outputs, cell_output),
+                    loop_state.histories.decoder_outputs, output),
                 outputs=append_tensor(
                     loop_state.histories.outputs, next_symbols),
                 mask=append_tensor(loop_state.histories.mask, not_finished))
@@ -433,7 +497,7 @@ class Decoder(AutoregressiveDecoder):
             for a in self.attentions if a is not None]
 
         histories["decoder_outputs"] = tf.zeros(
-            shape=[0, self.batch_size, self.rnn_size],
+            shape=[0, self.batch_size, self.output_dimension],
             dtype=tf.float32,
             name="hist_decoder_outputs")
 
@@ -447,6 +511,28 @@ class Decoder(AutoregressiveDecoder):
             constants=default_ls.constants,
             feedables=rnn_feedables)
 
+    def output_histories_mask(self, histories: NamedTuple) -> NamedTuple:
+        mask = AutoregressiveDecoder.output_histories_mask(self, histories)
+
+        attentions = [a for a in self.attentions if a is not None]
+        return mask._replace(attention_histories=[
+            tf.contrib.framework.nest.map_structure(
+                lambda _, att=att: not att.reads_history, att_mask)
+            for att, att_mask in zip(attentions, mask.attention_histories)])
+
+    def get_batch_tensors(self) -> Dict[str, Any]:
+        # The encoder states are read only by the attentions
+        return {a.name: a.get_batch_tensors() for a in self.attentions}
+
+    @contextmanager
+    def replace_batch_tensors(
+            self, tensors: Dict[str, Any]) -> Iterator[None]:
+        with ExitStack() as stack:
+            for att in self.attentions:
+                stack.enter_context(
+                    att.replace_batch_tensors(tensors[att.name]))
+            yield
+
     def finalize_loop(self, final_loop_state: LoopState,
                       train_mode: bool) -> None:
         for att_state, attn_obj in zip(
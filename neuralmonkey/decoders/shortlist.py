@@ -0,0 +1,177 @@
+"""Vocabulary shortlists for faster decoding.
+
+During inference, the output projection of an autoregressive decoder can be
+restricted to a small subset of the target vocabulary. For each batch, the
+shortlist consists of the most frequent target words and of the translation
+candidates of the source words in the batch. The candidates are read from a
+lexical table, which can be built from word-aligned training data using
+``scripts/build_lexical_table.py``.
+"""
+from typing import Dict, Iterable, List
+
+import numpy as np
+import tensorflow as tf
+from typeguard import check_argument_types
+
+from neuralmonkey.dataset import Dataset
+from neuralmonkey.decorators import tensor
+from neuralmonkey.logging import log
+from neuralmonkey.model.feedable import FeedDict
+from neuralmonkey.model.model_part import ModelPart
+from neuralmonkey.vocabulary import Vocabulary, SPECIAL_TOKENS
+
+
+def load_lexical_table(path: str, vocabulary: Vocabulary,
+                       candidates: int = None) -> Dict[str, np.ndarray]:
+    """Load the lexical table from a file.
+
+    Each line of the file contains a source word, a tab character and a
+    space-separated list of its translation candidates, sorted from the most
+    probable ones.
+
+    Arguments:
+        path: The path to the lexical table file.
+        vocabulary: The target vocabulary. Candidates which are not in the
+            vocabulary are discarded.
+        candidates: The maximum number of candidates for a source word. If
+            not set, all candidates from the file are used.
+
+    Returns:
+        A dictionary mapping the source words to arrays of vocabulary indices
+        of their translation candidates.
+    """
+    word_to_index = {
+        word: i for i, word in enumerate(vocabulary.index_to_word)}
+    table = {}  # type: Dict[str, np.ndarray]
+
+    with open(path, encoding="utf-8") as f_table:
+        for line in f_table:
+            source, _, targets = line.rstrip("\n").partition("\t")
+            indices = [word_to_index[word] for word in targets.split()
+                       if word in word_to_index][:candidates]
+            if indices:
+                table[source] = np.array(indices, dtype=np.int32)
+
+    log("Lexical table with {} source words loaded from {}".format(
+        len(table), path))
+    return table
+
+
+class Shortlist(ModelPart):
+    """A per-batch shortlist of the target vocabulary.
+
+    The shortlist is fed only during inference; in training, it contains the
+    whole vocabulary. The decoders use the shortlist in the output projection
+    of the greedy and beam search decoding (not when sampling). The logits
+    inside the decoding loop are over the shortlist and the selected positions
+    are mapped to the vocabulary indices using ``word_ids``.
+
+    The shortlist is sorted and always contains the special tokens, so they
+    have the same indices in the shortlist as in the vocabulary.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 name: str,
+                 vocabulary: Vocabulary,
+                 data_id: str,
+                 lexical_table: str,
+                 frequent_words: int = 1000,
+                 candidates: int = None) -> None:
+        """Create a new shortlist.
+
+        Arguments:
+            name: The name of the model part.
+            vocabulary: The target vocabulary.
+            data_id: The source data series. Its tokens are looked up in the
+                lexical table.
+            lexical_table: The path to the lexical table.
+            frequent_words: The number of words from the beginning of the
+                target vocabulary which are always in the shortlist. The
+                vocabulary is expected to be sorted by frequency. The special
+                tokens are always included.
+            candidates: The maximum number of translation candidates per
+                source word.
+        """
+        check_argument_types()
+        ModelPart.__init__(self, name, None, None, None, None)
+
+        self.vocabulary = vocabulary
+        self.data_id = data_id
+        self.frequent_words = frequent_words
+        self.candidates = candidates
+
+        if self.frequent_words < 0:
+            raise ValueError("The number of frequent words must not be "
+                             "negative.")
+
+        if self.candidates is not None and self.candidates <= 0:
+            raise ValueError("The number of candidates must be a positive "
+                             "integer.")
+
+        self._frequent_ids = np.arange(
+            min(max(frequent_words, len(SPECIAL_TOKENS)), len(vocabulary)),
+            dtype=np.int32)
+        self._table = load_lexical_table(lexical_table, vocabulary, candidates)
+    # pylint: enable=too-many-arguments
+
+    @tensor
+    def ids(self) -> tf.Tensor:
+        """Sorted vocabulary indices of the shortlisted words."""
+        return tf.placeholder_with_default(
+            tf.range(len(self.vocabulary)), [None], "shortlist_ids")
+
+    @tensor
+    def positions(self) -> tf.Tensor:
+        """Position of every vocabulary word in the shortlist.
+
+        The words outside the shortlist are at position equal to the size of
+        the shortlist.
+        """
+        size = tf.size(self.ids)
+        return tf.scatter_nd(
+            tf.expand_dims(self.ids, 1), tf.range(size) - size,
+            [len(self.vocabulary)]) + size
+
+    def word_ids(self, positions: tf.Tensor) -> tf.Tensor:
+        """Map positions in the shortlist to the vocabulary indices.
+
+        Arguments:
+            positions: An integer tensor of positions in the shortlist.
+
+        Returns:
+            A tensor of the same shape and type with the vocabulary indices.
+        """
+        return tf.gather(tf.cast(self.ids, positions.dtype), positions)
+
+    def expand_logits(self, logits: tf.Tensor) -> tf.Tensor:
+        """Scatter the logits of the shortlisted words to the vocabulary.
+
+        Arguments:
+            logits: A tensor of logits with the shortlist as the last
+                dimension, e.g. ``(time, batch, shortlist)``-shaped.
+
+        Returns:
+            A tensor of logits with the vocabulary as the last dimension,
+            where the words outside the shortlist get a large negative value.
+        """
+        last_axis = logits.shape.ndims - 1
+        padded = tf.pad(logits, [[0, 0]] * last_axis + [[0, 1]],
+                        constant_values=-1e9)
+        return tf.gather(padded, self.positions, axis=last_axis)
+
+    def get_shortlist(self, sentences: Iterable[List[str]]) -> np.ndarray:
+        """Compute the sorted vocabulary indices of the batch shortlist."""
+        words = {word for sentence in sentences for word in sentence}
+        return np.unique(np.concatenate(
+            [self._frequent_ids]
+            + [self._table[word] for word in words if word in self._table]))
+
+    def feed_dict(self, dataset: Dataset, train: bool = False) -> FeedDict:
+        fd = ModelPart.feed_dict(self, dataset, train)
+
+        sentences = dataset.maybe_get_series(self.data_id)
+        if not train and sentences is not None:
+            fd[self.ids] = self.get_shortlist(sentences)
+
+        return fd
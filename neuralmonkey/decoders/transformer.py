@@ -18,6 +18,7 @@ from neuralmonkey.attention.transformer_cross_layer import (
 from neuralmonkey.decorators import tensor
 from neuralmonkey.decoders.autoregressive import (
     AutoregressiveDecoder, LoopState, DecoderFeedables)
+from neuralmonkey.decoders.shortlist import Shortlist
 from neuralmonkey.encoders.transformer import (
     TransformerLayer, position_signal)
 from neuralmonkey.logging import warn
@@ -81,6 +82,9 @@ class TransformerDecoder(AutoregressiveDecoder):
                  attention_dropout_keep_prob: Union[float, List[float]] = 1.0,
                  use_att_transform_bias: bool = False,
                  supress_unk: bool = False,
+                 sampled_softmax_size: int = None,
+                 compaction_interval: int = None,
+                 shortlist: Shortlist = None,
                  reuse: ModelPart = None,
                  save_checkpoint: str = None,
                  load_checkpoint: str = None,
@@ -119,6 +123,12 @@ class TransformerDecoder(AutoregressiveDecoder):
                 during dropout on the attention output.
             supress_unk: If true, decoder will not produce symbols for unknown
                 tokens.
+            sampled_softmax_size: Use sampled softmax with this number of
+                samples for the training cost.
+            compaction_interval: Remove the finished sentences from the batch
+                every this many steps during decoding.
+            shortlist: Restrict the output projection during greedy and beam
+                search decoding to the vocabulary shortlist.
             reuse: Reuse the variables from the given model part.
         """
         check_argument_types()
@@ -134,6 +144,9 @@ class TransformerDecoder(AutoregressiveDecoder):
             tie_embeddings=tie_embeddings,
             label_smoothing=label_smoothing,
             supress_unk=supress_unk,
+            sampled_softmax_size=sampled_softmax_size,
+            compaction_interval=compaction_interval,
+            shortlist=shortlist,
             reuse=reuse,
             save_checkpoint=save_checkpoint,
             load_checkpoint=load_checkpoint)
@@ -382,29 +395,36 @@ class TransformerDecoder(AutoregressiveDecoder):
         return TransformerLayer(states=output_states, mask=mask)
 
     @tensor
-    def train_logits(self) -> tf.Tensor:
+    def train_output_states(self) -> tf.Tensor:
         last_layer = self.layer(self.depth, self.embedded_train_inputs,
                                 tf.transpose(self.train_mask))
 
-        # t_states shape: (batch, time, channels)
+        # return states in time-major shape (time, batch, channels)
+        return tf.transpose(last_layer.temporal_states, perm=[1, 0, 2])
+
+    def dropout_output_states(self, states: tf.Tensor) -> tf.Tensor:
+        # The dropout is applied inside the layers
+        return states
+
+    @tensor
+    def train_logits(self) -> tf.Tensor:
+        # t_states shape: (time, batch, channels)
         # dec_w shape: (channels, vocab)
-        last_layer_shape = tf.shape(last_layer.temporal_states)
-        last_layer_states = tf.reshape(
-            last_layer.temporal_states,
-            [-1, last_layer_shape[-1]])
+        states = self.train_output_states
+        states_shape = tf.shape(states)
+        flat_states = tf.reshape(states, [-1, states_shape[-1]])
 
         # Reusing input embedding matrix for generating logits
         # significantly reduces the overall size of the model.
         # See: https://arxiv.org/pdf/1608.05859.pdf
         #
-        # shape (batch, time, vocab)
+        # shape (time, batch, vocab)
         logits = tf.reshape(
-            tf.matmul(last_layer_states, self.decoding_w),
-            [last_layer_shape[0], last_layer_shape[1], len(self.vocabulary)])
+            tf.matmul(flat_states, self.decoding_w),
+            [states_shape[0], states_shape[1], len(self.vocabulary)])
         logits += tf.reshape(self.decoding_b, [1, 1, -1])
 
-        # return logits in time-major shape
-        return tf.transpose(logits, perm=[1, 0, 2])
+        return logits
 
     def get_initial_loop_state(self) -> LoopState:
 
@@ -439,10 +459,25 @@ class TransformerDecoder(AutoregressiveDecoder):
             constants=[],
             feedables=default_ls.feedables)
 
+    def output_histories_mask(self, histories: NamedTuple) -> NamedTuple:
+        # The decoded symbols and the input mask are read by the self-attention
+        # in every step.
+        mask = AutoregressiveDecoder.output_histories_mask(self, histories)
+        return mask._replace(decoded_symbols=False, input_mask=False)
+
     def get_body(self, train_mode: bool, sample: bool = False,
                  temperature: float = 1.) -> Callable:
         assert not train_mode
 
+        # See train_logits definition
+        def full_projection(state: tf.Tensor) -> tf.Tensor:
+            return tf.matmul(state, self.decoding_w) + self.decoding_b
+
+        project = full_projection  # type: Callable[[tf.Tensor], tf.Tensor]
+        use_shortlist = self.uses_shortlist(train_mode, sample)
+        if use_shortlist:
+            project = self.get_shortlist_logits_fn()
+
         # pylint: disable=too-many-locals
         def body(*args) -> LoopState:
 
@@ -473,9 +508,7 @@ class TransformerDecoder(AutoregressiveDecoder):
                 # (batch, state_size)
                 output_state = last_layer.temporal_states[:, -1, :]
 
-                # See train_logits definition
-                logits = tf.matmul(output_state, self.decoding_w)
-                logits += self.decoding_b
+                logits = project(output_state)
 
                 # apply temperature
                 logits /= temperature
@@ -485,6 +518,8 @@ class TransformerDecoder(AutoregressiveDecoder):
                         tf.multinomial(logits, num_samples=1), axis=1)
                 else:
                     next_symbols = tf.argmax(logits, axis=1)
+                    if use_shortlist:
+                        next_symbols = self.shortlist.word_ids(next_symbols)
                     int_unfinished_mask = tf.to_int64(
                         tf.logical_not(loop_state.feedables.finished))
 
@@ -1,4 +1,6 @@
+from contextlib import contextmanager
 from functools import wraps
+from typing import Any, Dict, Iterator
 
 import tensorflow as tf
 
@@ -6,10 +8,14 @@ from neuralmonkey.model.parameterized import Parameterized
 from neuralmonkey.tf_utils import tf_print
 
 
+def _cache_attribute(name: str) -> str:
+    return "_{}_cached_placeholder".format(name)
+
+
 def tensor(func):
     @wraps(func)
     def decorate(self, *args, **kwargs):
-        attribute_name = "_{}_cached_placeholder".format(func.__name__)
+        attribute_name = _cache_attribute(func.__name__)
         if not hasattr(self, attribute_name):
             if isinstance(self, Parameterized):
                 # jump out of the caller's scope and into the ModelPart's scope
@@ -25,3 +31,29 @@ def tensor(func):
 
         return getattr(self, attribute_name)
     return property(decorate)
+
+
+@contextmanager
+def replaced_tensors(obj: Any, values: Dict[str, Any]) -> Iterator[None]:
+    """Temporarily replace the cached values of ``tensor`` properties.
+
+    This is used for building a part of the graph on different tensors than
+    the ones cached by the properties, e.g. the encoder states gathered for
+    a part of the batch (see ``AutoregressiveDecoder.compaction_interval``).
+    The original values are computed (if they were not yet) before they are
+    replaced, and restored when the context is left.
+
+    Arguments:
+        obj: The object with the ``tensor`` properties.
+        values: A dictionary mapping the names of the properties to the values
+            used in the context.
+    """
+    originals = {name: getattr(obj, name) for name in values}
+    for name, value in values.items():
+        setattr(obj, _cache_attribute(name), value)
+
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(obj, _cache_attribute(name), value)
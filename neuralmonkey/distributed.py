@@ -0,0 +1,322 @@
+"""Synchronous data-parallel training across local worker processes.
+
+The training can be split among several processes running on the local
+machine. One of the processes hosts a parameter server (a `tf.train.Server`
+on localhost) which stores the model variables. The remaining processes
+(workers) build the same model from the same configuration file. At each
+training step, every worker takes its shard of the current batch, computes the
+gradients and sends them to the parameter server, where they are averaged
+and applied using `tf.train.SyncReplicasOptimizer`.
+
+The first worker (the chief) is responsible for variable initialization,
+logging, validation, and saving the model. The other workers only train. They
+start when the chief has initialized the model and stop when the chief stops.
+
+The local cluster is started with ``neuralmonkey-train --workers N``.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import tensorflow as tf
+
+from neuralmonkey.dataset import Dataset
+from neuralmonkey.logging import log, warn
+
+# pylint: disable=invalid-name
+ClusterDict = Dict[str, List[str]]
+# pylint: enable=invalid-name
+
+
+class WorkerContext:
+    """Information about the worker process in a local training cluster.
+
+    Attributes:
+        cluster: The cluster specification as a dictionary mapping job names
+            to lists of addresses.
+        task_index: Index of this process among the workers.
+        num_workers: Total number of workers in the cluster.
+    """
+
+    def __init__(self, cluster: ClusterDict, task_index: int) -> None:
+        if "ps" not in cluster or "worker" not in cluster:
+            raise ValueError(
+                "Cluster specification must have 'ps' and 'worker' jobs.")
+        if not 0 <= task_index < len(cluster["worker"]):
+            raise ValueError("Worker task index {} out of range".format(
+                task_index))
+
+        self.cluster = cluster
+        self.task_index = task_index
+        self.num_workers = len(cluster["worker"])
+
+        self._cluster_spec = tf.train.ClusterSpec(cluster)
+        self._server = None  # type: Optional[tf.train.Server]
+        self._coordinator = tf.train.Coordinator()
+        self._sync_optimizers = \
+            []  # type: List[tf.train.SyncReplicasOptimizer]
+
+        # Weight of the gradient of the last shard in the synchronous update
+        self.shard_weight = 1.0
+        self._gradient_weight = None  # type: Optional[tf.Tensor]
+
+        self._chief_ready = None  # type: Optional[tf.Variable]
+        self._training_done = None  # type: Optional[tf.Variable]
+        self._is_ready = None  # type: Optional[tf.Tensor]
+        self._is_done = None  # type: Optional[tf.Tensor]
+        self._stop_tokens = []  # type: List[tf.Operation]
+
+    @property
+    def is_chief(self) -> bool:
+        return self.task_index == 0
+
+    @property
+    def server(self) -> tf.train.Server:
+        if self._server is None:
+            self._server = tf.train.Server(
+                self._cluster_spec, job_name="worker",
+                task_index=self.task_index)
+        return self._server
+
+    @property
+    def device_filters(self) -> List[str]:
+        """Devices a session of this worker is allowed to talk to."""
+        return ["/job:ps", "/job:worker/task:{}".format(self.task_index)]
+
+    def device_setter(self):
+        """Get a device function that places variables on the server."""
+        return tf.train.replica_device_setter(
+            worker_device="/job:worker/task:{}".format(self.task_index),
+            cluster=self._cluster_spec)
+
+    @property
+    def gradient_weight(self) -> tf.Tensor:
+        """Placeholder for the weight of the gradient of this worker."""
+        if self._gradient_weight is None:
+            self._gradient_weight = tf.placeholder_with_default(
+                1.0, [], "gradient_weight")
+        return self._gradient_weight
+
+    def sync_optimizer(
+            self,
+            optimizer: tf.train.Optimizer) -> tf.train.SyncReplicasOptimizer:
+        """Wrap an optimizer so the workers' gradients are aggregated."""
+        sync_opt = tf.train.SyncReplicasOptimizer(
+            optimizer,
+            replicas_to_aggregate=self.num_workers,
+            total_num_replicas=self.num_workers)
+        self._sync_optimizers.append(sync_opt)
+        return sync_opt
+
+    def initialize_session(self, session: tf.Session,
+                           init_op: tf.Operation,
+                           init_tables: tf.Operation) -> None:
+        """Initialize a session connected to the cluster.
+
+        The chief initializes the shared variables. The workers do not train
+        until the chief calls `set_ready`, which it does only after the
+        variables are possibly restored from the initial checkpoints. The
+        other workers wait for that in `wait_for_chief`.
+        """
+        with session.graph.as_default():
+            # The flags are not in any collection, so that they are neither
+            # initialized with the model variables nor saved
+            with tf.name_scope("distributed"), tf.device("/job:ps/task:0"):
+                self._chief_ready = tf.Variable(
+                    True, trainable=False, collections=[], name="chief_ready")
+                self._training_done = tf.Variable(
+                    True, trainable=False, collections=[],
+                    name="training_done")
+            self._is_ready = tf.is_variable_initialized(self._chief_ready)
+            self._is_done = tf.is_variable_initialized(self._training_done)
+
+            if self.is_chief:
+                self._stop_tokens = [
+                    sync_opt.get_init_tokens_op(self.num_workers)
+                    for sync_opt in self._sync_optimizers]
+
+        if self.is_chief:
+            session.run(init_op)
+        session.run(init_tables)
+
+    def set_ready(self, session: tf.Session) -> None:
+        """Start the gradient aggregation and let the other workers train.
+
+        Called by the chief when the model variables have their initial
+        values.
+        """
+        for sync_opt in self._sync_optimizers:
+            session.run(sync_opt.chief_init_op)
+            session.run(sync_opt.get_init_tokens_op())
+            sync_opt.get_chief_queue_runner().create_threads(
+                session, coord=self._coordinator, daemon=True, start=True)
+
+        session.run(self._chief_ready.initializer)
+
+    def wait_for_chief(self, session: tf.Session) -> None:
+        """Wait until the chief has initialized the model."""
+        log("Waiting for the chief worker to initialize the model")
+        while not session.run(self._is_ready):
+            time.sleep(1)
+
+        for sync_opt in self._sync_optimizers:
+            session.run(sync_opt.local_step_init_op)
+
+    def should_stop(self, session: tf.Session) -> bool:
+        """Check whether the chief has stopped the training."""
+        return session.run(self._is_done)
+
+    def stop_workers(self, session: tf.Session) -> None:
+        """Make the other workers finish when the chief stops training.
+
+        The workers check the stop flag before each step. The workers
+        already waiting for an aggregated update that will never come are
+        released by extra tokens in the synchronization queues.
+        """
+        session.run(self._training_done.initializer)
+        for tokens_op in self._stop_tokens:
+            session.run(tokens_op)
+        self._coordinator.request_stop()
+
+    def shard(self, batch: Dataset) -> Dataset:
+        """Select the part of the batch processed by this worker.
+
+        The batch is split into contiguous shards (see `shard_bounds`) and
+        the weight of the gradient of the shard is stored in
+        `shard_weight`. When the batch is smaller than the number of
+        workers, the workers without their own shard still have to take
+        part in the synchronous update. They process the last example of
+        the batch, but with zero weight.
+        """
+        start, length, self.shard_weight = shard_bounds(
+            len(batch), self.num_workers, self.task_index)
+
+        if length == 0:
+            return batch.subset(len(batch) - 1, 1)
+        return batch.subset(start, length)
+
+
+def shard_bounds(size: int, num_workers: int,
+                 task_index: int) -> Tuple[int, int, float]:
+    """Compute the shard of a batch processed by a worker.
+
+    The synchronous update averages the gradients of the workers, each of
+    which is a mean over the shard. The gradient of a shard of ``length``
+    examples is weighted by ``length * num_workers / size``, so the update
+    equals the gradient of the mean over the whole batch, even when the
+    shards have unequal sizes or are empty.
+
+    Arguments:
+        size: The number of examples in the batch.
+        num_workers: Total number of workers.
+        task_index: Index of the worker.
+
+    Returns:
+        A tuple of the start and the length of the shard and the weight of
+        its gradient.
+    """
+    shard_size = -(-size // num_workers)
+    start = min(task_index * shard_size, size)
+    length = min(shard_size, size - start)
+    return start, length, length * num_workers / size
+
+
+_WORKER_CONTEXT = None  # type: Optional[WorkerContext]
+
+
+def get_worker_context() -> Optional[WorkerContext]:
+    """Return the context of this worker, `None` when not distributed."""
+    return _WORKER_CONTEXT
+
+
+def set_worker_context(context: Optional[WorkerContext]) -> None:
+    global _WORKER_CONTEXT  # pylint: disable=global-statement
+    _WORKER_CONTEXT = context
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def local_cluster(num_workers: int) -> ClusterDict:
+    """Create a specification of a cluster with one parameter server."""
+    return {"ps": ["localhost:{}".format(_free_port())],
+            "worker": ["localhost:{}".format(_free_port())
+                       for _ in range(num_workers)]}
+
+
+def launch_local_cluster(num_workers: int, train_args: List[str]) -> int:
+    """Run the training in a cluster of local processes.
+
+    Starts the parameter server and `num_workers` worker processes, each of
+    them running ``neuralmonkey.train`` with the given arguments, and waits
+    until the chief worker finishes or another worker fails.
+
+    Arguments:
+        num_workers: Number of worker processes.
+        train_args: Command line arguments for the training script.
+
+    Returns:
+        The exit code of the chief worker.
+    """
+    cluster = local_cluster(num_workers)
+    cluster_json = json.dumps(cluster)
+    log("Starting local cluster: {}".format(cluster_json))
+
+    # Make sure the children import this very copy of Neural Monkey.
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in [package_root, env.get("PYTHONPATH")] if p)
+
+    ps_proc = subprocess.Popen(
+        [sys.executable, "-m", "neuralmonkey.distributed", cluster_json],
+        env=env)
+
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "neuralmonkey.train"] + train_args
+            + ["--cluster", cluster_json, "--task-index", str(i)],
+            env=env)
+        for i in range(num_workers)]
+
+    try:
+        while workers[0].poll() is None:
+            # The training cannot continue without any of the workers
+            for i, worker in enumerate(workers[1:], 1):
+                if worker.poll() not in [None, 0]:
+                    warn("Worker {} failed with exit code {}, stopping the "
+                         "training.".format(i, worker.returncode))
+                    return worker.returncode
+            time.sleep(1)
+
+        exit_code = workers[0].returncode
+        for i, worker in enumerate(workers[1:], 1):
+            try:
+                worker.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                warn("Worker {} did not finish, terminating.".format(i))
+                worker.terminate()
+    finally:
+        for proc in workers + [ps_proc]:
+            if proc.poll() is None:
+                proc.terminate()
+
+    return exit_code
+
+
+def _run_parameter_server(cluster_json: str) -> None:
+    server = tf.train.Server(tf.train.ClusterSpec(json.loads(cluster_json)),
+                             job_name="ps", task_index=0)
+    server.join()
+
+
+if __name__ == "__main__":
+    _run_parameter_server(sys.argv[1])
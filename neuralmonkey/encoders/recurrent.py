@@ -23,8 +23,12 @@ RNN_CELL_TYPES = {
 
 RNN_DIRECTIONS = ["forward", "backward", "bidirectional"]
 
+# The cell types which have a fused implementation
+FUSED_RNN_CELL_TYPES = ["GRU", "LSTM"]
+
 # pylint: disable=invalid-name
-RNNSpecTuple = Union[Tuple[int], Tuple[int, str], Tuple[int, str, str]]
+RNNSpecTuple = Union[Tuple[int], Tuple[int, str], Tuple[int, str, str],
+                     Tuple[int, str, str, bool]]
 RNNCellTuple = Tuple[tf.nn.rnn_cell.RNNCell, tf.nn.rnn_cell.RNNCell]
 # pylint: enable=invalid-name
 
@@ -33,7 +37,8 @@ class RNNSpec(NamedTuple(
         "RNNSpec",
         [("size", int),
          ("direction", str),
-         ("cell_type", str)])):
+         ("cell_type", str),
+         ("fused", bool)])):
     """Recurrent neural network specifications.
 
     Attributes:
@@ -42,12 +47,16 @@ class RNNSpec(NamedTuple(
             ``backward``, and ``bidirectional``.
         cell_type: The recurrent cell type to use. Refer to
             ``encoders.recurrent.RNN_CELL_TYPES`` for possible values.
+        fused: Use the implementation of the cell which computes each step
+            (or the whole sequence) in a single fused kernel. The variables
+            are compatible with the generic implementation.
     """
 
 
 def _make_rnn_spec(size: int,
                    direction: str = "bidirectional",
-                   cell_type: str = "GRU") -> RNNSpec:
+                   cell_type: str = "GRU",
+                   fused: bool = False) -> RNNSpec:
     if size <= 0:
         raise ValueError(
             "RNN size must be a positive integer. {} given.".format(size))
@@ -60,14 +69,54 @@ def _make_rnn_spec(size: int,
         raise ValueError("RNN cell type must be one of {}. {} given."
                          .format(str(RNN_CELL_TYPES), cell_type))
 
-    return RNNSpec(size, direction, cell_type)
+    if fused and cell_type not in FUSED_RNN_CELL_TYPES:
+        raise ValueError("Fused RNN cell type must be one of {}. {} given."
+                         .format(str(FUSED_RNN_CELL_TYPES), cell_type))
+
+    return RNNSpec(size, direction, cell_type, fused)
 
 
 def _make_rnn_cell(spec: RNNSpec) -> Callable[[], tf.nn.rnn_cell.RNNCell]:
     """Return the graph template for creating RNN cells."""
+    if spec.fused:
+        # The fused cells need TensorFlow contrib, which is slow to import.
+        from neuralmonkey.nn.fused_rnn_cells import (
+            FusedOrthoGRUCell, FusedLSTMCell)
+
+        if spec.cell_type == "LSTM":
+            return FusedLSTMCell(spec.size)
+        return FusedOrthoGRUCell(spec.size)
+
     return RNN_CELL_TYPES[spec.cell_type](spec.size)
 
 
+def _fused_lstm_layer(rnn_input: tf.Tensor,
+                      lengths: tf.Tensor,
+                      rnn_spec: RNNSpec) -> Tuple[tf.Tensor, tf.Tensor]:
+    """Run a LSTM layer over the whole sequences in single fused ops.
+
+    The variable scopes mimic the scopes created by ``tf.nn.dynamic_rnn`` and
+    ``tf.nn.bidirectional_dynamic_rnn``.
+    """
+    from neuralmonkey.nn.fused_rnn_cells import fused_lstm
+
+    if rnn_spec.direction == "bidirectional":
+        with tf.variable_scope("bidirectional_rnn"):
+            with tf.variable_scope("fw"):
+                fw_outputs, fw_state = fused_lstm(
+                    rnn_input, lengths, rnn_spec.size)
+            with tf.variable_scope("bw"):
+                bw_outputs, bw_state = fused_lstm(
+                    rnn_input, lengths, rnn_spec.size, reverse=True)
+
+        return (tf.concat([fw_outputs, bw_outputs], 2),
+                tf.concat([fw_state, bw_state], 1))
+
+    with tf.variable_scope("rnn"):
+        return fused_lstm(rnn_input, lengths, rnn_spec.size,
+                          reverse=rnn_spec.direction == "backward")
+
+
 def rnn_layer(rnn_input: tf.Tensor,
               lengths: tf.Tensor,
               rnn_spec: RNNSpec,
@@ -80,7 +129,9 @@ def rnn_layer(rnn_input: tf.Tensor,
         rnn_spec: A valid RNNSpec tuple specifying the network architecture.
         add_residual: Add residual connections to the layer output.
     """
-    if rnn_spec.direction == "bidirectional":
+    if rnn_spec.fused and rnn_spec.cell_type == "LSTM":
+        outputs, final_state = _fused_lstm_layer(rnn_input, lengths, rnn_spec)
+    elif rnn_spec.direction == "bidirectional":
         fw_cell = _make_rnn_cell(rnn_spec)
         bw_cell = _make_rnn_cell(rnn_spec)
 
@@ -132,6 +183,7 @@ class RecurrentEncoder(ModelPart, TemporalStatefulWithOutput):
                  rnn_cell: str = "GRU",
                  rnn_direction: str = "bidirectional",
                  add_residual: bool = False,
+                 fused_rnn_cell: bool = False,
                  dropout_keep_prob: float = 1.0,
                  reuse: ModelPart = None,
                  save_checkpoint: str = None,
@@ -150,6 +202,8 @@ class RecurrentEncoder(ModelPart, TemporalStatefulWithOutput):
                 "bidirectional" will double the resulting vector dimension as
                 well as the number of encoder parameters.
             add_residual: Add residual connections to the RNN layer output.
+            fused_rnn_cell: Use the fused implementation of the GRU or LSTM
+                cell. It is faster on CPU and it uses the same variables.
             dropout_keep_prob: 1 - dropout probability.
             save_checkpoint: ModelPart save checkpoint file.
             load_checkpoint: ModelPart load checkpoint file.
@@ -161,7 +215,8 @@ class RecurrentEncoder(ModelPart, TemporalStatefulWithOutput):
 
         self.input_sequence = input_sequence
         self.dropout_keep_prob = dropout_keep_prob
-        self.rnn_spec = _make_rnn_spec(rnn_size, rnn_direction, rnn_cell)
+        self.rnn_spec = _make_rnn_spec(rnn_size, rnn_direction, rnn_cell,
+                                       fused_rnn_cell)
         self.add_residual = add_residual
 
         if self.dropout_keep_prob <= 0.0 or self.dropout_keep_prob > 1.0:
@@ -209,6 +264,7 @@ class SentenceEncoder(RecurrentEncoder):
                  rnn_cell: str = "GRU",
                  rnn_direction: str = "bidirectional",
                  add_residual: bool = False,
+                 fused_rnn_cell: bool = False,
                  max_input_len: int = None,
                  dropout_keep_prob: float = 1.0,
                  reuse: ModelPart = None,
@@ -234,6 +290,8 @@ class SentenceEncoder(RecurrentEncoder):
                 "bidirectional" will double the resulting vector dimension as
                 well as the number of encoder parameters.
             add_residual: Add residual connections to the RNN layer output.
+            fused_rnn_cell: Use the fused implementation of the GRU or LSTM
+                cell. It is faster on CPU and it uses the same variables.
             dropout_keep_prob: 1 - dropout probability.
             save_checkpoint: ModelPart save checkpoint file.
             load_checkpoint: ModelPart load checkpoint file.
@@ -270,6 +328,7 @@ class SentenceEncoder(RecurrentEncoder):
             rnn_cell=rnn_cell,
             rnn_direction=rnn_direction,
             add_residual=add_residual,
+            fused_rnn_cell=fused_rnn_cell,
             dropout_keep_prob=dropout_keep_prob,
             reuse=reuse,
             save_checkpoint=save_checkpoint,
@@ -289,6 +348,7 @@ class FactoredEncoder(RecurrentEncoder):
                  rnn_cell: str = "GRU",
                  rnn_direction: str = "bidirectional",
                  add_residual: bool = False,
+                 fused_rnn_cell: bool = False,
                  max_input_len: int = None,
                  dropout_keep_prob: float = 1.0,
                  reuse: ModelPart = None,
@@ -314,6 +374,8 @@ class FactoredEncoder(RecurrentEncoder):
                 "bidirectional" will double the resulting vector dimension as
                 well as the number of encoder parameters.
             add_residual: Add residual connections to the RNN layer output.
+            fused_rnn_cell: Use the fused implementation of the GRU or LSTM
+                cell. It is faster on CPU and it uses the same variables.
             dropout_keep_prob: 1 - dropout probability.
             save_checkpoint: ModelPart save checkpoint file.
             load_checkpoint: ModelPart load checkpoint file.
@@ -340,6 +402,7 @@ class FactoredEncoder(RecurrentEncoder):
             rnn_cell=rnn_cell,
             rnn_direction=rnn_direction,
             add_residual=add_residual,
+            fused_rnn_cell=fused_rnn_cell,
             dropout_keep_prob=dropout_keep_prob,
             reuse=reuse,
             save_checkpoint=save_checkpoint,
@@ -359,6 +422,7 @@ class DeepSentenceEncoder(SentenceEncoder):
                  rnn_directions: List[str],
                  rnn_cell: str = "GRU",
                  add_residual: bool = False,
+                 fused_rnn_cell: bool = False,
                  max_input_len: int = None,
                  dropout_keep_prob: float = 1.0,
                  reuse: ModelPart = None,
@@ -387,6 +451,8 @@ class DeepSentenceEncoder(SentenceEncoder):
                 "bidirectional" will double the resulting vector dimension as
                 well as the number of the parameters in the given layer.
             add_residual: Add residual connections to each RNN layer output.
+            fused_rnn_cell: Use the fused implementation of the GRU or LSTM
+                cells. It is faster on CPU and it uses the same variables.
             dropout_keep_prob: 1 - dropout probability.
             save_checkpoint: ModelPart save checkpoint file.
             load_checkpoint: ModelPart load checkpoint file.
@@ -410,6 +476,7 @@ class DeepSentenceEncoder(SentenceEncoder):
             rnn_direction=rnn_directions[-1],
             rnn_cell=rnn_cell,
             add_residual=add_residual,
+            fused_rnn_cell=fused_rnn_cell,
             max_input_len=max_input_len,
             dropout_keep_prob=dropout_keep_prob,
             reuse=reuse,
@@ -430,7 +497,8 @@ class DeepSentenceEncoder(SentenceEncoder):
 
         for level, (rnn_size, rnn_dir) in enumerate(
                 zip(self.rnn_sizes, self.rnn_directions)):
-            rnn_spec = _make_rnn_spec(rnn_size, rnn_dir, self.rnn_cell)
+            rnn_spec = _make_rnn_spec(rnn_size, rnn_dir, self.rnn_cell,
+                                      self.rnn_spec.fused)
 
             with tf.variable_scope("layer_{}".format(level)):
                 outputs, state = rnn_layer(
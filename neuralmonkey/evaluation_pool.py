@@ -0,0 +1,259 @@
+"""Concurrent execution of the evaluators.
+
+Scoring the outputs on a large validation set with several evaluators may take
+a considerable time, during which the model sits idle. The ``EvaluationPool``
+runs the evaluators concurrently:
+
+* Evaluators which declare they are ``picklable`` are sent to a pool of worker
+  processes when the pool is created. For every evaluation, the scored data
+  series are serialized only once to a temporary file, which every worker
+  process loads at most once.
+
+* Evaluators which are not picklable, but declare they are ``thread_safe``,
+  run in threads of the main process. This helps the evaluators which spend
+  most of the time waiting for external processes.
+
+* The remaining evaluators run in the main thread while the others are being
+  computed.
+
+The worker processes are started as fresh interpreters instead of forking
+the training process, which runs the TensorFlow threads.
+"""
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from neuralmonkey.logging import log, warn
+
+# pylint: disable=invalid-name
+# A triple of the hypothesis series, the reference series and the evaluator
+EvaluatorSpec = Tuple[str, str, Callable]
+Evaluation = Dict[str, float]
+# pylint: enable=invalid-name
+
+# The state of a worker process
+_worker_evaluators = []  # type: List[Callable]
+_worker_data_path = None  # type: Optional[str]
+_worker_data = ({}, {})  # type: Tuple[Dict[str, Any], Dict[str, Any]]
+
+
+def _init_worker(evaluators: List[Callable]) -> None:
+    global _worker_evaluators  # pylint: disable=global-statement
+    _worker_evaluators = evaluators
+
+
+def _evaluate_in_worker(index: int, data_path: str, hypothesis_id: str,
+                        reference_id: str) -> Tuple[float, float]:
+    # pylint: disable=global-statement
+    global _worker_data_path, _worker_data
+    # pylint: enable=global-statement
+
+    if data_path != _worker_data_path:
+        with open(data_path, "rb") as f_data:
+            _worker_data = pickle.load(f_data)
+        _worker_data_path = data_path
+
+    hypotheses, references = _worker_data
+    return _timed_call(_worker_evaluators[index],
+                       hypotheses[hypothesis_id], references[reference_id])
+
+
+def _timed_call(function: Callable, hypotheses: Any,
+                references: Any) -> Tuple[float, float]:
+    start = time.time()
+    score = function(hypotheses, references)
+    return score, time.time() - start
+
+
+def metric_name(hypothesis_id: str, function: Callable) -> str:
+    return "{}/{}".format(hypothesis_id, function.name)
+
+
+def evaluate_serially(
+        evaluators: List[EvaluatorSpec],
+        batch: Dict[str, List],
+        result_data: Dict[str, List]) -> Tuple[Evaluation, Evaluation]:
+    """Score the outputs with the evaluators one after another.
+
+    Arguments:
+        evaluators: List of triples of the hypothesis series, the reference
+            series and the evaluator.
+        batch: Dictionary from series names to the reference data.
+        result_data: Dictionary from series names to the model outputs.
+
+    Returns:
+        Tuple of dictionaries from metric names to the scores and to the
+        times of the evaluators in seconds.
+    """
+    scores = {}  # type: Evaluation
+    timings = {}  # type: Evaluation
+
+    for hypothesis_id, reference_id, function in evaluators:
+        if reference_id not in batch or hypothesis_id not in result_data:
+            continue
+
+        name = metric_name(hypothesis_id, function)
+        scores[name], timings[name] = _timed_call(
+            function, result_data[hypothesis_id], batch[reference_id])
+
+    return scores, timings
+
+
+class EvaluationPool:
+    """A pool of workers which run the evaluators concurrently."""
+
+    def __init__(self, evaluators: List[EvaluatorSpec],
+                 processes: int) -> None:
+        """Create the pool and start the worker processes.
+
+        Arguments:
+            evaluators: List of triples of the hypothesis series, the
+                reference series and the evaluator.
+            processes: The number of worker processes.
+        """
+        if processes < 1:
+            raise ValueError("Evaluation pool needs at least one process.")
+
+        self.evaluators = evaluators
+
+        # Indices of the evaluators by the way they are run
+        self._in_processes = []  # type: List[int]
+        self._in_threads = []  # type: List[int]
+        self._in_main = []  # type: List[int]
+
+        picklable = []  # type: List[Callable]
+        for i, (_, _, function) in enumerate(evaluators):
+            if getattr(function, "picklable", False):
+                try:
+                    pickle.dumps(function)
+                    self._in_processes.append(i)
+                    picklable.append(function)
+                    continue
+                except (pickle.PicklingError, TypeError, AttributeError):
+                    warn("Evaluator '{}' cannot be pickled, running it in "
+                         "the main process".format(function.name))
+
+            if getattr(function, "thread_safe", False):
+                self._in_threads.append(i)
+            else:
+                self._in_main.append(i)
+
+        self._process_pool = None  # type: Optional[Any]
+        if self._in_processes:
+            # Each worker gets the list of the picklable evaluators, so the
+            # tasks refer to them by the index to this list.
+            context = multiprocessing.get_context("spawn")
+            self._process_pool = context.Pool(
+                min(processes, len(self._in_processes)),
+                initializer=_init_worker, initargs=(picklable,))
+
+        self._thread_pool = None  # type: Optional[ThreadPoolExecutor]
+        if self._in_threads:
+            self._thread_pool = ThreadPoolExecutor(len(self._in_threads))
+
+        log("Evaluation pool started: {} evaluators in {} processes, {} in "
+            "threads, {} in the main thread".format(
+                len(self._in_processes),
+                min(processes, len(self._in_processes)),
+                len(self._in_threads), len(self._in_main)))
+
+    def evaluate(self,
+                 batch: Dict[str, List],
+                 result_data: Dict[str, List]) -> Tuple[Evaluation,
+                                                        Evaluation]:
+        """Score the outputs with all evaluators concurrently.
+
+        Arguments:
+            batch: Dictionary from series names to the reference data.
+            result_data: Dictionary from series names to the model outputs.
+
+        Returns:
+            Tuple of dictionaries from metric names to the scores and to the
+            times of the evaluators in seconds. The metrics are in the order
+            of the evaluators.
+        """
+        applicable = [
+            i for i, (hyp_id, ref_id, _) in enumerate(self.evaluators)
+            if ref_id in batch and hyp_id in result_data]
+
+        async_results = {}  # type: Dict[int, Any]
+        futures = {}  # type: Dict[int, Any]
+        data_path = None
+
+        try:
+            in_processes = [i for i in self._in_processes if i in applicable]
+            if in_processes:
+                assert self._process_pool is not None
+                data_path = self._write_data(
+                    [self.evaluators[i] for i in in_processes],
+                    batch, result_data)
+
+                for i in in_processes:
+                    hyp_id, ref_id, _ = self.evaluators[i]
+                    async_results[i] = self._process_pool.apply_async(
+                        _evaluate_in_worker,
+                        (self._in_processes.index(i), data_path, hyp_id,
+                         ref_id))
+
+            for i in self._in_threads:
+                if i in applicable:
+                    assert self._thread_pool is not None
+                    hyp_id, ref_id, function = self.evaluators[i]
+                    futures[i] = self._thread_pool.submit(
+                        _timed_call, function, result_data[hyp_id],
+                        batch[ref_id])
+
+            results = {}  # type: Dict[int, Tuple[float, float]]
+            for i in self._in_main:
+                if i in applicable:
+                    hyp_id, ref_id, function = self.evaluators[i]
+                    results[i] = _timed_call(
+                        function, result_data[hyp_id], batch[ref_id])
+
+            # The exceptions raised in the workers are re-raised here
+            for i, async_result in async_results.items():
+                results[i] = async_result.get()
+            for i, future in futures.items():
+                results[i] = future.result()
+        finally:
+            if data_path is not None:
+                os.remove(data_path)
+
+        scores = {}  # type: Evaluation
+        timings = {}  # type: Evaluation
+        for i in applicable:
+            hyp_id, _, function = self.evaluators[i]
+            name = metric_name(hyp_id, function)
+            scores[name], timings[name] = results[i]
+
+        return scores, timings
+
+    @staticmethod
+    def _write_data(evaluators: List[EvaluatorSpec],
+                    batch: Dict[str, List],
+                    result_data: Dict[str, List]) -> str:
+        """Serialize the data series needed by the evaluators to a file."""
+        hypotheses = {hyp_id: result_data[hyp_id]
+                      for hyp_id, _, _ in evaluators}
+        references = {ref_id: batch[ref_id] for _, ref_id, _ in evaluators}
+
+        handle, path = tempfile.mkstemp(prefix="neuralmonkey_evaluation_")
+        with os.fdopen(handle, "wb") as f_data:
+            pickle.dump((hypotheses, references), f_data,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    def close(self) -> None:
+        """Stop the worker processes and threads."""
+        if self._process_pool is not None:
+            self._process_pool.terminate()
+            self._process_pool.join()
+            self._process_pool = None
+
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown()
+            self._thread_pool = None
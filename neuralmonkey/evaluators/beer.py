@@ -1,11 +1,14 @@
 import tempfile
 import subprocess
-from typing import List
+from typing import Any, Dict, List, Optional
 
+import numpy as np
 from typeguard import check_argument_types
 
-from neuralmonkey.logging import log
+from neuralmonkey.logging import log, warn
 from neuralmonkey.evaluators.evaluator import Evaluator
+from neuralmonkey.evaluators.scorer_daemon import (
+    ScorerDaemon, ScorerDaemonError)
 
 
 class BeerWrapper(Evaluator[List[str]]):
@@ -15,21 +18,47 @@ class BeerWrapper(Evaluator[List[str]]):
     Code: https://github.com/stanojevic/beer
     """
 
+    # Every call uses its own temporary files and scorer process, the
+    # requests to the daemon are serialized.
+    thread_safe = True
+
     def __init__(self,
                  wrapper: str,
                  name: str = "BEER",
-                 encoding: str = "utf-8") -> None:
+                 encoding: str = "utf-8",
+                 daemon: bool = False,
+                 daemon_command: List[str] = None,
+                 timeout: float = 60.0) -> None:
         """Initialize the BEER wrapper.
 
         Args:
             name: Name of the evaluator.
             wrapper: Path to the BEER's executable.
             encoding: Data encoding.
+            daemon: Start BEER once in the interactive mode and keep it
+                running between the evaluations. The corpus-level score is
+                the average of the sentence-level scores.
+            daemon_command: The command that starts the interactive scorer.
+                By default, it is BEER in the interactive working mode.
+            timeout: How long to wait for the daemon to score a sentence.
         """
         check_argument_types()
         super().__init__(name)
         self.wrapper = wrapper
         self.encoding = encoding
+        self.daemon = daemon
+        self.daemon_command = daemon_command
+        self.timeout = timeout
+        self._daemon = None  # type: Optional[ScorerDaemon]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Drop the daemon, which cannot be pickled.
+
+        Every copy of the evaluator starts its own daemon.
+        """
+        state = self.__dict__.copy()
+        state["_daemon"] = None
+        return state
 
     def serialize_to_bytes(self, sentences: List[List[str]]) -> bytes:
         joined = [" ".join(r) for r in sentences]
@@ -39,7 +68,43 @@ class BeerWrapper(Evaluator[List[str]]):
     def score_batch(self,
                     hypotheses: List[List[str]],
                     references: List[List[str]]) -> float:
-
+        if self.daemon:
+            try:
+                return self._score_with_daemon(hypotheses, references)
+            except ScorerDaemonError as exc:
+                warn("BEER daemon failed ({}), running BEER as a single "
+                     "process".format(exc))
+
+        return self._score_with_process(hypotheses, references)
+
+    def _score_with_daemon(self,
+                           hypotheses: List[List[str]],
+                           references: List[List[str]]) -> float:
+        if self._daemon is None:
+            command = self.daemon_command
+            if command is None:
+                command = [self.wrapper, "--workingMode", "interactive"]
+            self._daemon = ScorerDaemon(
+                command, self.name, self.timeout, self.encoding)
+
+        answers = self._daemon.request(
+            ["EVAL ||| {} ||| {}".format(" ".join(hyp), " ".join(ref))
+             for hyp, ref in zip(hypotheses, references)])
+
+        if not answers:
+            return 0.0
+
+        try:
+            return float(np.mean([float(a.split()[-1]) for a in answers]))
+        except (IndexError, ValueError):
+            log("Error: Malformed output from BEER daemon:", color="red")
+            log("\n".join(answers), color="red")
+            log("=======", color="red")
+            return 0.0
+
+    def _score_with_process(self,
+                            hypotheses: List[List[str]],
+                            references: List[List[str]]) -> float:
         ref_bytes = self.serialize_to_bytes(references)
         hyp_bytes = self.serialize_to_bytes(hypotheses)
 
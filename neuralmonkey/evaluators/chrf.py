@@ -1,24 +1,77 @@
-from typing import List, Dict
+from typing import List, Dict, NamedTuple, Tuple
 from typeguard import check_argument_types
 import numpy as np
-from neuralmonkey.evaluators.evaluator import Evaluator
+from neuralmonkey.evaluators.evaluator import Evaluator, check_lengths
 
 # pylint: disable=invalid-name
 NGramDicts = List[Dict[str, int]]
 # pylint: enable=invalid-name
 
 
+class _Characters(NamedTuple(
+        "_Characters",
+        [("codes", np.ndarray),
+         ("lengths", np.ndarray),
+         ("sentence", np.ndarray),
+         ("position", np.ndarray)])):
+    """Characters of a batch of sentences concatenated to a single array.
+
+    Attributes:
+        codes: The code points of the characters.
+        lengths: The number of characters of each sentence.
+        sentence: The sentence index of each character.
+        position: The position of each character in its sentence.
+    """
+
+
+class _ReferenceStats(NamedTuple(
+        "_ReferenceStats",
+        [("alphabet", np.ndarray),
+         ("lengths", np.ndarray),
+         ("keys", List[np.ndarray]),
+         ("counts", List[np.ndarray]),
+         ("sentences", List[np.ndarray])])):
+    """Character n-gram statistics of a set of references.
+
+    The characters are mapped to IDs from 1 to the size of the alphabet of
+    the references. The n-grams of order 1 are identified by the sentence
+    index and the character ID, the n-grams of a higher order by the index of
+    their prefix among the unique n-grams of the previous order and their
+    last character ID. For each order, there is a sorted array of the unique
+    n-gram keys, the number of their occurrences and the sentence they come
+    from.
+    """
+
+
 class ChrFEvaluator(Evaluator[List[str]]):
     """Compute ChrF score.
 
     See http://www.statmt.org/wmt15/pdf/WMT49.pdf
+
+    The score of a batch is the average of the sentence-level scores. The
+    character n-gram statistics of the references are cached, so they are
+    computed only once for each validation set. The n-grams of all
+    hypotheses in a batch are counted at once with NumPy (see
+    ``sentence_scores``). The ``score_instance`` method is kept as the
+    reference implementation.
     """
 
     def __init__(self,
                  n: int = 6,
                  beta: float = 1.0,
                  ignored_symbols: List[str] = None,
-                 name: str = None) -> None:
+                 name: str = None,
+                 cache_size: int = 100000) -> None:
+        """Create the ChrF evaluator.
+
+        Arguments:
+            n: Longest character n-grams considered.
+            beta: Weight of the recall in the F-score.
+            ignored_symbols: Characters removed before the scoring.
+            name: Name displayed in the logs and TensorBoard.
+            cache_size: Maximum number of reference sentences whose n-gram
+                statistics are cached.
+        """
         check_argument_types()
 
         if name is None:
@@ -27,11 +80,161 @@ class ChrFEvaluator(Evaluator[List[str]]):
 
         self.n = n
         self.beta_2 = beta**2
+        self.cache_size = cache_size
 
         self.ignored = []  # type: List[str]
         if ignored_symbols is not None:
             self.ignored = ignored_symbols
 
+        # Only single characters can be ignored, longer symbols never match
+        self._deletions = {ord(sym): None for sym in self.ignored
+                           if len(sym) == 1}
+        self._reference_cache = {}  \
+            # type: Dict[Tuple[str, ...], _ReferenceStats]
+
+    @check_lengths
+    def score_batch(self,
+                    hypotheses: List[List[str]],
+                    references: List[List[str]]) -> float:
+        return np.mean(self.sentence_scores(hypotheses, references))
+
+    def sentence_scores(self,
+                        hypotheses: List[List[str]],
+                        references: List[List[str]]) -> np.ndarray:
+        """Compute the sentence-level ChrF scores of a batch.
+
+        The hypothesis n-grams of each order are looked up among the unique
+        reference n-grams of the sentence, which gives the number of the
+        matched n-grams after clipping the counts of the found n-grams. The
+        scores are equal to the scores of ``score_instance``.
+
+        Arguments:
+            hypotheses: List of model predictions.
+            references: List of golden outputs.
+
+        Returns:
+            A float array with a score for every sentence.
+        """
+        ref_stats = self._reference_stats(references)
+        hyp_chars = self._characters([" ".join(h) for h in hypotheses])
+        alphabet_size = ref_stats.alphabet.shape[0]
+
+        # Characters not in the references get ID 0 and never match
+        ids = np.searchsorted(ref_stats.alphabet, hyp_chars.codes)
+        if alphabet_size > 0:
+            found = ref_stats.alphabet[
+                np.minimum(ids, alphabet_size - 1)] == hyp_chars.codes
+            ids = np.where(found, ids + 1, 0)
+        else:
+            ids = np.zeros_like(ids)
+
+        orders = np.arange(self.n)
+        hyp_all = np.maximum(hyp_chars.lengths[:, None] - orders, 0)
+        ref_all = np.maximum(ref_stats.lengths[:, None] - orders, 0)
+        matched = np.zeros_like(hyp_all)
+
+        # The index of the n-gram starting at each position among the unique
+        # reference n-grams of the current order, -1 if it is not there
+        prefixes = hyp_chars.sentence
+        for m in range(self.n):
+            valid = hyp_chars.position < hyp_chars.lengths[
+                hyp_chars.sentence] - m
+            valid[valid.shape[0] - m:] = False
+            valid &= prefixes >= 0
+
+            shifted = np.roll(ids, -m)
+            keys = prefixes[valid] * (alphabet_size + 1) + shifted[valid]
+            indices = np.searchsorted(ref_stats.keys[m], keys)
+            found = indices < ref_stats.keys[m].shape[0]
+            found[found] = ref_stats.keys[m][indices[found]] == keys[found]
+
+            prefixes = np.full_like(prefixes, -1)
+            prefixes[np.flatnonzero(valid)[found]] = indices[found]
+
+            hyp_counts = np.bincount(indices[found],
+                                     minlength=ref_stats.keys[m].shape[0])
+            matched[:, m] = np.bincount(
+                ref_stats.sentences[m],
+                weights=np.minimum(hyp_counts, ref_stats.counts[m]),
+                minlength=len(hypotheses))
+
+        precision = np.mean(np.divide(
+            matched, hyp_all, out=np.ones(hyp_all.shape),
+            where=(hyp_all != 0)), axis=1)
+        recall = np.mean(np.divide(
+            matched, ref_all, out=np.ones(ref_all.shape),
+            where=(ref_all != 0)), axis=1)
+
+        numerator = (1 + self.beta_2) * (precision * recall)
+        denominator = (self.beta_2 * precision) + recall
+        scores = np.divide(numerator, denominator,
+                           out=np.zeros_like(numerator),
+                           where=(denominator != 0))
+
+        # Empty sentences only match other empty sentences
+        empty = (hyp_chars.lengths == 0) | (ref_stats.lengths == 0)
+        scores[empty] = (hyp_chars.lengths == ref_stats.lengths)[empty]
+        return scores
+
+    def _characters(self, sentences: List[str]) -> _Characters:
+        filtered = sentences
+        if self._deletions:
+            filtered = [s.translate(self._deletions) for s in sentences]
+        lengths = np.array([len(s) for s in filtered], dtype=np.int64)
+        codes = np.frombuffer(
+            "".join(filtered).encode("utf-32-le"), dtype="<u4")
+
+        sentence = np.repeat(np.arange(len(sentences)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        position = np.arange(codes.shape[0]) - starts[sentence]
+        return _Characters(codes, lengths, sentence, position)
+
+    def _reference_stats(self,
+                         references: List[List[str]]) -> _ReferenceStats:
+        joined = tuple(" ".join(r) for r in references)
+        if joined in self._reference_cache:
+            return self._reference_cache[joined]
+
+        chars = self._characters(list(joined))
+        alphabet, ids = np.unique(chars.codes, return_inverse=True)
+        ids = ids + 1
+
+        keys = []  # type: List[np.ndarray]
+        counts = []  # type: List[np.ndarray]
+        sentences = []  # type: List[np.ndarray]
+
+        prefixes = chars.sentence
+        for m in range(self.n):
+            valid = chars.position < chars.lengths[chars.sentence] - m
+            valid[valid.shape[0] - m:] = False
+
+            unique_keys, inverse, unique_counts = np.unique(
+                prefixes[valid] * (alphabet.shape[0] + 1)
+                + np.roll(ids, -m)[valid],
+                return_inverse=True, return_counts=True)
+
+            if m == 0:
+                unique_sentences = unique_keys // (alphabet.shape[0] + 1)
+            else:
+                unique_sentences = sentences[-1][
+                    unique_keys // (alphabet.shape[0] + 1)]
+
+            keys.append(unique_keys)
+            counts.append(unique_counts)
+            sentences.append(unique_sentences)
+
+            prefixes = np.full_like(prefixes, -1)
+            prefixes[valid] = inverse
+
+        stats = _ReferenceStats(alphabet, chars.lengths, keys, counts,
+                                sentences)
+
+        cached = sum(len(k) for k in self._reference_cache)
+        if cached + len(joined) > self.cache_size:
+            self._reference_cache = {}
+        self._reference_cache[joined] = stats
+        return stats
+
     def score_instance(self,
                        hypothesis: List[str],
                        reference: List[str]) -> float:
@@ -97,5 +300,35 @@ def _get_ngrams(tokens: List[str], n: int) -> NGramDicts:
     return ngr_dicts
 
 
+class ChrFAccumulator:
+    """Incremental computation of the ChrF score of a dataset.
+
+    The hypotheses and references are added in batches, e.g. as they are
+    decoded. The score is the same as if the whole dataset was scored by the
+    evaluator at once.
+    """
+
+    def __init__(self, evaluator: ChrFEvaluator) -> None:
+        self.evaluator = evaluator
+        self._scores = []  # type: List[np.ndarray]
+
+    def add(self,
+            hypotheses: List[List[str]],
+            references: List[List[str]]) -> None:
+        """Score a batch and add it to the accumulated statistics."""
+        if len(hypotheses) != len(references):
+            raise ValueError("Hypothesis and reference lists do not have the "
+                             "same length: {} vs {}.".format(len(hypotheses),
+                                                             len(references)))
+        self._scores.append(
+            self.evaluator.sentence_scores(hypotheses, references))
+
+    def score(self) -> float:
+        """Return the ChrF score of the batches added so far."""
+        if not self._scores:
+            raise ValueError("No hyp/ref pair to evaluate.")
+        return np.mean(np.concatenate(self._scores))
+
+
 # pylint: disable=invalid-name
 ChrF3 = ChrFEvaluator(beta=3)
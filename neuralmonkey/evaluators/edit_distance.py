@@ -1,10 +1,18 @@
 from typing import List
-from difflib import SequenceMatcher
 
 from neuralmonkey.evaluators.evaluator import Evaluator
+from neuralmonkey.evaluators.levenshtein import lcs_length
 
 
 class EditDistanceEvaluator(Evaluator[List[str]]):
+    """Compute the character-level edit distance of the joined sentences.
+
+    The sentence score is the similarity ratio of the sentences, i.e. twice
+    the length of their longest common subsequence divided by the sum of
+    their lengths, which is one minus the insertion/deletion distance
+    normalized by the sum of the lengths. The batch score is one minus the
+    average ratio.
+    """
 
     # pylint: disable=no-self-use
     def score_instance(self,
@@ -13,8 +21,10 @@ class EditDistanceEvaluator(Evaluator[List[str]]):
         hyp_joined = " ".join(hypothesis)
         ref_joined = " ".join(reference)
 
-        matcher = SequenceMatcher(None, hyp_joined, ref_joined)
-        return matcher.ratio()
+        total_length = len(hyp_joined) + len(ref_joined)
+        if not total_length:
+            return 1.0
+        return 2 * lcs_length(hyp_joined, ref_joined) / total_length
     # pylint: enable=no-self-use
 
     def score_batch(self,
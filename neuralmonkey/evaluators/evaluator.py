@@ -29,8 +29,19 @@ class Evaluator(Generic[EvalType]):
     Each evaluator has a `__call__` method which returns a score for a batch
     of model predictions given a the references. This class provides default
     implementations of `score_batch` and `score_instance` functions.
+
+    The evaluators declare how they can be run concurrently with other
+    evaluators (see `neuralmonkey.evaluation_pool`):
+
+    Attributes:
+        picklable: The evaluator can be pickled and run in a worker process.
+        thread_safe: The evaluator can be run in a thread other than the main
+            one.
     """
 
+    picklable = True
+    thread_safe = False
+
     def __init__(self, name: str = None) -> None:
         check_argument_types()
         if name is None:
@@ -0,0 +1,137 @@
+"""Bit-parallel edit distance kernel shared by the evaluators.
+
+The edit distances are computed with the bit-vector algorithm of Myers (1999)
+in the formulation of Hyyrö (2001). The reference sequence is encoded once as
+a bit mask for each of its distinct tokens, which marks the positions where
+the token occurs. A column of the dynamic programming matrix is then stored as
+two bit vectors of vertical differences, which are updated by a constant
+number of integer operations for each hypothesis token. Python integers have
+an arbitrary size, so the references can be of any length.
+
+The tokens can be of any hashable type; since they are used only as keys of
+the mask dictionary, mapping them to integer IDs first brings no speed-up.
+
+For a fixed reference, the ``Aligner`` can also return the state of the
+computation after each prefix of a hypothesis and resume from it. This is used
+by TER, which computes the edit distances of many hypotheses that differ only
+in a suffix.
+"""
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+# pylint: disable=invalid-name
+# The vertical positive and negative differences and the distance
+AlignmentState = Tuple[int, int, int]
+# pylint: enable=invalid-name
+
+
+def _token_masks(sequence: Sequence[Hashable]) -> Dict[Hashable, int]:
+    masks = {}  # type: Dict[Hashable, int]
+    for i, token in enumerate(sequence):
+        masks[token] = masks.get(token, 0) | (1 << i)
+    return masks
+
+
+class Aligner:
+    """Computes the edit distances of hypotheses to a fixed reference."""
+
+    def __init__(self, reference: Sequence[Hashable]) -> None:
+        self.length = len(reference)
+        self._masks = _token_masks(reference)
+        self._full = (1 << self.length) - 1
+        self._last = 1 << (self.length - 1) if self.length else 0
+
+    @property
+    def initial_state(self) -> AlignmentState:
+        """The state before reading any hypothesis token."""
+        return self._full, 0, self.length
+
+    def resume(self, state: AlignmentState,
+               hypothesis: Sequence[Hashable]) -> int:
+        """Continue the computation from a state and return the distance."""
+        return self._advance(state, hypothesis, None)[2]
+
+    def prefix_states(
+            self, hypothesis: Sequence[Hashable]) -> List[AlignmentState]:
+        """Get the states after each prefix of the hypothesis.
+
+        Returns:
+            A list of ``len(hypothesis) + 1`` states, the distance of the
+            whole hypothesis is the last element of the last state.
+        """
+        states = [self.initial_state]
+        self._advance(self.initial_state, hypothesis, states)
+        return states
+
+    def distance(self, hypothesis: Sequence[Hashable]) -> int:
+        """Compute the Levenshtein distance of the hypothesis."""
+        return self.resume(self.initial_state, hypothesis)
+
+    def _advance(self, state: AlignmentState,
+                 hypothesis: Sequence[Hashable],
+                 states: List[AlignmentState] = None) -> AlignmentState:
+        positive, negative, score = state
+        if not self.length:
+            for _ in hypothesis:
+                score += 1
+                if states is not None:
+                    states.append((positive, negative, score))
+            return positive, negative, score
+
+        masks = self._masks
+        full = self._full
+        last = self._last
+
+        for token in hypothesis:
+            equal = masks.get(token, 0)
+            vertical = equal | negative
+            horizontal = (((equal & positive) + positive) ^ positive) | equal
+            h_positive = negative | (full & ~(horizontal | positive))
+            h_negative = positive & horizontal
+
+            if h_positive & last:
+                score += 1
+            elif h_negative & last:
+                score -= 1
+
+            # The first row of the matrix increases by one in each column
+            h_positive = ((h_positive << 1) | 1) & full
+            h_negative = (h_negative << 1) & full
+            positive = h_negative | (full & ~(vertical | h_positive))
+            negative = h_positive & vertical
+
+            if states is not None:
+                states.append((positive, negative, score))
+
+        return positive, negative, score
+
+
+def levenshtein(hypothesis: Sequence[Hashable],
+                reference: Sequence[Hashable]) -> int:
+    """Compute the Levenshtein distance of two sequences."""
+    return Aligner(reference).distance(hypothesis)
+
+
+def lcs_length(first: Sequence[Hashable], second: Sequence[Hashable]) -> int:
+    """Compute the length of the longest common subsequence.
+
+    Uses the bit-parallel algorithm of Allison and Dix (1986).
+    """
+    masks = _token_masks(second)
+    full = (1 << len(second)) - 1
+    row = full
+
+    for token in first:
+        matches = row & masks.get(token, 0)
+        row = ((row + matches) | (row - matches)) & full
+
+    return len(second) - bin(row).count("1")
+
+
+def levenshtein_batch(hypotheses: List[Sequence[Hashable]],
+                      references: List[Sequence[Hashable]]) -> np.ndarray:
+    """Compute the Levenshtein distances of a batch of sequence pairs."""
+    return np.array([levenshtein(hyp, ref)
+                     for hyp, ref in zip(hypotheses, references)],
+                    dtype=np.int64)
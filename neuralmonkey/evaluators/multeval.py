@@ -1,22 +1,32 @@
+import os
 import tempfile
 import subprocess
-from typing import List
+from typing import Any, Dict, List, Optional
 from typeguard import check_argument_types
 
 from neuralmonkey.logging import warn
 from neuralmonkey.evaluators.evaluator import Evaluator
+from neuralmonkey.evaluators.scorer_daemon import (
+    ScorerDaemon, ScorerDaemonError)
 
 
 # pylint: disable=too-few-public-methods
 class MultEvalWrapper(Evaluator[List[str]]):
     """Wrapper for mult-eval's reference BLEU and METEOR scorer."""
 
+    # Every call uses its own temporary files and scorer process, the
+    # requests to the daemon are serialized.
+    thread_safe = True
+
     def __init__(self,
                  wrapper: str,
                  name: str = "MultEval",
                  encoding: str = "utf-8",
                  metric: str = "bleu",
-                 language: str = "en") -> None:
+                 language: str = "en",
+                 daemon: bool = False,
+                 daemon_command: List[str] = None,
+                 timeout: float = 60.0) -> None:
         """Initialize the wrapper.
 
         Arguments:
@@ -25,6 +35,12 @@ class MultEvalWrapper(Evaluator[List[str]]):
             encoding: Encoding of input files
             language: Language of hypotheses and references
             metric: Evaluation metric "bleu", "ter", "meteor"
+            daemon: Keep METEOR running in the stdio mode between the
+                evaluations. MultEval itself has no interactive mode, so
+                this is only supported for the METEOR metric.
+            daemon_command: The command that starts the interactive scorer.
+                By default, it is the METEOR jar bundled with MultEval.
+            timeout: How long to wait for the daemon to score a sentence.
         """
         check_argument_types()
         super().__init__("{}_{}_{}".format(name, metric, language))
@@ -33,16 +49,80 @@ class MultEvalWrapper(Evaluator[List[str]]):
         self.encoding = encoding
         self.language = language
         self.metric = metric
+        self.daemon = daemon
+        self.daemon_command = daemon_command
+        self.timeout = timeout
+        self._daemon = None  # type: Optional[ScorerDaemon]
 
         if self.metric not in ["bleu", "ter", "meteor"]:
             warn("{} metric is not valid. Using bleu instead.".
                  format(self.metric))
             self.metric = "bleu"
 
+        if self.daemon and self.metric != "meteor":
+            raise ValueError(
+                "MultEval daemon is only supported for METEOR, not for "
+                "'{}'".format(self.metric))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Drop the daemon, which cannot be pickled.
+
+        Every copy of the evaluator starts its own daemon.
+        """
+        state = self.__dict__.copy()
+        state["_daemon"] = None
+        return state
+
     def score_batch(self,
                     hypotheses: List[List[str]],
                     references: List[List[str]]) -> float:
-
+        if self.daemon:
+            try:
+                return self._score_with_daemon(hypotheses, references)
+            except ScorerDaemonError as exc:
+                warn("METEOR daemon failed ({}), running MultEval as a "
+                     "single process".format(exc))
+
+        return self._score_with_process(hypotheses, references)
+
+    def _score_with_daemon(self,
+                           hypotheses: List[List[str]],
+                           references: List[List[str]]) -> float:
+        if self._daemon is None:
+            command = self.daemon_command
+            if command is None:
+                jar = os.path.join(os.path.dirname(self.wrapper), "lib",
+                                   "meteor-1.4", "meteor-1.4.jar")
+                command = ["java", "-Xmx2G", "-jar", jar, "-", "-",
+                           "-l", self.language, "-stdio"]
+            self._daemon = ScorerDaemon(
+                command, self.name, self.timeout, self.encoding)
+
+        # METEOR returns the sufficient statistics of each sentence, their
+        # sum is scored by another request
+        answers = self._daemon.request(
+            ["SCORE ||| {} ||| {}".format(" ".join(ref), " ".join(hyp))
+             for hyp, ref in zip(hypotheses, references)])
+
+        if not answers:
+            return 0.0
+
+        try:
+            stats = [[float(s) for s in answer.split()] for answer in answers]
+            summed = [sum(column) for column in zip(*stats)]
+            line = " ".join(
+                str(int(s)) if s.is_integer() else str(s) for s in summed)
+            return float(self._daemon.request(
+                ["EVAL ||| {}".format(line)])[0])
+        except ValueError:
+            warn("Error: Malformed output from METEOR daemon:")
+            warn("\n".join(answers))
+            warn("=======")
+            return 0.0
+
+    def _score_with_process(self,
+                            hypotheses: List[List[str]],
+                            references: List[List[str]]) -> float:
         ref_bytes = self.serialize_to_bytes(references)
         hyp_bytes = self.serialize_to_bytes(hypotheses)
 
@@ -0,0 +1,149 @@
+"""Long-lived external scorer processes.
+
+Some external scorers (e.g. BEER or METEOR) run in the Java virtual machine,
+whose start-up often takes longer than the scoring itself. Most of them have
+an interactive mode, in which they read requests from the standard input and
+write the answers to the standard output. The ``ScorerDaemon`` starts such
+a process once and keeps it running between the evaluations.
+
+The requests and the answers are single lines. The daemon sends a request and
+waits for its answer before sending the next one, so the pipe buffers never
+fill up.
+"""
+import atexit
+import os
+import select
+import subprocess
+import threading
+import time
+from typing import List, Optional
+
+from neuralmonkey.logging import log, warn
+
+
+class ScorerDaemonError(Exception):
+    """The scorer process died or did not answer in time."""
+
+
+class ScorerDaemon:
+    """An external scorer process communicating over pipes.
+
+    The process is started on the first request. Before each batch of
+    requests, the daemon checks that the process is still running. When the
+    process dies or does not answer in time, it is restarted and the requests
+    are sent again. The process is terminated when the Python interpreter
+    exits.
+    """
+
+    def __init__(self,
+                 command: List[str],
+                 name: str,
+                 timeout: float = 60.0,
+                 encoding: str = "utf-8") -> None:
+        """Create the daemon, the process is started on the first request.
+
+        Arguments:
+            command: The command that starts the scorer in the interactive
+                mode.
+            name: Name of the scorer used in the log messages.
+            timeout: How long to wait for an answer in seconds.
+            encoding: Encoding of the requests and the answers.
+        """
+        self.command = command
+        self.name = name
+        self.timeout = timeout
+        self.encoding = encoding
+
+        self._process = None  # type: Optional[subprocess.Popen]
+        self._buffer = b""
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def is_alive(self) -> bool:
+        """Check whether the scorer process is running."""
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """Start the scorer process, stopping the previous one if any."""
+        self.close()
+        self._process = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL)
+        self._buffer = b""
+        log("Started {} scorer process {}".format(
+            self.name, self._process.pid))
+
+    def close(self) -> None:
+        """Terminate the scorer process."""
+        if self._process is None:
+            return
+
+        process = self._process
+        self._process = None
+
+        if process.poll() is None:
+            try:
+                process.stdin.close()
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+                process.wait()
+
+    def request(self, lines: List[str]) -> List[str]:
+        """Send the request lines and return the answer to each of them.
+
+        If the process fails, it is restarted and the requests are sent once
+        again.
+
+        Raises:
+            ScorerDaemonError if the restarted process fails as well.
+        """
+        with self._lock:
+            try:
+                if not self.is_alive():
+                    self.start()
+                return self._communicate(lines)
+            except ScorerDaemonError as exc:
+                warn("{} scorer failed ({}), restarting it".format(
+                    self.name, exc))
+
+            self.start()
+            return self._communicate(lines)
+
+    def _communicate(self, lines: List[str]) -> List[str]:
+        assert self._process is not None
+        answers = []
+
+        for line in lines:
+            try:
+                self._process.stdin.write(
+                    (line.replace("\n", " ") + "\n").encode(self.encoding))
+                self._process.stdin.flush()
+            except OSError as exc:
+                raise ScorerDaemonError(
+                    "cannot write to the process: {}".format(exc))
+
+            answers.append(self._read_line())
+
+        return answers
+
+    def _read_line(self) -> str:
+        assert self._process is not None
+        stdout = self._process.stdout.fileno()
+        deadline = time.time() + self.timeout
+
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise ScorerDaemonError(
+                    "no answer in {} seconds".format(self.timeout))
+
+            readable, _, _ = select.select([stdout], [], [], remaining)
+            if readable:
+                chunk = os.read(stdout, 65536)
+                if not chunk:
+                    raise ScorerDaemonError("the process has exited")
+                self._buffer += chunk
+
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode(self.encoding).strip()
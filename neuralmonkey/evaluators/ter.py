@@ -1,18 +1,18 @@
-from typing import List
-import pyter
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
 from neuralmonkey.evaluators.evaluator import Evaluator
+from neuralmonkey.evaluators.levenshtein import Aligner
 
 
 # pylint: disable=too-few-public-methods
 class TEREvaluator(Evaluator[List[str]]):
-    """Compute TER using the pyter library."""
+    """Compute TER, giving the same scores as the pyter library."""
 
     # pylint: disable=no-self-use
     def score_instance(self,
                        hypothesis: List[str],
                        reference: List[str]) -> float:
         if reference and hypothesis:
-            return pyter.ter(hypothesis, reference)
+            return ter(hypothesis, reference)
         if not reference and not hypothesis:
             return 0.0
         return 1.0
@@ -23,4 +23,79 @@ class TEREvaluator(Evaluator[List[str]]):
         return super().compare_scores(score2, score1)
 
 
+def ter(hypothesis: Sequence[Hashable],
+        reference: Sequence[Hashable]) -> float:
+    """Compute the translation error rate of a hypothesis.
+
+    The hypothesis is greedily edited by shifts of phrases which match the
+    reference until no shift decreases the edit distance, exactly as in
+    ``pyter.ter``. The edit distances of the shifted hypotheses are computed
+    by resuming the alignment of the current hypothesis after the prefix the
+    shifted hypothesis shares with it.
+
+    Arguments:
+        hypothesis: The hypothesis tokens.
+        reference: The non-empty list of reference tokens.
+    """
+    words = list(hypothesis)
+    aligner = Aligner(reference)
+    positions = {}  # type: Dict[Hashable, List[int]]
+    for i, word in enumerate(reference):
+        positions.setdefault(word, []).append(i)
+
+    shifts = 0
+    while True:
+        states = aligner.prefix_states(words)
+        distance = states[-1][2]
+
+        # The best shift by the decrease of the distance, the ties are broken
+        # by comparing the shifted hypotheses like pyter does
+        best = None  # type: Optional[Tuple[int, List[Hashable]]]
+        for start, target, length in _shift_candidates(
+                words, reference, positions):
+            shifted = words[:start] + words[start + length:]
+            shifted[target:target] = words[start:start + length]
+
+            # The hypotheses share at least this prefix
+            common = min(start, target)
+            candidate = (distance - aligner.resume(
+                states[common], shifted[common:]), shifted)
+
+            if best is None or candidate > best:
+                best = candidate
+
+        if best is None or best[0] <= 0:
+            break
+
+        shifts += 1
+        words = best[1]
+
+    return (shifts + aligner.distance(words)) / len(reference)
+
+
+def _shift_candidates(
+        words: List[Hashable], reference: Sequence[Hashable],
+        positions: Dict[Hashable, List[int]]) -> Iterator[Tuple[int, int,
+                                                                int]]:
+    """Find the phrases which can be shifted to match the reference.
+
+    Yields triples of the start of the phrase in the hypothesis, its start in
+    the reference and its length. For every pair of positions with equal
+    words, except for equal positions, the phrase is the longest one
+    matching from there on.
+    """
+    for start, word in enumerate(words):
+        for target in positions.get(word, ()):
+            if start == target:
+                continue
+
+            length = 1
+            while (start + length < len(words)
+                   and target + length < len(reference)
+                   and words[start + length] == reference[target + length]):
+                length += 1
+
+            yield start, target, length
+
+
 TER = TEREvaluator("TER")
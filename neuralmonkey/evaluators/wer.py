@@ -1,6 +1,6 @@
 from typing import List
-import pyter
 from neuralmonkey.evaluators.evaluator import Evaluator, check_lengths
+from neuralmonkey.evaluators.levenshtein import levenshtein, levenshtein_batch
 
 
 class WEREvaluator(Evaluator[List[str]]):
@@ -10,22 +10,21 @@ class WEREvaluator(Evaluator[List[str]]):
     def score_instance(self,
                        hypothesis: List[str],
                        reference: List[str]) -> float:
-        if reference and hypothesis:
-            return pyter.edit_distance(hypothesis, reference)
-        if not reference and not hypothesis:
+        # An empty reference does not count the inserted words
+        if not reference:
             return 0.0
-        return len(reference)
+        return levenshtein(hypothesis, reference)
     # pylint: enable=no-self-use
 
     @check_lengths
     def score_batch(self,
                     hypotheses: List[List[str]],
                     references: List[List[str]]) -> float:
-        total_length = 0
-        total_score = 0.0
-        for hyp, ref in zip(hypotheses, references):
-            total_score += self.score_instance(hyp, ref)
-            total_length += len(ref)
+        distances = levenshtein_batch(hypotheses, references)
+        # An empty reference does not count the inserted words
+        distances[[not ref for ref in references]] = 0
+        total_score = float(distances.sum())
+        total_length = sum(len(ref) for ref in references)
         return total_score / total_length
 
     @staticmethod
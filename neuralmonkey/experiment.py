@@ -11,16 +11,18 @@ from typing import Set  # pylint: disable=unused-import
 
 import numpy as np
 import tensorflow as tf
-from tensorflow.contrib.tensorboard.plugins import projector
 
 from neuralmonkey.checking import CheckingException
 from neuralmonkey.dataset import Dataset
-from neuralmonkey.logging import Logging, log, debug, warn
+from neuralmonkey.distributed import get_worker_context
+from neuralmonkey.logging import Logging, log, debug, debug_enabled, warn
 from neuralmonkey.config.configuration import Configuration
 from neuralmonkey.config.normalize import normalize_configuration
 from neuralmonkey.learning_utils import (training_loop, evaluation,
                                          run_on_dataset,
                                          print_final_evaluation)
+from neuralmonkey.quantization import (
+    QuantizedStorage, read_quantized_variables)
 from neuralmonkey.runners.base_runner import ExecutionResult
 from neuralmonkey.runners.dataset_runner import DatasetRunner
 
@@ -30,7 +32,8 @@ _TRAIN_ARGS = [
     "test_datasets", "initial_variables", "validation_period",
     "val_preview_input_series", "val_preview_output_series",
     "val_preview_num_examples", "logging_period", "visualize_embeddings",
-    "random_seed", "overwrite_output_dir"
+    "random_seed", "overwrite_output_dir", "validation_cache_size",
+    "evaluation_workers", "async_logging"
 ]
 
 
@@ -66,6 +69,7 @@ class Experiment:
         self.graph = tf.Graph()
         self._initializers = {}  # type: Dict[str, Callable]
         self._initialized_variables = set()  # type: Set[str]
+        self._quantized_variables = {}  # type: Dict[str, QuantizedStorage]
         self.cont_index = -1
         self._model_built = False
         self._vars_loaded = False
@@ -75,7 +79,14 @@ class Experiment:
         self.config.load_file(config_path, config_changes)
         args = self.config.args
 
-        if self.train_mode:
+        worker_context = get_worker_context()
+        if self.train_mode and worker_context is not None and (
+                not worker_context.is_chief):
+            # Only the chief worker of a training cluster manages the
+            # experiment directory.
+            os.makedirs(args.output, exist_ok=True)
+
+        elif self.train_mode:
             # We may need to create the experiment directory.
             if (os.path.isdir(args.output)
                     and os.path.exists(
@@ -143,10 +154,14 @@ class Experiment:
                 trainers = [self.model.trainer]
 
             for trainer in trainers:
-                debug("Trainer fetches: {}".format(trainer.fetches), "bless")
+                fetches = trainer.fetches
+                if debug_enabled("bless"):
+                    debug("Trainer fetches: {}".format(fetches), "bless")
 
         for runner in self.model.runners:
-            debug("Runner fetches: {}".format(runner.fetches), "bless")
+            fetches = runner.fetches
+            if debug_enabled("bless"):
+                debug("Runner fetches: {}".format(fetches), "bless")
         log("TF Graph built")
 
     def register_inputs(self) -> None:
@@ -198,7 +213,12 @@ class Experiment:
         random.seed(self.config.args.random_seed)
         np.random.seed(self.config.args.random_seed)
 
-        with self.graph.as_default():
+        # In data-parallel training, variables live on the parameter server.
+        worker_context = get_worker_context()
+        device = (worker_context.device_setter()
+                  if worker_context is not None else None)
+
+        with self.graph.as_default(), tf.device(device):
             tf.set_random_seed(self.config.args.random_seed)
 
             # Enable the created model parts to find this experiment.
@@ -243,6 +263,17 @@ class Experiment:
             self.build_model()
 
         self.cont_index += 1
+        Logging.set_async(self.model.async_logging)
+
+        worker_context = get_worker_context()
+        if worker_context is not None and not worker_context.is_chief:
+            Logging.set_log_file(self.get_path(
+                "experiment.worker-{}.log".format(worker_context.task_index)))
+            with self.graph.as_default():
+                training_loop(cfg=self.model)
+            log("Finished.")
+            Logging.flush()
+            return
 
         # Initialize the experiment directory.
         self.config.save_file(self.get_path("experiment.ini"))
@@ -270,6 +301,7 @@ class Experiment:
                                   name="test_{}".format(test_id))
 
             log("Finished.")
+            Logging.flush()
             self._vars_loaded = True
 
     def load_variables(self, variable_files: List[str] = None) -> None:
@@ -283,13 +315,14 @@ class Experiment:
            best scoring checkpoint from the run.
         3. Look for the final checkpoint saved in `variables.data.final`.
 
+        If the model is not built yet and the variable files are quantized
+        (see `neuralmonkey.quantization`), the quantized variables keep their
+        reduced precision in the built model.
+
         Arguments:
             variable_files: A list of variable files to load. The length of
                 this list should match the number of sessions.
         """
-        if not self._model_built:
-            self.build_model()
-
         if variable_files is None:
             if os.path.exists(self.get_path("variables.data.avg-0.index")):
                 variable_files = [self.get_path("variables.data.avg-0")]
@@ -315,6 +348,19 @@ class Experiment:
                     "Index file for var prefix {} does not exist"
                     .format(vfile))
 
+        if not self._model_built:
+            # All sessions share the graph, so the quantized storage can be
+            # used only if it is the same in all the files.
+            storages = [read_quantized_variables(vfile)
+                        for vfile in variable_files]
+            if all(storage == storages[0] for storage in storages):
+                self._quantized_variables = storages[0]
+            if self._quantized_variables:
+                log("Using quantized storage for {} variables".format(
+                    len(self._quantized_variables)))
+
+            self.build_model()
+
         self.model.tf_manager.restore(variable_files)
         self._vars_loaded = True
 
@@ -406,11 +452,20 @@ class Experiment:
         Calling the method marks the given initializer as used.
         """
         initializer = self._initializers.get(var_name, default)
-        if initializer is not default:
+        if initializer is not default and debug_enabled():
             debug("Using {} for variable {}".format(initializer, var_name))
         self._initialized_variables.add(var_name)
         return initializer
 
+    def get_quantized_storage(
+            self, var_name: str) -> Optional[QuantizedStorage]:
+        """Return the quantized storage of the given variable.
+
+        Returns `None` if the variable is not quantized in the checkpoint
+        which is being loaded.
+        """
+        return self._quantized_variables.get(var_name)
+
     def _check_unused_initializers(self) -> None:
         unused_initializers = [name for name in self._initializers
                                if name not in self._initialized_variables]
@@ -425,6 +480,10 @@ class Experiment:
         Visualize the embeddings of `EmbeddedFactorSequence` objects specified
         in the `main.visualize_embeddings` config attribute.
         """
+        # Importing TensorFlow contrib is slow, so it is imported only when
+        # the embeddings are visualized.
+        from tensorflow.contrib.tensorboard.plugins import projector
+
         tb_projector = projector.ProjectorConfig()
 
         for sequence in self.model.visualize_embeddings:
@@ -483,6 +542,11 @@ def create_config(train_mode: bool = True) -> Configuration:
         config.add_argument("initial_variables", required=False, default=None)
         config.add_argument("overwrite_output_dir", required=False,
                             default=False)
+        config.add_argument("validation_cache_size", required=False,
+                            default=512, cond=lambda x: x is None or x >= 0)
+        config.add_argument("evaluation_workers", required=False, default=0,
+                            cond=lambda x: x >= 0)
+        config.add_argument("async_logging", required=False, default=False)
     else:
         config.add_argument("evaluation", required=False, default=None)
         for argument in _TRAIN_ARGS:
@@ -503,6 +567,7 @@ class _DummyExperiment(Experiment):
         # pylint: disable=super-init-not-called
         self._initializers = {}  # type: Dict[str, Callable]
         self._initialized_variables = set()  # type: Set[str]
+        self._quantized_variables = {}  # type: Dict[str, QuantizedStorage]
         self._warned = False
 
     def update_initializers(
@@ -0,0 +1,200 @@
+"""Export a trained model as a frozen inference graph.
+
+The exported model is a directory with the frozen graph (all variables are
+converted to constants and the constant subgraphs are folded) and a signature
+file which describes how to feed the inputs and how to read the outputs of the
+runners. The exported model is loaded by ``neuralmonkey.frozen_model`` without
+building the experiment configuration.
+
+Only the runners which produce token sequences (``GreedyRunner``,
+``PlainRunner`` and ``BeamSearchRunner`` of autoregressive decoders) can be
+exported. The postprocessors of the runners and of the experiment are not part
+of the exported model.
+"""
+# pylint: disable=unused-import, wrong-import-order
+import neuralmonkey.checkpython
+# pylint: enable=unused-import, wrong-import-order
+
+import argparse
+import json
+import os
+from typing import Any, Dict, Set
+
+import tensorflow as tf
+# pylint: disable=no-name-in-module
+from tensorflow.tools.graph_transforms import TransformGraph
+# pylint: enable=no-name-in-module
+
+from neuralmonkey.decoders.autoregressive import AutoregressiveDecoder
+from neuralmonkey.decoders.shortlist import Shortlist
+from neuralmonkey.experiment import Experiment
+from neuralmonkey.frozen_model import GRAPH_FILE, SIGNATURE_FILE
+from neuralmonkey.logging import log, warn
+from neuralmonkey.model.feedable import Feedable
+from neuralmonkey.model.sequence import EmbeddedFactorSequence
+from neuralmonkey.runners.base_runner import BaseRunner
+from neuralmonkey.runners.beamsearch_runner import BeamSearchRunner
+from neuralmonkey.runners.plain_runner import PlainRunner
+from neuralmonkey.runners.runner import GreedyRunner
+
+OUTPUT_SCOPE = "export"
+
+# Feedables whose feed dictionaries can be reproduced from the signature.
+SUPPORTED_FEED_DICTS = [Feedable.feed_dict,
+                        EmbeddedFactorSequence.feed_dict,
+                        AutoregressiveDecoder.feed_dict,
+                        Shortlist.feed_dict]
+
+
+def runner_output(runner: BaseRunner) -> tf.Tensor:
+    """Create the tensor with the output tokens of a runner.
+
+    Arguments:
+        runner: The runner to export.
+
+    Returns:
+        A batch-major string tensor with the output tokens. The sentences end
+        with the end symbol if it was generated.
+    """
+    decoder = runner.decoder
+
+    if isinstance(runner, BeamSearchRunner):
+        # Strip the start symbols.
+        token_ids = decoder.hypotheses[1:, :, runner.rank - 1]
+    elif isinstance(runner, GreedyRunner) and isinstance(
+            decoder, AutoregressiveDecoder):
+        token_ids = tf.argmax(decoder.runtime_logprobs, axis=2)
+    elif isinstance(runner, PlainRunner) and isinstance(
+            decoder, AutoregressiveDecoder):
+        token_ids = decoder.decoded
+    else:
+        raise ValueError(
+            "Exporting runner '{}' of type {} is not supported".format(
+                runner.output_series, type(runner).__name__))
+
+    return tf.transpose(decoder.vocabulary.indices_to_strings(token_ids))
+
+
+def input_signature(feedables: Set[Feedable]) -> Dict[str, Any]:
+    """Describe how to feed the placeholders of the feedables.
+
+    Arguments:
+        feedables: The feedables of the exported runners.
+
+    Returns:
+        A dictionary with the names of the batch size and the train mode
+        placeholders and with the description of the data series.
+    """
+    signature = {"batch_size": [], "train_mode": [], "inputs": {}} \
+        # type: Dict[str, Any]
+
+    optional_series = set()  # type: Set[str]
+    for feedable in feedables:
+        if type(feedable).feed_dict not in SUPPORTED_FEED_DICTS:
+            raise ValueError(
+                "Exporting model part of type {} is not supported".format(
+                    type(feedable).__name__))
+
+        if isinstance(feedable, Shortlist):
+            warn("The vocabulary shortlist is not used by the exported "
+                 "model, the full vocabulary will be used instead")
+
+        signature["batch_size"].append(feedable.batch_size.name)
+        signature["train_mode"].append(feedable.train_mode.name)
+
+        if isinstance(feedable, AutoregressiveDecoder):
+            optional_series.add(feedable.data_id)
+
+        for s_id, dtype in feedable.input_types.items():
+            series = signature["inputs"].setdefault(s_id, {
+                "tensor": feedable.dataset[s_id].name,
+                "dtype": dtype.name})
+
+            if isinstance(feedable, EmbeddedFactorSequence):
+                series.update({
+                    "max_length": feedable.max_length,
+                    "add_start_symbol": feedable.add_start_symbol,
+                    "add_end_symbol": feedable.add_end_symbol})
+
+    # Target series of the decoders are not fed at inference time.
+    for s_id in optional_series:
+        if "max_length" not in signature["inputs"][s_id]:
+            del signature["inputs"][s_id]
+
+    return signature
+
+
+def export_model(exp: Experiment, path: str,
+                 fold_constants: bool = True) -> None:
+    """Export the runners of an experiment as a frozen graph.
+
+    Arguments:
+        exp: The experiment with the built model and loaded variables.
+        path: The directory to save the exported model to.
+        fold_constants: Fold the constant subgraphs of the frozen graph. This
+            converts the quantized variables to the full precision.
+    """
+    if len(exp.model.tf_manager.sessions) != 1:
+        raise ValueError("Only models with a single session can be exported")
+
+    if exp.model.postprocess is not None or any(
+            getattr(runner, "postprocess", None) is not None
+            for runner in exp.model.runners):
+        warn("The postprocessors are not part of the exported model")
+
+    with exp.graph.as_default():
+        outputs = {}  # type: Dict[str, str]
+        with tf.name_scope(OUTPUT_SCOPE):
+            for i, runner in enumerate(exp.model.runners):
+                output = tf.identity(
+                    runner_output(runner), name="output_{}".format(i))
+                outputs[runner.output_series] = output.name
+
+            tables_init = tf.tables_initializer(name="tables_initializer")
+
+        feedables = set.union(
+            *[runner.feedables for runner in exp.model.runners])
+        signature = input_signature(feedables)
+        signature["outputs"] = outputs
+        signature["tables_initializer"] = tables_init.name
+
+        output_nodes = [name.split(":")[0] for name in outputs.values()]
+        output_nodes.append(tables_init.name)
+
+        graph_def = tf.graph_util.convert_variables_to_constants(
+            exp.model.tf_manager.sessions[0], exp.graph.as_graph_def(),
+            output_nodes)
+
+    if fold_constants:
+        input_nodes = [series["tensor"].split(":")[0]
+                       for series in signature["inputs"].values()]
+        graph_def = TransformGraph(graph_def, input_nodes, output_nodes,
+                                   ["fold_constants(ignore_errors=true)"])
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, GRAPH_FILE), "wb") as f_graph:
+        f_graph.write(graph_def.SerializeToString())
+    with open(os.path.join(path, SIGNATURE_FILE), "w") as f_signature:
+        json.dump(signature, f_signature, indent=2, sort_keys=True)
+
+    log("Model with {} nodes exported to {}".format(
+        len(graph_def.node), path))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("config", metavar="INI-FILE",
+                        help="the configuration file of the experiment")
+    parser.add_argument("output", metavar="OUTPUT-DIR",
+                        help="the directory to export the model to")
+    parser.add_argument("--variables", type=str, nargs="+", default=None,
+                        help="the variable files to load, inferred from "
+                        "the experiment directory by default")
+    parser.add_argument("--no-constant-folding", dest="fold_constants",
+                        action="store_false",
+                        help="do not fold the constants in the frozen graph")
+    args = parser.parse_args()
+
+    exp = Experiment(config_path=args.config)
+    exp.load_variables(args.variables)
+    export_model(exp, args.output, args.fold_constants)
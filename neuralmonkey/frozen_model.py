@@ -0,0 +1,152 @@
+"""Load and run a model exported as a frozen inference graph.
+
+The frozen models are created by ``neuralmonkey.export``. Loading a frozen
+model does not need the experiment configuration, so no model parts are
+instantiated and no graph is built. The graph is imported from the file and
+the outputs are fetched in a single session.
+"""
+import json
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.logging import log
+from neuralmonkey.vocabulary import END_TOKEN, pad_batch
+
+GRAPH_FILE = "graph.pb"
+SIGNATURE_FILE = "signature.json"
+
+
+class FrozenModel:
+    """A model exported as a frozen inference graph.
+
+    Attributes:
+        inputs: The names of the input series.
+        outputs: The names of the output series.
+    """
+
+    def __init__(self, path: str, num_threads: int = 4) -> None:
+        """Load the frozen model.
+
+        Arguments:
+            path: The directory with the exported model.
+            num_threads: Number of threads the session runs in.
+        """
+        with open(os.path.join(path, SIGNATURE_FILE)) as f_signature:
+            self._signature = json.load(f_signature)
+
+        graph_def = tf.GraphDef()
+        with open(os.path.join(path, GRAPH_FILE), "rb") as f_graph:
+            graph_def.ParseFromString(f_graph.read())
+
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            tf.import_graph_def(graph_def, name="")
+
+        # The placeholders which are not needed by the outputs were removed
+        # from the graph when it was frozen.
+        node_names = set(node.name for node in graph_def.node)
+        self._batch_size = [name for name in self._signature["batch_size"]
+                            if name.split(":")[0] in node_names]
+        self._train_mode = [name for name in self._signature["train_mode"]
+                            if name.split(":")[0] in node_names]
+
+        session_cfg = tf.ConfigProto()
+        session_cfg.inter_op_parallelism_threads = num_threads
+        session_cfg.intra_op_parallelism_threads = num_threads
+
+        self.session = tf.Session(graph=self.graph, config=session_cfg)
+        self.session.run(self._signature["tables_initializer"])
+
+        log("Frozen model loaded from {}".format(path))
+
+    @property
+    def inputs(self) -> List[str]:
+        return list(self._signature["inputs"])
+
+    @property
+    def outputs(self) -> List[str]:
+        return list(self._signature["outputs"])
+
+    def feed_dict(self, data: Dict[str, List[Any]]) -> Dict[str, Any]:
+        """Create the feed dictionary for a batch of data.
+
+        Arguments:
+            data: A dictionary mapping the input series to the batch of data.
+
+        Returns:
+            A feed dictionary keyed by the tensor names.
+        """
+        missing = [s_id for s_id in self.inputs if s_id not in data]
+        if missing:
+            raise ValueError("Missing input series: {}".format(
+                ", ".join(missing)))
+
+        batch_size = len(data[self.inputs[0]])
+        fd = {}  # type: Dict[str, Any]
+
+        for name in self._batch_size:
+            fd[name] = batch_size
+        for name in self._train_mode:
+            fd[name] = False
+
+        for s_id, series in self._signature["inputs"].items():
+            if len(data[s_id]) != batch_size:
+                raise ValueError("Input series have different lengths")
+
+            if "max_length" in series:
+                fd[series["tensor"]] = pad_batch(
+                    list(data[s_id]), series["max_length"],
+                    series["add_start_symbol"], series["add_end_symbol"])
+            else:
+                fd[series["tensor"]] = np.array(
+                    data[s_id], dtype=series["dtype"])
+
+        return fd
+
+    def run(self, data: Dict[str, List[Any]],
+            batch_size: int = None) -> Dict[str, List[List[str]]]:
+        """Run the model on the given data.
+
+        Arguments:
+            data: A dictionary mapping the input series to lists of the input
+                data, e.g. tokenized sentences.
+            batch_size: The maximum size of a batch. The whole data is
+                processed at once by default.
+
+        Returns:
+            A dictionary mapping the output series to lists of tokenized
+            sentences.
+        """
+        size = len(data[self.inputs[0]]) if self.inputs else 0
+        if batch_size is None:
+            batch_size = max(size, 1)
+
+        results = {s_id: [] for s_id in self.outputs} \
+            # type: Dict[str, List[List[str]]]
+
+        for start in range(0, size, batch_size):
+            batch = {s_id: data[s_id][start:start + batch_size]
+                     for s_id in self.inputs}
+            outputs = self.session.run(self._signature["outputs"],
+                                       self.feed_dict(batch))
+
+            for s_id, tokens in outputs.items():
+                results[s_id].extend(_to_sentences(tokens))
+
+        return results
+
+
+def _to_sentences(tokens: np.ndarray) -> List[List[str]]:
+    sentences = []
+    for row in tokens:
+        sentence = []
+        for token in row:
+            token = token.decode("utf-8")
+            if token == END_TOKEN:
+                break
+            sentence.append(token)
+        sentences.append(sentence)
+    return sentences
@@ -14,7 +14,9 @@ from termcolor import colored
 
 from neuralmonkey.logging import log, log_print, warn
 from neuralmonkey.dataset import Dataset
-from neuralmonkey.tf_manager import TensorFlowManager
+from neuralmonkey.distributed import get_worker_context
+from neuralmonkey.evaluation_pool import EvaluationPool, evaluate_serially
+from neuralmonkey.tf_manager import TensorFlowManager, FeedDictCache
 from neuralmonkey.runners.base_runner import (
     BaseRunner, ExecutionResult, GraphExecutor, OutputSeries)
 from neuralmonkey.runners.dataset_runner import DatasetRunner
@@ -43,16 +45,38 @@ def training_loop(cfg: Namespace) -> None:
     """
     _check_series_collisions(cfg.runners, cfg.postprocess)
     _log_model_variables(cfg.trainers)
-    _initialize_model(cfg.tf_manager, cfg.initial_variables,
-                      cfg.runners + cfg.trainers)
 
-    log("Initializing TensorBoard summary writer.")
-    tb_writer = tf.summary.FileWriter(cfg.output,
-                                      cfg.tf_manager.sessions[0].graph)
-    log("TensorBoard writer initialized.")
+    # In data-parallel training, only the chief worker initializes the model,
+    # logs, validates and saves. The other workers only train on their shards.
+    worker_context = get_worker_context()
+    is_chief = worker_context is None or worker_context.is_chief
+
+    tb_writer = None
+    if is_chief:
+        _initialize_model(cfg.tf_manager, cfg.initial_variables,
+                          cfg.runners + cfg.trainers)
+        if worker_context is not None:
+            worker_context.set_ready(cfg.tf_manager.sessions[0])
+
+        log("Initializing TensorBoard summary writer.")
+        tb_writer = tf.summary.FileWriter(cfg.output,
+                                          cfg.tf_manager.sessions[0].graph)
+        log("TensorBoard writer initialized.")
+    else:
+        worker_context.wait_for_chief(cfg.tf_manager.sessions[0])
 
     feedables = set.union(*[ex.feedables for ex in cfg.runners + cfg.trainers])
 
+    # The validation data are fed the same way in every validation, so their
+    # feed dictionaries can be prepared only once.
+    val_cache = None
+    if cfg.validation_cache_size:
+        val_cache = FeedDictCache(int(cfg.validation_cache_size * 2**20))
+
+    eval_pool = None
+    if is_chief and cfg.evaluation_workers:
+        eval_pool = EvaluationPool(cfg.evaluation, cfg.evaluation_workers)
+
     log("Starting training")
     profiler = TrainingProfiler()
     profiler.training_start()
@@ -64,6 +88,10 @@ def training_loop(cfg: Namespace) -> None:
 
     try:
         for epoch_n in range(1, cfg.epochs + 1):
+            if not is_chief and worker_context.should_stop(
+                    cfg.tf_manager.sessions[0]):
+                break
+
             train_batches = cfg.train_dataset.batches()
 
             if epoch_n == 1 and cfg.train_start_offset:
@@ -78,10 +106,17 @@ def training_loop(cfg: Namespace) -> None:
             profiler.epoch_start()
 
             for batch_n, batch in enumerate(train_batches):
+                if not is_chief and worker_context.should_stop(
+                        cfg.tf_manager.sessions[0]):
+                    break
+
                 step += 1
                 seen_instances += len(batch)
 
-                if cfg.log_timer(step, profiler.last_log_time):
+                if worker_context is not None:
+                    batch = worker_context.shard(batch)
+
+                if is_chief and cfg.log_timer(step, profiler.last_log_time):
                     trainer_result = cfg.tf_manager.execute(
                         batch, feedables, cfg.trainers, train=True,
                         summaries=True)
@@ -107,7 +142,7 @@ def training_loop(cfg: Namespace) -> None:
                         batch, feedables, cfg.trainers, train=True,
                         summaries=False)
 
-                if cfg.val_timer(step, profiler.last_val_time):
+                if is_chief and cfg.val_timer(step, profiler.last_val_time):
 
                     log_print("")
                     profiler.validation_start()
@@ -118,12 +153,15 @@ def training_loop(cfg: Namespace) -> None:
 
                         val_results, val_outputs, f_valset = run_on_dataset(
                             cfg.tf_manager, cfg.runners, cfg.dataset_runner,
-                            valset, cfg.postprocess, write_out=False)
+                            valset, cfg.postprocess, write_out=False,
+                            feed_dict_cache=val_cache)
                         # ensure val outputs are iterable more than once
                         val_outputs = {k: list(v)
                                        for k, v in val_outputs.items()}
+                        val_timings = {}  # type: Dict[str, float]
                         val_evaluation = evaluation(
-                            cfg.evaluation, f_valset, val_results, val_outputs)
+                            cfg.evaluation, f_valset, val_results, val_outputs,
+                            pool=eval_pool, timings=val_timings)
 
                         valheader = ("Validation (epoch {}, batch number {}):"
                                      .format(epoch_n, batch_n))
@@ -135,6 +173,7 @@ def training_loop(cfg: Namespace) -> None:
                             cfg.val_preview_num_examples)
                         log_print("")
                         log(valheader, color="blue")
+                        _log_evaluation_timings(val_timings)
 
                         # The last validation set is selected to be the main
                         if val_id == len(cfg.val_datasets) - 1:
@@ -184,6 +223,11 @@ def training_loop(cfg: Namespace) -> None:
 
     except KeyboardInterrupt as ex:
         interrupt = ex
+    finally:
+        if eval_pool is not None:
+            eval_pool.close()
+        if worker_context is not None and is_chief:
+            worker_context.stop_workers(cfg.tf_manager.sessions[0])
 
     log("Training finished. Maximum {} on validation data: {:.4g}, epoch {}"
         .format(cfg.main_metric, cfg.tf_manager.best_score,
@@ -277,7 +321,8 @@ def run_on_dataset(tf_manager: TensorFlowManager,
                    dataset: Dataset,
                    postprocess: Postprocess,
                    write_out: bool = False,
-                   log_progress: int = 0) -> Tuple[
+                   log_progress: int = 0,
+                   feed_dict_cache: FeedDictCache = None) -> Tuple[
                        List[ExecutionResult],
                        Dict[str, List],
                        Dict[str, List]]:
@@ -297,6 +342,9 @@ def run_on_dataset(tf_manager: TensorFlowManager,
         write_out: Flag whether the outputs should be printed to a file defined
             in the dataset object.
         log_progress: log progress every X seconds
+        feed_dict_cache: Cache of prepared feed dictionaries to use for the
+            dataset. If not provided, the feed dictionaries are created for
+            every batch.
 
         extra_fetches: Extra tensors to evaluate for each batch.
 
@@ -319,8 +367,12 @@ def run_on_dataset(tf_manager: TensorFlowManager,
 
     fetched_input = {s: [] for s in dataset.series}  # type: Dict[str, List]
 
+    batches = (feed_dict_cache.batches(dataset, feedables)
+               if feed_dict_cache is not None
+               else ((batch, None) for batch in dataset.batches()))
+
     processed_examples = 0
-    for batch in dataset.batches():
+    for batch, feed_dict in batches:
         if 0 < log_progress < time.process_time() - last_log_time:
             log("Processed {} examples.".format(processed_examples))
             last_log_time = time.process_time()
@@ -330,7 +382,8 @@ def run_on_dataset(tf_manager: TensorFlowManager,
         executors.append(dataset_runner)
 
         execution_results = tf_manager.execute(
-            batch, feedables, executors, compute_losses=contains_targets)
+            batch, feedables, executors, compute_losses=contains_targets,
+            feed_dict=feed_dict)
 
         processed_examples += len(batch)
 
@@ -433,7 +486,9 @@ def join_execution_results(
     return ExecutionResult(outputs, losses, total_size, all_summaries)
 
 
-def evaluation(evaluators, batch, execution_results, result_data):
+def evaluation(evaluators, batch, execution_results, result_data,
+               pool: EvaluationPool = None,
+               timings: Dict[str, float] = None):
     """Evaluate the model outputs.
 
     Args:
@@ -441,6 +496,11 @@ def evaluation(evaluators, batch, execution_results, result_data):
         batch: Batch of data against which the evaluation is done.
         execution_results: Execution results that include the loss values.
         result_data: Dictionary from series names to list of outputs.
+        pool: Evaluation pool which runs the evaluators concurrently. It must
+            be created with the same evaluators. If not given, the evaluators
+            are run one after another.
+        timings: If given, the times of the evaluators in seconds are stored
+            in this dictionary under the metric names.
 
     Returns:
         Dictionary of evaluation names and their values which includes the
@@ -457,18 +517,26 @@ def evaluation(evaluators, batch, execution_results, result_data):
         eval_result.update(result.losses)
 
     # evaluation metrics
-    for hypothesis_id, reference_id, function in evaluators:
-        if reference_id not in batch or hypothesis_id not in result_data:
-            continue
+    if pool is not None:
+        scores, eval_timings = pool.evaluate(batch, result_data)
+    else:
+        scores, eval_timings = evaluate_serially(
+            evaluators, batch, result_data)
 
-        desired_output = batch[reference_id]
-        model_output = result_data[hypothesis_id]
-        eval_result["{}/{}".format(hypothesis_id, function.name)] = function(
-            model_output, desired_output)
+    eval_result.update(scores)
+    if timings is not None:
+        timings.update(eval_timings)
 
     return eval_result
 
 
+def _log_evaluation_timings(timings: Dict[str, float]) -> None:
+    if timings:
+        log("Evaluation times: {}".format(", ".join(
+            "{} {:.2f} s".format(name, seconds)
+            for name, seconds in timings.items())))
+
+
 def _log_continuous_evaluation(tb_writer: tf.summary.FileWriter,
                                main_metric: str,
                                eval_result: Evaluation,
@@ -1,5 +1,9 @@
 selectedExperiment = null;
 fileToLoad = null;
+// Byte offset of the log to continue from, null if nothing is loaded
+logOffset = null;
+// Identity of the loaded log file, changes when the file is replaced
+logId = null;
 
 function loadExperiments() {
     $.get("/experiments", function(data) {
@@ -36,14 +40,44 @@ function selectTopButton(button, fileName) {
 }
 
 function loadContent() {
+    logOffset = null;
+    logId = null;
     if ((selectedExperiment != null) && (fileToLoad != null)) {
-        $.get("/experiments/"+selectedExperiment+"/"+fileToLoad,
-              function(data) {
-                  $("#content").html(data);
-              });
+        var url = "/experiments/"+selectedExperiment+"/"+fileToLoad;
+        $.get(url, function(data, status, xhr) {
+            $("#content").html(data);
+            if (xhr.getResponseHeader("X-Log-End") != null) {
+                logOffset = xhr.getResponseHeader("X-Log-End");
+                logId = xhr.getResponseHeader("X-Log-Id");
+            }
+        });
     }
 }
 
+// Append the lines written to the log since the last request
+function tailContent() {
+    if (logOffset == null) {
+        return;
+    }
+    var url = "/experiments/"+selectedExperiment+"/"+fileToLoad;
+    var requested = {experiment: selectedExperiment, file: fileToLoad};
+    $.get(url, {offset: logOffset, id: logId}, function(data, status, xhr) {
+        if (requested.experiment != selectedExperiment
+                || requested.file != fileToLoad) {
+            return;
+        }
+        if (xhr.getResponseHeader("X-Log-Start") == "0") {
+            // The log was replaced
+            $("#content").html(data);
+        }
+        else {
+            $("#content").append(data);
+        }
+        logOffset = xhr.getResponseHeader("X-Log-End");
+        logId = xhr.getResponseHeader("X-Log-Id");
+    });
+}
+
 function zoom(out) {
     var fontSize = parseInt($("#contentBox").css("font-size"));
     if (out) {
@@ -61,6 +95,10 @@ $(document).ready(function() {
     $("#showConfiguration").click(function() {selectTopButton($(this), "experiment.ini")});
     $("#showLog").click(function() {selectTopButton($(this), "experiment.log")});
     selectTopButton($("#showLog"), "experiment.log");
+    $("#refresh").click(function() {
+        if (logOffset != null) { tailContent(); } else { loadContent(); }
+    });
+    setInterval(tailContent, 5000);
     $("#zoomIn").click(function() {zoom(false);});
     $("#zoomOut").click(function() {zoom(true);});
     $("#toggleLeftMenu").click(function() { $("#experiments").toggle("slow") });
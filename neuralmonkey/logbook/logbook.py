@@ -3,10 +3,13 @@ import neuralmonkey.checkpython
 # pylint: enable=unused-import, wrong-import-order
 
 import argparse
+from collections import OrderedDict
 import os
 import html
 import json
-from flask import Flask, Response
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from flask import Flask, Response, request
 from pygments import highlight
 from pygments.lexers.configs import IniLexer
 from pygments.formatters import HtmlFormatter
@@ -17,6 +20,229 @@ APP = Flask(__name__)
 APP.config.from_object(__name__)
 APP.config['logdir'] = None
 
+# pylint: disable=invalid-name
+# The start and end offsets of a part of a log file and its rendered HTML
+Chunk = Tuple[int, int, str]
+# A rendered part of a log file. The identity distinguishes the files which
+# were at the path; the clients send it back with the next offset.
+LogPart = NamedTuple("LogPart", [("start", int), ("end", int),
+                                 ("identity", str), ("content", str)])
+# pylint: enable=invalid-name
+
+# Size of the blocks of the log files rendered and cached at once
+CHUNK_SIZE = 1 << 20
+
+
+def render_log(content: bytes) -> str:
+    return ansiconv.to_html(html.escape(
+        content.decode("utf-8", errors="replace")))
+
+
+class LogCache:
+    """Renders the log files incrementally and caches the rendered HTML.
+
+    The logs are only appended to while the experiments run, so the files are
+    split to chunks of about ``CHUNK_SIZE`` bytes ending with a line break.
+    A chunk is rendered once when it is completely written and kept until
+    the file is replaced or truncated; the chunks are kept for at most
+    ``max_files`` recently requested files. The rest of the file (up to the
+    last line break) is rendered on request; these renderings are kept in a
+    small cache keyed by the file, the offset and the modification time, so
+    the clients polling an unchanged file get the cached HTML.
+
+    The total length of the cached HTML is limited by ``max_bytes``; above
+    it, the renderings of the least recently requested files are dropped
+    and rendered again when the files are requested.
+    """
+
+    def __init__(self, max_tails: int = 64, max_files: int = 16,
+                 max_bytes: int = 1 << 28) -> None:
+        self.max_tails = max_tails
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # The identity of each file and its complete chunks
+        self._chunks = OrderedDict()  # type: OrderedDict
+        # The end offsets and the HTML by the file, offset and mtime
+        self._tails = OrderedDict()  # type: OrderedDict
+        # The total length of the cached HTML
+        self.size = 0
+
+    def get(self, path: str, offset: int = 0,
+            identity: str = None) -> LogPart:
+        """Render the log from the given byte offset.
+
+        Arguments:
+            path: Path to the log file.
+            offset: The offset returned by the previous request, zero to
+                render the whole file.
+            identity: The identity returned by the previous request. If the
+                file at the path is a different one, the offset is ignored.
+
+        Returns:
+            The offset the rendered content starts at, the offset the next
+            request should continue from, the identity of the file, and the
+            rendered HTML. The content starts at zero, which tells the client
+            to discard the content it has, when the file was replaced or
+            became shorter than the offset.
+        """
+        with self._lock:
+            stat = os.stat(path)
+            current_identity = _file_identity(stat)
+            if (offset < 0 or offset > stat.st_size
+                    or (identity is not None
+                        and identity != current_identity)):
+                offset = 0
+
+            with open(path, "rb") as f_log:
+                chunks = self._update_chunks(path, f_log, stat)
+
+                pieces = []
+                for start, end, rendered in chunks:
+                    if end <= offset:
+                        continue
+                    if start >= offset:
+                        pieces.append(rendered)
+                    else:
+                        f_log.seek(offset)
+                        pieces.append(render_log(f_log.read(end - offset)))
+
+                tail_start = max(offset, chunks[-1][1] if chunks else 0)
+                tail_end, rendered = self._get_tail(
+                    path, f_log, tail_start, stat.st_mtime_ns)
+                pieces.append(rendered)
+
+            self._evict()
+
+        return LogPart(offset, tail_end, current_identity, "".join(pieces))
+
+    def _update_chunks(self, path: str, f_log,
+                       stat: os.stat_result) -> List[Chunk]:
+        identity = _file_identity(stat)
+        cached_identity, chunks = self._chunks.pop(path, (identity, []))
+        self.size -= _chunks_size(chunks)
+
+        if (cached_identity != identity
+                or (chunks and chunks[-1][1] > stat.st_size)):
+            chunks = []
+
+        start = chunks[-1][1] if chunks else 0
+        while stat.st_size - start >= CHUNK_SIZE:
+            f_log.seek(start)
+            content = f_log.read(CHUNK_SIZE)
+            line_end = content.rfind(b"\n")
+            if line_end >= 0:
+                content = content[:line_end + 1]
+            else:
+                content += f_log.readline()
+                if not content.endswith(b"\n"):
+                    break
+
+            chunks.append((start, start + len(content), render_log(content)))
+            start += len(content)
+
+        self._chunks[path] = (identity, chunks)
+        self.size += _chunks_size(chunks)
+        if len(self._chunks) > self.max_files:
+            self._pop_file()
+        return chunks
+
+    def _get_tail(self, path: str, f_log, start: int,
+                  mtime: int) -> Tuple[int, str]:
+        key = (path, start, mtime)
+        if key in self._tails:
+            self._tails.move_to_end(key)
+            return self._tails[key]
+
+        f_log.seek(start)
+        content = f_log.read()
+        # The last line may not be completely written yet
+        content = content[:content.rfind(b"\n") + 1]
+
+        tail = (start + len(content), render_log(content))
+        self._tails[key] = tail
+        self.size += len(tail[1])
+        if len(self._tails) > self.max_tails:
+            self._pop_tail()
+        return tail
+
+    def _evict(self) -> None:
+        """Drop the least recently used renderings above ``max_bytes``."""
+        while self.size > self.max_bytes and self._tails:
+            self._pop_tail()
+        while self.size > self.max_bytes and self._chunks:
+            self._pop_file()
+
+    def _pop_file(self) -> None:
+        _, (_, chunks) = self._chunks.popitem(last=False)
+        self.size -= _chunks_size(chunks)
+
+    def _pop_tail(self) -> None:
+        _, (_, rendered) = self._tails.popitem(last=False)
+        self.size -= len(rendered)
+
+
+def _chunks_size(chunks: List[Chunk]) -> int:
+    return sum(len(rendered) for _, _, rendered in chunks)
+
+
+def _file_identity(stat: os.stat_result) -> str:
+    return "{}-{}".format(stat.st_dev, stat.st_ino)
+
+
+class ExperimentIndex:
+    """List of the experiments in the log directory.
+
+    The directory is only scanned again when its modification time changes,
+    i.e. when an experiment directory is added or removed. The subdirectories
+    without the experiment configuration are watched as well, because the
+    configuration is written after the directory is created.
+    """
+
+    def __init__(self, logdir: str) -> None:
+        self.logdir = logdir
+        self._lock = threading.Lock()
+        self._experiments = []  # type: List[str]
+        self._mtime = None  # type: Optional[int]
+        self._pending = {}  # type: Dict[str, int]
+
+    def get(self) -> List[str]:
+        with self._lock:
+            if self._is_outdated():
+                self._scan()
+            return list(self._experiments)
+
+    def _is_outdated(self) -> bool:
+        if os.stat(self.logdir).st_mtime_ns != self._mtime:
+            return True
+
+        for path, mtime in self._pending.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _scan(self) -> None:
+        self._mtime = os.stat(self.logdir).st_mtime_ns
+        self._experiments = []
+        self._pending = {}
+
+        for entry in os.scandir(self.logdir):
+            if not entry.is_dir():
+                continue
+            if os.path.isfile(os.path.join(entry.path, 'experiment.ini')):
+                self._experiments.append(entry.name)
+            else:
+                self._pending[entry.path] = entry.stat().st_mtime_ns
+
+        if os.path.isfile(os.path.join(self.logdir, 'experiment.ini')):
+            self._experiments.append(".")
+
+
+LOG_CACHE = LogCache()
+
 
 def root_dir():  # pragma: no cover
     return os.path.abspath(os.path.dirname(__file__))
@@ -35,14 +261,11 @@ def index():
 
 @APP.route('/experiments', methods=['GET'])
 def list_experiments():
-    logdir = APP.config['logdir']
-    experiment_list = [dr for dr in os.listdir(logdir)
-                       if os.path.isdir(os.path.join(logdir, dr))
-                       and os.path.isfile(os.path.join(
-                           logdir, dr, 'experiment.ini'))]
-
-    if os.path.isfile(os.path.join(logdir, 'experiment.ini')):
-        experiment_list.append(".")
+    index = APP.config.get('experiment_index')
+    if index is None or index.logdir != APP.config['logdir']:
+        index = ExperimentIndex(APP.config['logdir'])
+        APP.config['experiment_index'] = index
+    experiment_list = index.get()
 
     json_response = json.dumps({'experiments': experiment_list})
 
@@ -55,13 +278,27 @@ def list_experiments():
 
 @APP.route('/experiments/<path:path>', methods=['GET'])
 def get_experiment(path):
+    """Get the rendered experiment file.
+
+    The logs can be requested from the byte offset given by the ``offset``
+    query parameter. The response headers ``X-Log-Start`` and ``X-Log-End``
+    contain the offset of the returned content and the offset to continue
+    from, ``X-Log-Id`` the identity of the file to send in the ``id``
+    parameter with the offset. When the file was replaced, the content
+    starts at zero.
+    """
     logdir = APP.config['logdir']
     complete_path = os.path.join(logdir, path)
+    headers = {}
     if os.path.isfile(complete_path):
-        file_content = get_file(complete_path)
         if path.endswith(".log"):
-            result = ansiconv.to_html(html.escape(file_content))
+            start, end, identity, result = LOG_CACHE.get(
+                complete_path, request.args.get('offset', 0, type=int),
+                request.args.get('id'))
+            headers = {'X-Log-Start': str(start), 'X-Log-End': str(end),
+                       'X-Log-Id': identity}
         elif path.endswith(".ini"):
+            file_content = get_file(complete_path)
             lexer = IniLexer()
             formatter = HtmlFormatter(linenos=True)
             result = highlight(file_content, lexer, formatter)
@@ -69,7 +306,8 @@ def get_experiment(path):
             result = "Unknown file type: '{}'.".format(complete_path)
     else:
         result = "File '{}' does not exist.".format(complete_path)
-    return Response(result, mimetype='text/html', status=200)
+    return Response(result, mimetype='text/html', status=200,
+                    headers=headers)
 
 
 @APP.route("/ansiconv.css")
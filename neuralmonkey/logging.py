@@ -1,17 +1,103 @@
+import atexit
+import queue
+import threading
 import time
 import sys
 import os
 
 # pylint: disable=unused-import
-from typing import Any, List
+from typing import Any, List, Optional
 # pylint: enable=unused-import
 
 from termcolor import colored
 
 
+class AsyncWriter:
+    """Writes the log lines to the console and the log file in a thread.
+
+    The lines are put to a bounded queue, so the logging thread does not wait
+    for the (possibly slow) file system unless the queue is full. The writer
+    thread takes all lines waiting in the queue and writes and flushes them
+    at once. The queue is emptied when the Python interpreter exits.
+    """
+
+    def __init__(self, max_lines: int = 10000) -> None:
+        """Start the writer thread.
+
+        Arguments:
+            max_lines: Maximum number of lines waiting to be written. When
+                the queue is full, logging blocks until there is space.
+        """
+        self._queue = queue.Queue(maxsize=max_lines)  # type: queue.Queue
+        self._error = None  # type: Optional[Exception]
+        self._thread = threading.Thread(
+            target=self._run, name="LoggingWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, log_file: Any, text: str) -> None:
+        """Queue a line to be written to the console and the log file."""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        if not self._thread.is_alive():
+            _write_lines([(log_file, text)])
+            return
+        self._queue.put((log_file, text))
+
+    def flush(self) -> None:
+        """Wait until all queued lines are written."""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write the queued lines and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self._queue.maxsize:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in items
+            try:
+                _write_lines([item for item in items if item is not None])
+            except Exception as exc:  # pylint: disable=broad-except
+                self._error = exc
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+            if stop:
+                return
+
+
+def _write_lines(items: List) -> None:
+    """Write pairs of a log file and a line, flushing each file once."""
+    log_files = []  # type: List[Any]
+    for log_file, text in items:
+        if log_file is not None and not log_file.closed:
+            log_file.write(text + "\n")
+            if log_file not in log_files:
+                log_files.append(log_file)
+    for log_file in log_files:
+        log_file.flush()
+
+    sys.stderr.write("".join(text + "\n" for _, text in items))
+    sys.stderr.flush()
+
+
 class Logging:
 
     log_file = None  # type: Any
+    # The writer thread of the asynchronous logging, None when synchronous
+    async_writer = None  # type: Optional[AsyncWriter]
 
     # 'all' and 'none' are special symbols,
     # others are filtered according the labels
@@ -28,16 +114,54 @@ class Logging:
     @staticmethod
     def set_log_file(path: str) -> None:
         """Set up the file where the logging will be done."""
+        if Logging.async_writer is not None:
+            Logging.async_writer.flush()
         if Logging.log_file is not None and not Logging.log_file.closed:
             Logging.log_file.close()
-        Logging.log_file = open(path, "w", encoding="utf-8", buffering=1)
+        buffering = -1 if Logging.async_writer is not None else 1
+        Logging.log_file = open(path, "w", encoding="utf-8",
+                                buffering=buffering)
+
+    @staticmethod
+    def set_async(enabled: bool, max_lines: int = 10000) -> None:
+        """Switch between the synchronous and the asynchronous logging.
+
+        In the asynchronous mode, the lines are written by a background
+        thread (see ``AsyncWriter``), so the logging does not block on slow
+        (e.g. network) file systems.
+
+        Arguments:
+            enabled: Whether to log asynchronously.
+            max_lines: Maximum number of lines waiting to be written.
+        """
+        if enabled == (Logging.async_writer is not None):
+            return
+
+        if enabled:
+            Logging.async_writer = AsyncWriter(max_lines)
+        else:
+            writer = Logging.async_writer
+            Logging.async_writer = None
+            assert writer is not None
+            writer.close()
+
+    @staticmethod
+    def flush() -> None:
+        """Wait until all logged lines are written."""
+        if Logging.async_writer is not None:
+            Logging.async_writer.flush()
 
     @staticmethod
     def log_print(text: str) -> None:
         """Print a string both to console and a log file is it is defined."""
+        if not isinstance(text, str):
+            text = str(text)
+
+        if Logging.async_writer is not None:
+            Logging.async_writer.write(Logging.log_file, text)
+            return
+
         if Logging.log_file is not None:
-            if not isinstance(text, str):
-                text = str(text)
             Logging.log_file.write(text + "\n")
             Logging.log_file.flush()
 
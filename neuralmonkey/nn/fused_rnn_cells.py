@@ -0,0 +1,76 @@
+"""Recurrent cells which compute each step in a single fused kernel.
+
+The cells use the block kernels from ``tf.contrib.rnn``, which compute the
+whole update of the cell state in a single op instead of many small ones.
+This is considerably faster on CPU. The variables of the cells are named and
+laid out the same way as the variables of the cells they replace, so the
+models trained with the generic cells can be loaded with the fused ones and
+vice versa.
+
+Note that importing ``tf.contrib`` is slow, so this module is imported only
+when the fused cells are used.
+"""
+from typing import Tuple
+
+import tensorflow as tf
+from tensorflow.contrib.rnn import (
+    GRUBlockCellV2, LSTMBlockCell, LSTMBlockFusedCell)
+
+
+# pylint: disable=too-few-public-methods
+class FusedOrthoGRUCell(GRUBlockCellV2):
+    """A fused replacement of ``OrthoGRUCell``.
+
+    The ``gates`` and ``candidate`` kernels are initialized with random
+    orthogonal matrices and the variables are created in the same scope as
+    the variables of ``OrthoGRUCell``.
+    """
+
+    def __call__(self, inputs, state, scope="OrthoGRUCell"):
+        with tf.variable_scope(
+                scope, initializer=tf.orthogonal_initializer()) as cell_scope:
+            return GRUBlockCellV2.__call__(self, inputs, state, cell_scope)
+# pylint: enable=too-few-public-methods
+
+
+# The block LSTM cell uses the same gate order and variable names as
+# ``tf.nn.rnn_cell.LSTMCell``.
+FusedLSTMCell = LSTMBlockCell
+
+
+def fused_lstm(inputs: tf.Tensor,
+               lengths: tf.Tensor,
+               size: int,
+               reverse: bool = False) -> Tuple[tf.Tensor, tf.Tensor]:
+    """Run a LSTM over the whole sequence in a single fused op.
+
+    The variables are the same as the variables of a ``LSTMCell`` run by
+    ``tf.nn.dynamic_rnn`` in the current variable scope. As with the dynamic
+    RNN, the outputs beyond the sequence lengths are zeros and the final state
+    is taken from the last valid time step.
+
+    Arguments:
+        inputs: The batch-major input sequences.
+        lengths: The lengths of the input sequences.
+        size: The state size.
+        reverse: Process the sequences from their ends.
+
+    Returns:
+        A tuple of the batch-major outputs and the final output state.
+    """
+    # The fused cell is time-major
+    time_major = tf.transpose(inputs, [1, 0, 2])
+    if reverse:
+        time_major = tf.reverse_sequence(time_major, lengths, seq_axis=0,
+                                         batch_axis=1)
+
+    # Name the cell the same way as the LSTMCell
+    cell = LSTMBlockFusedCell(size, name="lstm_cell")
+    outputs, final_state = cell(time_major, dtype=tf.float32,
+                                sequence_length=lengths)
+
+    if reverse:
+        outputs = tf.reverse_sequence(outputs, lengths, seq_axis=0,
+                                      batch_axis=1)
+
+    return tf.transpose(outputs, [1, 0, 2]), final_state.h
@@ -4,7 +4,7 @@ from typing import Tuple
 import tensorflow as tf
 
 
-class NoisyGRUCell(tf.contrib.rnn.RNNCell):
+class NoisyGRUCell(tf.nn.rnn_cell.RNNCell):
     """Gated Recurrent Unit cell (cf. http://arxiv.org/abs/1406.1078).
 
     GRU with noisy activation functions (http://arxiv.org/abs/1603.00391).
@@ -41,20 +41,20 @@ def orthogonal_initializer():
 
 
 # pylint: disable=too-few-public-methods
-class OrthoGRUCell(tf.contrib.rnn.GRUCell):
+class OrthoGRUCell(tf.nn.rnn_cell.GRUCell):
     """Classic GRU cell but initialized using random orthogonal matrices."""
 
     def __init__(self, num_units, activation=None, reuse=None):
-        tf.contrib.rnn.GRUCell.__init__(
+        tf.nn.rnn_cell.GRUCell.__init__(
             self, num_units, activation, reuse,
             kernel_initializer=tf.orthogonal_initializer())
 
     def __call__(self, inputs, state, scope="OrthoGRUCell"):
-        return tf.contrib.rnn.GRUCell.__call__(self, inputs, state, scope)
+        return tf.nn.rnn_cell.GRUCell.__call__(self, inputs, state, scope)
 
 
 # Note that tensorflow does not like when the type annotations are present.
-class NematusGRUCell(tf.contrib.rnn.GRUCell):
+class NematusGRUCell(tf.nn.rnn_cell.GRUCell):
     """Nematus implementation of gated recurrent unit cell.
 
     The main difference is the order in which the gating functions and linear
@@ -68,7 +68,7 @@ class NematusGRUCell(tf.contrib.rnn.GRUCell):
         self.use_state_bias = use_state_bias
         self.use_input_bias = use_input_bias
 
-        tf.contrib.rnn.GRUCell.__init__(self, rnn_size)
+        tf.nn.rnn_cell.GRUCell.__init__(self, rnn_size)
 
     def call(self, inputs, state):
         """Gated recurrent unit (GRU) with nunits cells."""
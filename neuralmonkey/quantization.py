@@ -0,0 +1,146 @@
+"""Post-training quantization of model variables.
+
+Large variables of a trained model (embedding matrices, output projections)
+can be stored in a checkpoint with a reduced precision, either as 16-bit
+floats or as 8-bit integers with a floating-point scale for each slice of the
+variable. Such checkpoints are created by ``scripts/quantize_checkpoint.py``.
+
+A quantized checkpoint is an ordinary TensorFlow checkpoint in which the
+quantized variables have a different data type. For int8 quantization, the
+scale is stored in a separate variable whose name is the name of the
+quantized variable with the ``SCALE_SUFFIX`` appended. The scale has the
+shape which broadcasts to the shape of the variable.
+
+When an experiment loads a quantized checkpoint before building its model,
+the variables created by ``tf_utils.get_variable`` keep the reduced precision
+in the graph and they are dequantized by the graph itself (see
+``dequantized_variable``). Quantized variables of an already built model are
+dequantized when the checkpoint is restored (see ``load_dequantized``).
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+SCALE_SUFFIX = "/quantization_scale"
+QUANTIZED_DTYPES = [tf.int8, tf.float16]
+
+# The variables quantized by default: the embedding matrices of the
+# EmbeddedSequence and of the autoregressive decoders, and the output
+# projection matrix of the decoders.
+DEFAULT_PATTERNS = [r".*/embedding_matrix_\d+$",
+                    r".*/word_embeddings$",
+                    r".*/state_to_word_W$"]
+
+QuantizedStorage = NamedTuple(
+    "QuantizedStorage",
+    [("dtype", tf.DType),
+     ("shape", List[int]),
+     ("scale_shape", Optional[List[int]])])
+
+
+def quantize_int8(value: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantize an array to 8-bit integers.
+
+    The array is split to slices along its largest dimension (for the
+    embedding and output projection matrices, this is the vocabulary
+    dimension) and each slice is scaled symmetrically to the range from -127
+    to 127.
+
+    Arguments:
+        value: The array to quantize, at least two-dimensional.
+
+    Returns:
+        A tuple of the quantized array and the float32 scale such that the
+        product of the two approximates the original array.
+    """
+    if value.ndim < 2:
+        raise ValueError("Only arrays with at least two dimensions can be "
+                         "quantized to int8")
+
+    axis = int(np.argmax(value.shape))
+    reduced_axes = tuple(i for i in range(value.ndim) if i != axis)
+
+    scale = np.max(np.abs(value), axis=reduced_axes, keepdims=True) / 127.
+    scale[scale == 0] = 1.
+
+    quantized = np.round(value / scale).astype(np.int8)
+    return quantized, scale.astype(np.float32)
+
+
+def dequantize(value: np.ndarray, scale: np.ndarray = None) -> np.ndarray:
+    """Convert a quantized array back to float32."""
+    value = value.astype(np.float32)
+    if scale is not None:
+        value *= scale
+    return value
+
+
+def read_quantized_variables(
+        checkpoint: str) -> Dict[str, QuantizedStorage]:
+    """Get the storage of the quantized variables in a checkpoint.
+
+    Arguments:
+        checkpoint: The path to the checkpoint.
+
+    Returns:
+        A dictionary mapping the names of the quantized variables to their
+        storage description. The dictionary is empty when the checkpoint is
+        not quantized.
+    """
+    reader = tf.train.NewCheckpointReader(checkpoint)
+    dtypes = reader.get_variable_to_dtype_map()
+    shapes = reader.get_variable_to_shape_map()
+
+    storage = {}
+    for name, dtype in dtypes.items():
+        if dtype in QUANTIZED_DTYPES:
+            scale_shape = shapes.get(name + SCALE_SUFFIX)
+            storage[name] = QuantizedStorage(
+                dtype, shapes[name], scale_shape)
+
+    return storage
+
+
+def load_dequantized(reader: tf.train.NewCheckpointReader,
+                     name: str) -> np.ndarray:
+    """Read a variable from a quantized checkpoint as a float32 array."""
+    scale = None
+    if reader.has_tensor(name + SCALE_SUFFIX):
+        scale = reader.get_tensor(name + SCALE_SUFFIX)
+    return dequantize(reader.get_tensor(name), scale)
+
+
+def dequantized_variable(name: str,
+                         storage: QuantizedStorage) -> tf.Tensor:
+    """Create a quantized variable and dequantize it in the graph.
+
+    The variable (and its scale) is not trainable. The dequantization is
+    placed outside of any control flow context, so it is computed at most
+    once per session run even if the variable is first used in the body of
+    a decoding loop.
+
+    Arguments:
+        name: The name of the variable in the current variable scope.
+        storage: The description of the quantized storage of the variable.
+
+    Returns:
+        A float32 tensor with the dequantized value of the variable.
+    """
+    stored = tf.get_variable(
+        name=name, shape=storage.shape, dtype=storage.dtype, trainable=False,
+        initializer=tf.zeros_initializer())
+
+    scale = None
+    if storage.scale_shape is not None:
+        scale = tf.get_variable(
+            name=name + SCALE_SUFFIX, shape=storage.scale_shape,
+            dtype=tf.float32, trainable=False,
+            initializer=tf.ones_initializer())
+
+    with tf.control_dependencies(None):
+        value = tf.to_float(stored)
+        if scale is not None:
+            value *= scale
+
+    return value
@@ -29,14 +29,7 @@ def audio_reader(prefix: str = "",
         The reader function that takes a list of audio file paths (relative to
         provided prefix) and returns a list of numpy arrays.
     """
-
-    if audio_format == "wav":
-        load_file = _load_wav
-    elif audio_format == "sph":
-        load_file = _load_sph
-    else:
-        raise ValueError(
-            "Unsupported audio format: {}".format(audio_format))
+    load_file = get_audio_loader(audio_format)
 
     def load(list_files: List[str]) -> Iterable[Audio]:
         for list_file in list_files:
@@ -48,6 +41,20 @@ def audio_reader(prefix: str = "",
     return load
 
 
+def get_audio_loader(audio_format: str) -> Callable[[str], Audio]:
+    """Get a function loading audio files of the given format.
+
+    Args:
+        audio_format: The format of the files, "wav" or "sph".
+    """
+    if audio_format == "wav":
+        return _load_wav
+    if audio_format == "sph":
+        return _load_sph
+
+    raise ValueError("Unsupported audio format: {}".format(audio_format))
+
+
 def _load_wav(path: str) -> Audio:
     """Read a WAV file."""
     return Audio(*wavfile.read(path))
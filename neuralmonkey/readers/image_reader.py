@@ -1,11 +1,16 @@
-from typing import Callable, Iterable, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Tuple
+import hashlib
+import json
 import os
+import tempfile
 
 import numpy as np
 from typeguard import check_argument_types
 from PIL import Image, ImageFile
 
-from neuralmonkey.logging import warn
+from neuralmonkey.logging import log, warn
 
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
@@ -18,7 +23,9 @@ def image_reader(pad_w: int,
                  rescale_w: bool = False,
                  rescale_h: bool = False,
                  keep_aspect_ratio: bool = False,
-                 mode: str = "RGB") -> Callable:
+                 mode: str = "RGB",
+                 num_threads: int = 1,
+                 cache_dir: str = None) -> Callable:
     """Get a reader of images loading them from a list of pahts.
 
     Args:
@@ -34,6 +41,10 @@ def image_reader(pad_w: int,
             rescaling. Can only be used if both width and height are rescaled.
         mode: Scipy image loading mode, see scipy documentation for more
             details.
+        num_threads: Number of threads decoding the images in parallel. The
+            images are returned in the original order.
+        cache_dir: Directory where the processed images are cached (see
+            ``load_image_files``).
 
     Returns:
         The reader function that takes a list of image paths (relative to
@@ -50,47 +61,54 @@ def image_reader(pad_w: int,
             "While rescaling only one side, aspect ratio must be kept, "
             "was set to false.")
 
+    # The images are cached in the data type PIL uses for the mode
+    dtype = np.array(Image.new(mode, (1, 1))).dtype
+
+    def process(path: str, i: int) -> np.ndarray:
+        if not os.path.exists(path):
+            raise Exception(
+                ("Image file '{}' no."
+                 "{}  does not exist.").format(path, i + 1))
+
+        try:
+            image = Image.open(path).convert(mode)
+        except IOError:
+            warn("Skipping image from file '{}' no. '{}'.".format(
+                path, i + 1))
+            image = Image.new(mode, (pad_w, pad_h))
+
+        image = _rescale_or_crop(image, pad_w, pad_h,
+                                 rescale_w, rescale_h,
+                                 keep_aspect_ratio)
+        image_np = np.array(image)
+
+        if len(image_np.shape) == 2:
+            img_channels = 1
+            image_np = np.expand_dims(image_np, 2)
+        elif len(image_np.shape) == 3:
+            img_channels = image_np.shape[2]
+        else:
+            raise ValueError(
+                ("Image should have either 2 (black and white) "
+                 "or three dimensions (color channels), has {} "
+                 "dimension.").format(len(image_np.shape)))
+
+        if channels != img_channels:
+            raise ValueError(
+                "Image does not have the pre-declared number of "
+                "channels {}, but {}.".format(
+                    channels, img_channels))
+
+        return _pad(image_np, pad_w, pad_h, channels, dtype)
+
+    config = ["image_reader", prefix, pad_w, pad_h, channels, rescale_w,
+              rescale_h, keep_aspect_ratio, mode]
+
     def load(list_files: List[str]) -> Iterable[np.ndarray]:
-        for list_file in list_files:
-            with open(list_file) as f_list:
-                for i, image_file in enumerate(f_list):
-                    path = os.path.join(prefix, image_file.rstrip())
-
-                    if not os.path.exists(path):
-                        raise Exception(
-                            ("Image file '{}' no."
-                             "{}  does not exist.").format(path, i + 1))
-
-                    try:
-                        image = Image.open(path).convert(mode)
-                    except IOError:
-                        warn("Skipping image from file '{}' no. '{}'.".format(
-                            path, i + 1))
-                        image = Image.new(mode, (pad_w, pad_h))
-
-                    image = _rescale_or_crop(image, pad_w, pad_h,
-                                             rescale_w, rescale_h,
-                                             keep_aspect_ratio)
-                    image_np = np.array(image)
-
-                    if len(image_np.shape) == 2:
-                        img_channels = 1
-                        image_np = np.expand_dims(image_np, 2)
-                    elif len(image_np.shape) == 3:
-                        img_channels = image_np.shape[2]
-                    else:
-                        raise ValueError(
-                            ("Image should have either 2 (black and white) "
-                             "or three dimensions (color channels), has {} "
-                             "dimension.").format(len(image_np.shape)))
-
-                    if channels != img_channels:
-                        raise ValueError(
-                            "Image does not have the pre-declared number of "
-                            "channels {}, but {}.".format(
-                                channels, img_channels))
-
-                    yield _pad(image_np, pad_w, pad_h, channels)
+        for image in load_image_files(
+                list_files, prefix, process, (pad_h, pad_w, channels), dtype,
+                num_threads, cache_dir, config):
+            yield image.astype(np.float64)
 
     return load
 
@@ -103,7 +121,9 @@ def imagenet_reader(prefix: str,
                     target_width: int = 227,
                     target_height: int = 227,
                     vgg_normalization: bool = False,
-                    zero_one_normalization: bool = False) -> Callable:
+                    zero_one_normalization: bool = False,
+                    num_threads: int = 1,
+                    cache_dir: str = None) -> Callable:
     """Load and prepare image the same way as Caffe scripts.
 
     The image preprocessing first rescales the image such that smaller edge has
@@ -118,6 +138,10 @@ def imagenet_reader(prefix: str,
             from all pixels. This is used for VGG nets.
         zero_one_normalization: If true, all pixel values are divided by 255
             such that they are in [0, 1] range. This is used for ResNet.
+        num_threads: Number of threads decoding the images in parallel. The
+            images are returned in the original order.
+        cache_dir: Directory where the resized and cropped images are cached
+            (see ``load_image_files``).
 
     Yield:
         An numpy array with the resized and cropped image for every image file
@@ -125,28 +149,37 @@ def imagenet_reader(prefix: str,
     """
     check_argument_types()
 
-    def load(list_files: List[str]) -> Iterable[np.ndarray]:
-        for list_file in list_files:
-            with open(list_file) as f_list:
-                for i, image_file in enumerate(f_list):
-                    path = os.path.join(prefix, image_file.rstrip())
+    def process(path: str, i: int) -> np.ndarray:
+        if not os.path.exists(path):
+            raise Exception(
+                "Image file '{}' no. {} does not exist."
+                .format(path, i + 1))
 
-                    if not os.path.exists(path):
-                        raise Exception(
-                            "Image file '{}' no. {} does not exist."
-                            .format(path, i + 1))
+        return _resize_and_crop_for_imagenet(
+            path, target_height, target_width)
 
-                    res = single_image_for_imagenet(
-                        path, target_height, target_width,
-                        vgg_normalization, zero_one_normalization)
+    config = ["imagenet_reader", prefix, target_width, target_height]
 
-                    yield res
+    def load(list_files: List[str]) -> Iterable[np.ndarray]:
+        for image in load_image_files(
+                list_files, prefix, process,
+                (target_width, target_height, 3), np.uint8, num_threads,
+                cache_dir, config):
+            yield _normalize_for_imagenet(
+                image, vgg_normalization, zero_one_normalization)
     return load
 
 
 def single_image_for_imagenet(
         path: str, target_height: int, target_width: int,
         vgg_normalization: bool, zero_one_normalization: bool) -> np.ndarray:
+    return _normalize_for_imagenet(
+        _resize_and_crop_for_imagenet(path, target_height, target_width),
+        vgg_normalization, zero_one_normalization)
+
+
+def _resize_and_crop_for_imagenet(path: str, target_height: int,
+                                  target_width: int) -> np.ndarray:
     image = Image.open(path).convert("RGB")
 
     width, height = image.size
@@ -166,9 +199,14 @@ def single_image_for_imagenet(
     cropped_image = _crop(image, target_width, target_height)
 
     res = _pad(np.array(cropped_image),
-               target_width, target_height, 3)
+               target_width, target_height, 3, np.uint8)
     assert res.shape == (target_width, target_height, 3)
+    return res
+
 
+def _normalize_for_imagenet(image: np.ndarray, vgg_normalization: bool,
+                            zero_one_normalization: bool) -> np.ndarray:
+    res = image.astype(np.float64)
     if vgg_normalization:
         res -= VGG_RGB_MEANS
     if zero_one_normalization:
@@ -217,10 +255,112 @@ def _crop(image: Image.Image, pad_w: int, pad_h: int) -> Image.Image:
 
 
 def _pad(image: np.ndarray, pad_w: int, pad_h: int,
-         channels: int) -> np.ndarray:
+         channels: int, dtype: Any = np.float64) -> np.ndarray:
     img_h, img_w = image.shape[:2]
 
-    image_padded = np.zeros((pad_h, pad_w, channels))
+    image_padded = np.zeros((pad_h, pad_w, channels), dtype=dtype)
     image_padded[:img_h, :img_w, :] = image
 
     return image_padded
+
+
+def load_image_files(list_files: List[str],
+                     prefix: str,
+                     process: Callable[[str, int], np.ndarray],
+                     shape: Tuple[int, ...],
+                     dtype: Any,
+                     num_threads: int = 1,
+                     cache_dir: str = None,
+                     config: List[Any] = None) -> Iterator[np.ndarray]:
+    """Load and process the images listed in the files.
+
+    The images are processed by a pool of threads (the decoding and resizing
+    in PIL mostly releases the GIL), but they are yielded in the order of the
+    list files.
+
+    When a cache directory is given, the processed images from each list
+    file are stored in a memory-mapped ``.npy`` file of shape ``(images,) +
+    shape``, so the following epochs read the images from the cache instead
+    of decoding them. The cache file name is derived from the list file
+    path, size and modification time and the reader configuration; changes
+    of the image files themselves are not detected. The cache is written
+    only when all images of the list file have been read.
+
+    Arguments:
+        list_files: Files with the image paths, one per line.
+        prefix: Prefix of the paths in the list files.
+        process: Function that loads an image given its path and its index
+            in the list file.
+        shape: The shape of the processed images.
+        dtype: The data type of the processed images.
+        num_threads: Number of threads processing the images.
+        cache_dir: Directory with the cached images, or None.
+        config: Configuration of the reader the cache file name depends on.
+    """
+    for list_file in list_files:
+        with open(list_file) as f_list:
+            paths = [os.path.join(prefix, line.rstrip()) for line in f_list]
+
+        cache_path = None
+        if cache_dir is not None:
+            cache_path = _cache_path(cache_dir, list_file, config)
+            if os.path.exists(cache_path):
+                cached = np.load(cache_path, mmap_mode="r")
+                if cached.shape == (len(paths),) + shape:
+                    for image in cached:
+                        yield np.asarray(image)
+                    continue
+
+        images = _map_in_order(process, paths, num_threads)
+        if cache_path is None:
+            yield from images
+            continue
+
+        os.makedirs(cache_dir, exist_ok=True)
+        handle, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        os.close(handle)
+        try:
+            cache = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=dtype,
+                shape=(len(paths),) + shape)
+            for i, image in enumerate(images):
+                cache[i] = image
+                yield image
+            cache.flush()
+            del cache
+            os.replace(tmp_path, cache_path)
+            log("Cached images from '{}' in '{}'".format(
+                list_file, cache_path))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def _cache_path(cache_dir: str, list_file: str, config: List[Any]) -> str:
+    stat = os.stat(list_file)
+    key = json.dumps([os.path.abspath(list_file), stat.st_size,
+                      stat.st_mtime_ns, config])
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(list_file))[0]
+    return os.path.join(cache_dir, "{}.{}.npy".format(name, digest))
+
+
+def _map_in_order(function: Callable[[str, int], np.ndarray],
+                  paths: List[str],
+                  num_threads: int) -> Iterator[np.ndarray]:
+    """Apply the function to the paths in threads, keeping the order."""
+    if num_threads <= 1:
+        for i, path in enumerate(paths):
+            yield function(path, i)
+        return
+
+    with ThreadPoolExecutor(num_threads) as executor:
+        # Only a few images ahead are processed to keep the memory bounded
+        pending = deque()  # type: Deque[Any]
+        for i, path in enumerate(paths):
+            pending.append(executor.submit(function, path, i))
+            if len(pending) >= 4 * num_threads:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
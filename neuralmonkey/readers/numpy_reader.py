@@ -5,13 +5,57 @@ from typeguard import check_argument_types
 import numpy as np
 
 
-def single_tensor(files: List[str]) -> np.ndarray:
-    """Load a single tensor from a numpy file."""
+def single_tensor(files: List[str], memory_map: bool = False) -> np.ndarray:
+    """Load a single tensor from a numpy file.
+
+    Args:
+        files: The ``.npy`` files, concatenated along the first axis.
+        memory_map: Memory-map a single file read-only instead of reading it
+            into memory. More files are concatenated in memory anyway.
+    """
     check_argument_types()
+    mmap_mode = "r" if memory_map else None
     if len(files) == 1:
-        return np.load(files[0])
+        return np.load(files[0], mmap_mode=mmap_mode)
+
+    return np.concatenate([np.load(f, mmap_mode=mmap_mode) for f in files],
+                          axis=0)
+
+
+def shard_index_path(shard: str) -> str:
+    """Get the path to the index of a packed shard."""
+    return shard + ".index"
+
+
+def from_shards(shape: List[int] = None) -> Callable:
+    """Load a series of numpy arrays from packed shards.
+
+    A shard is a ``.npy`` file with the arrays of the series concatenated
+    along their first axis and its index is a file with the offsets of the
+    arrays in it (see ``neuralmonkey.writers.numpy_writer``). The shards are
+    memory-mapped and the yielded arrays are views of them, so nothing is
+    read until the data are used.
 
-    return np.concatenate([np.load(f) for f in files], axis=0)
+    Args:
+        shape: If given, the shape every array must have.
+
+    Returns:
+        A generator function that yields the arrays from the shards.
+    """
+    check_argument_types()
+
+    def load(files: List[str]) -> Iterable[np.ndarray]:
+        for path in files:
+            data = np.load(path, mmap_mode="r")
+            offsets = np.load(shard_index_path(path))
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                arr = np.asarray(data[start:end])
+                if shape is not None and list(arr.shape) != shape:
+                    raise ValueError(
+                        "Shapes do not match: expected {}, found {}"
+                        .format(shape, list(arr.shape)))
+                yield arr
+    return load
 
 
 def from_file_list(prefix: str,
@@ -1,7 +1,10 @@
-from typing import List, Iterable, Callable
+from typing import List, Iterable, Callable, Set
+import functools
 import gzip
 import csv
 import io
+import itertools
+import re
 import sys
 import unicodedata
 
@@ -14,10 +17,52 @@ PlainTextFileReader = Callable[[List[str]], Iterable[List[str]]]
 
 csv.field_size_limit(sys.maxsize)
 
-ALNUM_CHARSET = set(
-    chr(i) for i in range(sys.maxunicode)
-    if (unicodedata.category(chr(i)).startswith("L")
-        or unicodedata.category(chr(i)).startswith("N")))
+
+@functools.lru_cache(maxsize=None)
+def get_alnum_charset() -> Set[str]:
+    """Return the set of alphanumeric characters.
+
+    These are the characters from the Unicode letter and number categories.
+    Building the set takes a call to ``unicodedata.category`` for every code
+    point, so it is built on the first use instead of at import time.
+    """
+    return set(
+        chr(i) for i in range(sys.maxunicode)
+        if (unicodedata.category(chr(i)).startswith("L")
+            or unicodedata.category(chr(i)).startswith("N")))
+
+
+# A word character (a letter, a number or the underscore) except for the
+# underscore. This matches the same characters as ``get_alnum_charset`` and,
+# unlike a character class listing the ranges of the set, it is fast to match.
+ALNUM_REGEX = re.compile(r"[^\W_]")
+
+# Groups of alnum or non-alnum characters. A single space between two alnum
+# groups is not matched by any of the alternatives, so it is skipped.
+T2T_TOKEN_REGEX = re.compile(r"[^\W_]+|(?! [^\W_])[\W_]+")
+
+
+def t2t_tokenize_batch(lines: Iterable[str]) -> List[List[str]]:
+    """Tokenize lines of plain text with the tensor2tensor-like tokenizer.
+
+    See ``t2t_tokenized_text_reader`` for the description of the tokenization.
+    Each line is tokenized with a single regex pass.
+
+    Arguments:
+        lines: The lines of text. Surrounding whitespace is stripped.
+
+    Returns:
+        The list of tokenized lines.
+    """
+    findall = T2T_TOKEN_REGEX.findall
+    batch = []
+
+    # The stripped lines do not start or end with a space, so a group
+    # consisting of a single space is always between two alnum groups.
+    for line in lines:
+        batch.append(findall(line.strip()) or [""])
+
+    return batch
 
 
 def string_reader(
@@ -46,7 +91,8 @@ def tokenized_text_reader(encoding: str = "utf-8") -> PlainTextFileReader:
     return reader
 
 
-def t2t_tokenized_text_reader(encoding: str = "utf-8") -> PlainTextFileReader:
+def t2t_tokenized_text_reader(encoding: str = "utf-8",
+                              batch_size: int = 1024) -> PlainTextFileReader:
     """Get a tokenizing reader for plain text.
 
     Tokenization is inspired by the tensor2tensor tokenizer:
@@ -56,34 +102,16 @@ def t2t_tokenized_text_reader(encoding: str = "utf-8") -> PlainTextFileReader:
     tokens, dropping single spaces inside the text. Basically the goal here is
     to preserve the whitespace around weird characters and whitespace on weird
     positions (beginning and end of the text).
+
+    The lines are read and tokenized in batches of ``batch_size`` lines.
     """
     def reader(files: List[str]) -> Iterable[List[str]]:
-        lines = string_reader(encoding)
-        for line in lines(files):
-            if not line:
-                yield []
-            line = line.strip()
-
-            tokens = []
-            is_alnum = [ch in ALNUM_CHARSET for ch in line]
-            current_token_start = 0
-
-            for pos in range(1, len(line)):
-                # Boundary of alnum and non-alnum character groups
-                if is_alnum[pos] != is_alnum[pos - 1]:
-                    token = line[current_token_start:pos]
-
-                    # Drop single space if it's not on the beginning
-                    if token != " " or current_token_start == 0:
-                        tokens.append(token)
-
-                    current_token_start = pos
-
-            # Add a final token (even if it's a single space)
-            final_token = line[current_token_start:]
-            tokens.append(final_token)
-
-            yield tokens
+        lines = iter(string_reader(encoding)(files))
+        while True:
+            batch = t2t_tokenize_batch(itertools.islice(lines, batch_size))
+            if not batch:
+                return
+            yield from batch
 
     return reader
 
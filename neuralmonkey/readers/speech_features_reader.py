@@ -0,0 +1,167 @@
+"""Reader of speech features computed in parallel and cached on disk.
+
+The reader combines the ``audio_reader`` with the
+``SpeechFeaturesPreprocessor``: the audio files from a list are loaded and
+their features computed in a pool of processes. The features of each list are
+optionally stored in a feature store, a directory with shards of the
+``neuralmonkey.readers.numpy_reader.from_shards`` format, so the following
+epochs and experiments only memory-map them.
+"""
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List
+from collections import deque
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from typeguard import check_argument_types
+
+from neuralmonkey.logging import log
+from neuralmonkey.processors.speech import SpeechFeaturesPreprocessor
+from neuralmonkey.readers.audio_reader import get_audio_loader
+from neuralmonkey.readers.numpy_reader import from_shards
+from neuralmonkey.writers.numpy_writer import NumpyShardWriter
+
+
+# pylint: disable=too-many-arguments
+def speech_features_reader(prefix: str = "",
+                           audio_format: str = "wav",
+                           feature_type: str = "mfcc",
+                           delta_order: int = 0,
+                           delta_window: int = 2,
+                           num_workers: int = 1,
+                           cache_dir: str = None,
+                           shard_size: int = 1000,
+                           **kwargs) -> Callable:
+    """Get a reader of speech features of audio files from a list of paths.
+
+    The reader yields the same features as the ``audio_reader`` followed by
+    the ``SpeechFeaturesPreprocessor`` with the same arguments, in the order
+    of the list files.
+
+    When a cache directory is given, the features of each list file are
+    computed and stored there before the first of them is yielded, and they
+    are memory-mapped from the store afterwards. The store is identified
+    by the paths, sizes and modification times of the audio files and the
+    feature configuration, so a change of any of them creates a new store.
+
+    Args:
+        prefix: Prefix of the paths to the audio files.
+        audio_format: The format of the audio files, "wav" or "sph".
+        feature_type: mfcc, fbank, logfbank or ssc (default is mfcc)
+        delta_order: maximum order of the delta features (default is 0)
+        delta_window: window size for delta features (default is 2)
+        num_workers: Number of processes computing the features.
+        cache_dir: Directory with the feature stores, or None.
+        shard_size: Number of utterances in a shard of a feature store.
+        **kwargs: keyword arguments for the appropriate function from
+            python_speech_features
+
+    Returns:
+        The reader function that takes a list of files with audio file paths
+        (relative to the provided prefix) and yields numpy arrays of shape
+        [num_frames, num_features].
+    """
+    check_argument_types()
+
+    config = dict(feature_type=feature_type, delta_order=delta_order,
+                  delta_window=delta_window, **kwargs)
+    # Fail early on invalid arguments
+    get_audio_loader(audio_format)
+    SpeechFeaturesPreprocessor(**config)
+
+    def load(list_files: List[str]) -> Iterable[np.ndarray]:
+        for list_file in list_files:
+            with open(list_file) as f_list:
+                paths = [os.path.join(prefix, line.rstrip())
+                         for line in f_list]
+
+            if cache_dir is None:
+                yield from _extract_in_order(
+                    paths, audio_format, config, num_workers)
+                continue
+
+            store = _store_path(cache_dir, list_file, paths,
+                                [audio_format, config])
+            if not os.path.isdir(store):
+                _create_store(store, _extract_in_order(
+                    paths, audio_format, config, num_workers), shard_size)
+                log("Stored speech features from '{}' in '{}'".format(
+                    list_file, store))
+
+            yield from from_shards()(
+                sorted(glob.glob(os.path.join(store, "features.*.npy"))))
+
+    return load
+
+
+def _extract_features(path: str, audio_format: str,
+                      config: Dict[str, Any]) -> np.ndarray:
+    """Load an audio file and compute its features in a worker process."""
+    audio = get_audio_loader(audio_format)(path)
+    return SpeechFeaturesPreprocessor(**config)(audio)
+
+
+def _extract_in_order(paths: List[str], audio_format: str,
+                      config: Dict[str, Any],
+                      num_workers: int) -> Iterator[np.ndarray]:
+    """Compute the features of the audio files in processes, keeping order."""
+    if num_workers <= 1:
+        for path in paths:
+            yield _extract_features(path, audio_format, config)
+        return
+
+    # The workers are spawned, forking the training process (which may run
+    # TensorFlow threads) can deadlock
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(num_workers) as pool:
+        # Only a few files ahead are processed to keep the memory bounded
+        pending = deque()  # type: Deque[Any]
+        for path in paths:
+            pending.append(pool.apply_async(
+                _extract_features, (path, audio_format, config)))
+            if len(pending) >= 4 * num_workers:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+
+
+def _store_path(cache_dir: str, list_file: str, paths: List[str],
+                config: List[Any]) -> str:
+    files = []
+    for path in paths:
+        stat = os.stat(path)
+        files.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+
+    # Arguments which cannot be serialized (e.g. a window function) are
+    # represented by their repr, so they will probably not hit the cache
+    key = json.dumps([files, config], sort_keys=True, default=repr)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(list_file))[0]
+    return os.path.join(cache_dir, "{}.{}".format(name, digest))
+
+
+def _create_store(store: str, features: Iterable[np.ndarray],
+                  shard_size: int) -> None:
+    """Write the features to a temporary directory and rename it."""
+    os.makedirs(os.path.dirname(store), exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(store), suffix=".tmp")
+    try:
+        with NumpyShardWriter(os.path.join(tmp_dir, "features"),
+                              shard_size) as writer:
+            for feature in features:
+                writer.write(feature)
+        try:
+            os.rename(tmp_dir, store)
+        except OSError:
+            # Another reader may have created the same store in the meantime
+            if not os.path.isdir(store):
+                raise
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
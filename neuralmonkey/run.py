@@ -38,7 +38,8 @@ def main() -> None:
     datasets_model = load_runtime_config(args.datasets)
 
     exp = Experiment(config_path=args.config)
-    exp.build_model()
+    # The model is built when loading the variables, so it can use the
+    # quantized storage of the variables.
     exp.load_variables(datasets_model.variables)
 
     if args.grid and len(datasets_model.test_datasets) > 1:
@@ -1,6 +1,5 @@
 from typing import Callable, List, Dict
 
-import scipy
 import numpy as np
 import tensorflow as tf
 from typeguard import check_argument_types
@@ -14,6 +13,31 @@ from neuralmonkey.runners.base_runner import FeedDict
 from neuralmonkey.vocabulary import END_TOKEN_INDEX
 
 
+def backtrack_hypotheses(token_ids: np.ndarray,
+                         parent_ids: np.ndarray) -> np.ndarray:
+    """Reconstruct the hypotheses in the beam from the backpointers.
+
+    Arguments:
+        token_ids: A ``(time, batch, beam)``-shaped array with the tokens
+            selected in each step of the beam search.
+        parent_ids: A ``(time, batch, beam)``-shaped array with the indices of
+            the hypotheses extended in each step.
+
+    Returns:
+        A ``(time, batch, beam)``-shaped array with the tokens of the final
+        hypotheses in the beam.
+    """
+    batch_ids = np.arange(token_ids.shape[1])[:, np.newaxis]
+    beam_ids = np.tile(np.arange(token_ids.shape[2]), [token_ids.shape[1], 1])
+
+    hypotheses = np.empty_like(token_ids)
+    for step in range(len(token_ids) - 1, -1, -1):
+        hypotheses[step] = token_ids[step][batch_ids, beam_ids]
+        beam_ids = parent_ids[step][batch_ids, beam_ids]
+
+    return hypotheses
+
+
 class BeamSearchRunner(BaseRunner[BeamSearchDecoder]):
     """A runner which takes the output from a beam search decoder.
 
@@ -51,7 +75,7 @@ class BeamSearchRunner(BaseRunner[BeamSearchDecoder]):
                              for res in results]
 
             # Arithmetic mean
-            ens_logprobs = (scipy.misc.logsumexp(prev_logprobs, 0)
+            ens_logprobs = (np.logaddexp.reduce(prev_logprobs, 0)
                             - np.log(self.num_sessions))
 
             if self._is_finished(results):
@@ -84,7 +108,9 @@ class BeamSearchRunner(BaseRunner[BeamSearchDecoder]):
         def prepare_results(self, output):
             bs_scores = [s[self.rank - 1] for s in output.scores]
 
-            tok_ids = np.transpose(output.token_ids, [1, 2, 0])
+            hypotheses = backtrack_hypotheses(
+                output.token_ids, output.parent_ids)
+            tok_ids = np.transpose(hypotheses, [1, 2, 0])
             decoded_tokens = [toks[self.rank - 1][1:] for toks in tok_ids]
 
             for i, sent in enumerate(decoded_tokens):
@@ -11,14 +11,14 @@ import flask
 from flask import Flask, request, Response, render_template
 import numpy as np
 
-from neuralmonkey.config.configuration import Configuration
 from neuralmonkey.dataset import Dataset, BatchingScheme
-from neuralmonkey.experiment import Experiment
+from neuralmonkey.frozen_model import FrozenModel
 
 
 APP = Flask(__name__)
 APP.config.from_object(__name__)
 APP.config["experiment"] = None
+APP.config["frozen_model"] = None
 
 
 def root_dir():  # pragma: no cover
@@ -31,11 +31,16 @@ def get_file(filename):  # pragma: no cover
 
 
 def run(data):  # pragma: no cover
-    exp = APP.config["experiment"]
     dataset = Dataset(
         "request", data, BatchingScheme(batch_size=1), {},
         preprocessors=APP.config["preprocess"])
 
+    frozen_model = APP.config["frozen_model"]
+    if frozen_model is not None:
+        return frozen_model.run(
+            {s_id: list(dataset.get_series(s_id)) for s_id in dataset.series})
+
+    exp = APP.config["experiment"]
     _, response_data, _ = exp.run_model(dataset, write_out=False)
 
     return response_data
@@ -97,14 +102,20 @@ def main() -> None:
         description="Runs Neural Monkey as a web server.")
     parser.add_argument("--port", type=int, default=5000)
     parser.add_argument("--host", type=str, default="127.0.0.1")
-    parser.add_argument("--configuration", type=str, required=True)
+    model = parser.add_mutually_exclusive_group(required=True)
+    model.add_argument("--configuration", type=str)
+    model.add_argument("--frozen-model", type=str,
+                       help="a model exported by neuralmonkey-export")
     parser.add_argument("--preprocess", type=str,
                         required=False, default=None)
     args = parser.parse_args()
 
     print("")
 
+    # The configuration builder and the experiment are imported only when
+    # needed, so a frozen model starts quickly.
     if args.preprocess is not None:
+        from neuralmonkey.config.configuration import Configuration
         preprocessing = Configuration()
         preprocessing.add_argument("preprocess")
         preprocessing.load_file(args.preprocess)
@@ -113,7 +124,11 @@ def main() -> None:
     else:
         APP.config["preprocess"] = []
 
-    exp = Experiment(config_path=args.configuration)
-    exp.build_model()
-    APP.config["experiment"] = exp
+    if args.frozen_model is not None:
+        APP.config["frozen_model"] = FrozenModel(args.frozen_model)
+    else:
+        from neuralmonkey.experiment import Experiment
+        exp = Experiment(config_path=args.configuration)
+        exp.load_variables()
+        APP.config["experiment"] = exp
     APP.run(port=args.port, host=args.host)
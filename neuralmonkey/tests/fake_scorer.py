@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""A fake interactive scorer for testing the scorer daemons.
+
+The scorer understands the interactive protocols of BEER and METEOR, but the
+scores are only unigram F1 scores:
+
+* ``EVAL ||| hypothesis ||| reference`` returns the sentence score (BEER).
+* ``SCORE ||| reference ||| hypothesis`` returns the statistics of the
+  sentence, i.e. the number of matched unigrams and the lengths of the
+  hypothesis and the reference (METEOR).
+* ``EVAL ||| statistics`` returns the score computed from the statistics
+  (METEOR).
+"""
+
+import argparse
+import collections
+import sys
+import time
+
+
+def statistics(hypothesis, reference):
+    hyp = hypothesis.split()
+    ref = reference.split()
+    matches = collections.Counter(hyp) & collections.Counter(ref)
+    return [sum(matches.values()), len(hyp), len(ref)]
+
+
+def f1_score(matches, hyp_length, ref_length):
+    if matches == 0:
+        return 0.0
+    return 2 * matches / (hyp_length + ref_length)
+
+
+def answer(line):
+    fields = [f.strip() for f in line.split("|||")]
+
+    if fields[0] == "EVAL" and len(fields) == 3:
+        return f1_score(*statistics(fields[1], fields[2]))
+    if fields[0] == "EVAL" and len(fields) == 2:
+        return f1_score(*[float(s) for s in fields[1].split()])
+    if fields[0] == "SCORE" and len(fields) == 3:
+        return " ".join(str(s) for s in statistics(fields[2], fields[1]))
+
+    raise ValueError("Unknown request: {}".format(line))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--crash-after", type=int, default=None,
+                        help="exit after answering this many requests")
+    parser.add_argument("--hang", action="store_true",
+                        help="never answer the requests")
+    args = parser.parse_args()
+
+    for answered, line in enumerate(sys.stdin):
+        if args.crash_after is not None and answered >= args.crash_after:
+            sys.exit(1)
+        if args.hang:
+            time.sleep(3600)
+
+        print(answer(line), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3.5
+
+import unittest
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.attention.base_attention import AttentionLoopState
+from neuralmonkey.attention.scaled_dot_product import attention
+from neuralmonkey.attention.stateful_context import StatefulContext
+from neuralmonkey.model.stateful import Stateful
+from neuralmonkey.tf_utils import group_copies, tile_batch, ungroup_copies
+
+
+class ConstantStateful(Stateful):
+
+    def __init__(self, output: tf.Tensor) -> None:
+        self._output = output
+
+    @property
+    def output(self) -> tf.Tensor:
+        return self._output
+
+
+class TestBroadcastAttention(unittest.TestCase):
+
+    def setUp(self):
+        tf.reset_default_graph()
+        np.random.seed(1234)
+
+        self.batch = 3
+        self.multiple = 4
+        self.keys = np.random.rand(self.batch, 5, 6).astype(np.float32)
+        self.queries = np.random.rand(
+            self.batch * self.multiple, 2, 6).astype(np.float32)
+        self.mask = np.ones([self.batch, 5], dtype=np.float32)
+        self.mask[0, 3:] = 0
+
+    def test_group_copies(self):
+        tiled = tile_batch(tf.constant(self.keys), self.multiple)
+        grouped = group_copies(tiled, self.batch)
+        ungrouped = ungroup_copies(grouped)
+
+        with tf.Session() as sess:
+            tiled_val, grouped_val, ungrouped_val = sess.run(
+                [tiled, grouped, ungrouped])
+
+        self.assertEqual(grouped_val.shape, (self.batch, self.multiple, 5, 6))
+        for i in range(self.multiple):
+            self.assertTrue(np.array_equal(grouped_val[:, i], self.keys))
+        self.assertTrue(np.array_equal(ungrouped_val, tiled_val))
+
+    def test_untiled_keys(self):
+        """Attention over untiled keys equals attention over tiled keys."""
+        keys = tf.constant(self.keys)
+        mask = tf.constant(self.mask)
+        queries = tf.constant(self.queries)
+
+        with tf.variable_scope("attention"):
+            context, weights = attention(
+                queries, keys, keys, mask, num_heads=2,
+                dropout_callback=lambda x: x)
+
+        with tf.variable_scope("attention", reuse=True):
+            tiled_context, tiled_weights = attention(
+                queries, tile_batch(keys, self.multiple),
+                tile_batch(keys, self.multiple),
+                tile_batch(mask, self.multiple), num_heads=2,
+                dropout_callback=lambda x: x)
+
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            results = sess.run(
+                [context, weights, tiled_context, tiled_weights])
+
+        self.assertEqual(results[0].shape, (self.batch * self.multiple, 2, 6))
+        self.assertEqual(results[1].shape,
+                         (self.batch * self.multiple, 2, 2, 5))
+        self.assertTrue(np.allclose(results[0], results[2], atol=1e-6))
+        self.assertTrue(np.allclose(results[1], results[3], atol=1e-6))
+
+    def test_stateful_context_tiled_queries(self):
+        """The context is copied for the queries of the tiled batch items."""
+        states = np.random.rand(self.batch, 6).astype(np.float32)
+        context_attention = StatefulContext(
+            "stateful_context", ConstantStateful(tf.constant(states)))
+
+        queries = tf.constant(
+            np.random.rand(self.batch * self.multiple, 7).astype(np.float32))
+        # The decoder tiles the initial loop state, see tile_loop_state
+        loop_state = AttentionLoopState(
+            *(tile_batch(x, self.multiple, dim=1)
+              for x in context_attention.initial_loop_state()))
+
+        context, next_loop_state = context_attention.attention(
+            queries, None, None, loop_state)
+
+        with tf.Session() as sess:
+            context_val, contexts_val, weights_val = sess.run(
+                [context, next_loop_state.contexts, next_loop_state.weights],
+                {context_attention.batch_size: self.batch})
+
+        expected = np.repeat(states, self.multiple, axis=0)
+        self.assertTrue(np.array_equal(context_val, expected))
+        self.assertTrue(np.array_equal(contexts_val, expected[None]))
+        self.assertEqual(weights_val.shape,
+                         (1, self.batch * self.multiple, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
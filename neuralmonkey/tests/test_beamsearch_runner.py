@@ -0,0 +1,37 @@
+#!/usr/bin/env python3.5
+
+import unittest
+
+import numpy as np
+
+from neuralmonkey.runners.beamsearch_runner import backtrack_hypotheses
+
+
+class TestBacktrackHypotheses(unittest.TestCase):
+
+    def test_backtrack(self):
+        # shape (time, batch, beam)
+        token_ids = np.array([[[1, 1], [1, 1]],
+                              [[5, 6], [3, 4]],
+                              [[7, 8], [9, 2]]])
+        parent_ids = np.array([[[0, 1], [0, 1]],
+                               [[0, 0], [0, 0]],
+                               [[1, 0], [0, 0]]])
+
+        hypotheses = np.transpose(
+            backtrack_hypotheses(token_ids, parent_ids), [1, 2, 0])
+
+        self.assertEqual(hypotheses.tolist(), [[[1, 6, 7], [1, 5, 8]],
+                                               [[1, 3, 9], [1, 3, 2]]])
+
+    def test_identity_backpointers(self):
+        random = np.random.RandomState(42)
+        token_ids = random.randint(0, 100, size=(10, 4, 3))
+        parent_ids = np.tile(np.arange(3), [10, 4, 1])
+
+        self.assertTrue(np.array_equal(
+            backtrack_hypotheses(token_ids, parent_ids), token_ids))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3.5
 
 
+import random
 import unittest
 
-from neuralmonkey.evaluators.chrf import ChrFEvaluator, _get_ngrams
+import numpy as np
+
+from neuralmonkey.evaluators.chrf import (
+    ChrFAccumulator, ChrFEvaluator, _get_ngrams)
 from neuralmonkey.tests.test_bleu import DECODED, REFERENCE
 
 
@@ -49,6 +53,65 @@ class TestChrF(unittest.TestCase):
         for i, _ in enumerate(NGRAMS):
             self.assertDictEqual(ngrams_out[i], NGRAMS[i])
 
+    def test_empty_pairs(self):
+        scores = FUNC.sentence_scores([[], [], ["a"], [""]],
+                                      [[], ["a"], [], [""]])
+        self.assertEqual(list(scores), [1.0, 0.0, 0.0, 1.0])
+
+
+def random_sentences(rng, count):
+    words = ["".join(rng.choice("abcdeáč😀 ") for _ in range(
+        rng.randint(1, 6))) for _ in range(50)]
+    return [[rng.choice(words) for _ in range(rng.randint(0, 12))]
+            for _ in range(count)]
+
+
+class TestChrFParity(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(42)
+        cls.references = random_sentences(rng, 200)
+        cls.hypotheses = [ref[:rng.randint(0, len(ref))] + hyp for ref, hyp
+                          in zip(cls.references, random_sentences(rng, 200))]
+
+    def test_sentence_scores(self):
+        for evaluator in [ChrFEvaluator(),
+                          ChrFEvaluator(n=1, beta=3),
+                          ChrFEvaluator(n=10, beta=0.5),
+                          ChrFEvaluator(ignored_symbols=[" ", "a", "bc"])]:
+            expected = [evaluator.score_instance(hyp, ref) for hyp, ref
+                        in zip(self.hypotheses, self.references)]
+
+            scores = evaluator.sentence_scores(self.hypotheses,
+                                               self.references)
+            self.assertTrue(np.array_equal(scores, expected))
+
+            # Again with the cached references
+            score = evaluator(self.hypotheses, self.references)
+            self.assertEqual(score, np.mean(expected))
+
+    def test_reference_cache(self):
+        evaluator = ChrFEvaluator(cache_size=300)
+        evaluator(self.hypotheses, self.references)
+        stats = evaluator._reference_stats(self.references)
+        evaluator(self.references, self.references)
+        self.assertIs(evaluator._reference_stats(self.references), stats)
+
+        # Adding another set would exceed the cache size
+        evaluator(self.hypotheses[:150], self.hypotheses[:150])
+        self.assertEqual(len(evaluator._reference_cache), 1)
+
+    def test_accumulator(self):
+        evaluator = ChrFEvaluator(beta=3)
+        accumulator = ChrFAccumulator(evaluator)
+        for start in range(0, 200, 64):
+            accumulator.add(self.hypotheses[start:start + 64],
+                            self.references[start:start + 64])
+
+        self.assertEqual(accumulator.score(),
+                         evaluator(self.hypotheses, self.references))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,12 +3,32 @@
 """ Unit tests for the decoder. (Tests only initialization so far) """
 
 import unittest
+
+import numpy as np
 import tensorflow as tf
 
+from neuralmonkey.attention.coverage import CoverageAttention
+from neuralmonkey.attention.feed_forward import Attention
 from neuralmonkey.decoders.decoder import Decoder
+from neuralmonkey.model.stateful import TemporalStateful
 from neuralmonkey.vocabulary import Vocabulary
 
 
+class ConstantTemporalStateful(TemporalStateful):
+
+    def __init__(self, states: tf.Tensor, mask: tf.Tensor) -> None:
+        self._states = states
+        self._mask = mask
+
+    @property
+    def temporal_states(self) -> tf.Tensor:
+        return self._states
+
+    @property
+    def temporal_mask(self) -> tf.Tensor:
+        return self._mask
+
+
 class TestDecoder(unittest.TestCase):
 
     @classmethod
@@ -61,6 +81,12 @@ class TestDecoder(unittest.TestCase):
         with self.assertRaises(ValueError):
             Decoder(**dparams)
 
+    def test_compaction_interval(self):
+        dparams = self.decoder_params
+        dparams["compaction_interval"] = 0
+        with self.assertRaises(ValueError):
+            Decoder(**dparams)
+
     def test_cell_type(self):
         dparams = self.decoder_params
 
@@ -75,5 +101,90 @@ class TestDecoder(unittest.TestCase):
             Decoder(**dparams)
 
 
+class TestCompaction(unittest.TestCase):
+
+    def setUp(self):
+        tf.reset_default_graph()
+        np.random.seed(1234)
+
+        self.batch = 6
+        states = np.random.normal(size=[self.batch, 4, 8]).astype(np.float32)
+        mask = np.ones([self.batch, 4], dtype=np.float32)
+        mask[::2, 2:] = 0
+
+        self.encoder = ConstantTemporalStateful(
+            tf.constant(states), tf.constant(mask))
+        self.dataset = {"target": tf.constant([["a"]] * self.batch)}
+
+    def decode(self, attention, sample_size):
+        """Decode the batch without and with the compaction."""
+        decoder = Decoder(
+            encoders=[],
+            vocabulary=Vocabulary(["a", "b", "c"]),
+            data_id="target",
+            name="decoder",
+            max_output_len=10,
+            embedding_size=8,
+            rnn_size=8,
+            attentions=[attention])
+        decoder.register_input(self.dataset)
+
+        dense = decoder.decoding_loop(False, sample_size=sample_size)
+        decoder.compaction_interval = 2
+        compacted = decoder.decoding_loop(False, sample_size=sample_size)
+
+        feed_dict = {}
+        for part in (decoder, attention):
+            feed_dict[part.train_mode] = False
+            feed_dict[part.batch_size] = self.batch
+
+        with tf.Session() as sess:
+            sess.run([tf.global_variables_initializer(),
+                      tf.tables_initializer()])
+
+            # The default initializers are too small to make the sentences
+            # of different lengths
+            for var in tf.trainable_variables():
+                var.load(np.random.normal(
+                    size=var.shape.as_list()).astype(np.float32), sess)
+
+            return sess.run((dense, compacted), feed_dict)
+
+    def assert_equal_decoding(self, dense, compacted):
+        logits, decoder_outputs, mask, decoded = dense
+        c_logits, c_decoder_outputs, c_mask, c_decoded = compacted
+
+        self.assertEqual(c_logits.shape, logits.shape)
+        self.assertTrue(np.array_equal(c_decoded, decoded))
+        self.assertTrue(np.array_equal(c_mask, mask))
+
+        # Some sentences must finish before the others for the test to make
+        # sense
+        lengths = mask.sum(0)
+        self.assertGreater(lengths.max(), lengths.min())
+
+        # The values are compared in the steps before the sentence end and
+        # in the step which generated the end symbol
+        computed = np.concatenate(
+            [np.ones_like(mask[:1]), mask[:-1]], 0).astype(bool)
+        self.assertTrue(np.allclose(c_logits[computed], logits[computed],
+                                    atol=1e-5))
+        self.assertTrue(np.allclose(c_decoder_outputs[computed],
+                                    decoder_outputs[computed], atol=1e-5))
+
+    def test_compacted_decoding(self):
+        attention = Attention("attention", self.encoder)
+        self.assert_equal_decoding(*self.decode(attention, sample_size=1))
+
+    def test_compacted_tiled_decoding(self):
+        attention = Attention("attention", self.encoder)
+        self.assert_equal_decoding(*self.decode(attention, sample_size=2))
+
+    def test_compacted_coverage(self):
+        # The coverage attention reads its history in the loop
+        attention = CoverageAttention("attention", self.encoder)
+        self.assert_equal_decoding(*self.decode(attention, sample_size=1))
+
+
 if __name__ == "__main__":
     unittest.main()
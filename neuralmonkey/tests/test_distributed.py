@@ -0,0 +1,54 @@
+#!/usr/bin/env python3.5
+
+import unittest
+
+from neuralmonkey.distributed import shard_bounds
+
+
+class TestShardBounds(unittest.TestCase):
+
+    def check_shards(self, size, num_workers):
+        shards = [shard_bounds(size, num_workers, i)
+                  for i in range(num_workers)]
+
+        covered = []
+        for start, length, _ in shards:
+            covered.extend(range(start, start + length))
+        self.assertEqual(covered, list(range(size)))
+
+        self.assertAlmostEqual(sum(weight for _, _, weight in shards),
+                               num_workers)
+        for _, length, weight in shards:
+            self.assertAlmostEqual(weight, length * num_workers / size)
+        return shards
+
+    def test_even(self):
+        shards = self.check_shards(8, 2)
+        self.assertEqual(shards, [(0, 4, 1.0), (4, 4, 1.0)])
+
+    def test_uneven(self):
+        shards = self.check_shards(7, 3)
+        self.assertEqual([length for _, length, _ in shards], [3, 3, 1])
+
+    def test_empty_shards(self):
+        shards = self.check_shards(2, 4)
+        self.assertEqual([length for _, length, _ in shards], [1, 1, 0, 0])
+        self.assertEqual(shards[2][2], 0)
+        self.assertEqual(shards[3][2], 0)
+
+    def test_weighted_mean(self):
+        # Weighted mean of shard means equals the mean of the whole batch
+        values = [1., 2., 4., 8., 16.]
+        num_workers = 3
+        total = 0.
+        for i in range(num_workers):
+            start, length, weight = shard_bounds(len(values), num_workers, i)
+            if length:
+                shard = values[start:start + length]
+                total += weight * sum(shard) / length
+        self.assertAlmostEqual(total / num_workers,
+                               sum(values) / len(values))
+
+
+if __name__ == "__main__":
+    unittest.main()
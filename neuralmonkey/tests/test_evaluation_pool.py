@@ -0,0 +1,78 @@
+#!/usr/bin/env python3.5
+
+import threading
+import unittest
+
+from neuralmonkey.evaluation_pool import EvaluationPool, evaluate_serially
+from neuralmonkey.evaluators.bleu import BLEUEvaluator
+from neuralmonkey.evaluators.chrf import ChrFEvaluator
+from neuralmonkey.evaluators.evaluator import Evaluator
+from neuralmonkey.evaluators.gleu import GLEUEvaluator
+from neuralmonkey.tests.test_bleu import DECODED, REFERENCE
+
+
+class ThreadRecordingEvaluator(Evaluator):
+    """An evaluator which cannot be pickled and records its thread."""
+
+    picklable = False
+
+    def __init__(self, name: str, thread_safe: bool) -> None:
+        super().__init__(name)
+        self.thread_safe = thread_safe
+        self.threads = []
+
+    def score_batch(self, hypotheses, references):
+        self.threads.append(threading.current_thread())
+        return float(len(hypotheses))
+
+
+class TestEvaluationPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.in_thread = ThreadRecordingEvaluator("InThread", True)
+        cls.in_main = ThreadRecordingEvaluator("InMain", False)
+
+        cls.evaluators = [
+            ("target", "target", BLEUEvaluator()),
+            ("target", "target", cls.in_thread),
+            ("target", "target", ChrFEvaluator()),
+            ("target", "target", cls.in_main),
+            ("target", "missing", BLEUEvaluator(name="Missing")),
+            ("target", "target", GLEUEvaluator())]
+
+        cls.pool = EvaluationPool(cls.evaluators, 2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_parity(self):
+        batch = {"target": REFERENCE}
+        outputs = {"target": DECODED}
+
+        serial_scores, _ = evaluate_serially(self.evaluators, batch, outputs)
+        scores, timings = self.pool.evaluate(batch, outputs)
+
+        # The same scores in the same order
+        self.assertEqual(list(scores.items()), list(serial_scores.items()))
+        self.assertEqual(list(timings), list(scores))
+        self.assertNotIn("target/Missing", scores)
+
+        # The pool can be reused
+        scores, _ = self.pool.evaluate(batch, outputs)
+        self.assertEqual(scores, serial_scores)
+
+    def test_threads(self):
+        self.pool.evaluate({"target": REFERENCE}, {"target": DECODED})
+
+        self.assertIs(self.in_main.threads[-1], threading.main_thread())
+        self.assertIsNot(self.in_thread.threads[-1], threading.main_thread())
+
+    def test_invalid_processes(self):
+        with self.assertRaises(ValueError):
+            EvaluationPool(self.evaluators, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3.5
+
+import unittest
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.dataset import Dataset, BatchingScheme
+from neuralmonkey.model.feedable import Feedable
+# pylint: disable=protected-access
+from neuralmonkey.tf_manager import (
+    FeedDictCache, _batch_size, _feed_value_size)
+
+
+class CountingFeedable(Feedable):
+
+    def __init__(self) -> None:
+        Feedable.__init__(self)
+        self.tokens = tf.placeholder(tf.string, [None, None], "tokens")
+        self.calls = 0
+
+    def feed_dict(self, dataset, train=False):
+        self.calls += 1
+        fd = Feedable.feed_dict(self, dataset, train)
+        fd[self.tokens] = [[w, "<pad>"] for w in dataset.get_series("words")]
+        return fd
+
+
+def _dataset(name: str, size: int) -> Dataset:
+    words = ["w{}".format(i) for i in range(size)]
+    return Dataset(name, {"words": lambda: iter(words)},
+                   BatchingScheme(batch_size=2))
+
+
+class TestFeedDictCache(unittest.TestCase):
+
+    def setUp(self):
+        tf.reset_default_graph()
+        self.feedable = CountingFeedable()
+
+    def test_reuse(self):
+        cache = FeedDictCache(max_size=2**20)
+        dataset = _dataset("data", 5)
+
+        first = list(cache.batches(dataset, {self.feedable}))
+        self.assertEqual(self.feedable.calls, 3)
+
+        second = list(cache.batches(dataset, {self.feedable}))
+        self.assertEqual(self.feedable.calls, 3)
+
+        for (batch1, fd1), (batch2, fd2) in zip(first, second):
+            self.assertIs(batch1, batch2)
+            self.assertIs(fd1, fd2)
+
+        tokens = first[0][1][self.feedable.tokens]
+        self.assertIsInstance(tokens, np.ndarray)
+        self.assertEqual(tokens.shape, (2, 2))
+        self.assertFalse(first[0][1][self.feedable.train_mode])
+        self.assertEqual(first[-1][1][self.feedable.batch_size], 1)
+
+    def test_size_limit(self):
+        cache = FeedDictCache(max_size=10)
+        dataset = _dataset("data", 5)
+
+        first = list(cache.batches(dataset, {self.feedable}))
+        second = list(cache.batches(dataset, {self.feedable}))
+
+        self.assertEqual(self.feedable.calls, 6)
+        self.assertEqual(len(first), len(second))
+        self.assertEqual(cache.size, 0)
+
+    def test_size_counts_batches(self):
+        cache = FeedDictCache(max_size=2**20)
+        dataset = _dataset("data", 5)
+
+        entries = list(cache.batches(dataset, {self.feedable}))
+        batches_size = sum(_batch_size(batch) for batch, _ in entries)
+        feeds_size = sum(_feed_value_size(val)
+                         for _, feed_dict in entries
+                         for val in feed_dict.values())
+
+        self.assertGreater(batches_size, 0)
+        self.assertEqual(cache.size, batches_size + feeds_size)
+
+    def test_different_datasets(self):
+        cache = FeedDictCache(max_size=2**20)
+
+        datasets = [_dataset("a", 2), _dataset("b", 2)]
+
+        for _ in range(2):
+            for dataset in datasets:
+                list(cache.batches(dataset, {self.feedable}))
+
+        self.assertEqual(self.feedable.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
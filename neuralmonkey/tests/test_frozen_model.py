@@ -0,0 +1,81 @@
+#!/usr/bin/env python3.5
+
+import json
+import os
+import tempfile
+import unittest
+
+import tensorflow as tf
+
+from neuralmonkey.frozen_model import FrozenModel, GRAPH_FILE, SIGNATURE_FILE
+
+
+class TestFrozenModel(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+
+        # A "model" which appends the batch size to the input tokens
+        with tf.Graph().as_default() as graph:
+            source = tf.placeholder(tf.string, [None, None], "source")
+            batch_size = tf.placeholder(tf.int32, [], "batch_size")
+            tf.placeholder(tf.bool, [], "unused_train_mode")
+
+            suffix = tf.fill([batch_size, 1], tf.as_string(batch_size))
+            tf.concat([source, suffix], 1, name="output")
+
+        signature = {
+            "batch_size": ["batch_size:0"],
+            "train_mode": ["unused_train_mode:0"],
+            "inputs": {"source": {"tensor": "source:0", "dtype": "string",
+                                  "max_length": 3,
+                                  "add_start_symbol": False,
+                                  "add_end_symbol": True}},
+            "outputs": {"target": "output:0"},
+            "tables_initializer": "init_all_tables"}
+
+        with graph.as_default():
+            tf.tables_initializer(name="init_all_tables")
+            graph_def = tf.graph_util.extract_sub_graph(
+                graph.as_graph_def(), ["output", "init_all_tables"])
+
+        with open(os.path.join(cls.model_dir, GRAPH_FILE), "wb") as f_graph:
+            f_graph.write(graph_def.SerializeToString())
+        with open(os.path.join(cls.model_dir, SIGNATURE_FILE), "w") as f_sig:
+            json.dump(signature, f_sig)
+
+        cls.model = FrozenModel(cls.model_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.model.session.close()
+
+    def test_signature(self):
+        self.assertEqual(self.model.inputs, ["source"])
+        self.assertEqual(self.model.outputs, ["target"])
+
+    def test_run(self):
+        result = self.model.run({"source": [["a", "b"], ["c", "d", "e"]]})
+
+        # The first sentence is cut at the end symbol, the second one is
+        # truncated to the maximum length before adding the end symbol
+        self.assertEqual(result["target"],
+                         [["a", "b"], ["c", "d", "e", "2"]])
+
+    def test_batching(self):
+        result = self.model.run({"source": [["a"], ["b"], ["c"]]},
+                                batch_size=2)
+        self.assertEqual(result["target"], [["a"], ["b"], ["c"]])
+
+        fd = self.model.feed_dict({"source": [["a"], ["b"]]})
+        self.assertEqual(fd["batch_size:0"], 2)
+        self.assertNotIn("unused_train_mode:0", fd)
+
+    def test_missing_input(self):
+        with self.assertRaises(ValueError):
+            self.model.run({"target": [["a"]]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3.5
+
+import unittest
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.encoders.recurrent import (
+    _make_rnn_spec, _make_rnn_cell, rnn_layer)
+
+BATCH = 3
+TIME = 6
+INPUT_SIZE = 5
+RNN_SIZE = 4
+
+
+def _run_layer(spec, inputs, lengths, values=None):
+    """Build an RNN layer and return its variables and outputs."""
+    with tf.Graph().as_default():
+        rnn_input = tf.constant(inputs)
+        with tf.variable_scope("encoder"):
+            outputs, state = rnn_layer(
+                rnn_input, tf.constant(lengths), spec, add_residual=False)
+
+        variables = {v.op.name: v for v in tf.global_variables()}
+        with tf.Session() as session:
+            session.run(tf.global_variables_initializer())
+            if values is not None:
+                for name, value in values.items():
+                    variables[name].load(value, session)
+
+            return (session.run(variables), session.run([outputs, state]))
+
+
+def _run_step(cell_spec, inputs, state, values=None):
+    """Build a single step of a decoder cell and return its variables."""
+    with tf.Graph().as_default():
+        with tf.variable_scope("decoder"):
+            cell = _make_rnn_cell(cell_spec)
+            if cell_spec.cell_type == "LSTM":
+                state = tf.nn.rnn_cell.LSTMStateTuple(
+                    tf.constant(state), tf.constant(state))
+            output, _ = cell(tf.constant(inputs), state)
+
+        variables = {v.op.name: v for v in tf.global_variables()}
+        with tf.Session() as session:
+            session.run(tf.global_variables_initializer())
+            if values is not None:
+                for name, value in values.items():
+                    variables[name].load(value, session)
+
+            return session.run(variables), session.run(output)
+
+
+class TestFusedRNNCells(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.inputs = rng.uniform(
+            -1, 1, [BATCH, TIME, INPUT_SIZE]).astype(np.float32)
+        self.lengths = np.array([TIME, 2, 4], dtype=np.int32)
+        self.state = rng.uniform(-1, 1, [BATCH, RNN_SIZE]).astype(np.float32)
+
+    def test_layer_compatibility(self):
+        for cell_type in ["GRU", "LSTM"]:
+            for direction in ["forward", "backward", "bidirectional"]:
+                generic = _make_rnn_spec(RNN_SIZE, direction, cell_type)
+                fused = _make_rnn_spec(RNN_SIZE, direction, cell_type, True)
+
+                values, (outputs, state) = _run_layer(
+                    generic, self.inputs, self.lengths)
+                fused_values, (fused_outputs, fused_state) = _run_layer(
+                    fused, self.inputs, self.lengths, values)
+
+                self.assertEqual(
+                    {n: v.shape for n, v in values.items()},
+                    {n: v.shape for n, v in fused_values.items()})
+                self.assertTrue(np.allclose(outputs, fused_outputs,
+                                            atol=1e-5))
+                self.assertTrue(np.allclose(state, fused_state, atol=1e-5))
+
+    def test_step_compatibility(self):
+        inputs = self.inputs[:, 0]
+        for cell_type in ["GRU", "LSTM"]:
+            generic = _make_rnn_spec(RNN_SIZE, "forward", cell_type)
+            fused = _make_rnn_spec(RNN_SIZE, "forward", cell_type, True)
+
+            values, output = _run_step(generic, inputs, self.state)
+            fused_values, fused_output = _run_step(
+                fused, inputs, self.state, values)
+
+            self.assertEqual(sorted(values), sorted(fused_values))
+            self.assertTrue(np.allclose(output, fused_output, atol=1e-5))
+
+    def test_nematus_not_fused(self):
+        with self.assertRaises(ValueError):
+            _make_rnn_spec(RNN_SIZE, "forward", "NematusGRU", True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3.5
+
+import random
+import unittest
+
+import pyter
+
+from neuralmonkey.evaluators.edit_distance import EditDistance
+from neuralmonkey.evaluators.levenshtein import (
+    Aligner, lcs_length, levenshtein, levenshtein_batch)
+from neuralmonkey.evaluators.ter import ter
+from neuralmonkey.evaluators.wer import WER
+
+
+def lcs_reference(first, second):
+    table = [[0] * (len(second) + 1) for _ in range(len(first) + 1)]
+    for i, token_a in enumerate(first):
+        for j, token_b in enumerate(second):
+            if token_a == token_b:
+                table[i + 1][j + 1] = table[i][j] + 1
+            else:
+                table[i + 1][j + 1] = max(table[i][j + 1], table[i + 1][j])
+    return table[-1][-1]
+
+
+def random_pairs(rng, count, alphabet, max_length):
+    return [([rng.choice(alphabet) for _ in range(rng.randint(0, max_length))],
+             [rng.choice(alphabet) for _ in range(rng.randint(0, max_length))])
+            for _ in range(count)]
+
+
+class TestLevenshtein(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(42)
+        # Long sequences need more than one 64-bit word
+        self.pairs = (random_pairs(rng, 300, "abcd", 30)
+                      + random_pairs(rng, 20, ["x", "y", "zz"], 150))
+
+    def test_levenshtein(self):
+        for hyp, ref in self.pairs:
+            self.assertEqual(levenshtein(hyp, ref),
+                             pyter.edit_distance(hyp, ref))
+
+        self.assertEqual(list(levenshtein_batch(*zip(*self.pairs))),
+                         [levenshtein(hyp, ref) for hyp, ref in self.pairs])
+
+    def test_prefix_states(self):
+        for hyp, ref in self.pairs[:50]:
+            aligner = Aligner(ref)
+            states = aligner.prefix_states(hyp)
+            self.assertEqual(len(states), len(hyp) + 1)
+
+            for i, state in enumerate(states):
+                self.assertEqual(state[2], levenshtein(hyp[:i], ref))
+                self.assertEqual(aligner.resume(state, hyp[i:]),
+                                 levenshtein(hyp, ref))
+
+    def test_lcs_length(self):
+        for first, second in self.pairs:
+            self.assertEqual(lcs_length(first, second),
+                             lcs_reference(first, second))
+
+    def test_ter(self):
+        rng = random.Random(42)
+        pairs = random_pairs(rng, 200, "abcdef", 15)
+        # Rotated references to have long shifts
+        pairs += [(hyp, hyp[3:] + hyp[:3]) for hyp, _ in pairs]
+
+        for hyp, ref in pairs:
+            if ref:
+                self.assertEqual(ter(hyp, ref), pyter.ter(hyp, ref))
+
+    def test_wer(self):
+        self.assertEqual(WER([["a", "b", "c"], []], [["a", "c"], ["d"]]),
+                         2 / 3)
+        self.assertEqual(WER([["a"]], [["a"]]), 0.0)
+
+    def test_wer_empty_reference(self):
+        # The words inserted against an empty reference are not counted,
+        # as with the previous pyter-based implementation
+        self.assertEqual(WER.score_instance(["a", "b"], []), 0.0)
+        self.assertEqual(WER.score_instance([], ["a", "b"]), 2.0)
+        self.assertEqual(WER([["a", "b"], ["c"]], [[], ["d"]]), 1.0)
+
+    def test_edit_distance(self):
+        self.assertEqual(EditDistance([["abc"], []], [["abc"], []]), 0.0)
+        self.assertEqual(EditDistance([["abc"]], [["xyz"]]), 1.0)
+        # LCS "ac" of "abc" and "ac"
+        self.assertAlmostEqual(EditDistance([["abc"]], [["ac"]]), 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
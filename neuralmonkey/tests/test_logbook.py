@@ -0,0 +1,192 @@
+#!/usr/bin/env python3.5
+
+import os
+import tempfile
+import unittest
+
+from neuralmonkey.logbook import logbook
+from neuralmonkey.logbook.logbook import (
+    APP, ExperimentIndex, LogCache, render_log)
+
+LINES = ["\x1b[32m2018-01-01 00:00:00\x1b[0m Step {} <loss> & more\n".format(
+    i).encode("utf-8") for i in range(100)]
+
+
+class TestLogCache(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk_size = logbook.CHUNK_SIZE
+        logbook.CHUNK_SIZE = 500
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "experiment.log")
+        with open(self.path, "wb") as f_log:
+            f_log.write(b"".join(LINES[:50]))
+
+    def tearDown(self):
+        logbook.CHUNK_SIZE = self.chunk_size
+        self.tmpdir.cleanup()
+
+    def append(self, content):
+        with open(self.path, "ab") as f_log:
+            f_log.write(content)
+
+    def test_tailing(self):
+        cache = LogCache()
+        start, end, _, rendered = cache.get(self.path)
+        self.assertEqual(start, 0)
+        self.assertEqual(end, os.path.getsize(self.path))
+        self.assertEqual(rendered, render_log(b"".join(LINES[:50])))
+
+        # An incomplete line is not returned until it is finished
+        self.append(b"".join(LINES[50:])[:-10])
+        start, end, _, new_lines = cache.get(self.path, end)
+        self.append(b"".join(LINES[50:])[-10:])
+        _, end, _, last_line = cache.get(self.path, end)
+
+        self.assertEqual(end, os.path.getsize(self.path))
+        self.assertEqual(rendered + new_lines + last_line,
+                         render_log(b"".join(LINES)))
+
+        # From the start, from a chunk boundary and from inside a chunk
+        for offset in [0, 10, len(b"".join(LINES[:40]))]:
+            part = cache.get(self.path, offset)
+            self.assertEqual((part.start, part.end, part.content),
+                             (offset, end, render_log(
+                                 b"".join(LINES)[offset:])))
+
+    def test_tail_cache(self):
+        cache = LogCache()
+        _, end, _, _ = cache.get(self.path)
+        cache.get(self.path, end)
+        cache.get(self.path, end)
+        self.assertEqual(len(cache._tails), 2)
+
+    def replace_log(self, content):
+        # The new file is created before the old one is removed, so it
+        # cannot get the same inode
+        new_path = self.path + ".new"
+        with open(new_path, "wb") as f_log:
+            f_log.write(content)
+        os.replace(new_path, self.path)
+
+    def test_replaced_file(self):
+        cache = LogCache()
+        _, end, _, _ = cache.get(self.path)
+
+        self.replace_log(LINES[0])
+
+        part = cache.get(self.path, end)
+        self.assertEqual((part.start, part.end, part.content),
+                         (0, len(LINES[0]), render_log(LINES[0])))
+
+    def test_replaced_longer_file(self):
+        cache = LogCache()
+        _, end, identity, _ = cache.get(self.path)
+
+        content = b"".join(reversed(LINES))
+        self.replace_log(content)
+
+        # The offset is valid in the new file, but the identity is not
+        start, new_end, new_identity, rendered = cache.get(
+            self.path, end, identity)
+        self.assertNotEqual(new_identity, identity)
+        self.assertEqual((start, new_end, rendered),
+                         (0, len(content), render_log(content)))
+
+        # The same file continues from the offset
+        self.assertEqual(
+            cache.get(self.path, new_end, new_identity).start, new_end)
+
+    def test_chunks_bounded(self):
+        cache = LogCache(max_files=2)
+        paths = [os.path.join(self.tmpdir.name, "{}.log".format(i))
+                 for i in range(3)]
+        for path in paths:
+            with open(path, "wb") as f_log:
+                f_log.write(b"".join(LINES))
+            cache.get(path)
+
+        self.assertEqual(list(cache._chunks), paths[1:])
+        self.assertEqual(cache.get(paths[0]).content,
+                         render_log(b"".join(LINES)))
+
+    def test_bytes_bounded(self):
+        rendered = render_log(b"".join(LINES))
+        cache = LogCache(max_bytes=2 * len(rendered))
+        paths = [os.path.join(self.tmpdir.name, "{}.log".format(i))
+                 for i in range(3)]
+        for path in paths:
+            with open(path, "wb") as f_log:
+                f_log.write(b"".join(LINES))
+            cache.get(path)
+            self.assertLessEqual(cache.size, cache.max_bytes)
+
+        self.assertEqual(list(cache._chunks), paths[1:])
+        self.assertEqual(cache.size, sum(
+            len(html) for _, chunks in cache._chunks.values()
+            for _, _, html in chunks) + sum(
+                len(html) for _, html in cache._tails.values()))
+
+        # The evicted file is rendered again
+        self.assertEqual(cache.get(paths[0]).content, rendered)
+        self.assertEqual(list(cache._chunks), [paths[2], paths[0]])
+
+
+class TestExperimentIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = ExperimentIndex(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def create_experiment(self, name):
+        with open(os.path.join(self.tmpdir.name, name, "experiment.ini"),
+                  "w") as f_ini:
+            f_ini.write("[main]\n")
+
+    def test_refresh(self):
+        self.assertEqual(self.index.get(), [])
+
+        os.mkdir(os.path.join(self.tmpdir.name, "first"))
+        self.assertEqual(self.index.get(), [])
+
+        # The configuration is written after the directory is created
+        self.create_experiment("first")
+        self.assertEqual(self.index.get(), ["first"])
+
+        os.mkdir(os.path.join(self.tmpdir.name, "second"))
+        self.create_experiment("second")
+        self.assertEqual(sorted(self.index.get()), ["first", "second"])
+
+    def test_endpoints(self):
+        os.mkdir(os.path.join(self.tmpdir.name, "exp"))
+        self.create_experiment("exp")
+        with open(os.path.join(self.tmpdir.name, "exp", "experiment.log"),
+                  "wb") as f_log:
+            f_log.write(b"".join(LINES))
+
+        APP.config["logdir"] = self.tmpdir.name
+        client = APP.test_client()
+
+        self.assertIn(b"exp", client.get("/experiments").data)
+
+        response = client.get("/experiments/exp/experiment.log?offset=10")
+        self.assertEqual(response.headers["X-Log-Start"], "10")
+        self.assertEqual(response.headers["X-Log-End"],
+                         str(len(b"".join(LINES))))
+
+        identity = response.headers["X-Log-Id"]
+        response = client.get(
+            "/experiments/exp/experiment.log?offset=10&id=" + identity)
+        self.assertEqual(response.headers["X-Log-Start"], "10")
+
+        response = client.get(
+            "/experiments/exp/experiment.log?offset=10&id=other")
+        self.assertEqual(response.headers["X-Log-Start"], "0")
+
+
+if __name__ == "__main__":
+    unittest.main()
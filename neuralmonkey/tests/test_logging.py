@@ -0,0 +1,101 @@
+#!/usr/bin/env python3.5
+
+import io
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+from neuralmonkey.logging import AsyncWriter, Logging, debug, log_print
+
+
+class TestAsyncLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.stderr = sys.stderr
+        sys.stderr = io.StringIO()
+
+    def tearDown(self):
+        Logging.set_async(False)
+        if Logging.log_file is not None:
+            Logging.log_file.close()
+            Logging.log_file = None
+        sys.stderr = self.stderr
+        self.tmpdir.cleanup()
+
+    def read_log(self, name):
+        with open(os.path.join(self.tmpdir.name, name),
+                  encoding="utf-8") as f_log:
+            return f_log.read()
+
+    def test_order_and_flush(self):
+        Logging.set_async(True, max_lines=10)
+        Logging.set_log_file(os.path.join(self.tmpdir.name, "first.log"))
+        for i in range(100):
+            log_print("line {}".format(i))
+
+        # Switching the file writes the queued lines to the previous one
+        Logging.set_log_file(os.path.join(self.tmpdir.name, "second.log"))
+        log_print(12345)
+        Logging.flush()
+
+        lines = ["line {}\n".format(i) for i in range(100)]
+        self.assertEqual(self.read_log("first.log"), "".join(lines))
+        self.assertEqual(self.read_log("second.log"), "12345\n")
+        self.assertEqual(sys.stderr.getvalue(), "".join(lines) + "12345\n")
+
+    def test_close(self):
+        writer = AsyncWriter()
+        log_file = open(os.path.join(self.tmpdir.name, "closed.log"), "w")
+        for i in range(1000):
+            writer.write(log_file, str(i))
+        writer.close()
+        log_file.close()
+
+        self.assertEqual(len(self.read_log("closed.log").split()), 1000)
+
+        # After closing, the lines are written synchronously
+        writer.write(None, "after")
+        self.assertTrue(sys.stderr.getvalue().endswith("after\n"))
+
+    def test_writer_thread(self):
+        threads = []
+
+        class RecordingFile(io.StringIO):
+            def write(self, text):
+                threads.append(threading.current_thread())
+                return super().write(text)
+
+        Logging.set_async(True)
+        Logging.log_file = RecordingFile()
+        log_print("text")
+        Logging.flush()
+
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+
+class TestDebug(unittest.TestCase):
+
+    def setUp(self):
+        self.enabled_for = Logging.debug_enabled_for
+        self.stderr = sys.stderr
+        sys.stderr = io.StringIO()
+
+    def tearDown(self):
+        Logging.debug_enabled_for = self.enabled_for
+        sys.stderr = self.stderr
+
+    def test_labels(self):
+        Logging.debug_enabled_for = ["shown"]
+        debug("first", "shown")
+        debug("second", "hidden")
+
+        self.assertIn("first", sys.stderr.getvalue())
+        self.assertNotIn("second", sys.stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3.5
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.quantization import (
+    SCALE_SUFFIX, dequantize, dequantized_variable, quantize_int8,
+    read_quantized_variables)
+
+
+class TestQuantization(unittest.TestCase):
+
+    def setUp(self):
+        tf.reset_default_graph()
+        np.random.seed(1234)
+        self.value = np.random.uniform(-1, 1, [20, 5]).astype(np.float32)
+
+    def test_quantize_int8(self):
+        quantized, scale = quantize_int8(self.value)
+
+        self.assertEqual(quantized.dtype, np.int8)
+        self.assertEqual(scale.shape, (20, 1))
+        self.assertTrue(np.all(np.abs(quantized).max(axis=1) == 127))
+        self.assertTrue(np.allclose(dequantize(quantized, scale), self.value,
+                                    atol=scale.max() / 2 + 1e-7))
+
+    def test_quantize_zeros(self):
+        self.value[3] = 0
+        quantized, scale = quantize_int8(self.value)
+        self.assertTrue(np.all(quantized[3] == 0))
+        self.assertTrue(np.all(np.isfinite(scale)))
+
+    def test_quantize_vector(self):
+        with self.assertRaises(ValueError):
+            quantize_int8(self.value[0])
+
+    def test_dequantized_variable(self):
+        quantized, scale = quantize_int8(self.value)
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, "variables.data")
+
+        with tf.Graph().as_default():
+            stored = tf.Variable(quantized, name="matrix")
+            stored_scale = tf.Variable(scale, name="matrix" + SCALE_SUFFIX)
+            saver = tf.train.Saver([stored, stored_scale])
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                saver.save(sess, path)
+
+        storage = read_quantized_variables(path)
+        self.assertEqual(list(storage), ["matrix"])
+        self.assertEqual(storage["matrix"].dtype, tf.int8)
+        self.assertEqual(storage["matrix"].scale_shape, [20, 1])
+
+        value = dequantized_variable("matrix", storage["matrix"])
+        with tf.Session() as sess:
+            tf.train.Saver().restore(sess, path)
+            result = sess.run(value)
+
+        self.assertTrue(np.allclose(result, dequantize(quantized, scale)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,27 @@
 #!/usr/bin/env python3.5
 """Unit tests for readers"""
 
+import os
+import random
+import sys
 import unittest
 import tempfile
 import numpy as np
-
+from PIL import Image
+
+from neuralmonkey.processors.speech import SpeechFeaturesPreprocessor
+from neuralmonkey.readers.audio_reader import audio_reader
+from neuralmonkey.readers.image_reader import image_reader, imagenet_reader
+from neuralmonkey.readers.numpy_reader import (
+    from_file_list, from_shards, single_tensor)
+from neuralmonkey.readers.speech_features_reader import (
+    speech_features_reader)
 from neuralmonkey.readers.string_vector_reader import get_string_vector_reader
-from neuralmonkey.readers.plain_text_reader import T2TReader
+from neuralmonkey.readers.plain_text_reader import (
+    T2TReader, get_alnum_charset, t2t_tokenize_batch,
+    t2t_tokenized_text_reader)
+from neuralmonkey.writers.numpy_writer import NumpyShardWriter, write_shard
+from neuralmonkey.writers.plain_text_writer import t2t_detokenize
 
 STRING_INTS = """
 1   2 3
@@ -37,6 +52,41 @@ LIST_INTS_FINE = [np.array(row.strip().split(), dtype=np.int32)
                   for row in STRING_INTS_FINE.strip().split("\n")]
 
 
+# Characters of different Unicode categories, including the underscore and
+# digits and letters which are not ASCII
+T2T_CHARACTERS = "aZč0９Ⅻ²_ -!?.,\t\u00a0\u200b'\"€漢字ｶ\U0001d400\U0001f600"
+
+
+def _reference_t2t_tokenize(line, alnum_charset):
+    """The original character-by-character T2T tokenization."""
+    line = line.strip()
+
+    tokens = []
+    is_alnum = [ch in alnum_charset for ch in line]
+    current_token_start = 0
+
+    for pos in range(1, len(line)):
+        if is_alnum[pos] != is_alnum[pos - 1]:
+            token = line[current_token_start:pos]
+            if token != " " or current_token_start == 0:
+                tokens.append(token)
+            current_token_start = pos
+
+    tokens.append(line[current_token_start:])
+    return tokens
+
+
+def _reference_t2t_detokenize(sentence, alnum_charset):
+    """The original set-based T2T detokenization."""
+    is_alnum = [t[0] in alnum_charset for t in sentence]
+    ret = []
+    for i, token in enumerate(sentence):
+        if i > 0 and is_alnum[i - 1] and is_alnum[i]:
+            ret.append(" ")
+        ret.append(token)
+    return "".join(ret)
+
+
 def _make_file(from_var):
     tmpfile = tempfile.NamedTemporaryFile(mode="w+")
     tmpfile.write(from_var)
@@ -118,6 +168,227 @@ class TestT2TReader(unittest.TestCase):
         self.assertEqual(len(read), 1)
         self.assertSequenceEqual(read[0], gold_tokens)
 
+    def test_batches(self):
+        lines = ["line {}  -- {}".format(i, "x" * i) for i in range(10)]
+        tmpfile = _make_file("\n".join(lines) + "\n")
+
+        gold = t2t_tokenize_batch(lines)
+        for batch_size in [1, 3, 10, 100]:
+            reader = t2t_tokenized_text_reader(batch_size=batch_size)
+            self.assertEqual(list(reader([tmpfile.name])), gold)
+
+        tmpfile.close()
+
+    def test_empty_line(self):
+        self.assertEqual(t2t_tokenize_batch(["", "  \n"]), [[""], [""]])
+
+    def test_tokenize_parity(self):
+        alnum_charset = get_alnum_charset()
+        rng = random.Random(42)
+
+        lines = ["".join(rng.choice(T2T_CHARACTERS)
+                         for _ in range(rng.randint(1, 30)))
+                 for _ in range(2000)]
+        lines.append(T2T_CHARACTERS)
+        lines.append(" a b  c ")
+
+        tokenized = t2t_tokenize_batch(lines)
+        for line, tokens in zip(lines, tokenized):
+            self.assertEqual(
+                tokens, _reference_t2t_tokenize(line, alnum_charset),
+                msg=repr(line))
+
+    def test_all_characters(self):
+        # Every code point is classified the same way as by the charset
+        alnum_charset = get_alnum_charset()
+        rng = random.Random(0)
+
+        code_points = (list(range(0xd800))
+                       + list(range(0xe000, sys.maxunicode + 1)))
+        rng.shuffle(code_points)
+        line = "".join(chr(i) for i in code_points)
+
+        # Wrap the line in letters so that no whitespace is stripped
+        line = "a" + line + "a"
+        self.assertEqual(t2t_tokenize_batch([line])[0],
+                         _reference_t2t_tokenize(line, alnum_charset))
+
+    def test_detokenize_parity(self):
+        alnum_charset = get_alnum_charset()
+        rng = random.Random(7)
+
+        lines = ["".join(rng.choice(T2T_CHARACTERS)
+                         for _ in range(rng.randint(1, 30)))
+                 for _ in range(2000)]
+        sentences = [tokens for tokens in t2t_tokenize_batch(lines)
+                     if all(tokens)]
+
+        detokenized = list(t2t_detokenize(sentences))
+        for sentence, line in zip(sentences, detokenized):
+            self.assertEqual(
+                line, _reference_t2t_detokenize(sentence, alnum_charset))
+
+
+class TestImageReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.list_file = os.path.join(self.tmpdir.name, "images.txt")
+
+        rng = np.random.RandomState(0)
+        with open(self.list_file, "w") as f_list:
+            for i in range(12):
+                size = (rng.randint(10, 60), rng.randint(10, 60))
+                pixels = rng.randint(0, 256, size=size + (3,), dtype=np.uint8)
+                Image.fromarray(pixels).save(
+                    os.path.join(self.tmpdir.name, "{}.png".format(i)))
+                print("{}.png".format(i), file=f_list)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assert_same_images(self, get_reader):
+        expected = list(get_reader(num_threads=1, cache_dir=None)(
+            [self.list_file]))
+        cache_dir = os.path.join(self.tmpdir.name, "cache")
+
+        # Decoding in threads, creating the cache and reading from it
+        for _ in range(2):
+            reader = get_reader(num_threads=3, cache_dir=cache_dir)
+            images = list(reader([self.list_file, self.list_file]))
+            self.assertEqual(len(images), 2 * len(expected))
+
+            for image, expected_image in zip(images, expected + expected):
+                self.assertIs(type(image), np.ndarray)
+                self.assertEqual(image.dtype, expected_image.dtype)
+                self.assertTrue(np.array_equal(image, expected_image))
+
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_image_reader(self):
+        self.assert_same_images(lambda **kwargs: image_reader(
+            pad_w=32, pad_h=24, prefix=self.tmpdir.name, rescale_w=True,
+            rescale_h=True, keep_aspect_ratio=True, **kwargs))
+
+    def test_grayscale_float_reader(self):
+        self.assert_same_images(lambda **kwargs: image_reader(
+            pad_w=40, pad_h=20, channels=1, prefix=self.tmpdir.name,
+            mode="F", **kwargs))
+
+    def test_imagenet_reader(self):
+        self.assert_same_images(lambda **kwargs: imagenet_reader(
+            self.tmpdir.name, 16, 16, vgg_normalization=True, **kwargs))
+
+
+class TestNumpyShards(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        rng = np.random.RandomState(0)
+        self.arrays = [rng.rand(rng.randint(1, 6), 3).astype(np.float32)
+                       for _ in range(11)]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_shards(self):
+        prefix = os.path.join(self.tmpdir.name, "series")
+        with NumpyShardWriter(prefix, shard_size=4) as writer:
+            for arr in self.arrays:
+                writer.write(arr)
+
+        self.assertEqual(len(writer.paths), 3)
+        loaded = list(from_shards()(writer.paths))
+        self.assertEqual(len(loaded), len(self.arrays))
+        for arr, expected in zip(loaded, self.arrays):
+            self.assertIs(type(arr), np.ndarray)
+            self.assertTrue(np.array_equal(arr, expected))
+
+        with self.assertRaises(ValueError):
+            list(from_shards(shape=[2, 3])(writer.paths))
+
+    def test_no_partial_shard_on_error(self):
+        prefix = os.path.join(self.tmpdir.name, "series")
+        with self.assertRaises(RuntimeError):
+            with NumpyShardWriter(prefix, shard_size=4) as writer:
+                for arr in self.arrays[:6]:
+                    writer.write(arr)
+                raise RuntimeError("Interrupted")
+
+        # Only the complete shard is written
+        self.assertEqual(len(writer.paths), 1)
+        self.assertTrue(os.path.exists(writer.paths[0]))
+        self.assertFalse(os.path.exists(prefix + ".00001.npy"))
+
+    def test_npz_parity(self):
+        list_file = os.path.join(self.tmpdir.name, "list.txt")
+        with open(list_file, "w") as f_list:
+            for i, arr in enumerate(self.arrays[:3]):
+                np.savez(os.path.join(self.tmpdir.name, str(i)), arr[:1])
+                print(i, file=f_list)
+
+        shard = os.path.join(self.tmpdir.name, "shard.npy")
+        write_shard(shard, [arr[:1] for arr in self.arrays[:3]])
+
+        for arr, expected in zip(
+                from_shards(shape=[1, 3])([shard]),
+                from_file_list(self.tmpdir.name, [1, 3], ".npz")(
+                    [list_file])):
+            self.assertTrue(np.array_equal(arr, expected))
+
+    def test_mismatched_shapes(self):
+        with self.assertRaises(ValueError):
+            write_shard(os.path.join(self.tmpdir.name, "shard.npy"),
+                        [np.zeros((2, 3)), np.zeros((2, 4))])
+
+    def test_single_tensor(self):
+        path = os.path.join(self.tmpdir.name, "tensor.npy")
+        np.save(path, self.arrays[0])
+
+        tensor = single_tensor([path], memory_map=True)
+        self.assertIsInstance(tensor, np.memmap)
+        self.assertTrue(np.array_equal(tensor, self.arrays[0]))
+        self.assertTrue(np.array_equal(
+            single_tensor([path, path], memory_map=True),
+            np.concatenate([self.arrays[0], self.arrays[0]])))
+
+
+class TestSpeechFeaturesReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.list_files = ["tests/data/yesno/train.wavlist",
+                           "tests/data/yesno/test.wavlist"]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_reader(self):
+        preprocess = SpeechFeaturesPreprocessor(
+            feature_type="logfbank", delta_order=1, nfilt=20)
+        expected = [preprocess(audio) for audio in audio_reader(
+            "tests/data/yesno")(self.list_files)]
+
+        # Computing in processes, creating the stores and reading from them
+        for cache_dir in [None, self.tmpdir.name, self.tmpdir.name]:
+            reader = speech_features_reader(
+                "tests/data/yesno", feature_type="logfbank", delta_order=1,
+                num_workers=2, cache_dir=cache_dir, shard_size=3, nfilt=20)
+            features = list(reader(self.list_files))
+            self.assertEqual(len(features), len(expected))
+
+            for feature, expected_feature in zip(features, expected):
+                self.assertIs(type(feature), np.ndarray)
+                self.assertTrue(np.array_equal(feature, expected_feature))
+
+        self.assertEqual(len(os.listdir(self.tmpdir.name)), 2)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            speech_features_reader(audio_format="mp3")
+        with self.assertRaises(ValueError):
+            speech_features_reader(feature_type="plp")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3.5
+"""Unit tests for scoring the samples of the RL objective."""
+
+import unittest
+
+import numpy as np
+
+from neuralmonkey.evaluators.gleu import GLEUEvaluator
+from neuralmonkey.trainers.rl_trainer import ReinforceObjective
+from neuralmonkey.trainers.self_critical_objective import sentence_gleu
+from neuralmonkey.vocabulary import (
+    END_TOKEN_INDEX, PAD_TOKEN_INDEX, SPECIAL_TOKENS)
+
+WORDS = ["w{}".format(i) for i in range(20)]
+
+
+class FakeVocabulary:
+    index_to_word = SPECIAL_TOKENS + WORDS
+
+
+class FakeDecoder:
+    vocabulary = FakeVocabulary()
+
+
+def make_objective(reward_function, reward_on_indices, sample_size):
+    # The scoring does not need the decoder graph, so the objective is not
+    # constructed through its initializer
+    # pylint: disable=protected-access
+    objective = ReinforceObjective.__new__(ReinforceObjective)
+    objective._decoder = FakeDecoder()
+    objective.reward_function = reward_function
+    objective.reward_on_indices = reward_on_indices
+    objective.sample_size = sample_size
+    return objective
+
+
+def random_sentences(random, count, max_len, min_len=1):
+    """Sample sentences ended by </s> or <pad> and followed by any tokens.
+
+    The tokens of a sentence are distinct, because the evaluator does not
+    clip the counts of repeated n-grams (see ``test_repeated_n_grams``).
+    """
+    sentences = random.randint(
+        len(SPECIAL_TOKENS) + len(WORDS), size=(max_len + 2, count))
+    for i in range(count):
+        length = random.randint(min_len, max_len + 1)
+        sentences[:length, i] = len(SPECIAL_TOKENS) + random.choice(
+            len(WORDS), size=length, replace=False)
+        sentences[length, i] = random.choice(
+            [END_TOKEN_INDEX, PAD_TOKEN_INDEX])
+    return sentences
+
+
+class TestScoreSamples(unittest.TestCase):
+
+    def test_indices_match_evaluator(self):
+        random = np.random.RandomState(1234)
+        evaluator = GLEUEvaluator()
+
+        for sample_size in [1, 3]:
+            by_evaluator = make_objective(evaluator, False, sample_size)
+            by_indices = make_objective(sentence_gleu, True, sample_size)
+
+            for _ in range(20):
+                batch_size = random.randint(1, 6)
+                references = random_sentences(random, batch_size, 8)
+                hypotheses = random_sentences(
+                    random, batch_size * sample_size, 8, min_len=0)
+
+                expected = by_evaluator._score_samples(references, hypotheses)
+                rewards = by_indices._score_samples(references, hypotheses)
+
+                self.assertEqual(rewards.dtype, np.float32)
+                self.assertEqual(rewards.shape, (batch_size * sample_size,))
+                self.assertTrue(np.allclose(rewards, expected))
+
+    def test_repeated_n_grams(self):
+        by_evaluator = make_objective(GLEUEvaluator(), False, 1)
+        by_indices = make_objective(sentence_gleu, True, 1)
+
+        once = np.array([[4], [5], [END_TOKEN_INDEX], [PAD_TOKEN_INDEX]])
+        repeated = np.array([[4], [4], [4], [END_TOKEN_INDEX]])
+
+        # The unigram repeated in the hypothesis is matched once by both
+        self.assertAlmostEqual(
+            by_indices._score_samples(once, repeated)[0], 1 / 6)
+        self.assertAlmostEqual(
+            by_evaluator._score_samples(once, repeated)[0], 1 / 6)
+
+        # The index-based reward clips the matched counts, so the unigram
+        # repeated in the reference is matched once out of its six n-grams.
+        # The evaluator matches all of its occurrences, i.e. three n-grams.
+        self.assertAlmostEqual(
+            by_indices._score_samples(repeated, once)[0], 1 / 6)
+        self.assertAlmostEqual(
+            by_evaluator._score_samples(repeated, once)[0], .5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3.5
+
+import os.path
+import pickle
+import sys
+import unittest
+
+from neuralmonkey.evaluators.beer import BeerWrapper
+from neuralmonkey.evaluators.multeval import MultEvalWrapper
+from neuralmonkey.evaluators.scorer_daemon import (
+    ScorerDaemon, ScorerDaemonError)
+from neuralmonkey.tests.test_eval_wrappers import HYP, REF
+
+FAKE_SCORER = [sys.executable,
+               os.path.join(os.path.dirname(__file__), "fake_scorer.py")]
+
+
+class TestScorerDaemon(unittest.TestCase):
+
+    def test_reuse(self):
+        beer = BeerWrapper("beer", daemon=True, daemon_command=FAKE_SCORER)
+
+        self.assertAlmostEqual(beer([HYP, REF], [REF, REF]), 0.7)
+        pid = beer._daemon._process.pid
+        self.assertAlmostEqual(beer([HYP], [REF]), 0.4)
+        self.assertEqual(beer._daemon._process.pid, pid)
+        beer._daemon.close()
+
+    def test_restart(self):
+        beer = BeerWrapper("beer", daemon=True,
+                           daemon_command=FAKE_SCORER + ["--crash-after", "2"])
+
+        self.assertAlmostEqual(beer([HYP, REF], [REF, REF]), 0.7)
+        pid = beer._daemon._process.pid
+        self.assertAlmostEqual(beer([HYP, REF], [REF, REF]), 0.7)
+        self.assertNotEqual(beer._daemon._process.pid, pid)
+        beer._daemon.close()
+
+    def test_timeout(self):
+        daemon = ScorerDaemon(FAKE_SCORER + ["--hang"], "hanging", 0.5)
+        with self.assertRaises(ScorerDaemonError):
+            daemon.request(["EVAL ||| a ||| a"])
+        self.assertTrue(daemon.is_alive())
+        daemon.close()
+        self.assertFalse(daemon.is_alive())
+
+    def test_meteor(self):
+        meteor = MultEvalWrapper("multeval.sh", metric="meteor", daemon=True,
+                                 daemon_command=FAKE_SCORER)
+
+        # (2 + 4) matches out of (6 + 4) + (4 + 4) tokens
+        self.assertAlmostEqual(meteor([HYP, REF], [REF, REF]), 12 / 18)
+        meteor._daemon.close()
+
+    def test_meteor_only(self):
+        with self.assertRaises(ValueError):
+            MultEvalWrapper("multeval.sh", metric="bleu", daemon=True)
+
+    def test_pickle(self):
+        beer = BeerWrapper("beer", daemon=True, daemon_command=FAKE_SCORER)
+        beer([HYP], [REF])
+
+        copy = pickle.loads(pickle.dumps(beer))
+        self.assertIsNone(copy._daemon)
+        self.assertAlmostEqual(copy([HYP], [REF]), 0.4)
+
+        beer._daemon.close()
+        copy._daemon.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
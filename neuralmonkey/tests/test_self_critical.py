@@ -0,0 +1,121 @@
+#!/usr/bin/env python3.5
+"""Unit tests for the index-based rewards for self-critical training."""
+
+from collections import Counter
+from itertools import takewhile
+import unittest
+
+import numpy as np
+
+from neuralmonkey.trainers.self_critical_objective import (
+    sentence_bleu, sentence_gleu)
+from neuralmonkey.vocabulary import END_TOKEN_INDEX, PAD_TOKEN_INDEX
+
+
+def _tokens(indices):
+    return list(takewhile(
+        lambda i: i not in (END_TOKEN_INDEX, PAD_TOKEN_INDEX), indices))
+
+
+def _reference_counts(ref, hyp, n):
+    """Count matching n-grams of a single sentence pair using Counters."""
+    def n_grams(indices):
+        tokens = _tokens(indices)
+        return [tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+
+    ref_n_grams = n_grams(ref)
+    hyp_n_grams = n_grams(hyp)
+    matched = sum((Counter(ref_n_grams) & Counter(hyp_n_grams)).values())
+    return matched, len(hyp_n_grams), len(ref_n_grams)
+
+
+def _reference_bleu(ref, hyp):
+    matched, hyp_totals = [], []
+    for n in range(1, 5):
+        match, hyp_total, _ = _reference_counts(ref, hyp, n)
+        if n > 1:
+            match += 1
+            hyp_total += 1
+        matched.append(match)
+        hyp_totals.append(hyp_total)
+
+    if hyp_totals[0] == 0:
+        return 0.
+
+    precision = (np.prod(matched) / np.prod(hyp_totals)) ** .25
+    ref_len = len(_tokens(ref))
+    return np.min([1., np.exp(1 - ref_len / hyp_totals[0])]) * precision
+
+
+def _reference_gleu(ref, hyp):
+    counts = np.array([_reference_counts(ref, hyp, n) for n in range(1, 5)])
+    matched, hyp_total, ref_total = np.sum(counts, axis=0)
+    if hyp_total == 0 or ref_total == 0:
+        return 0.
+    return min(matched / hyp_total, matched / ref_total)
+
+
+class TestSentenceRewards(unittest.TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(1234)
+        self.batches = []
+        for _ in range(200):
+            batch_size = random.randint(1, 8)
+            vocab_size = random.choice([5, 10, 10 ** 6])
+            self.batches.append((
+                random.randint(0, vocab_size,
+                               size=(random.randint(1, 12), batch_size)),
+                random.randint(0, vocab_size,
+                               size=(random.randint(1, 12), batch_size))))
+
+    def test_identical(self):
+        sentence = np.array([[5], [6], [7], [8], [9], [END_TOKEN_INDEX]])
+        self.assertEqual(sentence_bleu(sentence, sentence)[0], 1.)
+        self.assertEqual(sentence_gleu(sentence, sentence)[0], 1.)
+
+    def test_empty_hypothesis(self):
+        refs = np.array([[5], [6], [END_TOKEN_INDEX]])
+        hyps = np.array([[END_TOKEN_INDEX], [0], [0]])
+        self.assertEqual(sentence_bleu(refs, hyps)[0], 0.)
+        self.assertEqual(sentence_gleu(refs, hyps)[0], 0.)
+
+    def test_end_stops_n_grams(self):
+        # Neither the end symbol nor the tokens after it are counted, even in
+        # sentences shorter than the n-gram order
+        refs = np.array([[5], [END_TOKEN_INDEX], [6], [7]])
+        hyps = np.array([[5], [END_TOKEN_INDEX], [8], [9]])
+        self.assertEqual(sentence_gleu(refs, hyps)[0], 1.)
+        self.assertEqual(sentence_bleu(refs, hyps)[0], 1.)
+
+        hyps = np.array([[5], [6], [END_TOKEN_INDEX], [0]])
+        self.assertAlmostEqual(sentence_gleu(refs, hyps)[0], 1 / 3)
+
+    def test_clipped_counts(self):
+        refs = np.array([[5], [6], [END_TOKEN_INDEX], [0]])
+        hyps = np.array([[5], [5], [5], [END_TOKEN_INDEX]])
+        # One matched unigram out of three unigrams, two bigrams and a trigram
+        self.assertAlmostEqual(sentence_gleu(refs, hyps)[0], 1 / 6)
+        # Reversed, the precision is 1/3 (one unigram out of two and one
+        # bigram) and the recall is 1/6
+        self.assertAlmostEqual(sentence_gleu(hyps, refs)[0], 1 / 6)
+
+    def test_bleu_against_reference(self):
+        for refs, hyps in self.batches:
+            expected = np.array(
+                [_reference_bleu(r, h) for r, h in zip(refs.T, hyps.T)],
+                dtype=np.float32)
+            self.assertTrue(np.array_equal(sentence_bleu(refs, hyps),
+                                           expected))
+
+    def test_gleu_against_reference(self):
+        for refs, hyps in self.batches:
+            expected = np.array(
+                [_reference_gleu(r, h) for r, h in zip(refs.T, hyps.T)],
+                dtype=np.float32)
+            self.assertTrue(np.array_equal(sentence_gleu(refs, hyps),
+                                           expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
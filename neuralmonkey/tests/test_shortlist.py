@@ -0,0 +1,113 @@
+#!/usr/bin/env python3.5
+"""Unit tests for the vocabulary shortlist."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.decoders.shortlist import Shortlist
+from neuralmonkey.vocabulary import Vocabulary
+
+LEXICAL_TABLE = """a\tA B
+b\tC X D
+c\tE
+"""
+
+
+class TestShortlist(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        tf.reset_default_graph()
+
+    @classmethod
+    def tearDownClass(cls):
+        tf.reset_default_graph()
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", delete=False) as f_table:
+            f_table.write(LEXICAL_TABLE)
+        self.table_path = f_table.name
+        self.vocabulary = Vocabulary(["F", "A", "B", "C", "D", "E"])
+
+    def tearDown(self):
+        os.remove(self.table_path)
+
+    def test_get_shortlist(self):
+        shortlist = Shortlist("shortlist", self.vocabulary, "source",
+                              self.table_path, frequent_words=5,
+                              candidates=2)
+        # The special tokens and F are the frequent words, X is not in the
+        # vocabulary, so it does not count to the limit of candidates
+        self.assertEqual(
+            shortlist.get_shortlist([["a", "x"], ["b", "a"]]).tolist(),
+            [0, 1, 2, 3, 4, 5, 6, 7, 8])
+        self.assertEqual(shortlist.get_shortlist([["c"]]).tolist(),
+                         [0, 1, 2, 3, 4, 9])
+
+    def test_special_tokens_always_included(self):
+        shortlist = Shortlist("shortlist", self.vocabulary, "source",
+                              self.table_path, frequent_words=0)
+        self.assertEqual(shortlist.get_shortlist([["b"]]).tolist(),
+                         [0, 1, 2, 3, 7, 8])
+
+    def test_expand_logits(self):
+        shortlist = Shortlist("shortlist", self.vocabulary, "source",
+                              self.table_path, frequent_words=0)
+        logits = tf.placeholder(tf.float32, [None, None])
+        expanded = shortlist.expand_logits(logits)
+
+        ids = np.array([0, 1, 2, 3, 7, 8])
+        short_logits = np.arange(12, dtype=np.float32).reshape([2, 6])
+
+        with tf.Session() as sess:
+            result = sess.run(expanded, {shortlist.ids: ids,
+                                         logits: short_logits})
+
+        self.assertEqual(result.shape, (2, len(self.vocabulary)))
+        self.assertTrue(np.array_equal(result[:, ids], short_logits))
+        self.assertTrue(np.all(result[:, [4, 5, 6, 9]] == -1e9))
+
+    def test_expand_time_major_logits(self):
+        shortlist = Shortlist("shortlist", self.vocabulary, "source",
+                              self.table_path, frequent_words=0)
+        logits = tf.placeholder(tf.float32, [None, None, None])
+        expanded = shortlist.expand_logits(logits)
+
+        ids = np.array([0, 1, 2, 3, 7, 8])
+        short_logits = np.arange(36, dtype=np.float32).reshape([3, 2, 6])
+
+        with tf.Session() as sess:
+            result = sess.run(expanded, {shortlist.ids: ids,
+                                         logits: short_logits})
+
+        self.assertEqual(result.shape, (3, 2, len(self.vocabulary)))
+        self.assertTrue(np.array_equal(result[:, :, ids], short_logits))
+
+    def test_word_ids(self):
+        shortlist = Shortlist("shortlist", self.vocabulary, "source",
+                              self.table_path, frequent_words=0)
+        positions = tf.placeholder(tf.int64, [None])
+        word_ids = shortlist.word_ids(positions)
+
+        ids = shortlist.get_shortlist([["b"]])
+        with tf.Session() as sess:
+            result = sess.run(word_ids, {shortlist.ids: ids,
+                                         positions: [0, 2, 4, 5]})
+
+        self.assertEqual(result.dtype, np.int64)
+        # The special tokens keep their indices
+        self.assertEqual(result.tolist(), [0, 2, 7, 8])
+
+    def test_invalid_candidates(self):
+        with self.assertRaises(ValueError):
+            Shortlist("shortlist", self.vocabulary, "source",
+                      self.table_path, candidates=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
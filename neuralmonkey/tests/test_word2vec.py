@@ -0,0 +1,116 @@
+#!/usr/bin/env python3.5
+
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from neuralmonkey.util.word2vec import (
+    Word2Vec, get_word2vec_initializer, write_word2vec)
+from neuralmonkey.vocabulary import SPECIAL_TOKENS
+
+SAMPLE = "tests/data/sample.w2v"
+
+
+class PartitionInfo:
+
+    def __init__(self, full_shape, var_offset):
+        self.full_shape = full_shape
+        self.var_offset = var_offset
+
+
+def parse_reference(path):
+    """Parse the file line by line in double precision."""
+    with open(path, encoding="utf-8") as f_data:
+        next(f_data)
+        return [(fields[0], np.array([float(x) for x in fields[1:]]))
+                for fields in (line.split() for line in f_data)]
+
+
+class TestWord2Vec(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.expected = Word2Vec(SAMPLE)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assert_same(self, w2v):
+        self.assertEqual(w2v.vocabulary.index_to_word,
+                         self.expected.vocabulary.index_to_word)
+        self.assertTrue(np.array_equal(w2v.embeddings,
+                                       self.expected.embeddings))
+
+    def test_text(self):
+        embeddings = self.expected.embeddings
+        self.assertEqual(embeddings.dtype, np.float32)
+
+        reference = parse_reference(SAMPLE)
+        words = [word for word, _ in reference if word not in SPECIAL_TOKENS]
+        self.assertEqual(embeddings.shape,
+                         (len(SPECIAL_TOKENS) + len(words), 5))
+        self.assertTrue(np.array_equal(embeddings[:2], np.zeros((2, 5))))
+
+        index_to_word = self.expected.vocabulary.index_to_word
+        for word, vector in reference:
+            self.assertTrue(np.array_equal(
+                embeddings[index_to_word.index(word)],
+                vector.astype(np.float32)))
+
+    def test_write(self):
+        words = self.expected.vocabulary.index_to_word
+        for binary in [False, True]:
+            path = os.path.join(self.tmpdir.name, "embeddings")
+            with open(path, "wb") as f_out:
+                write_word2vec(f_out, words, self.expected.embeddings,
+                               binary=binary)
+            self.assert_same(Word2Vec(path, binary=binary))
+
+    def test_cache(self):
+        for _ in range(2):
+            w2v = Word2Vec(SAMPLE, cache_dir=self.tmpdir.name)
+            self.assert_same(w2v)
+        self.assertIsInstance(w2v.embeddings, np.memmap)
+        self.assertEqual(len(os.listdir(self.tmpdir.name)), 2)
+
+    def test_missing_unknown(self):
+        f_out = io.BytesIO()
+        write_word2vec(f_out, ["a"], np.ones((1, 2)))
+        path = os.path.join(self.tmpdir.name, "embeddings")
+        with open(path, "wb") as f_file:
+            f_file.write(f_out.getvalue())
+
+        with self.assertRaises(ValueError):
+            Word2Vec(path)
+
+    def test_invalid_number(self):
+        path = os.path.join(self.tmpdir.name, "embeddings")
+        with open(path, "w", encoding="utf-8") as f_file:
+            f_file.write("2 2\n<unk> 0.1 0.2\nword 0.3 O.4\n")
+
+        with self.assertRaisesRegex(ValueError, "O.4"):
+            Word2Vec(path)
+
+    def test_initializer(self):
+        init = get_word2vec_initializer(self.expected)
+        embeddings = self.expected.embeddings
+        rows = embeddings.shape[0]
+
+        matrix = init(list(embeddings.shape))
+        self.assertTrue(np.shares_memory(matrix, embeddings))
+        self.assertTrue(np.array_equal(matrix, embeddings))
+
+        part = init([rows - 10, 5], partition_info=PartitionInfo(
+            list(embeddings.shape), [10, 0]))
+        self.assertTrue(np.shares_memory(part, embeddings))
+        self.assertTrue(np.array_equal(part, embeddings[10:]))
+
+        with self.assertRaises(ValueError):
+            init([rows, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
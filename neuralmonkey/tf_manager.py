@@ -6,21 +6,22 @@ variables.
 
 """
 # pylint: disable=unused-import
-from typing import Any, List, Union, Optional, Set, Sequence
+from typing import (
+    Any, Dict, Iterator, List, Union, Optional, Set, Sequence, Tuple)
 # pylint: enable=unused-import
 
 import os
+import sys
 
 import numpy as np
 import tensorflow as tf
-# pylint: disable=no-name-in-module
-from tensorflow.python import debug as tf_debug
-# pylint: enable=no-name-in-module
 from typeguard import check_argument_types
 
-from neuralmonkey.logging import log
+from neuralmonkey.logging import log, warn
 from neuralmonkey.dataset import Dataset
+from neuralmonkey.distributed import get_worker_context
 from neuralmonkey.model.feedable import Feedable
+from neuralmonkey.quantization import load_dequantized
 from neuralmonkey.runners.base_runner import (
     FeedDict, ExecutionResult, GraphExecutor)
 
@@ -75,14 +76,33 @@ class TensorFlowManager:
         self.minimize_metric = minimize_metric
         self.num_sessions = num_sessions
 
-        self.sessions = [tf.Session(config=self.session_cfg)
+        # When running as a worker of a data-parallel training cluster, the
+        # sessions connect to the local server of the worker.
+        target = ""
+        worker_context = get_worker_context()
+        if worker_context is not None:
+            if self.num_sessions != 1:
+                raise ValueError("Data-parallel training supports only a "
+                                 "single session per worker")
+            target = worker_context.server.target
+            # pylint: disable=no-member
+            self.session_cfg.device_filters.extend(
+                worker_context.device_filters)
+            # pylint: enable=no-member
+
+        self.sessions = [tf.Session(target, config=self.session_cfg)
                          for _ in range(self.num_sessions)]
 
         if enable_tf_debug:
+            # Importing the debugger is slow, so it is imported only when used.
+            # pylint: disable=no-name-in-module
+            from tensorflow.python import debug as tf_debug
+            # pylint: enable=no-name-in-module
             self.sessions = [tf_debug.LocalCLIDebugWrapperSession(sess)
                              for sess in self.sessions]
 
         self.saver = None
+        self._saved_variables = []  # type: List[tf.Variable]
 
         self.best_score_index = None  # type: Optional[int]
         self.best_score_epoch = 0
@@ -191,7 +211,8 @@ class TensorFlowManager:
                 runners: Sequence[GraphExecutor],
                 train: bool = False,
                 compute_losses: bool = True,
-                summaries: bool = True) -> List[ExecutionResult]:
+                summaries: bool = True,
+                feed_dict: FeedDict = None) -> List[ExecutionResult]:
         """Execute runners on a batch of data.
 
         First, extract executables from the provided runners, telling the
@@ -206,12 +227,18 @@ class TensorFlowManager:
                  placeholders in model parts).
             compute_losses: Flag to runners whether run loss operations.
             summaries: Flag to runners whether to run summary operations.
+            feed_dict: A precomputed feed dictionary for the batch (e.g. from
+                a `FeedDictCache`). When not provided, it is created from the
+                feedables.
 
         Returns:
             A list of `ExecutionResult` tuples, one for each executable
             (runner).
         """
-        default_feed_dict = _feed_dicts(batch, feedables, train=train)
+        if feed_dict is None:
+            default_feed_dict = _feed_dicts(batch, feedables, train=train)
+        else:
+            default_feed_dict = feed_dict
 
         executables = [runner.get_executable(compute_losses=compute_losses,
                                              summaries=summaries,
@@ -257,9 +284,39 @@ class TensorFlowManager:
 
         for sess, file_name in zip(self.sessions, variable_files):
             log("Loading variables from {}".format(file_name))
-            self.saver.restore(sess, file_name)
+            self._restore_session(sess, file_name)
             log("Variables loaded from {}".format(file_name))
 
+    def _restore_session(self, session: tf.Session, file_name: str) -> None:
+        """Restore the variables of a session from a checkpoint.
+
+        Variables which are quantized in the checkpoint but have the full
+        precision in the model are dequantized before loading them to the
+        session. The rest of the variables is restored using the saver.
+        """
+        reader = tf.train.NewCheckpointReader(file_name)
+        checkpoint_dtypes = reader.get_variable_to_dtype_map()
+
+        dequantized = [
+            var for var in self._saved_variables
+            if checkpoint_dtypes.get(var.op.name, var.dtype.base_dtype)
+            != var.dtype.base_dtype]
+
+        if not dequantized:
+            self.saver.restore(session, file_name)
+            return
+
+        log("Dequantizing {} variables".format(len(dequantized)))
+        dequantized_names = set(var.op.name for var in dequantized)
+        with session.graph.as_default():
+            saver = tf.train.Saver(var_list=[
+                var for var in self._saved_variables
+                if var.op.name not in dequantized_names])
+        saver.restore(session, file_name)
+
+        for var in dequantized:
+            var.load(load_dequantized(reader, var.op.name), session)
+
     def restore_best_vars(self) -> None:
         assert self.best_score_index is not None
         self.restore(self.variables_files[self.best_score_index])
@@ -268,13 +325,18 @@ class TensorFlowManager:
         log("Initializing variables")
         init_op = tf.global_variables_initializer()
         init_tables = tf.tables_initializer()
+        worker_context = get_worker_context()
         for sess in self.sessions:
-            sess.run([init_op, init_tables])
+            if worker_context is not None:
+                worker_context.initialize_session(sess, init_op, init_tables)
+            else:
+                sess.run([init_op, init_tables])
 
         log("Initializing tf.train.Saver")
+        self._saved_variables = [g for g in tf.global_variables()
+                                 if "reward_" not in g.name]
         self.saver = tf.train.Saver(max_to_keep=None,
-                                    var_list=[g for g in tf.global_variables()
-                                              if "reward_" not in g.name])
+                                    var_list=self._saved_variables)
 
     def initialize_model_parts(self, runners: Sequence[GraphExecutor]) -> None:
         """Initialize model parts variables from their checkpoints."""
@@ -302,5 +364,118 @@ def _feed_dicts(dataset: Dataset, coders: Set[Feedable], train: bool = False):
     return res
 
 
+class FeedDictCache:
+    """Cache of feed dictionaries of datasets which are run repeatedly.
+
+    The feed dictionaries of the batches of a dataset are created during the
+    first pass through the dataset and their values are converted to NumPy
+    arrays of the placeholder types, so they can be passed to the session as
+    they are. The following passes through the same dataset with the same
+    feedables reuse them. This is meant for validation data which does not
+    change during the training and is always fed with the train mode off.
+
+    When the cached feed dictionaries would exceed the maximum size, the
+    dataset which did not fit is not cached at all.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """Create a new cache.
+
+        Arguments:
+            max_size: The maximum total size of the cached values in bytes.
+        """
+        check_argument_types()
+        self.max_size = max_size
+        self.size = 0
+
+        self._entries = \
+            {}  # type: Dict[Tuple, List[Tuple[Dataset, FeedDict]]]
+        self._rejected = set()  # type: Set[Tuple]
+
+    def batches(self, dataset: Dataset,
+                feedables: Set[Feedable]) -> Iterator[Tuple[Dataset,
+                                                            FeedDict]]:
+        """Iterate over the batches of a dataset with their feed dicts.
+
+        Arguments:
+            dataset: The dataset to feed. It is expected not to change
+                between calls.
+            feedables: The feedables which get the data.
+
+        Yields:
+            Tuples of a batch and the feed dictionary for the batch.
+        """
+        key = (dataset, frozenset(feedables))  # type: Tuple
+
+        if key in self._entries:
+            yield from self._entries[key]
+            return
+
+        caching = key not in self._rejected
+        entries = []  # type: List[Tuple[Dataset, FeedDict]]
+        entries_size = 0
+
+        for batch in dataset.batches():
+            feed_dict = _feed_dicts(batch, feedables, train=False)
+
+            if caching:
+                feed_dict = {plc: _to_feed_value(plc, val)
+                             for plc, val in feed_dict.items()}
+                entries_size += _batch_size(batch) + sum(
+                    _feed_value_size(val) for val in feed_dict.values())
+
+                if self.size + entries_size > self.max_size:
+                    warn("Feed dictionaries of dataset '{}' exceed the cache "
+                         "size limit, not caching them.".format(dataset.name))
+                    caching = False
+                    entries = []
+                    self._rejected.add(key)
+                else:
+                    entries.append((batch, feed_dict))
+
+            yield batch, feed_dict
+
+        if caching:
+            self._entries[key] = entries
+            self.size += entries_size
+
+    def clear(self) -> None:
+        self._entries = {}
+        self._rejected = set()
+        self.size = 0
+
+
+def _to_feed_value(placeholder: Any, value: Any) -> Any:
+    """Convert a value to the array a session would feed the placeholder."""
+    if isinstance(value, np.ndarray) or not isinstance(placeholder, tf.Tensor):
+        return value
+
+    try:
+        return np.asarray(value, dtype=placeholder.dtype.as_numpy_dtype)
+    except (TypeError, ValueError):
+        return value
+
+
+def _feed_value_size(value: Any) -> int:
+    """Estimate the memory occupied by a feed dictionary value."""
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return value.nbytes + sum(sys.getsizeof(item)
+                                      for item in value.flat)
+        return value.nbytes
+    return sys.getsizeof(value)
+
+
+def _batch_size(batch: Dataset) -> int:
+    """Estimate the memory occupied by the data series of a batch."""
+    size = 0
+    for name in batch.series:
+        for item in batch.get_series(name):
+            size += sys.getsizeof(item)
+            if isinstance(item, (list, tuple)):
+                size += sum(sys.getsizeof(token) for token in item)
+    return size
+
+
 def get_default_tf_manager() -> TensorFlowManager:
     return TensorFlowManager(num_sessions=1, num_threads=4)
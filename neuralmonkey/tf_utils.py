@@ -4,6 +4,7 @@ import numpy as np
 import tensorflow as tf
 
 from neuralmonkey.logging import debug, debug_enabled
+from neuralmonkey.quantization import dequantized_variable
 
 # pylint: disable=invalid-name
 ShapeSpec = List[int]
@@ -36,18 +37,29 @@ def get_variable(name: str,
                  shape: ShapeSpec = None,
                  dtype: tf.DType = None,
                  initializer: Callable = None,
-                 **kwargs) -> tf.Variable:
+                 **kwargs) -> Union[tf.Variable, tf.Tensor]:
     """Get an existing variable with these parameters or create a new one.
 
     This is a wrapper around `tf.get_variable`. The `initializer` parameter is
     treated as a default which can be overriden by a call to
     `update_initializers`.
 
+    If the experiment loads a quantized checkpoint, the variable is stored
+    with the reduced precision of the checkpoint and a dequantized tensor is
+    returned instead of the variable (see ``neuralmonkey.quantization``).
+
     This should only be called during model building.
     """
+    initializer = get_initializer(name, initializer)
+
+    scope_name = tf.get_variable_scope().name
+    full_name = scope_name + "/" + name if scope_name else name
+    storage = _get_current_experiment().get_quantized_storage(full_name)
+    if storage is not None:
+        return dequantized_variable(name, storage)
+
     return tf.get_variable(
-        name=name, shape=shape, dtype=dtype,
-        initializer=get_initializer(name, initializer),
+        name=name, shape=shape, dtype=dtype, initializer=initializer,
         **kwargs)
 
 
@@ -82,11 +94,14 @@ def get_shape_list(x: tf.Tensor) -> List[Union[int, tf.Tensor]]:
     return ret
 
 
-def get_state_shape_invariants(state: tf.Tensor) -> tf.TensorShape:
+def get_state_shape_invariants(
+        state: Union[tf.Tensor, tf.TensorArray]) -> tf.TensorShape:
     """Return the shape invariant of a tensor.
 
     This function computes the loosened shape invariant of a state tensor.
     Only invariant dimension is the state size dimension, which is the last.
+    A ``TensorArray`` is passed through the loop as its (scalar) flow tensor
+    so its shape invariant is left unspecified.
 
     Based on tensor2tensor.
 
@@ -97,6 +112,9 @@ def get_state_shape_invariants(state: tf.Tensor) -> tf.TensorShape:
         A ``TensorShape`` object with all but the last dimensions set to
         ``None``.
     """
+    if isinstance(state, tf.TensorArray):
+        return tf.TensorShape(None)
+
     shape = state.shape.as_list()
     for i in range(0, len(shape) - 1):
         shape[i] = None
@@ -131,6 +149,69 @@ def gather_flat(x: tf.Tensor,
     return tf.reshape(gathered, [-1] + shape[2:])
 
 
+def tile_batch(x: tf.Tensor,
+               multiple: Union[int, tf.Tensor],
+               dim: int = 0) -> tf.Tensor:
+    """Copy each batch item of a tensor ``multiple`` times.
+
+    The copies of a single item are placed next to each other, i.e. for
+    a batch ``[a, b]`` and ``multiple`` 2 the result is ``[a, a, b, b]``. This
+    is the same layout as used by the beam search decoder.
+
+    Arguments:
+        x: The ``Tensor`` to tile.
+        multiple: Number of copies of each batch item.
+        dim: The batch dimension of ``x``.
+
+    Returns:
+        The tiled tensor.
+    """
+    if x.shape.ndims == 0 or (isinstance(multiple, int) and multiple == 1):
+        return x
+
+    orig_shape = get_shape_list(x)
+    orig_shape[dim] *= multiple
+    tile_shape = [1] * (len(orig_shape) + 1)
+    tile_shape[dim + 1] = multiple
+
+    tiled = tf.tile(tf.expand_dims(x, dim + 1), tile_shape)
+    return tf.reshape(tiled, orig_shape)
+
+
+def group_copies(x: tf.Tensor,
+                 batch_size: Union[int, tf.Tensor]) -> tf.Tensor:
+    """Group the copies of batch items in a tensor.
+
+    This function expects a tensor with first dimension of size *batch x
+    multiple* with the layout produced by ``tile_batch``, e.g. the decoder
+    states of the hypotheses in the beam search. The tensor is reshaped to
+    shape ``(batch, multiple, ...)``, so it can be broadcast against tensors
+    which are not tiled, e.g. the encoder states.
+
+    Arguments:
+        x: The ``Tensor`` to reshape.
+        batch_size: The original size of the batch.
+
+    Returns:
+        The reshaped tensor.
+    """
+    return tf.reshape(x, [batch_size, -1] + get_shape_list(x)[1:])
+
+
+def ungroup_copies(x: tf.Tensor) -> tf.Tensor:
+    """Merge the first two dimensions of a tensor.
+
+    This function is the inverse of ``group_copies``.
+
+    Arguments:
+        x: A ``Tensor`` of shape ``(batch, multiple, ...)``.
+
+    Returns:
+        The reshaped tensor of shape ``(batch * multiple, ...)``.
+    """
+    return tf.reshape(x, [-1] + get_shape_list(x)[2:])
+
+
 def partial_transpose(x: tf.Tensor, indices: List[int]) -> tf.Tensor:
     """Do a transpose on a subset of tensor dimensions.
 
@@ -219,14 +300,59 @@ def layer_norm(x: tf.Tensor, epsilon: float = 1e-6) -> tf.Tensor:
         return norm_x * gamma + beta
 
 
-def append_tensor(tensor: tf.Tensor, appendval: tf.Tensor) -> tf.Tensor:
+def append_tensor(
+        tensor: Union[tf.Tensor, tf.TensorArray],
+        appendval: tf.Tensor) -> Union[tf.Tensor, tf.TensorArray]:
     """Append an ``N``-D Tensor to an ``(N+1)``-D Tensor.
 
+    If the original tensor is a ``TensorArray``, the value is written at its
+    end. Unlike the concatenation, this does not copy the previous values, so
+    this is the preferred way of accumulating histories in a while loop (see
+    ``history_to_array``).
+
     Arguments:
-        tensor: The original Tensor
+        tensor: The original Tensor or TensorArray
         appendval: The Tensor to add
 
     Returns:
-        An ``(N+1)``-D Tensor with ``appendval`` on the last position.
+        An ``(N+1)``-D Tensor (or a TensorArray) with ``appendval`` on the
+        last position.
     """
+    if isinstance(tensor, tf.TensorArray):
+        return tensor.write(tensor.size(), appendval)
     return tf.concat([tensor, tf.expand_dims(appendval, 0)], 0)
+
+
+def history_to_array(history: tf.Tensor,
+                     infer_shape: bool = True) -> tf.TensorArray:
+    """Convert a time-major history tensor to a ``TensorArray``.
+
+    The array has a dynamic size and can be extended using ``append_tensor``
+    inside a while loop. After the loop, the history is converted back to a
+    tensor using ``array_to_history``.
+
+    Arguments:
+        history: A tensor of shape ``(time, ...)``, usually empty.
+        infer_shape: If false, the elements of the array can differ in their
+            first (batch) dimension. Such arrays cannot be stacked, only
+            concatenated.
+
+    Returns:
+        A ``TensorArray`` with the elements of the history.
+    """
+    array = tf.TensorArray(dtype=history.dtype, size=0, dynamic_size=True,
+                           infer_shape=infer_shape,
+                           element_shape=history.shape[1:])
+    return array.unstack(history)
+
+
+def array_to_history(
+        history: Union[tf.Tensor, tf.TensorArray]) -> tf.Tensor:
+    """Stack a ``TensorArray`` history into a time-major tensor.
+
+    Tensors are returned unchanged, so the function can be mapped over loop
+    states in which only some of the histories are ``TensorArray`` objects.
+    """
+    if isinstance(history, tf.TensorArray):
+        return history.stack()
+    return history
@@ -5,12 +5,15 @@ import neuralmonkey.checkpython
 # pylint: enable=unused-import, wrong-import-order
 
 import argparse
+import json
 import os
 import shlex
 from shutil import copyfile
 import sys
 import traceback
 
+from neuralmonkey.distributed import (
+    WorkerContext, launch_local_cluster, set_worker_context)
 from neuralmonkey.logging import log, debug
 from neuralmonkey.experiment import Experiment
 
@@ -34,8 +37,25 @@ def _main() -> None:
     parser.add_argument("-f", "--overwrite", action="store_true",
                         help="force overwriting the output directory; can be "
                         "used to start an experiment created with --init")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="number of local worker processes for "
+                        "synchronous data-parallel training")
+    parser.add_argument("--cluster", type=str, default=None,
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--task-index", type=int, default=0,
+                        help=argparse.SUPPRESS)
     args = parser.parse_args()
 
+    if args.workers < 1:
+        parser.error("The number of workers must be positive")
+
+    if args.cluster is None and args.workers > 1 and not args.init_only:
+        exit(launch_local_cluster(args.workers, sys.argv[1:]))
+
+    if args.cluster is not None:
+        set_worker_context(
+            WorkerContext(json.loads(args.cluster), args.task_index))
+
     args.config_changes.extend("vars.{}".format(s) for s in args.config_vars)
 
     exp = Experiment(config_path=args.config,
@@ -43,8 +63,9 @@ def _main() -> None:
                      train_mode=True,
                      overwrite_output_dir=args.overwrite)
 
-    with open(exp.get_path("args", exp.cont_index + 1), "w") as file:
-        print(" ".join(shlex.quote(a) for a in sys.argv), file=file)
+    if args.cluster is None or args.task_index == 0:
+        with open(exp.get_path("args", exp.cont_index + 1), "w") as file:
+            print(" ".join(shlex.quote(a) for a in sys.argv), file=file)
 
     if args.init_only:
         if exp.cont_index >= 0:
@@ -78,3 +99,7 @@ def main() -> None:
         log("Training interrupted by user.")
         debug(traceback.format_exc())
         exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,11 @@ import re
 import tensorflow as tf
 from typeguard import check_argument_types
 
+from neuralmonkey.dataset import Dataset
 from neuralmonkey.decorators import tensor
+from neuralmonkey.distributed import get_worker_context
 from neuralmonkey.logging import warn
-from neuralmonkey.model.feedable import Feedable
+from neuralmonkey.model.feedable import FeedDict, Feedable
 from neuralmonkey.runners.base_runner import GraphExecutor, NextExecute
 from neuralmonkey.trainers.objective import (
     Objective, Gradients, ObjectiveWeight)
@@ -192,7 +194,29 @@ class GenericTrainer(GraphExecutor, Feedable):
         """Construct the training op."""
         with tf.name_scope("trainer"):
             step = tf.train.get_or_create_global_step()
-            return self.optimizer.apply_gradients(self.gradients, step)
+
+            optimizer = self.optimizer
+            gradients = self.gradients
+            worker_context = get_worker_context()
+            if worker_context is not None:
+                optimizer = worker_context.sync_optimizer(optimizer)
+                # The shards of a batch can have different sizes
+                # pylint: disable=not-an-iterable
+                weight = worker_context.gradient_weight
+                gradients = [(weight * grad if grad is not None else None, var)
+                             for grad, var in gradients]
+                # pylint: enable=not-an-iterable
+
+            return optimizer.apply_gradients(gradients, step)
+
+    def feed_dict(self, dataset: Dataset, train: bool = True) -> FeedDict:
+        fd = super().feed_dict(dataset, train)
+
+        worker_context = get_worker_context()
+        if worker_context is not None and train:
+            fd[worker_context.gradient_weight] = worker_context.shard_weight
+
+        return fd
 
     @property
     def var_list(self) -> List[tf.Variable]:
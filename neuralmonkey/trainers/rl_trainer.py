@@ -1,6 +1,6 @@
 """Training objectives for reinforcement learning."""
 
-from typing import Callable
+from typing import Callable, List
 
 import numpy as np
 import tensorflow as tf
@@ -10,7 +10,7 @@ from neuralmonkey.decoders.decoder import Decoder
 from neuralmonkey.decorators import tensor
 from neuralmonkey.logging import warn
 from neuralmonkey.trainers.generic_trainer import Objective
-from neuralmonkey.vocabulary import END_TOKEN, PAD_TOKEN
+from neuralmonkey.vocabulary import END_TOKEN_INDEX, PAD_TOKEN_INDEX
 
 
 # pylint: disable=invalid-name
@@ -30,7 +30,8 @@ class ReinforceObjective(Objective[Decoder]):
                  temperature: float = 1.,
                  ce_smoothing: float = 0.,
                  alpha: float = 1.,
-                 sample_size: int = 1) -> None:
+                 sample_size: int = 1,
+                 reward_on_indices: bool = False) -> None:
         """Construct RL objective for training with sentence-level feedback.
 
         Depending on the options the objective corresponds to:
@@ -61,6 +62,14 @@ class ReinforceObjective(Objective[Decoder]):
         :param ce_smoothing: add cross-entropy with this coefficient to loss
         :param alpha: determines the shape of the normalized distribution
         :param temperature: the softmax temperature for sampling
+        :param reward_on_indices: the reward function is a vectorized function
+            on decoded indices of shape (time, batch) returning an array of
+            rewards (e.g. ``self_critical_objective.sentence_gleu``) instead
+            of an evaluator. Note that such functions do not join the BPE
+            units and may count repeated n-grams differently than the
+            evaluators. Otherwise, the samples are converted to tokens
+            and scored by the evaluator one by one in Python, which is much
+            slower for large batches and sample sizes.
         """
         check_argument_types()
         name = "{}_rl".format(decoder.name)
@@ -73,78 +82,79 @@ class ReinforceObjective(Objective[Decoder]):
         self.ce_smoothing = ce_smoothing
         self.alpha = alpha
         self.sample_size = sample_size
+        self.reward_on_indices = reward_on_indices
     # pylint: enable=too-many-arguments
 
+    def _postprocess(self, indices: np.ndarray) -> List[str]:
+        """Convert decoded indices to a list of tokens for the evaluator.
+
+        Parts of the sentence after generated <pad> or </s> are ignored.
+        BPE-postprocessing is also included.
+        """
+        stops = np.flatnonzero((indices == END_TOKEN_INDEX)
+                               | (indices == PAD_TOKEN_INDEX))
+        length = stops[0] if stops.size else len(indices)
+        tokens = [self.decoder.vocabulary.index_to_word[i]
+                  for i in indices[:length]]
+
+        # join BPEs, split on " " to prepare list for evaluator
+        return " ".join(tokens).replace("@@ ", "").split(" ")
+
+    def _score_samples(self, references: np.ndarray,
+                       hypotheses: np.ndarray) -> np.ndarray:
+        """Score all samples from the batch with the reward function.
+
+        :param references: indices of references, shape (time, batch)
+        :param hypotheses: indices of hypotheses, shape
+            (time, batch * sample_size), samples for the same reference are
+            next to each other
+        :return: an array of batch * sample_size float rewards
+        """
+        if self.reward_on_indices:
+            tiled_references = np.repeat(references, self.sample_size, axis=1)
+            return np.asarray(
+                self.reward_function(tiled_references, hypotheses),
+                dtype=np.float32)
+
+        refs_tokens = [self._postprocess(ref) for ref in references.T]
+        rewards = [
+            float(self.reward_function(
+                [self._postprocess(hyp)],
+                [refs_tokens[i // self.sample_size]]))
+            for i, hyp in enumerate(hypotheses.T)]
+
+        return np.array(rewards, dtype=np.float32)
+
     @tensor
     def loss(self) -> tf.Tensor:
 
         reference = self.decoder.train_inputs
 
-        def _score_with_reward_function(references: np.array,
-                                        hypotheses: np.array) -> np.array:
-            """Score (time, batch) arrays with sentence-based reward function.
-
-            Parts of the sentence after generated <pad> or </s> are ignored.
-            BPE-postprocessing is also included.
-
-            :param references: indices of references, shape (time, batch)
-            :param hypotheses: indices of hypotheses, shape (time, batch)
-            :return: an array of batch length with float rewards
-            """
-            rewards = []
-            for refs, hyps in zip(references.transpose(),
-                                  hypotheses.transpose()):
-                ref_seq = []
-                hyp_seq = []
-                for r_token in refs:
-                    token = self.decoder.vocabulary.index_to_word[r_token]
-                    if token in (END_TOKEN, PAD_TOKEN):
-                        break
-                    ref_seq.append(token)
-                for h_token in hyps:
-                    token = self.decoder.vocabulary.index_to_word[h_token]
-                    if token in (END_TOKEN, PAD_TOKEN):
-                        break
-                    hyp_seq.append(token)
-                # join BPEs, split on " " to prepare list for evaluator
-                refs_tokens = " ".join(ref_seq).replace("@@ ", "").split(" ")
-                hyps_tokens = " ".join(hyp_seq).replace("@@ ", "").split(" ")
-                reward = float(self.reward_function([hyps_tokens],
-                                                    [refs_tokens]))
-                rewards.append(reward)
-            return np.array(rewards, dtype=np.float32)
-
-        samples_rewards = []
-        samples_logprobs = []
-
-        for _ in range(self.sample_size):
-            # sample from logits
-            # decoded, shape (time, batch)
-            sample_loop_result = self.decoder.decoding_loop(
-                train_mode=False, sample=True, temperature=self.temperature)
-            sample_logits = sample_loop_result[0]
-            sample_decoded = sample_loop_result[3]
-
-            # rewards, shape (batch)
-            # simulate from reference
-            sample_reward = tf.py_func(_score_with_reward_function,
-                                       [reference, sample_decoded],
-                                       tf.float32)
-
-            # pylint: disable=invalid-unary-operand-type
-            word_logprobs = -tf.nn.sparse_softmax_cross_entropy_with_logits(
-                labels=sample_decoded, logits=sample_logits)
-
-            # sum word log prob to sentence log prob
-            # no masking here, since otherwise shorter sentences are preferred
-            sent_logprobs = tf.reduce_sum(word_logprobs, axis=0)
-
-            samples_rewards.append(sample_reward)   # sample_size x batch
-            samples_logprobs.append(sent_logprobs)  # sample_size x batch
-
-        # stack samples, sample_size x batch
-        samples_rewards_stacked = tf.stack(samples_rewards)
-        samples_logprobs_stacked = tf.stack(samples_logprobs)
+        # sample from logits, all samples are decoded in a single loop
+        # decoded, shape (time, batch * sample_size)
+        sample_logits, _, _, sample_decoded = self.decoder.decoding_loop(
+            train_mode=False, sample=True, temperature=self.temperature,
+            sample_size=self.sample_size)
+
+        # rewards, shape (batch * sample_size)
+        # simulate from reference
+        sample_rewards = tf.py_func(self._score_samples,
+                                    [reference, sample_decoded],
+                                    tf.float32)
+
+        # pylint: disable=invalid-unary-operand-type
+        word_logprobs = -tf.nn.sparse_softmax_cross_entropy_with_logits(
+            labels=sample_decoded, logits=sample_logits)
+
+        # sum word log prob to sentence log prob
+        # no masking here, since otherwise shorter sentences are preferred
+        sent_logprobs = tf.reduce_sum(word_logprobs, axis=0)
+
+        # unstack samples, sample_size x batch
+        samples_rewards_stacked = tf.transpose(
+            tf.reshape(sample_rewards, [-1, self.sample_size]))
+        samples_logprobs_stacked = tf.transpose(
+            tf.reshape(sent_logprobs, [-1, self.sample_size]))
 
         if self.subtract_baseline:
             # if specified, compute the average reward baseline
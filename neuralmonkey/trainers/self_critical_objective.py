@@ -6,9 +6,7 @@ reward of the train-time decoder output as a baseline in the update step.
 For more details see: https://arxiv.org/pdf/1612.00563.pdf
 """
 
-from typing import Callable, Iterable, Tuple, Optional
-from itertools import takewhile
-from collections import Counter
+from typing import Callable, Tuple, Optional
 
 import numpy as np
 import tensorflow as tf
@@ -17,7 +15,7 @@ from typeguard import check_argument_types
 from neuralmonkey.decoders.decoder import Decoder
 from neuralmonkey.decorators import tensor
 from neuralmonkey.trainers.generic_trainer import Objective
-from neuralmonkey.vocabulary import END_TOKEN_INDEX
+from neuralmonkey.vocabulary import END_TOKEN_INDEX, PAD_TOKEN_INDEX
 
 
 # pylint: disable=invalid-name
@@ -128,38 +126,29 @@ def sentence_bleu(references: np.ndarray,
     Computes sentence level BLEU on indices outputed by the decoder, i.e.
     whatever the decoder uses as a unit is used a token in the BLEU
     computation, ignoring the tokens may be sub-word units.
-    """
-
-    bleu_scores = []
-    for ref, hyp in zip(np.transpose(references),
-                        np.transpose(hypotheses)):
-        matched_counts = []
-        hyp_n_grams_counts = []
-
-        for n in range(1, 5):
-            matched, total, _ = _count_matching_n_grams(ref, hyp, n)
 
-            if n > 1:
-                matched += 1
-                total += 1
+    The scores for the whole batch are computed at once (see
+    ``_n_gram_statistics``).
+    """
+    matched, hyp_totals, ref_totals = _n_gram_statistics(
+        references, hypotheses)
+    ref_lengths = ref_totals[0]
 
-            matched_counts.append(matched)
-            hyp_n_grams_counts.append(total)
+    # smoothing of the higher order n-gram precisions
+    matched[1:] += 1
+    hyp_totals[1:] += 1
 
-        if hyp_n_grams_counts[0] == 0:
-            bleu_scores.append(0.)
-        else:
-            precision = (
-                np.prod(matched_counts) / np.prod(hyp_n_grams_counts)) ** .25
-            ref_len = sum(1 for _ in
-                          takewhile(lambda i: i != END_TOKEN_INDEX, ref))
-            brevity_penalty = np.min([
-                1., np.exp(1 - ref_len / hyp_n_grams_counts[0])])
+    bleu_scores = np.zeros(matched.shape[1])
+    nonempty = hyp_totals[0] > 0
 
-            bleu_scores.append(brevity_penalty * precision)
+    precision = (np.prod(matched[:, nonempty], axis=0)
+                 / np.prod(hyp_totals[:, nonempty], axis=0)) ** .25
+    brevity_penalty = np.minimum(
+        1., np.exp(1 - ref_lengths[nonempty] / hyp_totals[0, nonempty]))
+    bleu_scores[nonempty] = brevity_penalty * precision
 
-    assert all(0 <= s <= 1 for s in bleu_scores)
-    return np.array(bleu_scores, dtype=np.float32)
+    assert np.all((bleu_scores >= 0) & (bleu_scores <= 1))
+    return bleu_scores.astype(np.float32)
 
 
 def sentence_gleu(references: np.ndarray,
@@ -171,61 +160,143 @@ def sentence_gleu(references: np.ndarray,
     It is a minimum of precision and recall on 1- to 4-grams.
 
     It operates over the indices emitted by the decoder which are not
-    necessarily tokens (could be characters or subword units).
+    necessarily tokens (could be characters or subword units). The sentences
+    end before the first end or padding symbol, as in the tokens passed to
+    ``GLEUEvaluator`` by ``ReinforceObjective``. Unlike the evaluator, the
+    counts of the matched n-grams are clipped, i.e. an n-gram repeated in
+    the hypothesis more times than in the reference is matched only as many
+    times as it occurs in the reference. Empty hypotheses and empty
+    references get zero score.
+    """
+    matched, hyp_totals, ref_totals = _n_gram_statistics(
+        references, hypotheses)
+
+    matched_sum = np.sum(matched, axis=0)
+    hyp_sum = np.sum(hyp_totals, axis=0)
+    ref_sum = np.sum(ref_totals, axis=0)
+
+    gleu_scores = np.zeros(matched.shape[1])
+    nonempty = (hyp_sum > 0) & (ref_sum > 0)
+
+    precision = matched_sum[nonempty] / hyp_sum[nonempty]
+    recall = matched_sum[nonempty] / ref_sum[nonempty]
+
+    assert np.all((precision >= 0.) & (precision <= 1.))
+    assert np.all((recall >= 0.) & (recall <= 1.))
+
+    gleu_scores[nonempty] = np.minimum(precision, recall)
+    return gleu_scores.astype(np.float32)
+
+
+def _n_gram_statistics(references: np.ndarray,
+                       hypotheses: np.ndarray,
+                       max_order: int = 4) -> Tuple[np.ndarray, np.ndarray,
+                                                    np.ndarray]:
+    """Count the matching n-grams for a batch of sentences.
+
+    The n-grams are taken from the start of the sentence up to the first end
+    or padding symbol (see ``_num_n_grams``). The n-grams
+    of the whole batch are mapped to integer IDs at once by finding unique
+    rows of a matrix which has the sentence index in the first column and the
+    n-gram token indices in the others. The clipped counts of matching n-grams
+    are then computed using the counts of the IDs.
+
+    Arguments:
+        references: Indices of the references, shape (time, batch).
+        hypotheses: Indices of the hypotheses, shape (time, batch).
+        max_order: The maximum n-gram order.
+
+    Returns:
+        Integer arrays of matched n-grams, hypothesis n-grams and reference
+        n-grams, each of shape (max_order, batch).
     """
-    gleu_scores = []
+    refs = np.transpose(references)
+    hyps = np.transpose(hypotheses)
+    batch_size = refs.shape[0]
+
+    ref_totals = np.stack(
+        [_num_n_grams(refs, n) for n in range(1, max_order + 1)])
+    hyp_totals = np.stack(
+        [_num_n_grams(hyps, n) for n in range(1, max_order + 1)])
+    matched = np.zeros((max_order, batch_size), dtype=np.int64)
+
+    for n in range(1, max_order + 1):
+        ref_rows = _n_gram_rows(refs, ref_totals[n - 1], n)
+        hyp_rows = _n_gram_rows(hyps, hyp_totals[n - 1], n)
+
+        if ref_rows.shape[0] == 0 or hyp_rows.shape[0] == 0:
+            continue
 
-    for ref, hyp in zip(np.transpose(references),
-                        np.transpose(hypotheses)):
+        rows = np.concatenate([ref_rows, hyp_rows])
+        unique_keys, ids = np.unique(_pack_rows(rows), return_inverse=True)
+        num_ids = unique_keys.shape[0]
 
-        matched_counts = []
-        hyp_n_grams_counts = []
-        ref_n_grams_counts = []
+        # the sentence index of each unique n-gram
+        sentence_ids = np.zeros(num_ids, dtype=np.int64)
+        sentence_ids[ids] = rows[:, 0]
 
-        for n in range(1, 5):
-            matched, total_hyp, total_ref = _count_matching_n_grams(
-                ref, hyp, n)
-            matched_counts.append(matched)
-            hyp_n_grams_counts.append(total_hyp)
-            ref_n_grams_counts.append(total_ref)
+        ref_counts = np.bincount(ids[:ref_rows.shape[0]], minlength=num_ids)
+        hyp_counts = np.bincount(ids[ref_rows.shape[0]:], minlength=num_ids)
 
-        precision = np.sum(matched_counts) / np.sum(hyp_n_grams_counts)
-        recall = np.sum(matched_counts) / np.sum(ref_n_grams_counts)
+        matched[n - 1] = np.bincount(
+            sentence_ids, weights=np.minimum(ref_counts, hyp_counts),
+            minlength=batch_size).astype(np.int64)
 
-        assert 0. <= precision <= 1.0
-        assert 0. <= recall <= 1.0
+    return matched, hyp_totals, ref_totals
 
-        gleu_scores.append(min(precision, recall))
 
-    return np.array(gleu_scores, dtype=np.float32)
+def _num_n_grams(sentences: np.ndarray, order: int) -> np.ndarray:
+    """Get the number of n-grams of each sentence in the batch.
 
+    The sentences end before the first end or padding symbol, so none of the
+    counted n-grams contains these symbols.
+    """
+    is_end = ((sentences == END_TOKEN_INDEX)
+              | (sentences == PAD_TOKEN_INDEX))
+    lengths = np.where(np.any(is_end, axis=1), np.argmax(is_end, axis=1),
+                       sentences.shape[1])
+    return np.maximum(lengths - order + 1, 0).astype(np.int64)
+
+
+def _n_gram_rows(sentences: np.ndarray, num_n_grams: np.ndarray,
+                 order: int) -> np.ndarray:
+    """Get the first ``num_n_grams`` n-grams from each sentence in a batch.
 
-def _count_matching_n_grams(ref: np.ndarray,
-                            hyp: np.ndarray,
-                            n: int) -> Tuple[int, int, int]:
-    ref_counts = Counter()  # type: Counter
-    total_ref_n_grams = 0
-    for n_gram in _get_n_grams(ref, n):
-        ref_counts[str(n_gram)] += 1
-        total_ref_n_grams += 1
+    Returns:
+        An int array of shape (n_grams, order + 1) with the sentence index in
+        the first column and the n-gram in the rest.
+    """
+    batch_size, max_time = sentences.shape
+    num_windows = max_time - order + 1
+
+    if num_windows <= 0:
+        return np.zeros((0, order + 1), dtype=np.int64)
 
-    matched_n_grams = 0
-    total_hyp_n_grams = 0
-    hyp_n_grams = _get_n_grams(hyp, n)
-    for n_gram in hyp_n_grams:
-        n_gram_s = str(n_gram)
-        if ref_counts[n_gram_s] > 0:
-            matched_n_grams += 1
-            ref_counts[n_gram_s] -= 1
-        total_hyp_n_grams += 1
+    windows = np.stack([sentences[:, i:i + num_windows]
+                        for i in range(order)], axis=2)
+    valid = np.arange(num_windows)[None, :] < num_n_grams[:, None]
+    sentence_ids = np.broadcast_to(
+        np.arange(batch_size)[:, None], valid.shape)
 
-    assert matched_n_grams <= total_hyp_n_grams
-    assert matched_n_grams <= total_ref_n_grams
+    return np.concatenate(
+        [sentence_ids[valid][:, None], windows[valid]],
+        axis=1).astype(np.int64)
 
-    return matched_n_grams, total_hyp_n_grams, total_ref_n_grams
 
+def _pack_rows(rows: np.ndarray) -> np.ndarray:
+    """Map rows of non-negative integers to unique keys.
 
-def _get_n_grams(indices: np.ndarray, order: int) -> Iterable[np.ndarray]:
-    all_n_grams = [indices[i:i + order]
-                   for i in range(len(indices) - order + 1)]
-    return takewhile(lambda g: g[-1] != END_TOKEN_INDEX, all_n_grams)
+    When possible, each row is packed to a single 64-bit integer treating the
+    row as a number in the base given by the largest value in the matrix.
+    Otherwise, the rows are viewed as opaque byte strings, which is slower.
+    """
+    base = int(rows.max()) + 1
+    if base ** rows.shape[1] < 2 ** 63:
+        keys = np.zeros(rows.shape[0], dtype=np.int64)
+        for column in rows.T:
+            keys = keys * base + column
+        return keys
+
+    rows = np.ascontiguousarray(rows)
+    row_type = np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))
+    return rows.view(row_type)[:, 0]
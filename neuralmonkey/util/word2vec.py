@@ -3,60 +3,68 @@
 This module provides functionality needed to work with word2vec files.
 """
 
-from typing import Callable, List
+from typing import BinaryIO, Callable, List, Tuple
+import hashlib
+import json
+import mmap
+import os
+import tempfile
 
 import numpy as np
 from typeguard import check_argument_types
 
+from neuralmonkey.logging import log
 from neuralmonkey.vocabulary import Vocabulary, SPECIAL_TOKENS
 
+# Number of lines of a text file parsed at once
+TEXT_BLOCK_SIZE = 10000
 
-class Word2Vec:
-
-    def __init__(self, path: str, encoding: str = "utf-8") -> None:
-        """Load the word2vec file."""
-        check_argument_types()
-
-        # Create the vocabulary object, load the words and vectors from the
-        # file
 
-        words = []  # List[str]
-        embedding_vectors = []  # type: List[np.ndarray]
-
-        with open(path, encoding=encoding) as f_data:
+class Word2Vec:
 
-            header = next(f_data)
-            emb_size = int(header.split()[1])
+    def __init__(self,
+                 path: str,
+                 encoding: str = "utf-8",
+                 binary: bool = False,
+                 cache_dir: str = None) -> None:
+        """Load the word2vec file.
 
-            # Add zero embeddings for padding, start, and end token
-            embedding_vectors.append(np.zeros(emb_size))
-            embedding_vectors.append(np.zeros(emb_size))
-            embedding_vectors.append(np.zeros(emb_size))
-            # Add placeholder for embedding of the unknown symbol
-            embedding_vectors.append(None)
+        The embeddings are stored as float32. The special tokens of the
+        vocabulary get zero embeddings unless they are in the file, which
+        must contain the embedding of the unknown token.
 
-            for line in f_data:
-                fields = line.split()
-                word = fields[0]
-                vector = np.fromiter((float(x) for x in fields[1:]),
-                                     dtype=np.float)
+        Arguments:
+            path: Path to the word2vec file.
+            encoding: Encoding of the words in the file.
+            binary: Whether the file is in the binary word2vec format.
+            cache_dir: If given, the embedding matrix is saved in this
+                directory as a ``.npy`` file with a word list and later loads
+                of the same file memory-map it instead of parsing the file.
+        """
+        check_argument_types()
 
-                assert vector.shape[0] == emb_size
+        cache_prefix = None
+        if cache_dir is not None:
+            cache_prefix = _cache_prefix(cache_dir, path, [encoding, binary])
+            if os.path.exists(cache_prefix + ".npy"):
+                with open(cache_prefix + ".words", encoding="utf-8") as f_wl:
+                    words = [line.rstrip("\n") for line in f_wl]
+                self.vocab = Vocabulary(words)
+                self.embedding_matrix = np.load(cache_prefix + ".npy",
+                                                mmap_mode="r")
+                return
 
-                # Embedding of unknown token should be at index 3 to match the
-                # vocabulary implementation
-                if word in SPECIAL_TOKENS:
-                    embedding_vectors[SPECIAL_TOKENS.index(word)] = vector
-                else:
-                    words.append(word)
-                    embedding_vectors.append(vector)
+        if binary:
+            words, self.embedding_matrix = _load_binary(path, encoding)
+        else:
+            words, self.embedding_matrix = _load_text(path, encoding)
 
         self.vocab = Vocabulary(words)
 
-        assert embedding_vectors[3] is not None
-        assert emb_size is not None
-
-        self.embedding_matrix = np.stack(embedding_vectors)
+        if cache_prefix is not None:
+            _save_cache(cache_prefix, words, self.embedding_matrix)
+            log("Cached word2vec embeddings from '{}' in '{}.npy'".format(
+                path, cache_prefix))
 
     @property
     def vocabulary(self) -> Vocabulary:
@@ -69,20 +77,211 @@ class Word2Vec:
         return self.embedding_matrix
 
 
+class _EmbeddingMatrix:
+    """Collects the embeddings read from a file in a preallocated matrix.
+
+    Embedding of unknown token should be at index 3 to match the vocabulary
+    implementation, so the special tokens are put to their vocabulary indices
+    and the other words after them.
+    """
+
+    def __init__(self, count: int, emb_size: int) -> None:
+        # Zero embeddings for padding, start, and end token
+        self.matrix = np.zeros((count + len(SPECIAL_TOKENS), emb_size),
+                               dtype=np.float32)
+        self.words = []  # type: List[str]
+        self.has_unknown = False
+
+    def rows(self, words: List[str]) -> List[int]:
+        """Get the rows for the embeddings of the next words."""
+        rows = []
+        for word in words:
+            if word in SPECIAL_TOKENS:
+                rows.append(SPECIAL_TOKENS.index(word))
+                self.has_unknown |= word == SPECIAL_TOKENS[3]
+            else:
+                rows.append(len(SPECIAL_TOKENS) + len(self.words))
+                self.words.append(word)
+
+        if rows and max(rows) >= self.matrix.shape[0]:
+            raise ValueError("The word2vec file has more embeddings than its "
+                             "header says")
+        return rows
+
+    def finish(self) -> Tuple[List[str], np.ndarray]:
+        if not self.has_unknown:
+            raise ValueError("The word2vec file must contain the embedding "
+                             "of the unknown token '{}'".format(
+                                 SPECIAL_TOKENS[3]))
+        return self.words, self.matrix[:len(SPECIAL_TOKENS) + len(self.words)]
+
+
+def _load_text(path: str, encoding: str) -> Tuple[List[str], np.ndarray]:
+    """Load a word2vec file in the text format.
+
+    The numbers from a block of lines are parsed by a single call to numpy.
+    """
+    with open(path, encoding=encoding) as f_data:
+        header = next(f_data).split()
+        emb_size = int(header[1])
+        embeddings = _EmbeddingMatrix(int(header[0]), emb_size)
+
+        while True:
+            words = []
+            vectors = []
+            for line in f_data:
+                fields = line.split(maxsplit=1)
+                if not fields:
+                    continue
+                words.append(fields[0])
+                vectors.append(fields[1] if len(fields) > 1 else "")
+                if len(words) == TEXT_BLOCK_SIZE:
+                    break
+
+            if not words:
+                break
+
+            try:
+                values = np.array(" ".join(vectors).split(),
+                                  dtype=np.float32)
+            except ValueError as exc:
+                raise ValueError(
+                    "The word2vec file has an invalid number in the "
+                    "embeddings of the words from '{}' to '{}': {}".format(
+                        words[0], words[-1], exc))
+            if values.size != len(words) * emb_size:
+                raise ValueError("The word2vec file has an embedding of a "
+                                 "wrong size near the word '{}'".format(
+                                     words[0]))
+
+            embeddings.matrix[embeddings.rows(words)] = values.reshape(
+                len(words), emb_size)
+
+    return embeddings.finish()
+
+
+def _load_binary(path: str, encoding: str) -> Tuple[List[str], np.ndarray]:
+    """Load a word2vec file in the binary format.
+
+    After a text header with the number of words and the embedding size,
+    each word is followed by a space and its embedding as little-endian
+    float32 numbers, optionally followed by a newline.
+    """
+    with open(path, "rb") as f_data:
+        header = f_data.readline().split()
+        count, emb_size = int(header[0]), int(header[1])
+        embeddings = _EmbeddingMatrix(count, emb_size)
+        vector_bytes = 4 * emb_size
+
+        if count == 0:
+            return embeddings.finish()
+
+        data = mmap.mmap(f_data.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            pos = f_data.tell()
+            for _ in range(count):
+                while data[pos:pos + 1].isspace():
+                    pos += 1
+                end = data.find(b" ", pos)
+                if end < 0 or end + 1 + vector_bytes > len(data):
+                    raise ValueError("The word2vec file is truncated")
+
+                row, = embeddings.rows([data[pos:end].decode(encoding)])
+                embeddings.matrix[row] = np.frombuffer(
+                    data[end + 1:end + 1 + vector_bytes], dtype="<f4")
+                pos = end + 1 + vector_bytes
+        finally:
+            data.close()
+
+    return embeddings.finish()
+
+
+def _cache_prefix(cache_dir: str, path: str, config: List) -> str:
+    stat = os.stat(path)
+    key = json.dumps([os.path.abspath(path), stat.st_size, stat.st_mtime_ns,
+                      config])
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, "{}.{}".format(
+        os.path.basename(path), digest))
+
+
+def _save_cache(prefix: str, words: List[str], matrix: np.ndarray) -> None:
+    """Save the word list and the matrix, the matrix last and atomically."""
+    os.makedirs(os.path.dirname(prefix), exist_ok=True)
+    with open(prefix + ".words", "w", encoding="utf-8") as f_words:
+        for word in words:
+            print(word, file=f_words)
+
+    handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(prefix),
+                                        suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as f_matrix:
+            np.save(f_matrix, matrix)
+        os.replace(tmp_path, prefix + ".npy")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_word2vec(f_out: BinaryIO,
+                   words: List[str],
+                   embeddings: np.ndarray,
+                   binary: bool = False,
+                   encoding: str = "utf-8") -> None:
+    """Write embeddings in the word2vec format.
+
+    Arguments:
+        f_out: A file opened for writing in the binary mode.
+        words: The words, one for each row of the embeddings.
+        embeddings: The embedding matrix.
+        binary: Whether to use the binary word2vec format instead of text.
+        encoding: Encoding of the words.
+    """
+    if len(words) != embeddings.shape[0]:
+        raise ValueError("There are {} words, but {} embeddings".format(
+            len(words), embeddings.shape[0]))
+
+    f_out.write("{} {}\n".format(*embeddings.shape).encode(encoding))
+
+    if binary:
+        matrix = embeddings.astype("<f4", copy=False)
+        for word, vector in zip(words, matrix):
+            f_out.write(word.encode(encoding) + b" ")
+            f_out.write(vector.tobytes())
+            f_out.write(b"\n")
+        return
+
+    row_format = " ".join(["%.8f"] * embeddings.shape[1])
+    for word, vector in zip(words, embeddings):
+        f_out.write("{} {}\n".format(
+            word, row_format % tuple(vector)).encode(encoding))
+
+
 def get_word2vec_initializer(w2v: Word2Vec) -> Callable:
     """Create a word2vec initializer.
 
-    A higher-order function that can be called from configuration.
+    A higher-order function that can be called from configuration. The
+    initializer returns a view of the embedding matrix, or of its part when
+    it initializes a partition of a partitioned variable.
     """
     check_argument_types()
 
-    def init(shape: List[int], **kwargs) -> np.ndarray:
-        if shape != list(w2v.embeddings.shape):
+    def init(shape: List[int], partition_info=None, **kwargs) -> np.ndarray:
+        offsets = [0] * len(shape)
+        full_shape = shape
+        if partition_info is not None:
+            offsets = partition_info.var_offset
+            full_shape = partition_info.full_shape
+
+        if list(full_shape) != list(w2v.embeddings.shape):
             raise ValueError(
                 "Shapes of model and word2vec embeddings do not match. "
                 "Word2Vec shape: {}, Should have been: {}"
-                .format(w2v.embeddings.shape, shape))
-        return w2v.embeddings
+                .format(w2v.embeddings.shape, full_shape))
+
+        return np.asarray(w2v.embeddings[tuple(
+            slice(offset, offset + size)
+            for offset, size in zip(offsets, shape))])
 
     return init
 
@@ -1,6 +1,7 @@
-from typing import Iterator, Dict
+from typing import Iterator, Dict, List, Sequence
 import numpy as np
 from neuralmonkey.logging import log
+from neuralmonkey.readers.numpy_reader import shard_index_path
 
 
 def numpy_array_writer(path: str, data: np.ndarray) -> None:
@@ -15,3 +16,94 @@ def numpy_dict_writer(
 
     np.savez(path, **unbatched)
     log("Result saved as numpy data to '{}.npz'".format(path))
+
+
+def numpy_shard_writer(path: str, data: Sequence[np.ndarray]) -> None:
+    write_shard(path, data)
+    log("Result saved as a numpy shard to '{}'".format(path))
+
+
+def write_shard(path: str, arrays: Sequence[np.ndarray]) -> None:
+    """Pack a series of numpy arrays into a shard.
+
+    The arrays are concatenated along their first axis and saved to ``path``
+    in the ``.npy`` format, the offsets of the arrays are saved to the index
+    file next to it. The shard is read by
+    ``neuralmonkey.readers.numpy_reader.from_shards``.
+
+    Arguments:
+        path: The path to the shard.
+        arrays: Arrays of at least one dimension whose other dimensions are
+            the same.
+    """
+    if not arrays:
+        raise ValueError("Cannot write an empty shard '{}'".format(path))
+
+    for arr in arrays:
+        if arr.ndim < 1 or arr.shape[1:] != arrays[0].shape[1:]:
+            raise ValueError(
+                "Cannot concatenate arrays of shapes {} and {} in a shard"
+                .format(arrays[0].shape, arr.shape))
+
+    offsets = np.cumsum([0] + [len(arr) for arr in arrays], dtype=np.int64)
+
+    # Use file objects, np.save would append .npy to the index path
+    with open(path, "wb") as f_shard:
+        np.save(f_shard, np.concatenate(arrays))
+    with open(shard_index_path(path), "wb") as f_index:
+        np.save(f_index, offsets)
+
+
+class NumpyShardWriter:
+    """Writes a stream of numpy arrays into shards of a fixed size.
+
+    The shards are named ``<prefix>.00000.npy``, ``<prefix>.00001.npy`` and so
+    on, so they can be listed in a dataset configuration by a single pattern
+    in the right order.
+    """
+
+    def __init__(self, prefix: str, shard_size: int = 1000) -> None:
+        """Create a new shard writer.
+
+        Arguments:
+            prefix: The prefix of the shard paths.
+            shard_size: The number of arrays in each shard.
+        """
+        if shard_size < 1:
+            raise ValueError("Shard size must be positive")
+
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.paths = []  # type: List[str]
+        self._arrays = []  # type: List[np.ndarray]
+
+    def write(self, array: np.ndarray) -> None:
+        """Add an array, writing the shard when it is full."""
+        self._arrays.append(array)
+        if len(self._arrays) >= self.shard_size:
+            self._write_shard()
+
+    def close(self) -> List[str]:
+        """Write the last shard and return the paths of all the shards."""
+        if self._arrays:
+            self._write_shard()
+        return self.paths
+
+    def _write_shard(self) -> None:
+        path = "{}.{:05d}.npy".format(self.prefix, len(self.paths))
+        write_shard(path, self._arrays)
+        log("Shard of {} arrays saved to '{}'".format(
+            len(self._arrays), path))
+        self.paths.append(path)
+        self._arrays = []
+
+    def __enter__(self) -> "NumpyShardWriter":
+        """Return the writer itself."""
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+        """Write the last shard, unless the block raised an exception."""
+        if exc_type is not None:
+            self._arrays = []
+            return
+        self.close()
@@ -1,7 +1,7 @@
 from typing import Iterator, List, Any, Callable
 
 from neuralmonkey.logging import log
-from neuralmonkey.readers.plain_text_reader import ALNUM_CHARSET
+from neuralmonkey.readers.plain_text_reader import ALNUM_REGEX
 
 # pylint: disable=invalid-name
 # Writer: function that gets file and the data
@@ -15,8 +15,9 @@ def t2t_detokenize(data: Iterator[List[str]]) -> Iterator[str]:
     Method is inspired by tensor2tensor tokenizer.decode method:
     https://github.com/tensorflow/tensor2tensor/blob/v1.5.5/tensor2tensor/data_generators/tokenizer.py
     """
+    is_alnum_start = ALNUM_REGEX.match
     for sentence in data:
-        is_alnum = [t[0] in ALNUM_CHARSET for t in sentence]
+        is_alnum = [is_alnum_start(token) is not None for token in sentence]
         ret = []
         for i, token in enumerate(sentence):
             if i > 0 and is_alnum[i - 1] and is_alnum[i]:
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Measure the time of scoring a validation set with ChrF.
+
+The script generates a random validation set and reports the time of the
+first evaluation, which computes the statistics of the references, the time
+of the following evaluations with the cached references and, for
+comparison, the time of the reference implementation which scores each
+sentence separately with ``score_instance``.
+"""
+
+import argparse
+import random
+import time
+from typing import List
+
+import numpy as np
+
+from neuralmonkey.evaluators.chrf import ChrFEvaluator
+
+
+def random_sentences(rng: random.Random, words: List[str],
+                     count: int, max_length: int) -> List[List[str]]:
+    return [[rng.choice(words) for _ in range(rng.randint(0, max_length))]
+            for _ in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sentences", type=int, default=3000,
+                        help="number of sentences of the validation set")
+    parser.add_argument("--max-length", type=int, default=40,
+                        help="maximum sentence length in words")
+    parser.add_argument("--n", type=int, default=6,
+                        help="longest character n-grams")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of evaluations to average over")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz")
+                     for _ in range(rng.randint(1, 10)))
+             for _ in range(10000)]
+    references = random_sentences(
+        rng, words, args.sentences, args.max_length)
+    hypotheses = [ref[:len(ref) // 2] + hyp for ref, hyp in zip(
+        references, random_sentences(rng, words, args.sentences, 10))]
+
+    evaluator = ChrFEvaluator(n=args.n, beta=3)
+
+    start = time.process_time()
+    evaluator(hypotheses, references)
+    first = time.process_time() - start
+
+    start = time.process_time()
+    for _ in range(args.repeat):
+        evaluator(hypotheses, references)
+    cached = (time.process_time() - start) / args.repeat
+
+    start = time.process_time()
+    np.mean([evaluator.score_instance(hyp, ref)
+             for hyp, ref in zip(hypotheses, references)])
+    per_sentence = time.process_time() - start
+
+    print("{: >12}{: >12}{: >16}".format(
+        "first [s]", "cached [s]", "sentences [s]"))
+    print("{: >12.3f}{: >12.3f}{: >16.3f}".format(
+        first, cached, per_sentence))
+
+
+if __name__ == "__main__":
+    main()
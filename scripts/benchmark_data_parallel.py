@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Measure the scaling of synchronous data-parallel training.
+
+The script trains the model from a given configuration file for a fixed
+number of epochs using different numbers of local worker processes and
+reports the wall-clock time and the speedup relative to the first setting.
+Validation is effectively disabled during the benchmark so that only the
+training throughput is measured.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from neuralmonkey.logging import log as _log
+
+TRAIN_SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+    "bin", "neuralmonkey-train")
+
+
+def log(message: str, color: str = "blue") -> None:
+    _log(message, color)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("config", metavar="INI-FILE",
+                        help="the configuration file of the experiment")
+    parser.add_argument("--workers", type=str, default="1,2,4,8",
+                        help="comma-separated numbers of worker processes")
+    parser.add_argument("--epochs", type=int, default=1,
+                        help="number of training epochs in each run")
+    parser.add_argument("-s", "--set", type=str, metavar="SETTING",
+                        action="append", dest="config_changes", default=[],
+                        help="override an option in the configuration")
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    times = []
+
+    for num_workers in worker_counts:
+        with tempfile.TemporaryDirectory() as output_dir:
+            cmd = [sys.executable, TRAIN_SCRIPT, args.config,
+                   "--workers", str(num_workers),
+                   "-s", "main.output=\"{}\"".format(output_dir),
+                   "-s", "main.epochs={}".format(args.epochs),
+                   "-s", "main.validation_period=\"1000d\"",
+                   "-s", "main.test_datasets=[]"]
+            for change in args.config_changes:
+                cmd.extend(["-s", change])
+
+            log("Training with {} worker(s)".format(num_workers))
+            start = time.time()
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL)
+            times.append(time.time() - start)
+
+    print("{: >8}{: >12}{: >10}".format("workers", "time [s]", "speedup"))
+    for num_workers, elapsed in zip(worker_counts, times):
+        print("{: >8}{: >12.1f}{: >10.2f}".format(
+            num_workers, elapsed, times[0] / elapsed))
+
+
+if __name__ == "__main__":
+    main()
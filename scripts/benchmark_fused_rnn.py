@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Compare the speed of the generic and the fused RNN cells on CPU.
+
+The script measures the throughput of a bidirectional recurrent encoder layer
+(in input tokens per second) and of the greedy decoding loop of a decoder
+without encoders (in decoded tokens per second), both with randomly
+initialized variables. Each measurement is done with the generic and with the
+fused implementation of the cell, using the given number of CPU threads.
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.decoders.autoregressive import LoopState
+from neuralmonkey.decoders.decoder import Decoder
+# pylint: disable=protected-access
+from neuralmonkey.encoders.recurrent import _make_rnn_spec, rnn_layer
+# pylint: enable=protected-access
+from neuralmonkey.vocabulary import Vocabulary, PAD_TOKEN
+
+
+def session_config(threads: int) -> tf.ConfigProto:
+    config = tf.ConfigProto(device_count={"GPU": 0})
+    config.inter_op_parallelism_threads = threads
+    config.intra_op_parallelism_threads = threads
+    return config
+
+
+def measure(fetch: tf.Tensor, feed_dict: Dict, threads: int,
+            repeat: int) -> float:
+    """Return the average time of a session run in seconds."""
+    with tf.Session(config=session_config(threads)) as session:
+        session.run([tf.global_variables_initializer(),
+                     tf.tables_initializer()])
+        session.run(fetch, feed_dict)
+
+        start = time.time()
+        for _ in range(repeat):
+            session.run(fetch, feed_dict)
+        return (time.time() - start) / repeat
+
+
+def encoder_throughput(cell_type: str, fused: bool,
+                       args: argparse.Namespace) -> float:
+    tf.reset_default_graph()
+    inputs = tf.constant(np.random.uniform(
+        -1, 1, [args.batch_size, args.length, args.rnn_size]), tf.float32)
+    lengths = tf.fill([args.batch_size], args.length)
+
+    outputs, _ = rnn_layer(
+        inputs, lengths,
+        _make_rnn_spec(args.rnn_size, "bidirectional", cell_type, fused),
+        add_residual=False)
+
+    seconds = measure(outputs, {}, args.threads, args.repeat)
+    return args.batch_size * args.length / seconds
+
+
+def decoder_throughput(cell_type: str, fused: bool,
+                       args: argparse.Namespace) -> float:
+    tf.reset_default_graph()
+    decoder = Decoder(
+        encoders=[],
+        vocabulary=Vocabulary(
+            ["w{}".format(i) for i in range(args.vocabulary_size)]),
+        data_id="target",
+        name="decoder",
+        max_output_len=args.length,
+        embedding_size=args.rnn_size,
+        rnn_size=args.rnn_size,
+        rnn_cell=cell_type,
+        fused_rnn_cell=fused)
+
+    # Decode for the maximum number of steps, regardless of the end symbols
+    setattr(decoder, "loop_continue_criterion",
+            lambda *a: tf.less(LoopState(*a).feedables.step, args.length))
+
+    feed_dict = {
+        decoder.batch_size: args.batch_size,
+        decoder.train_mode: False,
+        decoder.train_tokens: [[PAD_TOKEN]] * args.batch_size}
+
+    seconds = measure(decoder.runtime_output_states, feed_dict,
+                      args.threads, args.repeat)
+    return args.batch_size * args.length / seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cells", type=str, default="GRU,LSTM",
+                        help="comma-separated cell types to compare")
+    parser.add_argument("--threads", type=int, default=4,
+                        help="number of CPU threads of the session")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--length", type=int, default=50,
+                        help="input length and number of decoding steps")
+    parser.add_argument("--rnn-size", type=int, default=512)
+    parser.add_argument("--vocabulary-size", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of runs to average over")
+    args = parser.parse_args()
+
+    benchmarks = [("encoder", encoder_throughput),
+                  ("decoder", decoder_throughput)] \
+        # type: List[Tuple[str, Callable]]
+
+    print("{: <10}{: <8}{: >16}{: >16}{: >10}".format(
+        "part", "cell", "generic [tok/s]", "fused [tok/s]", "speedup"))
+
+    for part, throughput in benchmarks:
+        for cell_type in args.cells.split(","):
+            generic = throughput(cell_type, False, args)
+            fused = throughput(cell_type, True, args)
+
+            print("{: <10}{: <8}{: >16.0f}{: >16.0f}{: >10.2f}".format(
+                part, cell_type, generic, fused, fused / generic))
+
+
+if __name__ == "__main__":
+    main()
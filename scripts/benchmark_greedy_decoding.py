@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Measure the speed of greedy decoding of long outputs.
+
+The script builds a randomly initialized RNN decoder without encoders and
+measures the average time of greedy decoding for different output lengths.
+The decoding loop always runs for the maximum number of steps. The decoder
+histories are either accumulated in TensorArrays (the default behavior) or
+concatenated to the history tensors in every step (the previous behavior),
+so the two ways can be compared.
+"""
+
+import argparse
+import time
+
+import tensorflow as tf
+
+from neuralmonkey.decoders.autoregressive import LoopState
+from neuralmonkey.decoders.decoder import Decoder
+from neuralmonkey.vocabulary import Vocabulary, PAD_TOKEN
+
+
+def build_decoder(max_output_len: int, vocabulary_size: int,
+                  rnn_size: int, concat_histories: bool) -> Decoder:
+    decoder = Decoder(
+        encoders=[],
+        vocabulary=Vocabulary(
+            ["w{}".format(i) for i in range(vocabulary_size)]),
+        data_id="target",
+        name="decoder",
+        max_output_len=max_output_len,
+        embedding_size=rnn_size,
+        rnn_size=rnn_size)
+
+    # Decode for the maximum number of steps, regardless of the end symbols
+    setattr(decoder, "loop_continue_criterion",
+            lambda *args: tf.less(LoopState(*args).feedables.step,
+                                  max_output_len))
+
+    if concat_histories:
+        setattr(decoder, "histories_to_arrays", lambda histories: histories)
+
+    return decoder
+
+
+def measure(max_output_len: int, args: argparse.Namespace,
+            concat_histories: bool) -> float:
+    tf.reset_default_graph()
+    decoder = build_decoder(max_output_len, args.vocabulary_size,
+                            args.rnn_size, concat_histories)
+    outputs = decoder.runtime_output_states
+
+    feed_dict = {
+        decoder.batch_size: args.batch_size,
+        decoder.train_mode: False,
+        decoder.train_tokens: [[PAD_TOKEN]] * args.batch_size}
+
+    with tf.Session() as session:
+        session.run([tf.global_variables_initializer(),
+                     tf.tables_initializer()])
+        session.run(outputs, feed_dict)
+
+        start = time.time()
+        for _ in range(args.repeat):
+            session.run(outputs, feed_dict)
+        return (time.time() - start) / args.repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lengths", type=str, default="50,100,200,400",
+                        help="comma-separated numbers of decoding steps")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--vocabulary-size", type=int, default=30000)
+    parser.add_argument("--rnn-size", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of runs to average over")
+    args = parser.parse_args()
+
+    print("{: >8}{: >15}{: >15}{: >10}".format(
+        "length", "arrays [ms]", "concat [ms]", "speedup"))
+
+    for length in [int(num) for num in args.lengths.split(",")]:
+        arrays_time = measure(length, args, concat_histories=False)
+        concat_time = measure(length, args, concat_histories=True)
+
+        print("{: >8}{: >15.1f}{: >15.1f}{: >10.2f}".format(
+            length, arrays_time, concat_time,
+            concat_time / arrays_time))
+
+
+if __name__ == "__main__":
+    main()
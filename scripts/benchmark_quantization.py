@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Compare a model with its quantized checkpoints.
+
+For each of the given checkpoints, the script builds the model from the
+experiment configuration, loads the checkpoint and evaluates the model on the
+test datasets from the runtime configuration (the same file as used by
+`neuralmonkey-run`; the variables listed there are ignored). It reports the
+size of the model variables, the time of the evaluation and the evaluation
+results, so the quantized checkpoints (created by
+``scripts/quantize_checkpoint.py``) can be compared with the original one.
+"""
+
+import argparse
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.config.configuration import Configuration
+from neuralmonkey.experiment import Experiment
+
+
+def measure(config: str, checkpoint: str, datasets: List[Any],
+            repeat: int) -> Tuple[float, float, Dict[str, Any]]:
+    exp = Experiment(config_path=config)
+    exp.load_variables([checkpoint])
+
+    with exp.graph.as_default():
+        size = sum(v.dtype.base_dtype.size
+                   * np.prod(v.shape.as_list(), dtype=np.int64)
+                   for v in tf.global_variables())
+
+    results = {}  # type: Dict[str, Any]
+    start = time.time()
+    for _ in range(repeat):
+        for i, dataset in enumerate(datasets):
+            for key, value in exp.evaluate(dataset).items():
+                results["{}/{}".format(i, key)] = value
+    duration = (time.time() - start) / repeat
+
+    for session in exp.model.tf_manager.sessions:
+        session.close()
+
+    return size, duration, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("config", metavar="INI-FILE",
+                        help="the configuration file of the experiment")
+    parser.add_argument("datasets", metavar="INI-TEST-DATASETS",
+                        help="the configuration of the test datasets")
+    parser.add_argument("checkpoints", type=str, nargs="+",
+                        help="the original checkpoint followed by the "
+                        "quantized ones")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="number of runs to average the time over")
+    args = parser.parse_args()
+
+    datasets_cfg = Configuration()
+    datasets_cfg.add_argument("test_datasets")
+    datasets_cfg.ignore_argument("variables")
+    datasets_cfg.load_file(args.datasets)
+    datasets_cfg.build_model()
+    datasets = datasets_cfg.model.test_datasets
+
+    measurements = [measure(args.config, checkpoint, datasets, args.repeat)
+                    for checkpoint in args.checkpoints]
+
+    orig_size, orig_time, orig_results = measurements[0]
+    for checkpoint, (size, duration, results) in zip(
+            args.checkpoints, measurements):
+        print(checkpoint)
+        print("  size: {:.1f} MB ({:.1f} %)".format(
+            size / 2**20, 100 * size / orig_size))
+        print("  time: {:.2f} s (speedup {:.2f})".format(
+            duration, orig_time / duration))
+        for key in sorted(results):
+            value = results[key]
+            if isinstance(value, float):
+                print("  {}: {:.4f} ({:+.4f})".format(
+                    key, value, value - orig_results.get(key, np.nan)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Compare the training throughput with full and sampled softmax.
+
+The script trains the model from a given configuration file for a fixed
+number of epochs, once with the full softmax and once for each of the given
+sampled softmax sizes, and reports the wall-clock time, the number of
+training sentences per second and the speedup relative to the full softmax.
+Validation is effectively disabled during the benchmark so that only the
+training throughput is measured.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from neuralmonkey.logging import log
+
+TRAIN_SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+    "bin", "neuralmonkey-train")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("config", metavar="INI-FILE",
+                        help="the configuration file of the experiment")
+    parser.add_argument("--decoder", type=str, default="decoder",
+                        help="name of the decoder section in the config")
+    parser.add_argument("--sizes", type=str, default="1024,4096",
+                        help="comma-separated numbers of sampled words")
+    parser.add_argument("--epochs", type=int, default=1,
+                        help="number of training epochs in each run")
+    parser.add_argument("--train-size", type=int, default=None,
+                        help="number of training sentences (for reporting "
+                        "the throughput)")
+    parser.add_argument("-s", "--set", type=str, metavar="SETTING",
+                        action="append", dest="config_changes", default=[],
+                        help="override an option in the configuration")
+    args = parser.parse_args()
+
+    sizes = [None] + [int(s) for s in args.sizes.split(",")]
+    times = []
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as output_dir:
+            cmd = [sys.executable, TRAIN_SCRIPT, args.config,
+                   "-s", "main.output=\"{}\"".format(output_dir),
+                   "-s", "main.epochs={}".format(args.epochs),
+                   "-s", "main.validation_period=\"1000d\"",
+                   "-s", "main.test_datasets=[]",
+                   "-s", "{}.sampled_softmax_size={}".format(
+                       args.decoder, size)]
+            for change in args.config_changes:
+                cmd.extend(["-s", change])
+
+            log("Training with {}".format(
+                "full softmax" if size is None
+                else "sampled softmax of {} words".format(size)))
+            start = time.time()
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL)
+            times.append(time.time() - start)
+
+    print("{: >10}{: >12}{: >12}{: >10}".format(
+        "softmax", "time [s]", "sent/s", "speedup"))
+    for size, elapsed in zip(sizes, times):
+        throughput = (args.train_size * args.epochs / elapsed
+                      if args.train_size else float("nan"))
+        print("{: >10}{: >12.1f}{: >12.1f}{: >10.2f}".format(
+            "full" if size is None else size, elapsed, throughput,
+            times[0] / elapsed))
+
+
+if __name__ == "__main__":
+    main()
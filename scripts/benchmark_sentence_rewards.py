@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Measure the per-step cost of the index-based sentence-level rewards.
+
+The script generates random batches of references and hypotheses in the
+``(time, batch)`` layout used by the self-critical objective and reports the
+average time of a single call of ``sentence_bleu`` and ``sentence_gleu``.
+For comparison, the time of the previous per-sentence implementation based
+on counting stringified n-grams is reported as well.
+"""
+
+import argparse
+from collections import Counter
+from itertools import takewhile
+import time
+from typing import Callable
+
+import numpy as np
+
+from neuralmonkey.trainers.self_critical_objective import (
+    sentence_bleu, sentence_gleu)
+from neuralmonkey.vocabulary import END_TOKEN_INDEX
+
+
+def counter_n_gram_statistics(references: np.ndarray,
+                              hypotheses: np.ndarray) -> None:
+    """Count the matching n-grams the way the previous implementation did."""
+    for ref, hyp in zip(np.transpose(references), np.transpose(hypotheses)):
+        for n in range(1, 5):
+            ref_counts = Counter()  # type: Counter
+            for n_gram in takewhile(
+                    lambda g: g[-1] != END_TOKEN_INDEX,
+                    [ref[i:i + n] for i in range(len(ref) - n + 1)]):
+                ref_counts[str(n_gram)] += 1
+
+            for n_gram in takewhile(
+                    lambda g: g[-1] != END_TOKEN_INDEX,
+                    [hyp[i:i + n] for i in range(len(hyp) - n + 1)]):
+                n_gram_s = str(n_gram)
+                if ref_counts[n_gram_s] > 0:
+                    ref_counts[n_gram_s] -= 1
+
+
+def random_batch(random: np.random.RandomState, batch_size: int,
+                 max_length: int, vocabulary_size: int) -> np.ndarray:
+    batch = random.randint(4, vocabulary_size, size=(max_length, batch_size))
+    lengths = random.randint(1, max_length, size=batch_size)
+    for i, length in enumerate(lengths):
+        batch[length, i] = END_TOKEN_INDEX
+        batch[length + 1:, i] = 0
+    return batch
+
+
+def measure(function: Callable, references: np.ndarray,
+            hypotheses: np.ndarray, repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        function(references, hypotheses)
+    return (time.process_time() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-sizes", type=str, default="16,64,256",
+                        help="comma-separated batch sizes")
+    parser.add_argument("--max-length", type=int, default=50,
+                        help="number of decoding steps")
+    parser.add_argument("--vocabulary-size", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="number of calls to average over")
+    args = parser.parse_args()
+
+    random = np.random.RandomState(42)
+
+    print("{: >8}{: >12}{: >12}{: >12}".format(
+        "batch", "bleu [ms]", "gleu [ms]", "old [ms]"))
+
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        references = random_batch(
+            random, batch_size, args.max_length, args.vocabulary_size)
+        hypotheses = random_batch(
+            random, batch_size, args.max_length, args.vocabulary_size)
+
+        print("{: >8}{: >12.2f}{: >12.2f}{: >12.2f}".format(
+            batch_size,
+            measure(sentence_bleu, references, hypotheses, args.repeat),
+            measure(sentence_gleu, references, hypotheses, args.repeat),
+            measure(counter_n_gram_statistics, references, hypotheses,
+                    args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
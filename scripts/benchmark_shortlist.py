@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Measure the speed of greedy decoding with a vocabulary shortlist.
+
+The script builds a randomly initialized RNN decoder without encoders and
+measures the average time of greedy decoding without a shortlist and with
+shortlists of different sizes. The shortlists are the special tokens and
+random subsets of the other words, fed directly to the shortlist placeholder,
+so no lexical table is needed. The decoding loop always runs for the maximum
+number of steps.
+"""
+
+import argparse
+import tempfile
+import time
+from typing import Optional
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.decoders.autoregressive import LoopState
+from neuralmonkey.decoders.decoder import Decoder
+from neuralmonkey.decoders.shortlist import Shortlist
+from neuralmonkey.vocabulary import Vocabulary, PAD_TOKEN, SPECIAL_TOKENS
+
+
+def measure(shortlist_size: Optional[int], args: argparse.Namespace) -> float:
+    tf.reset_default_graph()
+    vocabulary = Vocabulary(
+        ["w{}".format(i) for i in range(args.vocabulary_size)])
+
+    shortlist = None
+    if shortlist_size is not None:
+        with tempfile.NamedTemporaryFile("w") as lexical_table:
+            shortlist = Shortlist("shortlist", vocabulary, "source",
+                                  lexical_table.name)
+
+    decoder = Decoder(
+        encoders=[],
+        vocabulary=vocabulary,
+        data_id="target",
+        name="decoder",
+        max_output_len=args.length,
+        embedding_size=args.rnn_size,
+        rnn_size=args.rnn_size,
+        shortlist=shortlist)
+
+    # Decode for the maximum number of steps, regardless of the end symbols
+    setattr(decoder, "loop_continue_criterion",
+            lambda *args: tf.less(LoopState(*args).feedables.step,
+                                  decoder.max_output_len))
+
+    outputs = decoder.runtime_output_states
+
+    feed_dict = {
+        decoder.batch_size: args.batch_size,
+        decoder.train_mode: False,
+        decoder.train_tokens: [[PAD_TOKEN]] * args.batch_size}
+
+    if shortlist is not None:
+        # The special tokens are always at the beginning of the shortlist
+        words = np.random.choice(
+            np.arange(len(SPECIAL_TOKENS), len(vocabulary)),
+            shortlist_size - len(SPECIAL_TOKENS), replace=False)
+        feed_dict[shortlist.ids] = np.concatenate(
+            [np.arange(len(SPECIAL_TOKENS)), np.sort(words)])
+
+    with tf.Session() as session:
+        session.run([tf.global_variables_initializer(),
+                     tf.tables_initializer()])
+        session.run(outputs, feed_dict)
+
+        start = time.time()
+        for _ in range(args.repeat):
+            session.run(outputs, feed_dict)
+        return (time.time() - start) / args.repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=str, default="1000,2000,5000",
+                        help="comma-separated sizes of the shortlist")
+    parser.add_argument("--length", type=int, default=50,
+                        help="number of decoding steps")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--vocabulary-size", type=int, default=30000)
+    parser.add_argument("--rnn-size", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of runs to average over")
+    args = parser.parse_args()
+
+    full_time = measure(None, args)
+
+    print("{: >10}{: >12}{: >10}".format("shortlist", "time [ms]", "speedup"))
+    print("{: >10}{: >12.1f}{: >10.2f}".format("full", full_time, 1.))
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        short_time = measure(size, args)
+        print("{: >10}{: >12.1f}{: >10.2f}".format(
+            size, short_time, full_time / short_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Measure the startup time of the Neural Monkey command-line tools.
+
+For each of the ``bin/neuralmonkey-*`` entry points, the script measures the
+wall time of importing the module with its ``main`` function and of running
+the tool with the ``--help`` option, both in a fresh Python process. Using
+``python -X importtime`` (Python 3.7 or newer), it also lists the imported
+modules which took the most time.
+"""
+
+import argparse
+import glob
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+MAIN_IMPORT = re.compile(r"from (neuralmonkey[\w.]*) import main")
+
+
+def entry_points() -> List[Tuple[str, str]]:
+    """Find the entry points and the modules they import."""
+    points = []
+    for path in sorted(glob.glob(os.path.join(REPO_DIR, "bin",
+                                              "neuralmonkey-*"))):
+        with open(path, encoding="utf-8") as f_bin:
+            match = MAIN_IMPORT.search(f_bin.read())
+        if match is not None:
+            points.append((path, match.group(1)))
+    return points
+
+
+def wall_time(command: List[str], repeat: int) -> Optional[float]:
+    """Return the minimal wall time of a command in seconds.
+
+    Returns `None` if the command fails.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        process = subprocess.run(
+            command, cwd=REPO_DIR, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL, check=False)
+        if process.returncode != 0:
+            return None
+        times.append(time.time() - start)
+    return min(times)
+
+
+def slowest_imports(module: str, count: int) -> List[Tuple[int, str]]:
+    """Return the imported modules with the highest self time (in us)."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        check=False, universal_newlines=True)
+
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = [f.strip() for f in line[len("import time:"):].split("|")]
+        # Skip the header line
+        if len(fields) == 3 and fields[0].isdigit():
+            imports.append((int(fields[0]), fields[2]))
+
+    return sorted(imports, reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of runs, the fastest one is reported")
+    parser.add_argument("--top", type=int, default=10,
+                        help="number of the slowest imports to list")
+    args = parser.parse_args()
+
+    has_importtime = sys.version_info >= (3, 7)
+
+    print("{: <24}{: >12}{: >12}".format("entry point", "import [s]",
+                                         "--help [s]"))
+    slowest = {}
+    for path, module in entry_points():
+        times = [
+            wall_time([sys.executable, "-c", "import " + module], args.repeat),
+            wall_time([sys.executable, path, "--help"], args.repeat)]
+        print("{: <24}{: >12}{: >12}".format(
+            os.path.basename(path),
+            *["failed" if t is None else "{:.2f}".format(t) for t in times]))
+
+        if has_importtime:
+            slowest[module] = slowest_imports(module, args.top)
+
+    for module, imports in slowest.items():
+        print()
+        print("Slowest imports of {}:".format(module))
+        for self_time, name in imports:
+            print("  {: >10.3f} s  {}".format(self_time / 1e6, name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Build a lexical table from word-aligned parallel data.
+
+The alignments are expected in the format read by the
+``WordAlignmentPreprocessor``, i.e. space-separated pairs of zero-based source
+and target word indices (``s-t`` or ``s:t/w``). For each source word, the
+target words aligned to it are sorted by their translation probability
+estimated from the alignment counts, and the most probable ones are written
+to the output as a line with the source word, a tab character and the
+space-separated candidates. The table is used by the vocabulary shortlist
+(``neuralmonkey.decoders.shortlist``).
+"""
+
+import argparse
+from collections import Counter, defaultdict
+from typing import Dict
+
+from neuralmonkey.logging import log
+from neuralmonkey.processors.alignment import ID_SEP
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", type=argparse.FileType("r"),
+                        help="tokenized source side of the data")
+    parser.add_argument("target", type=argparse.FileType("r"),
+                        help="tokenized target side of the data")
+    parser.add_argument("alignment", type=argparse.FileType("r"),
+                        help="word alignment of the data")
+    parser.add_argument("--output", type=argparse.FileType("w"),
+                        default="-", help="the output file, STDOUT by default")
+    parser.add_argument("--candidates", type=int, default=50,
+                        help="maximum number of candidates per source word")
+    parser.add_argument("--min-probability", type=float, default=0.,
+                        help="minimum translation probability of a candidate")
+    parser.add_argument("--one-based", action="store_true",
+                        help="the alignment indices start from one")
+    args = parser.parse_args()
+
+    counts = defaultdict(Counter)  # type: Dict[str, Counter]
+
+    for i, (src_line, tgt_line, ali_line) in enumerate(
+            zip(args.source, args.target, args.alignment)):
+        src_words = src_line.split()
+        tgt_words = tgt_line.split()
+
+        for ali in ali_line.split():
+            ids, _, _ = ali.partition("/")
+            src_id, tgt_id = [int(id_str) for id_str in ID_SEP.split(ids)]
+
+            if args.one_based:
+                src_id -= 1
+                tgt_id -= 1
+
+            if src_id >= len(src_words) or tgt_id >= len(tgt_words):
+                raise ValueError(
+                    "Alignment point {} out of range on line {}".format(
+                        ali, i + 1))
+
+            counts[src_words[src_id]][tgt_words[tgt_id]] += 1
+
+    for src_word in sorted(counts):
+        total = sum(counts[src_word].values())
+        candidates = [
+            tgt_word for tgt_word, count
+            in counts[src_word].most_common(args.candidates)
+            if count / total >= args.min_probability]
+
+        print("{}\t{}".format(src_word, " ".join(candidates)),
+              file=args.output)
+
+    log("Lexical table with {} source words built".format(len(counts)))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ import sys
 import tensorflow as tf
 
 from neuralmonkey.logging import log as _log
+from neuralmonkey.util.word2vec import write_word2vec
 from neuralmonkey.vocabulary import (
     from_wordlist, from_nematus_json, from_t2t_vocabulary)
 
@@ -39,9 +40,12 @@ def main() -> None:
     parser.add_argument(
         "vocabulary", metavar="VOCABULARY", help="Vocabulary file.")
     parser.add_argument(
-        "--output-file", metavar="OUTPUT", default=sys.stdout,
-        type=argparse.FileType('w'), required=False,
+        "--output-file", metavar="OUTPUT", default=sys.stdout.buffer,
+        type=argparse.FileType('wb'), required=False,
         help="Output file in Word2Vec format, STDOUT by default.")
+    parser.add_argument(
+        "--binary", action="store_true",
+        help="Use the binary Word2Vec format instead of the text one.")
     parser.add_argument(
         "--vocabulary-format", type=str,
         choices=["tsv", "word_list", "nematus_json", "t2t_vocabulary"],
@@ -94,7 +98,7 @@ def main() -> None:
     reader = tf.contrib.framework.load_checkpoint(args.model_checkpoint)
     embeddings = reader.get_tensor(embeddings_name)
 
-    word_count, dimension = embeddings.shape
+    word_count = embeddings.shape[0]
 
     if word_count != len(vocabulary):
         if args.validate_length:
@@ -105,10 +109,8 @@ def main() -> None:
         else:
             word_count = min(word_count, len(vocabulary))
 
-    print("{}\t{}".format(word_count, dimension), file=args.output_file)
-    for word, vector in zip(vocabulary.index_to_word, embeddings):
-        formatted_vector = "\t".join(["{:.8f}".format(x) for x in vector])
-        print("{}\t{}".format(word, formatted_vector), file=args.output_file)
+    write_word2vec(args.output_file, vocabulary.index_to_word[:word_count],
+                   embeddings[:word_count], binary=args.binary)
     args.output_file.close()
 
     log("Done")
@@ -6,6 +6,10 @@ of relative paths), process the images using an imagenet network and extract a
 given convolutional map from the image. The maps are saved as numpy tensors in
 files with a different prefix and the same relative path from this prefix
 ending with .npz.
+
+Alternatively, the maps can be packed into a few large shards, which are read
+by the ``neuralmonkey.readers.numpy_reader.from_shards`` reader without
+opening a file for each image.
 """
 
 import argparse
@@ -19,6 +23,7 @@ from neuralmonkey.dataset import Dataset, BatchingScheme
 from neuralmonkey.encoders.imagenet_encoder import ImageNet
 from neuralmonkey.logging import log
 from neuralmonkey.readers.image_reader import single_image_for_imagenet
+from neuralmonkey.writers.numpy_writer import NumpyShardWriter
 
 
 SUPPORTED_NETWORKS = [
@@ -45,6 +50,11 @@ def main():
     parser.add_argument("--images", type=str,
                         help="File with paths to images or stdin by default.")
     parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--shard-prefix", type=str, default=None,
+                        help="Pack the maps into shards with this path "
+                        "prefix instead of saving a file for each image.")
+    parser.add_argument("--shard-size", type=int, default=1000,
+                        help="Number of images in a shard.")
     args = parser.parse_args()
 
     if args.conv_map is None == args.vector is None:
@@ -54,7 +64,7 @@ def main():
     if not os.path.exists(args.input_prefix):
         raise ValueError("Directory {} does not exist.".format(
             args.input_prefix))
-    if not os.path.exists(args.output_prefix):
+    if args.shard_prefix is None and not os.path.exists(args.output_prefix):
         raise ValueError("Directory {} does not exist.".format(
             args.output_prefix))
 
@@ -90,6 +100,10 @@ def main():
     images = []
     image_paths = []
 
+    shard_writer = None
+    if args.shard_prefix is not None:
+        shard_writer = NumpyShardWriter(args.shard_prefix, args.shard_size)
+
     def process_images():
         dataset = Dataset("dataset", {"images": np.array(images)},
                           BatchingScheme(batch_size=1), {})
@@ -98,6 +112,11 @@ def main():
         fetch = imagenet.encoded if args.vector else imagenet.spatial_states
         feature_maps = session.run(fetch, feed_dict=feed_dict)
 
+        if shard_writer is not None:
+            for features in feature_maps:
+                shard_writer.write(features)
+            return
+
         for features, rel_path in zip(feature_maps, image_paths):
             npz_path = os.path.join(args.output_prefix, rel_path + ".npz")
             os.makedirs(os.path.dirname(npz_path), exist_ok=True)
@@ -118,6 +137,10 @@ def main():
             image_paths = []
     process_images()
 
+    if shard_writer is not None:
+        for path in shard_writer.close():
+            print(path)
+
     if args.images is not None:
         source.close()
 
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Pack numpy arrays stored in separate .npz files into shards.
+
+The script reads a list of .npz files in the format of the
+``neuralmonkey.readers.numpy_reader.from_file_list`` reader and packs the
+arrays into shards for the ``from_shards`` reader, keeping their order.
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from neuralmonkey.writers.numpy_writer import NumpyShardWriter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("list_file", type=str,
+                        help="File with paths to the .npz files.")
+    parser.add_argument("shard_prefix", type=str,
+                        help="Path prefix of the shards.")
+    parser.add_argument("--prefix", type=str, default="",
+                        help="Prefix of the paths in the list.")
+    parser.add_argument("--suffix", type=str, default="",
+                        help="Suffix appended to the paths in the list.")
+    parser.add_argument("--tensor-name", type=str, default="arr_0",
+                        help="Key of the arrays in the .npz files.")
+    parser.add_argument("--shard-size", type=int, default=1000,
+                        help="Number of arrays in a shard.")
+    args = parser.parse_args()
+
+    with NumpyShardWriter(args.shard_prefix, args.shard_size) as writer:
+        with open(args.list_file, encoding="utf-8") as f_list:
+            for line in f_list:
+                path = os.path.join(args.prefix, line.rstrip()) + args.suffix
+                with np.load(path) as npz:
+                    writer.write(npz[args.tensor_name])
+
+    for path in writer.paths:
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Quantize selected variables of a checkpoint for inference.
+
+The variables whose names match any of the given regular expressions (by
+default the embedding matrices and the output projection matrices of the
+decoders) are stored either as 8-bit integers with a scale for each row of
+the vocabulary dimension, or as 16-bit floats. The other variables are copied
+unchanged. The quantized checkpoint can be used in place of the original one
+in `neuralmonkey-run` and `neuralmonkey-server` (see
+``neuralmonkey.quantization``).
+"""
+
+import argparse
+import os
+import re
+from typing import Dict
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.logging import log
+from neuralmonkey.quantization import (
+    DEFAULT_PATTERNS, SCALE_SUFFIX, quantize_int8, dequantize)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("checkpoint", type=str,
+                        help="the checkpoint to quantize")
+    parser.add_argument("output_path", type=str,
+                        help="path to output the quantized checkpoint to")
+    parser.add_argument("--dtype", choices=["int8", "float16"],
+                        default="int8", help="the type of the storage")
+    parser.add_argument("--variables", type=str, nargs="+",
+                        default=DEFAULT_PATTERNS,
+                        help="regular expressions matching the names of the "
+                        "quantized variables")
+    args = parser.parse_args()
+
+    if not os.path.exists("{}.index".format(args.checkpoint)):
+        raise ValueError(
+            "Checkpoint {} does not exist".format(args.checkpoint))
+
+    reader = tf.train.NewCheckpointReader(args.checkpoint)
+    values = {}  # type: Dict[str, np.ndarray]
+    original_size = 0
+    max_error = 0.
+
+    for name in sorted(reader.get_variable_to_shape_map()):
+        value = reader.get_tensor(name)
+        original_size += value.nbytes
+
+        if (not any(re.match(pat, name) for pat in args.variables)
+                or value.dtype != np.float32):
+            values[name] = value
+            continue
+
+        if args.dtype == "float16":
+            values[name] = value.astype(np.float16)
+            scale = None
+        elif value.ndim < 2:
+            log("Variable {} has less than two dimensions, it will not be "
+                "quantized".format(name), color="red")
+            values[name] = value
+            continue
+        else:
+            values[name], scale = quantize_int8(value)
+            values[name + SCALE_SUFFIX] = scale
+
+        error = np.max(np.abs(dequantize(values[name], scale) - value))
+        max_error = max(max_error, error)
+        log("Variable {} {} quantized to {}, max. error {:.5f}".format(
+            name, list(value.shape), args.dtype, error))
+
+    tf_vars = [tf.get_variable(name, shape=value.shape,
+                               dtype=tf.as_dtype(value.dtype))
+               for name, value in values.items()]
+    placeholders = [tf.placeholder(v.dtype, shape=v.shape) for v in tf_vars]
+    assign_ops = [tf.assign(v, p) for (v, p) in zip(tf_vars, placeholders)]
+    saver = tf.train.Saver(tf_vars)
+
+    with tf.Session() as sess:
+        for placeholder, assign_op, value in zip(
+                placeholders, assign_ops, values.values()):
+            sess.run(assign_op, {placeholder: value})
+        saver.save(sess, args.output_path)
+
+    quantized_size = sum(value.nbytes for value in values.values())
+    log("Quantized checkpoint saved in {}".format(args.output_path))
+    log("Size of the variables reduced from {:.1f} MB to {:.1f} MB ({:.1f} "
+        "%), max. quantization error {:.5f}".format(
+            original_size / 2**20, quantized_size / 2**20,
+            100 * quantized_size / original_size, max_error))
+
+
+if __name__ == "__main__":
+    main()
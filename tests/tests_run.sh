@@ -6,24 +6,39 @@ export NEURALMONKEY_STRICT=1
 export PYTHONFAULTHANDLER=1
 
 bin/neuralmonkey-train tests/bahdanau.ini
+bin/neuralmonkey-train tests/bahdanau.ini -s 'decoder.sampled_softmax_size=10' -s 'main.output="tests/outputs/bahdanau_sampled"'
+bin/neuralmonkey-train tests/bahdanau.ini -s 'decoder.shortlist=None' -s 'main.output="tests/outputs/bahdanau_full_softmax"'
+bin/neuralmonkey-train tests/bahdanau.ini -s 'decoder.compaction_interval=2' -s 'main.output="tests/outputs/bahdanau_compacted"'
 NEURALMONKEY_STRICT= bin/neuralmonkey-train tests/bpe.ini
 bin/neuralmonkey-train tests/bpe.ini -s 'decoder.encoders=[<encoder_output_frozen>]' -s 'attention.encoder=<encoder_states_frozen>' -s 'main.initial_variables=["tests/outputs/bpe/variables.data"]'
 # bin/neuralmonkey-train tests/alignment.ini
 bin/neuralmonkey-train tests/post-edit.ini
+# Fused RNN cells initialized with the variables of the generic cells
+bin/neuralmonkey-train tests/post-edit.ini -s 'src_encoder.fused_rnn_cell=True' -s 'trans_encoder.fused_rnn_cell=True' -s 'decoder.fused_rnn_cell=True' -s 'main.initial_variables=["tests/outputs/postedit/variables.data.0"]' -s 'main.output="tests/outputs/postedit_fused"'
 bin/neuralmonkey-train tests/factored.ini
 bin/neuralmonkey-train tests/classifier.ini
+bin/neuralmonkey-train tests/classifier.ini --workers 2 -s 'main.output="tests/outputs/classifier_workers"'
 bin/neuralmonkey-train tests/labeler.ini
 bin/neuralmonkey-train tests/regressor.ini
+# The first run parses the word2vec file and caches the embeddings, the second
+# run memory-maps them from the cache
+rm -rf tests/outputs/word2vec_cache
 bin/neuralmonkey-train tests/language-model.ini
+ls tests/outputs/word2vec_cache/*.npy
+bin/neuralmonkey-train tests/language-model.ini -s 'main.output="tests/outputs/language-model_cached"'
 bin/neuralmonkey-train tests/audio-classifier.ini
 bin/neuralmonkey-train tests/ctc.ini
 bin/neuralmonkey-train tests/beamsearch.ini
 bin/neuralmonkey-train tests/self-critical.ini
 bin/neuralmonkey-train tests/rl.ini
+bin/neuralmonkey-train tests/rl.ini -s 'rl.reward_on_indices=True' -s 'rl.reward_function=trainers.self_critical_objective.sentence_gleu' -s 'main.output="tests/outputs/rl_indices"'
 bin/neuralmonkey-train tests/transformer.ini
+bin/neuralmonkey-train tests/transformer.ini -s 'decoder.sampled_softmax_size=10' -s 'main.output="tests/outputs/transformer_sampled"'
+bin/neuralmonkey-train tests/transformer.ini -s 'decoder.compaction_interval=2' -s 'main.output="tests/outputs/transformer_compacted"'
 bin/neuralmonkey-train tests/str.ini
 bin/neuralmonkey-train tests/flat-multiattention.ini
 bin/neuralmonkey-train tests/hier-multiattention.ini
+bin/neuralmonkey-train tests/hier-multiattention.ini -s 'decoder_hier_share_sentinel.compaction_interval=3' -s 'main.output="tests/outputs/hier-multiattention_compacted"'
 bin/neuralmonkey-train tests/small_sent_cnn.ini
 
 # Testing environment variable substitution in config file
@@ -32,6 +47,12 @@ export NM_EXPERIMENT_NAME='"small"'
 bin/neuralmonkey-run tests/small.ini tests/test_data.ini
 bin/neuralmonkey-run tests/small.ini tests/test_data.ini --json /dev/stdout \
     | python -c 'import sys,json; print(json.load(sys.stdin)[0]["target/bleu"])'
+
+# Quantized checkpoints
+python scripts/quantize_checkpoint.py tests/outputs/small/variables.data.final tests/outputs/small/variables.data.int8
+python scripts/quantize_checkpoint.py tests/outputs/small/variables.data.final tests/outputs/small/variables.data.fp16 --dtype float16
+bin/neuralmonkey-run tests/small.ini tests/test_data_quantized.ini
+python scripts/benchmark_quantization.py tests/small.ini tests/test_data_quantized.ini tests/outputs/small/variables.data.final tests/outputs/small/variables.data.int8 tests/outputs/small/variables.data.fp16
 unset NM_EXPERIMENT_NAME
 
 # Ensembles testing
@@ -55,9 +76,26 @@ sleep 20
 curl 127.0.0.1:5000/run -H "Content-Type: application/json" -X POST -d '{"source": ["I am the eggman.", "I am the walrus ."]}'
 kill $SERVER_PID
 
+# Frozen inference graphs
+NM_EXPERIMENT_NAME=small bin/neuralmonkey-export tests/small.ini tests/outputs/small_frozen
+bin/neuralmonkey-export tests/beamsearch.ini tests/outputs/beamsearch_frozen --variables tests/outputs/beamsearch/variables.data.0
+
+bin/neuralmonkey-server --frozen-model=tests/outputs/beamsearch_frozen --port=5000 &
+SERVER_PID=$!
+sleep 10
+
+curl 127.0.0.1:5000/run -H "Content-Type: application/json" -X POST -d '{"source": [["I", "am", "the", "eggman", "."], ["I", "am", "the", "walrus", "."]]}'
+kill $SERVER_PID
+
 
 # git clone https://github.com/tensorflow/models tests/tensorflow-models
 # bin/neuralmonkey-train tests/captioning.ini
 
+# Generic and fused RNN cells on a small model
+python scripts/benchmark_fused_rnn.py --threads 2 --batch-size 4 --length 5 --rnn-size 16 --vocabulary-size 100 --repeat 1
+
+# Track the startup time of the command-line tools
+python scripts/benchmark_startup.py --repeat 1
+
 rm -rf tests/tmp-test-output
 echo Tests OK.